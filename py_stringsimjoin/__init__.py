@@ -9,12 +9,21 @@ if sys.platform == 'win32':
     __use_cython__ = False
 
 # import join methods
-from py_stringsimjoin.join.cosine_join import cosine_join
-from py_stringsimjoin.join.dice_join import dice_join
-from py_stringsimjoin.join.edit_distance_join import edit_distance_join
-from py_stringsimjoin.join.jaccard_join import jaccard_join
-from py_stringsimjoin.join.overlap_join import overlap_join
-from py_stringsimjoin.join.overlap_coefficient_join import overlap_coefficient_join
+from py_stringsimjoin.join.cosine_join import cosine_join, cosine_join_iter, \
+    cosine_join_sweep
+from py_stringsimjoin.join.dice_join import dice_join, dice_join_iter, \
+    dice_join_sweep
+from py_stringsimjoin.join.edit_distance_join import edit_distance_join, \
+    edit_distance_join_iter
+from py_stringsimjoin.join.jaccard_join import jaccard_join, \
+    jaccard_join_iter, jaccard_join_sweep
+from py_stringsimjoin.join.multi_sim_join import multi_sim_join
+from py_stringsimjoin.join.overlap_join import overlap_join, overlap_join_iter
+from py_stringsimjoin.join.overlap_coefficient_join import \
+    overlap_coefficient_join, overlap_coefficient_join_iter
+from py_stringsimjoin.join.topk_cosine_join import topk_cosine_join
+from py_stringsimjoin.join.topk_dice_join import topk_dice_join
+from py_stringsimjoin.join.topk_jaccard_join import topk_jaccard_join
 
 # import filters
 from py_stringsimjoin.filter.overlap_filter import OverlapFilter
@@ -23,6 +32,12 @@ from py_stringsimjoin.filter.prefix_filter import PrefixFilter
 from py_stringsimjoin.filter.size_filter import SizeFilter
 from py_stringsimjoin.filter.suffix_filter import SuffixFilter
 
+# import index
+from py_stringsimjoin.index.set_sim_join_index import SetSimJoinIndex
+
+# import prepared table
+from py_stringsimjoin.utils.prepared_table import PreparedTable
+
 # import matcher methods
 from py_stringsimjoin.matcher.apply_matcher import apply_matcher
 
@@ -4,6 +4,7 @@ import pyprind
 
 from py_stringsimjoin.utils.generic_helper import build_dict_from_table, \
     get_num_processes_to_launch, split_table
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_key_attr, validate_input_table
 
@@ -32,9 +33,9 @@ class Filter(object):
             candset_r_key_attr (string): attribute in candidate set which is a 
                 key in right table.
 
-            ltable (DataFrame): left input table.
+            ltable (DataFrame or PreparedTable): left input table.
 
-            rtable (DataFrame): right input table.
+            rtable (DataFrame or PreparedTable): right input table.
 
             l_key_attr (string): key attribute in left table.
 
@@ -73,6 +74,10 @@ class Filter(object):
         validate_attr(candset_r_key_attr, candset.columns,
                       'right key attribute', 'candset')
 
+        # use the dataframes of the prepared tables, if any
+        ltable, l_prepared_table = unwrap_prepared_table(ltable)
+        rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
         # check if the input tables are dataframes
         validate_input_table(ltable, 'left table')
         validate_input_table(rtable, 'right table')
@@ -95,8 +100,10 @@ class Filter(object):
 
         # check if the key attributes are unique and do not contain 
         # missing values
-        validate_key_attr(l_key_attr, ltable, 'left table')
-        validate_key_attr(r_key_attr, rtable, 'right table')
+        validate_key_attr(l_key_attr, ltable, 'left table',
+                          l_prepared_table)
+        validate_key_attr(r_key_attr, rtable, 'right table',
+                          r_prepared_table)
 
         # check for empty candset
         if candset.empty:
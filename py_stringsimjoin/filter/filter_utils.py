@@ -1,8 +1,20 @@
+from bisect import bisect_left, insort
+from heapq import heapify, heappop, heappush
 from math import ceil
 from math import floor
 from math import sqrt
 from sys import maxsize
 
+from six import iteritems
+
+
+# costs of looking up a candidate in a long list with binary search, and of
+# merging an id of the short lists with MergeSkip, relative to the cost of
+# counting an id of a list, used by DivideSkip to choose the number of long
+# lists.
+BINARY_SEARCH_COST = 3
+MERGE_SKIP_COST = 10
+
 
 def get_size_lower_bound(num_tokens, sim_measure_type, threshold):
     """Computes lower bound for size filter.
@@ -25,7 +37,7 @@ def get_size_lower_bound(num_tokens, sim_measure_type, threshold):
     elif sim_measure_type == 'JACCARD':
         return int(ceil(round(threshold * num_tokens, 4)))
     elif sim_measure_type == 'OVERLAP':
-        return threshold
+        return int(ceil(threshold))
 
 
 def get_size_upper_bound(num_tokens, sim_measure_type, threshold):
@@ -74,7 +86,61 @@ def get_prefix_length(num_tokens, sim_measure_type, threshold, tokenizer):
     elif sim_measure_type == 'JACCARD':
         return int(num_tokens - ceil(threshold * num_tokens) + 1)
     elif sim_measure_type == 'OVERLAP':
-        return max(num_tokens - threshold + 1, 0)
+        return max(num_tokens - int(ceil(threshold)) + 1, 0)
+    elif sim_measure_type == 'OVERLAP_COEFFICIENT':
+        # prefix length of the record when it is the smaller record of a pair.
+        return num_tokens - max(int(ceil(round(threshold * num_tokens, 4))),
+                                1) + 1
+
+
+def get_location_prefix_length(token_positions, qval, threshold):
+    """Computes the prefix length of a string for edit distance, using the
+    locations of its q-grams.
+
+    token_positions holds the locations of the ordered q-grams of the string.
+    An edit operation destroys the q-grams overlapping its location, and the
+    prefix is the shortest prefix of the ordered q-grams which cannot be
+    destroyed by threshold edit operations. The prefix has at most
+    qval * threshold + 1 q-grams.
+
+    References:
+        * Ed-Join: An Efficient Algorithm for Similarity Joins With Edit
+          Distance Constraints, VLDB 2008.
+    """
+    num_tokens = len(token_positions)
+    max_prefix_length = min(qval * threshold + 1, num_tokens)
+    locations = []
+    for prefix_length in range(1, max_prefix_length + 1):
+        insort(locations, token_positions[prefix_length - 1])
+        if get_min_edit_errors(locations, qval) > threshold:
+            return prefix_length
+    return max_prefix_length
+
+
+def get_min_edit_errors(locations, qval):
+    """Computes the minimum number of edit operations needed to destroy the
+    q-grams at the input sorted locations, placing each edit operation at the
+    last location of the leftmost q-gram that is not yet destroyed."""
+    num_edits = 0
+    last_destroyed = -1
+    for location in locations:
+        if location > last_destroyed:
+            num_edits += 1
+            last_destroyed = location + qval - 1
+    return num_edits
+
+
+def get_char_count_distance(l_char_counts, r_char_counts):
+    """Computes the L1 distance between two dicts of character counts. Each
+    edit operation changes the distance by at most 2, hence half the distance
+    is a lower bound on the edit distance (content filter of Ed-Join)."""
+    dist = 0
+    for char, count in l_char_counts.items():
+        dist += abs(count - r_char_counts.get(char, 0))
+    for char, count in r_char_counts.items():
+        if char not in l_char_counts:
+            dist += count
+    return dist
 
 
 def get_overlap_threshold(l_num_tokens, r_num_tokens,
@@ -95,4 +161,173 @@ def get_overlap_threshold(l_num_tokens, r_num_tokens,
         return ceil(round((threshold / (1 + threshold)) * 
                           (l_num_tokens + r_num_tokens), 4))
     elif sim_measure_type == 'OVERLAP':
-        return threshold
+        return int(ceil(threshold))
+    elif sim_measure_type == 'OVERLAP_COEFFICIENT':
+        return max(int(ceil(round(threshold * min(l_num_tokens, r_num_tokens),
+                                  4))), 1)
+
+
+def est_hamming_dist_lower_bound(x, x_start, x_end, y, y_start, y_end,
+                                 hamming_dist_max, depth, max_depth):
+    """Estimates a lower bound on the hamming distance between the sorted 
+    token lists x[x_start:x_end] and y[y_start:y_end].
+
+    Both the lists are recursively partitioned using the middle token of y, 
+    up to a recursion depth of max_depth. The recursion stops as soon as the 
+    lower bound exceeds hamming_dist_max.
+
+    References:
+        * Efficient Similarity Joins for Near Duplicate Detection, WWW 2008.
+    """
+    x_size = x_end - x_start
+    y_size = y_end - y_start
+    abs_diff = abs(x_size - y_size)
+    if depth > max_depth or x_size == 0 or y_size == 0:
+        return abs_diff
+
+    y_mid = y_start + y_size // 2
+    x_pos = bisect_left(x, y[y_mid], x_start, x_end)
+
+    # if the middle token of y is present in x, it is excluded from the right
+    # partition of x. Else, it contributes 1 to the hamming distance.
+    if x_pos < x_end and x[x_pos] == y[y_mid]:
+        diff = 0
+        x_pos_right = x_pos + 1
+    else:
+        diff = 1
+        x_pos_right = x_pos
+
+    left_diff = abs((x_pos - x_start) - (y_mid - y_start))
+    right_diff = abs((x_end - x_pos_right) - (y_end - y_mid - 1))
+
+    hamming_dist = left_diff + right_diff + diff
+    if hamming_dist > hamming_dist_max:
+        return hamming_dist
+
+    hamming_dist_l = est_hamming_dist_lower_bound(
+                         x, x_start, x_pos, y, y_start, y_mid,
+                         hamming_dist_max - right_diff - diff,
+                         depth + 1, max_depth)
+    hamming_dist = hamming_dist_l + right_diff + diff
+    if hamming_dist > hamming_dist_max:
+        return hamming_dist
+
+    hamming_dist_r = est_hamming_dist_lower_bound(
+                         x, x_pos_right, x_end, y, y_mid + 1, y_end,
+                         hamming_dist_max - hamming_dist_l - diff,
+                         depth + 1, max_depth)
+    return hamming_dist_l + hamming_dist_r + diff
+
+
+def get_num_long_lists(list_lengths, threshold):
+    """Computes the number of long lists that DivideSkip handles with binary
+    search, for the input list lengths, sorted in decreasing order, and
+    occurrence threshold. At most threshold - 1 lists are long, so that the
+    candidates occur at least once in the short lists.
+
+    The number of long lists minimizes the estimated cost of the merge. The
+    ids of the short lists are merged, by counting them if the candidates
+    only need to occur once in the short lists, or by MergeSkip otherwise,
+    and each of them is looked up in each long list in the worst case.
+    Hence, the lists that are much longer than the others are long. If no
+    list is long, the ids of all the lists are counted.
+
+    References:
+        * Efficient Merging and Filtering Algorithms for Approximate String
+          Searches, ICDE 2008.
+    """
+    num_ids = sum(list_lengths)
+    num_long_lists = 0
+    min_cost = num_ids
+    for num_lists in range(1, min(threshold, len(list_lengths) + 1)):
+        num_ids -= list_lengths[num_lists - 1]
+        merge_cost = 1 if num_lists == threshold - 1 else MERGE_SKIP_COST
+        cost = num_ids * (merge_cost + BINARY_SEARCH_COST * num_lists)
+        if cost < min_cost:
+            num_long_lists = num_lists
+            min_cost = cost
+    return num_long_lists
+
+
+def merge_skip(lists, threshold):
+    """Finds the ids occurring in at least threshold of the input lists, which
+    are sorted lists of distinct ids, and returns a dict mapping each of these
+    ids to its number of occurrences (MergeSkip).
+
+    The heads of the lists are kept in a heap. When the smallest head occurs
+    in fewer than threshold lists, threshold - 1 heads are popped, and their
+    lists jump with binary search to the smallest remaining head, as the ids
+    before it cannot occur threshold times.
+
+    References:
+        * Efficient Merging and Filtering Algorithms for Approximate String
+          Searches, ICDE 2008.
+    """
+    positions = [0] * len(lists)
+    heap = [(id_list[0], list_index)
+            for list_index, id_list in enumerate(lists) if id_list]
+    heapify(heap)
+    occurrences = {}
+    while len(heap) >= threshold:
+        top_id = heap[0][0]
+        popped = []
+        while heap and heap[0][0] == top_id:
+            popped.append(heappop(heap)[1])
+
+        if len(popped) >= threshold:
+            occurrences[top_id] = len(popped)
+            for list_index in popped:
+                positions[list_index] += 1
+        else:
+            # at least threshold heads are left in the heap, so it is not
+            # empty after popping threshold - 1 of them.
+            for _ in range(threshold - 1 - len(popped)):
+                popped.append(heappop(heap)[1])
+            next_id = heap[0][0]
+            for list_index in popped:
+                positions[list_index] = bisect_left(lists[list_index], next_id,
+                                                    positions[list_index])
+
+        for list_index in popped:
+            if positions[list_index] < len(lists[list_index]):
+                heappush(heap, (lists[list_index][positions[list_index]],
+                                list_index))
+    return occurrences
+
+
+def divide_skip(lists, threshold, num_long_lists):
+    """Finds the ids occurring in at least threshold of the input lists, which
+    are sorted lists of distinct ids, and returns a dict mapping each of these
+    ids to its number of occurrences (DivideSkip).
+
+    The num_long_lists longest lists are not scanned. An id occurring
+    threshold times occurs at least threshold - num_long_lists times in the
+    other lists, which are merged using MergeSkip. If that is only once,
+    every id of the other lists is a candidate, and they are counted directly
+    instead. The occurrences of the candidates in the long lists are then
+    counted with binary search.
+
+    References:
+        * Efficient Merging and Filtering Algorithms for Approximate String
+          Searches, ICDE 2008.
+    """
+    lists = sorted(lists, key=len, reverse=True)
+    long_lists = lists[:num_long_lists]
+    if threshold - num_long_lists > 1:
+        candidates = merge_skip(lists[num_long_lists:],
+                                threshold - num_long_lists)
+    else:
+        candidates = {}
+        for id_list in lists[num_long_lists:]:
+            for cand in id_list:
+                candidates[cand] = candidates.get(cand, 0) + 1
+
+    occurrences = {}
+    for cand, num_occurrences in iteritems(candidates):
+        for id_list in long_lists:
+            pos = bisect_left(id_list, cand)
+            if pos < len(id_list) and id_list[pos] == cand:
+                num_occurrences += 1
+        if num_occurrences >= threshold:
+            occurrences[cand] = num_occurrences
+    return occurrences
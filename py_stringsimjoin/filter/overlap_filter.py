@@ -1,4 +1,5 @@
 # Overlap Filter
+from math import ceil, floor
 
 from joblib import delayed, Parallel
 from six import iteritems
@@ -6,6 +7,7 @@ import pandas as pd
 import pyprind
 
 from py_stringsimjoin.filter.filter import Filter
+from py_stringsimjoin.filter.filter_utils import divide_skip
 from py_stringsimjoin.index.inverted_index import InvertedIndex
 from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     find_output_attribute_indices, get_attrs_to_project, \
@@ -13,6 +15,7 @@ from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     get_output_row_from_tables, remove_redundant_attrs, split_table, COMP_OP_MAP
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
 from py_stringsimjoin.utils.simfunctions import overlap
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
@@ -103,9 +106,9 @@ class OverlapFilter(Filter):
         overlap filtering technique.
 
         Args:
-            ltable (DataFrame): left input table.
+            ltable (DataFrame or PreparedTable): left input table.
 
-            rtable (DataFrame): right input table.
+            rtable (DataFrame or PreparedTable): right input table.
 
             l_key_attr (string): key attribute in left table.
 
@@ -155,6 +158,10 @@ class OverlapFilter(Filter):
             (DataFrame).
         """
 
+        # use the dataframes of the prepared tables, if any
+        ltable, l_prepared_table = unwrap_prepared_table(ltable)
+        rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
         # check if the input tables are dataframes
         validate_input_table(ltable, 'left table')
         validate_input_table(rtable, 'right table')
@@ -181,8 +188,10 @@ class OverlapFilter(Filter):
 
         # check if the key attributes are unique and do not contain 
         # missing values
-        validate_key_attr(l_key_attr, ltable, 'left table')
-        validate_key_attr(r_key_attr, rtable, 'right table')
+        validate_key_attr(l_key_attr, ltable, 'left table',
+                          l_prepared_table)
+        validate_key_attr(r_key_attr, rtable, 'right table',
+                          r_prepared_table)
 
         # remove redundant attrs from output attrs.
         l_out_attrs = remove_redundant_attrs(l_out_attrs, l_key_attr)
@@ -254,11 +263,34 @@ class OverlapFilter(Filter):
         return output_table
 
     def find_candidates(self, probe_tokens, inverted_index):
+        """Finds the records of the inverted index whose overlap with the probe
+        tokens may satisfy the condition on the overlap size threshold, and
+        returns a dict mapping each of them to its overlap.
+
+        If a candidate needs more than one common token, the tokenizer
+        returns sets and some lists of the probe tokens are long, the lists
+        are merged using DivideSkip, which handles the long lists with binary
+        search instead of scanning them. Otherwise, the overlap of every
+        record sharing a token with the probe tokens is counted.
+        """
         candidate_overlap = {}
 
         if not inverted_index.index:
             return candidate_overlap
 
+        if self.comp_op == '>':
+            required_overlap = int(floor(self.overlap_size)) + 1
+        else:
+            required_overlap = int(ceil(self.overlap_size))
+
+        if required_overlap > 1 and self.tokenizer.get_return_set():
+            num_long_lists = len(inverted_index.get_long_lists(
+                                 required_overlap, probe_tokens))
+            if num_long_lists > 0:
+                return divide_skip([inverted_index.probe(token)
+                                    for token in probe_tokens],
+                                   required_overlap, num_long_lists)
+
         for token in probe_tokens:
             for cand in inverted_index.probe(token):
                 candidate_overlap[cand] = candidate_overlap.get(cand, 0) + 1
@@ -13,8 +13,9 @@ from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     get_output_row_from_tables, remove_redundant_attrs, split_table
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
 from py_stringsimjoin.utils.token_ordering import gen_token_ordering_for_lists, \
-    gen_token_ordering_for_tables, order_using_token_ordering
+    order_using_token_ordering, tokenize_and_order_tables
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_key_attr, validate_input_table, \
     validate_threshold, validate_tokenizer_for_sim_measure, \
@@ -141,9 +142,9 @@ class PrefixFilter(Filter):
         prefix filtering technique.
 
         Args:
-            ltable (DataFrame): left input table.
+            ltable (DataFrame or PreparedTable): left input table.
 
-            rtable (DataFrame): right input table.
+            rtable (DataFrame or PreparedTable): right input table.
 
             l_key_attr (string): key attribute in left table.
 
@@ -193,6 +194,10 @@ class PrefixFilter(Filter):
             (DataFrame).
         """
 
+        # use the dataframes of the prepared tables, if any
+        ltable, l_prepared_table = unwrap_prepared_table(ltable)
+        rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
         # check if the input tables are dataframes
         validate_input_table(ltable, 'left table')
         validate_input_table(rtable, 'right table')
@@ -219,8 +224,10 @@ class PrefixFilter(Filter):
 
         # check if the key attributes are unique and do not contain 
         # missing values
-        validate_key_attr(l_key_attr, ltable, 'left table')
-        validate_key_attr(r_key_attr, rtable, 'right table')
+        validate_key_attr(l_key_attr, ltable, 'left table',
+                          l_prepared_table)
+        validate_key_attr(r_key_attr, rtable, 'right table',
+                          r_prepared_table)
 
         # remove redundant attrs from output attrs.
         l_out_attrs = remove_redundant_attrs(l_out_attrs, l_key_attr)
@@ -290,17 +297,21 @@ class PrefixFilter(Filter):
 
         return output_table
 
-    def find_candidates(self, probe_tokens, prefix_index):
+    def find_candidates(self, probe_tokens, prefix_index,
+                        probe_prefix_length=None):
         # probe prefix index to find candidates for the input probe tokens.
+        # The prefix length of the probe tokens is computed using the
+        # similarity measure, if it is not given.
 
         if not prefix_index.index:
             return set()
 
-        probe_num_tokens = len(probe_tokens)
-        probe_prefix_length = get_prefix_length(probe_num_tokens,
-                                                self.sim_measure_type,
-                                                self.threshold,
-                                                self.tokenizer)
+        if probe_prefix_length is None:
+            probe_num_tokens = len(probe_tokens)
+            probe_prefix_length = get_prefix_length(probe_num_tokens,
+                                                    self.sim_measure_type,
+                                                    self.threshold,
+                                                    self.tokenizer)
 
         candidates = set()
         for token in probe_tokens[0:probe_prefix_length]:
@@ -326,12 +337,13 @@ def _filter_tables_split(ltable, rtable,
     r_filter_attr_index = r_columns.index(r_filter_attr)
     r_out_attrs_indices = find_output_attribute_indices(r_columns, r_out_attrs)
 
-    # generate token ordering using tokens in l_filter_attr and r_filter_attr
-    token_ordering = gen_token_ordering_for_tables(
+    # tokenize l_filter_attr and r_filter_attr, and order the tokens using the
+    # token ordering generated from the same pass
+    token_lists, token_ordering = tokenize_and_order_tables(
                                  [ltable, rtable],
                                  [l_filter_attr_index, r_filter_attr_index],
-                                 prefix_filter.tokenizer,
-                                 prefix_filter.sim_measure_type)
+                                 prefix_filter.tokenizer)
+    l_token_lists, r_token_lists = token_lists
 
     # ignore allow_empty flag for OVERLAP and EDIT_DISTANCE measures.           
     handle_empty = (prefix_filter.allow_empty and
@@ -343,7 +355,7 @@ def _filter_tables_split(ltable, rtable,
                        prefix_filter.threshold, token_ordering)
     # While building the index, we cache the record ids with empty set of 
     # tokens. This is needed to handle the allow_empty flag.
-    cached_data = prefix_index.build(handle_empty)
+    cached_data = prefix_index.build(handle_empty, token_lists=l_token_lists)
     l_empty_records = cached_data['empty_records']
 
     output_rows = []
@@ -353,12 +365,7 @@ def _filter_tables_split(ltable, rtable,
     if show_progress:
         prog_bar = pyprind.ProgBar(len(rtable))
 
-    for r_row in rtable:
-        r_string = r_row[r_filter_attr_index]
-
-        r_filter_attr_tokens = prefix_filter.tokenizer.tokenize(r_string)
-        r_ordered_tokens = order_using_token_ordering(r_filter_attr_tokens,
-                                                      token_ordering)
+    for r_row, r_ordered_tokens in zip(rtable, r_token_lists):
 
         # If allow_empty flag is set and the current rtable record has empty set
         # of tokens in the filter attribute, then generate output pairs joining   
@@ -15,6 +15,7 @@ from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     get_output_row_from_tables, remove_redundant_attrs, split_table
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_key_attr, validate_input_table, \
     validate_threshold, validate_tokenizer_for_sim_measure, \
@@ -124,9 +125,9 @@ class SizeFilter(Filter):
         size filtering technique.
 
         Args:
-            ltable (DataFrame): left input table.
+            ltable (DataFrame or PreparedTable): left input table.
 
-            rtable (DataFrame): right input table.
+            rtable (DataFrame or PreparedTable): right input table.
 
             l_key_attr (string): key attribute in left table.
 
@@ -170,6 +171,10 @@ class SizeFilter(Filter):
             (DataFrame).
         """
 
+        # use the dataframes of the prepared tables, if any
+        ltable, l_prepared_table = unwrap_prepared_table(ltable)
+        rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
         # check if the input tables are dataframes
         validate_input_table(ltable, 'left table')
         validate_input_table(rtable, 'right table')
@@ -196,8 +201,10 @@ class SizeFilter(Filter):
 
         # check if the key attributes are unique and do not contain 
         # missing values
-        validate_key_attr(l_key_attr, ltable, 'left table')
-        validate_key_attr(r_key_attr, rtable, 'right table')
+        validate_key_attr(l_key_attr, ltable, 'left table',
+                          l_prepared_table)
+        validate_key_attr(r_key_attr, rtable, 'right table',
+                          r_prepared_table)
 
         # remove redundant attrs from output attrs.
         l_out_attrs = remove_redundant_attrs(l_out_attrs, l_key_attr)
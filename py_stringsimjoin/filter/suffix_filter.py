@@ -1,20 +1,19 @@
-from math import ceil, floor
-
 from joblib import delayed, Parallel
 import pandas as pd
 import pyprind
 
 from py_stringsimjoin.filter.filter import Filter
-from py_stringsimjoin.filter.filter_utils import get_overlap_threshold, \
-                                                 get_prefix_length
+from py_stringsimjoin.filter.filter_utils import \
+    est_hamming_dist_lower_bound, get_overlap_threshold, get_prefix_length
 from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     find_output_attribute_indices, get_attrs_to_project, \
     get_num_processes_to_launch, get_output_header_from_tables, \
     get_output_row_from_tables, remove_redundant_attrs, split_table
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
 from py_stringsimjoin.utils.token_ordering import gen_token_ordering_for_lists,\
-    gen_token_ordering_for_tables, order_using_token_ordering
+    order_using_token_ordering, tokenize_and_order_tables
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_key_attr, validate_input_table, \
     validate_threshold, validate_tokenizer_for_sim_measure, \
@@ -127,37 +126,55 @@ class SuffixFilter(Filter):
         if l_prefix_length <= 0 or r_prefix_length <= 0:
             return True
 
-        return self._filter_suffix(ordered_ltokens[l_prefix_length:],
-                             ordered_rtokens[r_prefix_length:],
-                             l_prefix_length,
-                             r_prefix_length,
-                             l_num_tokens, r_num_tokens)
+        return self._filter_suffix(ordered_ltokens, ordered_rtokens,
+                                   l_prefix_length, r_prefix_length)
     
-    def _filter_suffix(self, l_suffix, r_suffix,
-                       l_prefix_num_tokens, r_prefix_num_tokens,
-                       l_num_tokens, r_num_tokens):
+    def _filter_suffix(self, ordered_ltokens, ordered_rtokens,
+                       l_prefix_length, r_prefix_length):
+        l_num_tokens = len(ordered_ltokens)
+        r_num_tokens = len(ordered_rtokens)
+        l_prefix_length = min(l_prefix_length, l_num_tokens)
+        r_prefix_length = min(r_prefix_length, r_num_tokens)
+
+        # find the overlap between the prefixes and the positions following 
+        # the last common token of the prefixes, by merging the prefixes.
+        i = j = prefix_overlap = 0
+        l_start = r_start = 0
+        while i < l_prefix_length and j < r_prefix_length:
+            if ordered_ltokens[i] == ordered_rtokens[j]:
+                prefix_overlap += 1
+                i += 1
+                j += 1
+                l_start = i
+                r_start = j
+            elif ordered_ltokens[i] < ordered_rtokens[j]:
+                i += 1
+            else:
+                j += 1
+
         # compute the overlap needed between the tokens to satisfy the 
         # threshold.
         overlap_threshold = get_overlap_threshold(l_num_tokens, r_num_tokens,
                                                   self.sim_measure_type,
                                                   self.threshold,
                                                   self.tokenizer)
-       
-        if (l_prefix_num_tokens >= overlap_threshold and 
-            r_prefix_num_tokens >= overlap_threshold):
-            return False
 
-        # compute the maximum allowed hamming distance between the
-        # suffix tokens in order to satisfy the threshold.
-        hamming_dist_max = (l_num_tokens + r_num_tokens - 2 * overlap_threshold)
+        # The tokens up to the last common token of the prefixes are smaller 
+        # than the tokens after it in both the strings, and the common tokens
+        # among them all lie in the prefixes. So, the suffixes following the 
+        # last common token need an overlap of at least the remaining required
+        # overlap. Compute the maximum allowed hamming distance between these
+        # suffixes in order to satisfy the threshold.
+        hamming_dist_max = ((l_num_tokens - l_start) + 
+                            (r_num_tokens - r_start) -
+                            2 * (overlap_threshold - prefix_overlap))
 
         # compute lowerbound on the actual hamming distance between the suffix
         # tokens.
-        hamming_dist = self._est_hamming_dist_lower_bound(
-                                l_suffix, r_suffix,
-                                l_num_tokens - l_prefix_num_tokens,
-                                r_num_tokens - r_prefix_num_tokens,
-                                hamming_dist_max, 1)
+        hamming_dist = est_hamming_dist_lower_bound(
+                                ordered_ltokens, l_start, l_num_tokens,
+                                ordered_rtokens, r_start, r_num_tokens,
+                                hamming_dist_max, 1, self.max_depth)
         
         # if the lowerbound on the actual hamming distance is already above the
         # maximum allowed hamming distance, then we can filter the pair.
@@ -175,9 +192,9 @@ class SuffixFilter(Filter):
         suffix filtering technique.
 
         Args:
-            ltable (DataFrame): left input table.
+            ltable (DataFrame or PreparedTable): left input table.
 
-            rtable (DataFrame): right input table.
+            rtable (DataFrame or PreparedTable): right input table.
 
             l_key_attr (string): key attribute in left table.
 
@@ -221,6 +238,10 @@ class SuffixFilter(Filter):
             (DataFrame).
         """
 
+        # use the dataframes of the prepared tables, if any
+        ltable, l_prepared_table = unwrap_prepared_table(ltable)
+        rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
         # check if the input tables are dataframes
         validate_input_table(ltable, 'left table')
         validate_input_table(rtable, 'right table')
@@ -247,8 +268,10 @@ class SuffixFilter(Filter):
 
         # check if the key attributes are unique and do not contain 
         # missing values
-        validate_key_attr(l_key_attr, ltable, 'left table')
-        validate_key_attr(r_key_attr, rtable, 'right table')
+        validate_key_attr(l_key_attr, ltable, 'left table',
+                          l_prepared_table)
+        validate_key_attr(r_key_attr, rtable, 'right table',
+                          r_prepared_table)
 
         # remove redundant attrs from output attrs.
         l_out_attrs = remove_redundant_attrs(l_out_attrs, l_key_attr)
@@ -318,111 +341,6 @@ class SuffixFilter(Filter):
 
         return output_table
 
-    def _est_hamming_dist_lower_bound(self, l_suffix, r_suffix,
-                                      l_suffix_num_tokens,
-                                      r_suffix_num_tokens,
-                                      hamming_dist_max, depth):
-        abs_diff = abs(l_suffix_num_tokens - r_suffix_num_tokens)
-        if (depth > self.max_depth or
-            l_suffix_num_tokens == 0 or
-            r_suffix_num_tokens == 0):
-            return abs_diff
-
-        if l_suffix_num_tokens == 1 and r_suffix_num_tokens==1:
-            return int(not l_suffix[0] == r_suffix[0])
-
-        r_mid = int(floor(r_suffix_num_tokens / 2))
-        r_mid_token = r_suffix[r_mid]
-        o = (hamming_dist_max - abs_diff) / 2
-
-        if l_suffix_num_tokens < r_suffix_num_tokens:
-            o_l = 1
-            o_r = 0
-        else:
-            o_l = 0
-            o_r = 1
-
-        # partition the tokens using the probe token.
-        (r_l, r_r, flag, diff) = self._partition(
-                                  r_suffix, r_mid_token, r_mid, r_mid)
-        (l_l, l_r, flag, diff) = self._partition(l_suffix, r_mid_token,
-                                  max(0, int(r_mid - o - abs_diff * o_l)),
-                                  min(l_suffix_num_tokens - 1,
-                                      int(r_mid + o + abs_diff * o_r)))
-
-        if flag == 0:
-            return hamming_dist_max + 1
-
-        r_l_num_tokens = len(r_l)
-        r_r_num_tokens = len(r_r)
-        l_l_num_tokens = len(l_l)
-        l_r_num_tokens = len(l_r)
-        hamming_dist = (abs(l_l_num_tokens - r_l_num_tokens) +
-                        abs(l_r_num_tokens - r_r_num_tokens) + diff)
-
-        if hamming_dist > hamming_dist_max:
-            return hamming_dist
-        else:
-            # compute lower bound on hamming distance in the left partition.
-            hamming_dist_l = self._est_hamming_dist_lower_bound(
-                             l_l, r_l, l_l_num_tokens, r_l_num_tokens,
-                             hamming_dist_max -
-                                 abs(l_r_num_tokens - r_r_num_tokens) - diff,
-                             depth + 1)
-            hamming_dist = (hamming_dist_l +
-                            abs(l_r_num_tokens - r_r_num_tokens) + diff)
-
-            if hamming_dist <= hamming_dist_max:
-                # compute lower bound on hamming distance in the right 
-                # partition.
-                hamming_dist_r = self._est_hamming_dist_lower_bound(
-                                 l_r, r_r, l_r_num_tokens, r_r_num_tokens,
-                                 hamming_dist_max - hamming_dist_l - diff,
-                                 depth + 1)
-                return hamming_dist_l + hamming_dist_r + diff
-            else:
-                return hamming_dist
-
-    def _partition(self, tokens, probe_token, left, right):
-        """Partition the tokens using the probe token."""
-        right = min(right, len(tokens) - 1)
-
-        if right < left:
-            return [], [], 0, 1
-
-        if tokens[left] > probe_token:
-            return [], [], 0, 1
-
-        if tokens[right] < probe_token:
-            return [], [], 0, 1
-
-        pos = self._binary_search(tokens, probe_token, left, right)
-        tokens_left = tokens[0:pos]
-
-        if tokens[pos] == probe_token:
-            tokens_right = tokens[pos+1:len(tokens)]
-            diff = 0
-        else:
-            tokens_right = tokens[pos:len(tokens)]
-            diff = 1
-
-        return tokens_left, tokens_right, 1, diff
-
-    def _binary_search(self, tokens, probe_token, left, right):
-        """Peform binary search to find the position of the probe token."""
-        if left == right:
-            return left
-
-        mid = int(floor((left + right) / 2))
-        mid_token = tokens[mid]
-
-        if mid_token == probe_token:
-            return mid
-        elif mid_token < probe_token:
-            return self._binary_search(tokens, probe_token, mid+1, right)
-        else:
-            return self._binary_search(tokens, probe_token, left, mid)
-
 
 def _filter_tables_split(ltable, rtable,
                          l_columns, r_columns,
@@ -441,12 +359,13 @@ def _filter_tables_split(ltable, rtable,
     r_filter_attr_index = r_columns.index(r_filter_attr)
     r_out_attrs_indices = find_output_attribute_indices(r_columns, r_out_attrs)
         
-    # generate token ordering using tokens in l_filter_attr and r_filter_attr
-    token_ordering = gen_token_ordering_for_tables(
+    # tokenize l_filter_attr and r_filter_attr, and order the tokens using the
+    # token ordering generated from the same pass
+    token_lists, _ = tokenize_and_order_tables(
                                 [ltable, rtable],
                                 [l_filter_attr_index, r_filter_attr_index],
-                                suffix_filter.tokenizer,
-                                suffix_filter.sim_measure_type)
+                                suffix_filter.tokenizer)
+    l_token_lists, r_token_lists = token_lists
 
     # ignore allow_empty flag for OVERLAP and EDIT_DISTANCE measures.           
     handle_empty = (suffix_filter.allow_empty and
@@ -459,24 +378,14 @@ def _filter_tables_split(ltable, rtable,
     if show_progress:
         prog_bar = pyprind.ProgBar(len(ltable))
 
-    for l_row in ltable:
-        l_string = l_row[l_filter_attr_index]
-
-        ltokens = suffix_filter.tokenizer.tokenize(l_string)
-        ordered_ltokens = order_using_token_ordering(ltokens, token_ordering)
+    for l_row, ordered_ltokens in zip(ltable, l_token_lists):
         l_num_tokens = len(ordered_ltokens)
         l_prefix_length = get_prefix_length(l_num_tokens,
                                             suffix_filter.sim_measure_type,
                                             suffix_filter.threshold,
                                             suffix_filter.tokenizer)
 
-        l_suffix = ordered_ltokens[l_prefix_length:]
-        for r_row in rtable:
-            r_string = r_row[r_filter_attr_index]
-
-            rtokens = suffix_filter.tokenizer.tokenize(r_string)
-            ordered_rtokens = order_using_token_ordering(rtokens,
-                                                         token_ordering)
+        for r_row, ordered_rtokens in zip(rtable, r_token_lists):
             r_num_tokens = len(ordered_rtokens)
 
             # If allow_empty flag is set, then add the pair to the output.
@@ -502,10 +411,10 @@ def _filter_tables_split(ltable, rtable,
             if l_prefix_length <= 0 or r_prefix_length <= 0:
                 continue
 
-            if not suffix_filter._filter_suffix(l_suffix,
-                                           ordered_rtokens[r_prefix_length:],
-                                           l_prefix_length, r_prefix_length,
-                                           l_num_tokens, r_num_tokens):
+            if not suffix_filter._filter_suffix(ordered_ltokens,
+                                                ordered_rtokens,
+                                                l_prefix_length,
+                                                r_prefix_length):
                 if has_output_attributes:
                     output_row = get_output_row_from_tables(
                                          l_row, r_row,
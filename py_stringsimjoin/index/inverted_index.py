@@ -1,10 +1,11 @@
+from py_stringsimjoin.filter.filter_utils import get_num_long_lists
 from py_stringsimjoin.index.index import Index
 
 
 class InvertedIndex(Index):
     """Builds an inverted index on the input column in the input table.                                                                  
                                                              
-    Inverted index is used by overlap filter and overlap coefficient join.
+    Inverted index is used by overlap filter.
                                                                                 
     Args:                                                                       
         table (list): Input table as list of tuples.
@@ -66,3 +67,23 @@ class InvertedIndex(Index):
     def probe(self, token):
         """Probe the index using the input token."""
         return self.index.get(token, [])
+
+    def get_long_lists(self, threshold, tokens=None):
+        """Get the lists of the input tokens (or of all the indexed tokens, if
+        tokens is None) that are considered long by DivideSkip, when finding
+        the records containing at least threshold of the tokens. The long
+        lists are handled with binary search instead of being scanned.
+
+        Returns:
+            A list of (token, list length) pairs for the long lists, in
+            decreasing order of list length (list).
+        """
+        if tokens is None:
+            tokens = self.index
+        list_lengths = sorted([(token, len(self.index[token]))
+                               for token in set(tokens)
+                               if token in self.index],
+                              key=lambda token_length: -token_length[1])
+        return list_lengths[:get_num_long_lists(
+                                 [length for _, length in list_lengths],
+                                 threshold)]
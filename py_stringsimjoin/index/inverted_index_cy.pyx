@@ -1,23 +1,62 @@
 
 from libcpp.vector cimport vector                                               
-from libcpp.map cimport map as omap  
+
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreView, \
+    get_num_tokens, get_tokens
+
+# The index is stored in a compressed sparse row (CSR) layout. Token ids are
+# dense integers obtained from the token ordering, so the ids of the records
+# containing token t are stored contiguously in 
+# postings[offsets[t] : offsets[t + 1]], in increasing order of record id. 
+# Tokens with id at least offsets.size() - 1 do not appear in the index.
 
 cdef class InvertedIndexCy:
-    cdef void set_fields(self, omap[int, vector[int]]& ind, vector[int]& sv):
-        self.index = ind
+    cdef void set_fields(self, vector[int]& offs, vector[int]& post, 
+                         vector[int]& sv):
+        self.offsets = offs
+        self.postings = post
         self.size_vector = sv
 
-    cdef void build_prefix_index(self, vector[vector[int]]& token_vectors, int qval, double threshold):
-        cdef int ii, jj, m, n, prefix_length
-        cdef vector[int] tokens
+    cdef void build_index(self, TokenStoreView& token_store, 
+                          vector[int]& prefix_lengths):
+        # index the first prefix_lengths[ii] tokens of each record.
+        cdef int ii, jj, token, max_token=0, n=token_store.num_records
+        cdef const int* tokens
+        cdef vector[int] next_pos
+
+        self.size_vector.clear()
+        for ii in range(n):
+            self.size_vector.push_back(get_num_tokens(token_store, ii))
+            tokens = get_tokens(token_store, ii)
+            for jj in range(prefix_lengths[ii]):
+                if tokens[jj] > max_token:
+                    max_token = tokens[jj]
+
+        # count the postings of each token and compute the offsets.
+        self.offsets.assign(max_token + 2, 0)
+        for ii in range(n):
+            tokens = get_tokens(token_store, ii)
+            for jj in range(prefix_lengths[ii]):
+                self.offsets[tokens[jj] + 1] += 1
+        for token in range(1, max_token + 2):
+            self.offsets[token] += self.offsets[token - 1]
 
-        n = token_vectors.size()
+        # fill the postings.
+        self.postings.resize(self.offsets[max_token + 1])
+        next_pos = self.offsets
         for ii in range(n):
-            tokens = token_vectors[ii]
-            m = tokens.size()
-            self.size_vector.push_back(m)
-            prefix_length = min(int(qval * threshold + 1), m)
-            
-            for jj in range(prefix_length):
-                self.index[tokens[jj]].push_back(ii)
- 
+            tokens = get_tokens(token_store, ii)
+            for jj in range(prefix_lengths[ii]):
+                token = tokens[jj]
+                self.postings[next_pos[token]] = ii
+                next_pos[token] += 1
+
+    cdef void build_prefix_index(self, TokenStoreView& token_store, int qval, double threshold):
+        cdef int ii, n = token_store.num_records
+        cdef vector[int] prefix_lengths
+
+        for ii in range(n):
+            prefix_lengths.push_back(min(int(qval * threshold + 1), 
+                                         get_num_tokens(token_store, ii)))
+
+        self.build_index(token_store, prefix_lengths)
@@ -26,18 +26,27 @@ class PositionIndex(Index):
         self.max_length = 0
         super(self.__class__, self).__init__()
 
-    def build(self, cache_empty_records=True, cache_tokens=False):
-        """Build position index."""
+    def build(self, cache_empty_records=True, cache_tokens=False,
+              token_lists=None):
+        """Build position index.
+
+        If token_lists is given, it holds the ordered tokens of each record in
+        the table, which are then used instead of tokenizing the table again.
+        """
         self.index = {}
         self.size_cache = []
         cached_tokens = []
         empty_records = []
         row_id = 0
         for row in self.table:
-            # tokenize string and order the tokens using the token ordering     
-            index_string = row[self.index_attr]
-            index_attr_tokens = order_using_token_ordering(
-                self.tokenizer.tokenize(index_string), self.token_ordering)
+            if token_lists is not None:
+                index_attr_tokens = token_lists[row_id]
+            else:
+                # tokenize string and order the tokens using the token
+                # ordering
+                index_string = row[self.index_attr]
+                index_attr_tokens = order_using_token_ordering(
+                    self.tokenizer.tokenize(index_string), self.token_ordering)
 
             # compute prefix length
             num_tokens = len(index_attr_tokens)
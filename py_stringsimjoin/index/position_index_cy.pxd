@@ -1,23 +1,36 @@
-
 from libcpp.vector cimport vector                                               
-from libcpp.map cimport map as omap                                             
+
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreView
 from libcpp.pair cimport pair                                                   
 
 '''
 cdef extern from "position_index_cy.h" nogil:                                      
     cdef cppclass PositionIndexCy nogil:                                          
         PositionIndexCy()                                                         
-        PositionIndexCy(omap[int, vector[pair[int, int]]]&, vector[int]&, vector[int]&, int&, int&, double&)
-        void set_fields(omap[int, vector[pair[int, int]]]&, vector[int]&, vector[int]&, int&, int&, double&)
-        omap[int, vector[pair[int, int]]] index                                 
+        PositionIndexCy(vector[int]&, int&, int&, double&)
+        void set_fields(vector[int]&, int&, int&, double&)
+        void build_index(vector[vector[int]]&, vector[int]&)
+        vector[int] offsets
+        vector[pair[int, int]] postings
         int min_len, max_len                                                    
         vector[int] size_vector, l_empty_ids                                                 
         double threshold 
 '''
 
 cdef class PositionIndexCy:                                        
-    cdef void set_fields(self, omap[int, vector[pair[int, int]]]&, vector[int]&, vector[int]&, int, int, double)
-    cdef omap[int, vector[pair[int, int]]] index                                 
+    cdef void set_fields(self, vector[int]&, int, int, double)
+    cdef void build_index(self, TokenStoreView&, vector[int]&)
+    cdef void set_arrays(self, const int[:], const int[:], const int[:],
+                         TokenStoreView&)
+    cdef vector[int] offsets, posting_ids, posting_positions
+    # the arrays probed by the joins. They point either to the vectors above,
+    # or to the arrays passed to set_arrays, which are kept alive by 
+    # array_refs.
+    cdef const int* offsets_ptr
+    cdef const int* posting_ids_ptr
+    cdef const int* posting_positions_ptr
+    cdef int num_indexed_tokens
+    cdef object array_refs
     cdef int min_len, max_len                                                    
     cdef vector[int] size_vector, l_empty_ids
     cdef double threshold   
@@ -1,14 +1,81 @@
 
 from libcpp.vector cimport vector                                               
-from libcpp.map cimport map as omap                                             
+
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreView, \
+    get_num_tokens, get_tokens
 from libcpp.pair cimport pair   
 
+# The index is stored in a compressed sparse row (CSR) layout. Token ids are
+# dense integers obtained from the token ordering, so the record ids and the
+# positions of token t are stored contiguously in 
+# posting_ids[offsets[t] : offsets[t + 1]] and 
+# posting_positions[offsets[t] : offsets[t + 1]], in increasing order of record
+# id. Tokens with id at least num_indexed_tokens do not appear in the index.
+
 cdef class PositionIndexCy:
-    cdef void set_fields(self, omap[int, vector[pair[int, int]]]& ind, vector[int]& sv, 
-                         vector[int]& emp_ids, int min_l, int max_l, double t):
-        self.index = ind
-        self.size_vector = sv
+    cdef void set_fields(self, vector[int]& emp_ids, int min_l, int max_l, 
+                         double t):
         self.l_empty_ids = emp_ids
         self.min_len = min_l
         self.max_len = max_l
         self.threshold = t
+
+    cdef void build_index(self, TokenStoreView& token_store, 
+                          vector[int]& prefix_lengths):
+        # index the first prefix_lengths[ii] tokens of each record.
+        cdef int ii, jj, token, max_token=0, n=token_store.num_records
+        cdef const int* tokens
+        cdef vector[int] next_pos
+
+        self.size_vector.clear()
+        for ii in range(n):
+            self.size_vector.push_back(get_num_tokens(token_store, ii))
+            tokens = get_tokens(token_store, ii)
+            for jj in range(prefix_lengths[ii]):
+                if tokens[jj] > max_token:
+                    max_token = tokens[jj]
+
+        # count the postings of each token and compute the offsets.
+        self.offsets.assign(max_token + 2, 0)
+        for ii in range(n):
+            tokens = get_tokens(token_store, ii)
+            for jj in range(prefix_lengths[ii]):
+                self.offsets[tokens[jj] + 1] += 1
+        for token in range(1, max_token + 2):
+            self.offsets[token] += self.offsets[token - 1]
+
+        # fill the postings.
+        self.posting_ids.resize(self.offsets[max_token + 1])
+        self.posting_positions.resize(self.offsets[max_token + 1])
+        next_pos = self.offsets
+        for ii in range(n):
+            tokens = get_tokens(token_store, ii)
+            for jj in range(prefix_lengths[ii]):
+                token = tokens[jj]
+                self.posting_ids[next_pos[token]] = ii
+                self.posting_positions[next_pos[token]] = jj
+                next_pos[token] += 1
+
+        self.offsets_ptr = self.offsets.data()
+        self.posting_ids_ptr = self.posting_ids.data()
+        self.posting_positions_ptr = self.posting_positions.data()
+        self.num_indexed_tokens = max_token + 1
+
+    cdef void set_arrays(self, const int[:] offsets, const int[:] posting_ids,
+                         const int[:] posting_positions,
+                         TokenStoreView& token_store):
+        # set the index to arrays in the same CSR layout, as stored in an
+        # index file by SetSimJoinIndex. The arrays are not copied, so that a
+        # memory-mapped index is only read where it is probed.
+        cdef int ii, n=token_store.num_records
+
+        self.size_vector.clear()
+        for ii in range(n):
+            self.size_vector.push_back(get_num_tokens(token_store, ii))
+
+        self.array_refs = (offsets, posting_ids, posting_positions)
+        self.offsets_ptr = &offsets[0]
+        self.num_indexed_tokens = offsets.shape[0] - 1
+        if posting_ids.shape[0] > 0:
+            self.posting_ids_ptr = &posting_ids[0]
+            self.posting_positions_ptr = &posting_positions[0]
@@ -21,23 +21,38 @@ class PrefixIndex(Index):
         self.index = None
         super(self.__class__, self).__init__()
 
-    def build(self, cache_empty_records=True):
-        """Build prefix index."""                                             
+    def build(self, cache_empty_records=True, token_lists=None,
+              prefix_lengths=None):
+        """Build prefix index.
+
+        If token_lists is given, it holds the ordered tokens of each record in
+        the table, which are then used instead of tokenizing the table again.
+        If prefix_lengths is given, it holds the prefix length of each record,
+        which is then used instead of the prefix length of the similarity
+        measure.
+        """
         self.index = {}
         empty_records = []
         row_id = 0
         for row in self.table:
-            # tokenize string and order the tokens using the token ordering
-            index_string = row[self.index_attr]
-            index_attr_tokens = order_using_token_ordering(
-                self.tokenizer.tokenize(index_string), self.token_ordering)
+            if token_lists is not None:
+                index_attr_tokens = token_lists[row_id]
+            else:
+                # tokenize string and order the tokens using the token
+                # ordering
+                index_string = row[self.index_attr]
+                index_attr_tokens = order_using_token_ordering(
+                    self.tokenizer.tokenize(index_string), self.token_ordering)
 
             # compute prefix length
             num_tokens = len(index_attr_tokens)
-            prefix_length = get_prefix_length(
-                                num_tokens,
-                                self.sim_measure_type, self.threshold,
-                                self.tokenizer)
+            if prefix_lengths is not None:
+                prefix_length = prefix_lengths[row_id]
+            else:
+                prefix_length = get_prefix_length(
+                                    num_tokens,
+                                    self.sim_measure_type, self.threshold,
+                                    self.tokenizer)
  
             # update index
             for token in index_attr_tokens[0:prefix_length]:
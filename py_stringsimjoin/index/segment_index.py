@@ -0,0 +1,76 @@
+from py_stringsimjoin.index.index import Index
+
+
+class SegmentIndex(Index):
+    """Builds an index on the segments of the strings in the input column in
+    the input table, splitting each string into threshold + 1 segments.
+
+    Segment index is used by the Pass-Join method of edit distance join.
+    """
+
+    def __init__(self, table, index_attr, threshold):
+        self.table = table
+        self.index_attr = index_attr
+        self.threshold = threshold
+        self.index = None
+        self.short_records = None
+        self.max_length = 0
+        super(self.__class__, self).__init__()
+
+    def build(self):
+        """Build segment index.
+
+        The strings with at most threshold characters cannot be split into
+        threshold + 1 non-empty segments, and are indexed by their length.
+        """
+        self.index = {}
+        self.short_records = {}
+        row_id = 0
+        for row in self.table:
+            index_string = row[self.index_attr]
+            length = len(index_string)
+
+            # keep track of max length.
+            if length > self.max_length:
+                self.max_length = length
+
+            if length <= self.threshold:
+                self.short_records.setdefault(length, []).append(row_id)
+                row_id += 1
+                continue
+
+            # update index
+            for k, (start, segment_length) in enumerate(
+                    get_segments(length, self.threshold)):
+                key = (length, k, index_string[start:start + segment_length])
+                self.index.setdefault(key, []).append(row_id)
+
+            row_id += 1
+
+        return True
+
+    def probe(self, length, k, segment):
+        """Probe segment index using the length of the indexed string, the
+        position of the segment and the segment."""
+        return self.index.get((length, k, segment), [])
+
+    def probe_short_records(self, length):
+        """Probe segment index for the strings of the input length that have
+        at most threshold characters."""
+        return self.short_records.get(length, [])
+
+
+def get_segments(length, threshold):
+    """Get the start and length of each of the threshold + 1 segments of a
+    string of the input length. The last (length mod (threshold + 1))
+    segments are one character longer than the others."""
+    num_segments = threshold + 1
+    num_short = num_segments - length % num_segments
+    short_length = length // num_segments
+    segments = []
+    start = 0
+    for k in range(num_segments):
+        segment_length = short_length if k < num_short else short_length + 1
+        segments.append((start, segment_length))
+        start += segment_length
+    return segments
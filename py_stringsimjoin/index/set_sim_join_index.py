@@ -0,0 +1,343 @@
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from py_stringsimjoin.filter.filter_utils import get_prefix_length
+from py_stringsimjoin.index.index import Index
+from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
+from py_stringsimjoin.utils.token_ordering import \
+    gen_sampled_token_ordering, tokenize_and_order_tables
+from py_stringsimjoin.utils.validation import validate_attr, \
+    validate_attr_type, validate_input_table, validate_sample_size, \
+    validate_sim_measure_type, validate_threshold, validate_tokenizer
+
+
+# magic string at the start of an index file, followed by the format version.
+INDEX_FILE_MAGIC = b'PYSSJIDX'
+INDEX_FILE_VERSION = 2
+
+# arrays stored in an index file, in the order in which they are written.
+INDEX_ARRAYS = ['token_offsets', 'tokens', 'offsets', 'posting_ids',
+                'posting_positions', 'vocab_offsets', 'vocab']
+
+SUPPORTED_SIM_MEASURES = ['COSINE', 'DICE', 'JACCARD']
+
+
+class SetSimJoinIndex(Index):
+    """Builds a position index on the join attribute of a table, which can be
+    saved to a file and reused by later Jaccard, cosine and Dice joins.
+
+    Building the token ordering and the position index of the left table is a
+    significant part of the time taken by a join. When the left table does not
+    change between joins, the index can be built once, saved to a file with
+    :meth:`save`, and loaded back with :meth:`load`, which memory-maps the
+    index file. The index is passed to the join using the `index` argument.
+
+    The index can be used by joins with the same similarity measure and any
+    threshold greater than or equal to the threshold used to build the index.
+    The token ordering is computed only using the indexed table. The tokens of
+    the right table that do not occur in the indexed table cannot match any
+    indexed record, but they still count towards the size of the right table
+    record.
+
+    Args:
+        tokenizer (Tokenizer): tokenizer to be used to tokenize the join
+            attribute. The same tokenizer should be used in the joins.
+        sim_measure_type (string): similarity measure type. Supported types
+            are 'JACCARD', 'COSINE' and 'DICE'.
+        threshold (float): minimum threshold of the joins that will use the
+            index.
+
+    Attributes:
+        tokenizer (Tokenizer): An attribute to store the tokenizer.
+        sim_measure_type (string): An attribute to store the similarity measure
+            type.
+        threshold (float): An attribute to store the threshold value.
+        num_records (int): Number of indexed records, i.e., the number of rows
+            of the indexed table with a non-missing value in the join attribute.
+        token_ordering (dict): Mapping from each token of the indexed table to
+            its position in the global token ordering.
+        fingerprint (string): Hash of the values of the indexed join 
+            attribute, used to check that a join is given the indexed table.
+        tokenizer_config (dict): Type and parameters of the tokenizer used to
+            build the index, used to check that a join uses the same tokenizer.
+    """
+
+    def __init__(self, tokenizer, sim_measure_type, threshold):
+        # check if the input tokenizer is valid
+        validate_tokenizer(tokenizer)
+
+        # check if the sim_measure_type is valid and supported by the index
+        validate_sim_measure_type(sim_measure_type)
+        sim_measure_type = sim_measure_type.upper()
+        if sim_measure_type not in SUPPORTED_SIM_MEASURES:
+            raise AssertionError('\'' + sim_measure_type + '\' is not ' + \
+                                 'supported by the index. Supported types ' + \
+                                 'are COSINE, DICE and JACCARD.')
+
+        # check if the threshold is valid
+        validate_threshold(threshold, sim_measure_type)
+
+        self.tokenizer = tokenizer
+        self.sim_measure_type = sim_measure_type
+        self.threshold = threshold
+        self.num_records = 0
+        self.token_ordering = None
+        self.fingerprint = None
+        self.tokenizer_config = get_tokenizer_config(tokenizer)
+        self.arrays = None
+        super(self.__class__, self).__init__()
+
+    def build(self, table, join_attr, sample_size=None, random_state=0):
+        """Builds the index on the join attribute of the input table.
+
+        Rows with missing value in the join attribute are not indexed, as done
+        by the joins.
+
+        Args:
+            table (DataFrame or PreparedTable): table to be indexed. The same
+                table should be passed as the left table in the joins.
+            join_attr (string): join attribute in the table.
+            sample_size (int): if given, the token ordering is derived from a
+                random sample of sample_size records, as done by
+                gen_sampled_token_ordering, instead of from all the records
+                (defaults to None). The joins using the index return the same
+                output, but may prune fewer candidates.
+            random_state (int): seed of the random sample (defaults to 0).
+
+        Returns:
+            The index itself (SetSimJoinIndex).
+        """
+        # use the dataframe of a prepared table
+        table, _ = unwrap_prepared_table(table)
+
+        # check if the input table is a dataframe
+        validate_input_table(table, 'input table')
+
+        # check if the join attribute exists and is not of numeric type
+        validate_attr(join_attr, table.columns, 'join attribute',
+                      'input table')
+        validate_attr_type(join_attr, table[join_attr].dtype,
+                           'join attribute', 'input table')
+
+        # set return_set flag of tokenizer to be True, in case it is set to
+        # False
+        revert_tokenizer_return_set_flag = False
+        if not self.tokenizer.get_return_set():
+            self.tokenizer.set_return_set(True)
+            revert_tokenizer_return_set_flag = True
+
+        table_array = convert_dataframe_to_array(table, [join_attr], join_attr)
+
+        sampled_token_ordering = None
+        if sample_size is not None:
+            validate_sample_size(sample_size)
+            sampled_token_ordering = gen_sampled_token_ordering(
+                                         [table_array], [0], self.tokenizer,
+                                         sample_size, random_state)
+
+        token_lists, token_ordering = tokenize_and_order_tables(
+                                          [table_array], [0], self.tokenizer,
+                                          sampled_token_ordering)
+        token_lists = token_lists[0]
+
+        # revert the return_set flag of tokenizer, in case it was modified.
+        if revert_tokenizer_return_set_flag:
+            self.tokenizer.set_return_set(False)
+
+        num_records = len(token_lists)
+        num_tokens = len(token_ordering)
+        sizes = np.array([len(tokens) for tokens in token_lists],
+                         dtype=np.int32)
+        token_offsets = np.zeros(num_records + 1, dtype=np.int32)
+        np.cumsum(sizes, dtype=np.int32, out=token_offsets[1:])
+        tokens = np.fromiter((token for token_list in token_lists
+                                    for token in token_list),
+                             dtype=np.int32, count=int(token_offsets[-1]))
+
+        # index the prefix of each record. The postings of each token are
+        # stored contiguously, sorted by record id, as done by PositionIndexCy.
+        prefix_lengths = np.array(
+            [min(get_prefix_length(size, self.sim_measure_type,
+                                   self.threshold, self.tokenizer), size)
+             for size in sizes], dtype=np.int32)
+        record_ids = np.repeat(np.arange(num_records, dtype=np.int32),
+                               sizes)
+        positions = (np.arange(len(tokens), dtype=np.int32) -
+                     np.repeat(token_offsets[:-1], sizes))
+        in_prefix = positions < np.repeat(prefix_lengths, sizes)
+        prefix_tokens = tokens[in_prefix]
+        order = np.argsort(prefix_tokens, kind='mergesort')
+        offsets = np.zeros(num_tokens + 2, dtype=np.int32)
+        np.cumsum(np.bincount(prefix_tokens, minlength=num_tokens + 1),
+                  dtype=np.int32, out=offsets[1:])
+
+        # store the tokens in the order of their ids, so that the token
+        # ordering can be restored when the index is loaded.
+        vocab_list = [None] * num_tokens
+        for token, token_id in token_ordering.items():
+            vocab_list[token_id - 1] = token.encode('utf-8')
+        vocab_offsets = np.zeros(num_tokens + 1, dtype=np.int64)
+        np.cumsum([len(token) for token in vocab_list], dtype=np.int64,
+                  out=vocab_offsets[1:])
+
+        self.num_records = num_records
+        self.token_ordering = token_ordering
+        self.fingerprint = get_join_attr_fingerprint(table_array, 0)
+        self.arrays = {
+            'token_offsets': token_offsets,
+            'tokens': tokens,
+            'offsets': offsets,
+            'posting_ids': record_ids[in_prefix][order],
+            'posting_positions': positions[in_prefix][order],
+            'vocab_offsets': vocab_offsets,
+            'vocab': np.frombuffer(b''.join(vocab_list), dtype=np.uint8)}
+        return self
+
+    def save(self, file_path):
+        """Saves the index to a binary file.
+
+        Args:
+            file_path (string): path of the file to be written.
+        """
+        if self.arrays is None:
+            raise AssertionError('index has not been built')
+
+        # the arrays are written after the header, each one aligned to 8
+        # bytes, so that they can be memory-mapped when the index is loaded.
+        array_info = {}
+        offset = 0
+        for name in INDEX_ARRAYS:
+            array = self.arrays[name]
+            array_info[name] = [offset, array.dtype.str, len(array)]
+            offset += _align(array.nbytes)
+
+        header = json.dumps({'version': INDEX_FILE_VERSION,
+                             'sim_measure_type': self.sim_measure_type,
+                             'threshold': self.threshold,
+                             'num_records': self.num_records,
+                             'fingerprint': self.fingerprint,
+                             'tokenizer_config': self.tokenizer_config,
+                             'arrays': array_info}).encode('utf-8')
+        data_start = _align(len(INDEX_FILE_MAGIC) + 8 + len(header))
+
+        with open(file_path, 'wb') as index_file:
+            index_file.write(INDEX_FILE_MAGIC)
+            index_file.write(struct.pack('<Q', len(header)))
+            index_file.write(header)
+            index_file.write(b'\0' * (data_start - index_file.tell()))
+            for name in INDEX_ARRAYS:
+                array = np.ascontiguousarray(self.arrays[name])
+                index_file.write(array.tobytes())
+                index_file.write(b'\0' * (_align(array.nbytes) - array.nbytes))
+
+    @classmethod
+    def load(cls, file_path, tokenizer):
+        """Loads an index saved using :meth:`save`. The arrays of the index are
+        memory-mapped from the file.
+
+        Args:
+            file_path (string): path of the index file.
+            tokenizer (Tokenizer): tokenizer used to build the index. It should
+                be of the same type and have the same parameters as the
+                tokenizer used to build the index.
+
+        Returns:
+            The loaded index (SetSimJoinIndex).
+        """
+        with open(file_path, 'rb') as index_file:
+            magic = index_file.read(len(INDEX_FILE_MAGIC))
+            if magic != INDEX_FILE_MAGIC:
+                raise AssertionError('\'' + file_path + '\' is not an index ' + \
+                                     'file')
+            (header_length, ) = struct.unpack('<Q', index_file.read(8))
+            header = json.loads(index_file.read(header_length).decode('utf-8'))
+
+        if header['version'] != INDEX_FILE_VERSION:
+            raise AssertionError('unsupported index file version ' + \
+                                 str(header['version']))
+
+        index = cls(tokenizer, header['sim_measure_type'], header['threshold'])
+        if index.tokenizer_config != header['tokenizer_config']:
+            raise AssertionError('tokenizer does not match the tokenizer ' + \
+                                 'used to build the index')
+        index.num_records = header['num_records']
+        index.fingerprint = header['fingerprint']
+
+        data_start = _align(len(INDEX_FILE_MAGIC) + 8 + header_length)
+        index.arrays = {}
+        for name in INDEX_ARRAYS:
+            (offset, dtype, length) = header['arrays'][name]
+            if length == 0:
+                index.arrays[name] = np.zeros(0, dtype=dtype)
+            else:
+                index.arrays[name] = np.memmap(file_path, dtype=dtype,
+                                               mode='r',
+                                               offset=data_start + offset,
+                                               shape=(length, ))
+
+        # restore the token ordering from the tokens stored in the order of
+        # their ids.
+        vocab = index.arrays['vocab'].tobytes()
+        vocab_offsets = index.arrays['vocab_offsets'].tolist()
+        index.token_ordering = dict(
+            (vocab[vocab_offsets[i]:vocab_offsets[i + 1]].decode('utf-8'),
+             i + 1) for i in range(len(vocab_offsets) - 1))
+        return index
+
+    def order_tokens(self, tokens):
+        """Orders the input tokens using the token ordering of the index.
+
+        Unlike order_using_token_ordering, the tokens that do not occur in the
+        indexed table are not dropped. They are given ids following the ids of
+        the indexed tokens, as they cannot match any indexed record but still
+        count towards the size of the record.
+        """
+        ordered_tokens = []
+        num_unknown_tokens = 0
+        for token in tokens:
+            order = self.token_ordering.get(token)
+            if order is None:
+                num_unknown_tokens += 1
+            else:
+                ordered_tokens.append(order)
+        ordered_tokens.sort()
+
+        num_tokens = len(self.token_ordering)
+        ordered_tokens.extend(range(num_tokens + 1,
+                                    num_tokens + 1 + num_unknown_tokens))
+        return ordered_tokens
+
+
+def get_join_attr_fingerprint(table_array, join_attr_index):
+    """Computes a hash of the values of the join attribute, in the order of
+    the rows of the table."""
+    fingerprint = hashlib.sha1()
+    for row in table_array:
+        fingerprint.update(str(row[join_attr_index]).encode('utf-8'))
+        fingerprint.update(b'\0')
+    return fingerprint.hexdigest()
+
+
+def get_tokenizer_config(tokenizer):
+    """Returns the type and the parameters of the tokenizer, except the
+    return_set flag which is set by the joins."""
+    params = {}
+    for (name, value) in vars(tokenizer).items():
+        if name == 'return_set':
+            continue
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        elif hasattr(value, 'pattern'):
+            value = value.pattern
+        elif not isinstance(value, (bool, int, float, str, type(None))):
+            value = repr(value)
+        params[name] = value
+    return {'type': type(tokenizer).__name__, 'params': params}
+
+
+def _align(num_bytes):
+    return (num_bytes + 7) // 8 * 8
@@ -0,0 +1,60 @@
+from py_stringsimjoin.index.index import Index
+
+
+class TrieIndex(Index):
+    """Builds a trie on the strings in the input column in the input table.
+
+    Trie index is used by the trie method of edit distance join.
+    """
+
+    def __init__(self, table, index_attr):
+        self.table = table
+        self.index_attr = index_attr
+        self.index = None
+        super(self.__class__, self).__init__()
+
+    def build(self):
+        """Build trie index.
+
+        A node of the trie is a pair of a dictionary mapping a character to
+        a child node and the list of the ids of the strings ending at the
+        node.
+        """
+        self.index = ({}, [])
+        row_id = 0
+        for row in self.table:
+            node = self.index
+            for char in row[self.index_attr]:
+                node = node[0].setdefault(char, ({}, []))
+            node[1].append(row_id)
+            row_id += 1
+        return True
+
+    def probe(self, probe_string, threshold):
+        """Probe trie index using the input string, and get the ids of the
+        strings within the threshold edit distance of the probe string.
+
+        The trie is traversed in depth first order, computing a row of the
+        edit distance matrix per node from the row of its parent, so that
+        the strings sharing a prefix share the rows of the prefix. A subtree
+        is skipped as soon as the minimum of the row exceeds the threshold.
+        """
+        ids = []
+        first_row = list(range(len(probe_string) + 1))
+        if first_row[-1] <= threshold:
+            ids.extend(self.index[1])
+        stack = [(self.index[0], first_row)]
+        while stack:
+            children, prev_row = stack.pop()
+            for char, child in children.items():
+                curr_row = [prev_row[0] + 1]
+                for j, probe_char in enumerate(probe_string):
+                    curr_row.append(min(prev_row[j] + (probe_char != char),
+                                        prev_row[j + 1] + 1,
+                                        curr_row[j] + 1))
+                if min(curr_row) > threshold:
+                    continue
+                if curr_row[-1] <= threshold:
+                    ids.extend(child[1])
+                stack.append((child[0], curr_row))
+        return ids
@@ -7,7 +7,9 @@ def cosine_join(ltable, rtable,
                 allow_empty=True, allow_missing=False,
                 l_out_attrs=None, r_out_attrs=None,
                 l_out_prefix='l_', r_out_prefix='r_',
-                out_sim_score=True, n_jobs=1, show_progress=True):
+                out_sim_score=True, n_jobs=1, show_progress=True,
+                self_join=False, suffix_filter_max_depth=0,
+                index=None):
     """Join two tables using a variant of cosine similarity known as Ochiai     
     coefficient.                                                                
                                                                                 
@@ -31,9 +33,9 @@ def cosine_join(ltable, rtable,
     specified in "threshold".                                                   
                                                                                 
     Args:                                                                       
-        ltable (DataFrame): left input table.                                   
+        ltable (DataFrame or PreparedTable): left input table.                                   
                                                                                 
-        rtable (DataFrame): right input table.                                  
+        rtable (DataFrame or PreparedTable): right input table.                                  
                                                                                 
         l_key_attr (string): key attribute in left table.                       
                                                                                 
@@ -90,6 +92,29 @@ def cosine_join(ltable, rtable,
                                                                                 
         show_progress (boolean): flag to indicate whether task progress should  
             be displayed to the user (defaults to True).                        
+
+        self_join (boolean): flag to indicate whether the join is a self join
+            (defaults to False). If True, ltable and rtable should be the same
+            table and l_join_attr and r_join_attr should be the same attribute.
+            The table is then tokenized and indexed only once, a tuple is not
+            paired with itself, and each matching pair is output only once
+            (with the left tuple occurring before the right tuple in the table).
+
+        suffix_filter_max_depth (int): maximum recursion depth of the suffix
+            filter applied to the candidate pairs before computing their
+            similarity scores (defaults to 0, which disables the suffix
+            filter). The suffix filter does not change the output. It pays off
+            when most candidates fail verification, for example on long strings
+            tokenized into q-grams. A depth of 2 is usually a good choice.
+
+        index (SetSimJoinIndex): prebuilt index on the join attribute of the
+            left table (defaults to None). If given, the Cython
+            implementation reads the tokens and the position index of the left
+            table from the index instead of computing them, while the Python
+            implementation only checks that the index can be used for the
+            join. The index should be built on ltable with the same tokenizer
+            and similarity measure, and with a threshold less than or equal to
+            the threshold of the join.
                                                                                 
     Returns:                                                                    
         An output table containing tuple pairs that satisfy the join            
@@ -106,7 +131,8 @@ def cosine_join(ltable, rtable,
                               allow_empty, allow_missing,                      
                               l_out_attrs, r_out_attrs,                        
                               l_out_prefix, r_out_prefix,                      
-                              out_sim_score, n_jobs, show_progress)  
+                              out_sim_score, n_jobs, show_progress,
+                              self_join, suffix_filter_max_depth, index)
     else:
         from py_stringsimjoin.join.cosine_join_py import cosine_join_py       
         return cosine_join_py(ltable, rtable,                                                
@@ -116,5 +142,124 @@ def cosine_join(ltable, rtable,
                               allow_empty, allow_missing,                         
                               l_out_attrs, r_out_attrs,                            
                               l_out_prefix, r_out_prefix,                          
-                              out_sim_score, n_jobs, show_progress)
+                              out_sim_score, n_jobs, show_progress,
+                              self_join, suffix_filter_max_depth, index)
+
+
+def cosine_join_iter(ltable, rtable,
+                     l_key_attr, r_key_attr,
+                     l_join_attr, r_join_attr,
+                     tokenizer, threshold, comp_op='>=',
+                     allow_empty=True, allow_missing=False,
+                     l_out_attrs=None, r_out_attrs=None,
+                     l_out_prefix='l_', r_out_prefix='r_',
+                     out_sim_score=True, n_jobs=1, show_progress=True,
+                     suffix_filter_max_depth=0, index=None, chunk_size=10000):
+    """Join two tables using cosine similarity measure, yielding the output
+    in chunks.
+
+    The right table is processed in chunks of chunk_size rows, and an output
+    table is yielded for each chunk, so that the memory used by the output is
+    bounded by the output of one chunk rather than by the total output. The
+    concatenation of the yielded tables contains the same tuple pairs as the
+    output of :func:`cosine_join`, with unique values in the '_id' column.
+
+    If index is not given, an index on the left table is built once and used
+    by the joins of all the chunks (only when the Cython implementation is
+    used), so that the left table is not tokenized again for each chunk.
+
+    Args:
+        chunk_size (int): number of right table rows per chunk (defaults to
+            10000).
+
+        The other arguments are the same as the arguments of
+        :func:`cosine_join`. A self join is not supported.
+
+    Returns:
+        A generator of output tables, one per chunk of the right table, each
+        containing tuple pairs that satisfy the join condition (DataFrame).
+    """
+    from py_stringsimjoin import __use_cython__
+    from py_stringsimjoin.index.set_sim_join_index import SetSimJoinIndex
+    from py_stringsimjoin.utils.generic_helper import iter_join_output_chunks
+    from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
+    from py_stringsimjoin.utils.validation import validate_chunk_size, \
+        validate_input_table
+
+    # the right table is split into chunks, hence the dataframe of a prepared
+    # right table is used.
+    rtable, _ = unwrap_prepared_table(rtable)
+
+    # check if the right table is a dataframe and the chunk size is valid
+    validate_input_table(rtable, 'right table')
+    validate_chunk_size(chunk_size)
+
+    if index is None and __use_cython__:
+        index = SetSimJoinIndex(tokenizer, 'COSINE',
+                                threshold).build(ltable, l_join_attr)
+
+    return iter_join_output_chunks(
+        lambda rtable_chunk: cosine_join(ltable, rtable_chunk,
+                                         l_key_attr, r_key_attr,
+                                         l_join_attr, r_join_attr,
+                                         tokenizer, threshold, comp_op,
+                                         allow_empty, allow_missing,
+                                         l_out_attrs, r_out_attrs,
+                                         l_out_prefix, r_out_prefix,
+                                         out_sim_score, n_jobs, show_progress,
+                                         False, suffix_filter_max_depth, index),
+        rtable, chunk_size)
+
+
+def cosine_join_sweep(ltable, rtable,
+                      l_key_attr, r_key_attr,
+                      l_join_attr, r_join_attr,
+                      tokenizer, thresholds,
+                      allow_empty=True, allow_missing=False,
+                      l_out_attrs=None, r_out_attrs=None,
+                      l_out_prefix='l_', r_out_prefix='r_',
+                      out_sim_score=True, n_jobs=1, show_progress=True,
+                      self_join=False, suffix_filter_max_depth=0, index=None):
+    """Join two tables using cosine similarity measure at several thresholds
+    in a single pass.
+
+    The tables are tokenized, indexed and probed once, by a join at the
+    lowest of the thresholds with the comparison operator '>='. Each output
+    pair is tagged with the highest threshold it satisfies, in a column named
+    '_threshold'. The pairs output by :func:`cosine_join` at a threshold t of
+    the list are the pairs whose '_threshold' value is greater than or equal
+    to t, so a threshold sweep costs about as much as one join at the lowest
+    threshold.
+
+    Args:
+        thresholds (list): cosine similarity thresholds to be swept.
+
+        index (SetSimJoinIndex): prebuilt index on the join attribute of the
+            left table (defaults to None). The index should be built with a
+            threshold less than or equal to the lowest of the thresholds.
+
+        The other arguments are the same as the arguments of
+        :func:`cosine_join`.
+
+    Returns:
+        An output table containing tuple pairs that satisfy the join
+        condition at the lowest threshold, with a '_threshold' column
+        (DataFrame).
+    """
+    from py_stringsimjoin.utils.generic_helper import sweep_join_thresholds
+    from py_stringsimjoin.utils.validation import validate_thresholds
+
+    # check if the list of thresholds is valid
+    validate_thresholds(thresholds, 'COSINE')
 
+    return sweep_join_thresholds(
+        lambda threshold: cosine_join(ltable, rtable,
+                                      l_key_attr, r_key_attr,
+                                      l_join_attr, r_join_attr,
+                                      tokenizer, threshold, '>=',
+                                      allow_empty, allow_missing,
+                                      l_out_attrs, r_out_attrs,
+                                      l_out_prefix, r_out_prefix,
+                                      True, n_jobs, show_progress,
+                                      self_join, suffix_filter_max_depth, index),
+        thresholds, out_sim_score)
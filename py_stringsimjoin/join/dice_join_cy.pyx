@@ -6,10 +6,13 @@ from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     find_output_attribute_indices, get_output_header_from_tables 
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import get_tokenized_columns, \
+    unwrap_prepared_table
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
     validate_input_table, validate_threshold, validate_tokenizer, \
-    validate_output_attrs
+    validate_output_attrs, validate_self_join, \
+    validate_set_sim_join_index, validate_suffix_filter_max_depth
 
 from libcpp.vector cimport vector                                               
 from libcpp.pair cimport pair  
@@ -25,7 +28,9 @@ def dice_join_cy(ltable, rtable,
                  allow_empty=True, allow_missing=False,
                  l_out_attrs=None, r_out_attrs=None,
                  l_out_prefix='l_', r_out_prefix='r_',
-                 out_sim_score=True, n_jobs=1, show_progress=True):
+                 out_sim_score=True, n_jobs=1, show_progress=True,
+                 self_join=False, suffix_filter_max_depth=0,
+                 index=None):
     """Join two tables using Dice similarity measure.                           
                                                                                 
     For two sets X and Y, the Dice similarity score between them is given by:                      
@@ -43,9 +48,9 @@ def dice_join_cy(ltable, rtable,
     specified in "threshold".                                                   
                                                                                 
     Args:                                                                       
-        ltable (DataFrame): left input table.                                   
+        ltable (DataFrame or PreparedTable): left input table.                                   
                                                                                 
-        rtable (DataFrame): right input table.                                  
+        rtable (DataFrame or PreparedTable): right input table.                                  
                                                                                 
         l_key_attr (string): key attribute in left table.                       
                                                                                 
@@ -102,12 +107,37 @@ def dice_join_cy(ltable, rtable,
                                                                                 
         show_progress (boolean): flag to indicate whether task progress should  
             be displayed to the user (defaults to True).                        
+
+        self_join (boolean): flag to indicate whether the join is a self join
+            (defaults to False). If True, ltable and rtable should be the same
+            table and l_join_attr and r_join_attr should be the same attribute.
+            The table is then tokenized and indexed only once, a tuple is not
+            paired with itself, and each matching pair is output only once
+            (with the left tuple occurring before the right tuple in the table).
+
+        suffix_filter_max_depth (int): maximum recursion depth of the suffix
+            filter applied to the candidate pairs before computing their
+            similarity scores (defaults to 0, which disables the suffix
+            filter). The suffix filter does not change the output. It pays off
+            when most candidates fail verification, for example on long strings
+            tokenized into q-grams. A depth of 2 is usually a good choice.
+
+        index (SetSimJoinIndex): prebuilt index on the join attribute of the
+            left table (defaults to None). If given, the tokens and the
+            position index of the left table are read from the index instead
+            of being computed. The index should be built on ltable with the
+            same tokenizer and similarity measure, and with a threshold less
+            than or equal to the threshold of the join.
                                                                                 
     Returns:                                                                    
         An output table containing tuple pairs that satisfy the join            
         condition (DataFrame).                                                  
     """
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
     # check if the input tables are dataframes
     validate_input_table(ltable, 'left table')
     validate_input_table(rtable, 'right table')
@@ -142,8 +172,17 @@ def dice_join_cy(ltable, rtable,
                           r_out_attrs, rtable.columns)
 
     # check if the key attributes are unique and do not contain missing values
-    validate_key_attr(l_key_attr, ltable, 'left table')
-    validate_key_attr(r_key_attr, rtable, 'right table')
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
+
+    # check if the self join flag is consistent with the input tables
+    if self_join:
+        validate_self_join(ltable, rtable, l_join_attr, r_join_attr)
+
+    # check if the maximum depth of the suffix filter is valid
+    validate_suffix_filter_max_depth(suffix_filter_max_depth)
 
     # set return_set flag of tokenizer to be True, in case it is set to False
     revert_tokenizer_return_set_flag = False
@@ -164,6 +203,13 @@ def dice_join_cy(ltable, rtable,
     # the input dataframes. Then, convert the resulting dataframes into ndarray.
     ltable_array = convert_dataframe_to_array(ltable, l_proj_attrs, l_join_attr)
     rtable_array = convert_dataframe_to_array(rtable, r_proj_attrs, r_join_attr)
+
+    # check if the prebuilt index can be used for the join
+    if index is not None:
+        validate_set_sim_join_index(index, 'DICE', threshold,
+                                    ltable_array,
+                                    l_proj_attrs.index(l_join_attr),
+                                    tokenizer)
                                                                                 
     # find column indices of key attr and output attrs in ltable                
     l_key_attr_index = l_proj_attrs.index(l_key_attr)
@@ -181,11 +227,20 @@ def dice_join_cy(ltable, rtable,
     cdef vector[vector[pair[int, int]]] output_pairs, 
     cdef vector[vector[double]] output_sim_scores
 
+    # get the tokens cached by the prepared tables, if any. The tokens are
+    # not needed when a prebuilt index is used.
+    tokenized_columns = None
+    if index is None:
+        tokenized_columns = get_tokenized_columns(
+                                [l_prepared_table, r_prepared_table],
+                                [l_join_attr, r_join_attr], tokenizer)
+
     set_sim_join_cy(ltable_array, rtable_array,
                     l_join_attr_index, r_join_attr_index,
                     tokenizer, 'DICE', threshold, comp_op, 
                     n_jobs, allow_empty, show_progress, 
-                    output_pairs, output_sim_scores)   
+                    output_pairs, output_sim_scores, self_join,
+                    suffix_filter_max_depth, index, tokenized_columns)
 
     output_header = get_output_header_from_tables(                              
                         l_key_attr, r_key_attr,                                 
@@ -199,7 +254,7 @@ def dice_join_cy(ltable, rtable,
                                          output_pairs, output_sim_scores,      
                                          l_key_attr_index, r_key_attr_index,             
                                          l_out_attrs_indices, r_out_attrs_indices,       
-                                         out_sim_score, output_header, n_jobs)
+                                         out_sim_score, output_header)
 
     # If allow_missing flag is set, then compute all pairs with missing value in
     # at least one of the join attributes and then add it to the output 
@@ -211,7 +266,8 @@ def dice_join_cy(ltable, rtable,
                                         l_join_attr, r_join_attr,
                                         l_out_attrs, r_out_attrs,
                                         l_out_prefix, r_out_prefix,
-                                        out_sim_score, show_progress) 
+                                        out_sim_score, show_progress,
+                                        self_join) 
         output_table = pd.concat([output_table, missing_pairs])
 
     # add an id column named '_id' to the output table.
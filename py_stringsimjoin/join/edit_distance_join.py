@@ -9,7 +9,7 @@ def edit_distance_join(ltable, rtable,
                        l_out_attrs=None, r_out_attrs=None,
                        l_out_prefix='l_', r_out_prefix='r_',
                        out_sim_score=True, n_jobs=1, show_progress=True,
-                       tokenizer=QgramTokenizer(qval=2)):
+                       tokenizer=QgramTokenizer(qval=2), method='qgram'):
     from py_stringsimjoin import __use_cython__ 
     if __use_cython__:
         from py_stringsimjoin.join.edit_distance_join_cy import edit_distance_join_cy                     
@@ -21,7 +21,7 @@ def edit_distance_join(ltable, rtable,
                                      l_out_attrs, r_out_attrs,
                                      l_out_prefix, r_out_prefix,
                                      out_sim_score, n_jobs, show_progress,
-                                     tokenizer)
+                                     tokenizer, method)
     else:
         from py_stringsimjoin.join.edit_distance_join_py import edit_distance_join_py
         return edit_distance_join_py(ltable, rtable,
@@ -32,4 +32,60 @@ def edit_distance_join(ltable, rtable,
                                      l_out_attrs, r_out_attrs,
                                      l_out_prefix, r_out_prefix,
                                      out_sim_score, n_jobs, show_progress,
-                                     tokenizer)
+                                     tokenizer, method)
+
+
+def edit_distance_join_iter(ltable, rtable,
+                            l_key_attr, r_key_attr,
+                            l_join_attr, r_join_attr,
+                            threshold, comp_op='<=',
+                            allow_missing=False,
+                            l_out_attrs=None, r_out_attrs=None,
+                            l_out_prefix='l_', r_out_prefix='r_',
+                            out_sim_score=True, n_jobs=1, show_progress=True,
+                            tokenizer=QgramTokenizer(qval=2), chunk_size=10000,
+                            method='qgram'):
+    """Join two tables using edit distance measure, yielding the output in chunks.
+
+    The right table is processed in chunks of chunk_size rows, and an output
+    table is yielded for each chunk, so that the memory used by the output is
+    bounded by the output of one chunk rather than by the total output. The
+    concatenation of the yielded tables contains the same tuple pairs as the
+    output of :func:`edit_distance_join`, with unique values in the '_id' column. The
+    left table is tokenized again for each chunk, so chunk_size should be
+    large enough for this cost to be small compared to the join of a chunk.
+
+    Args:
+        chunk_size (int): number of right table rows per chunk (defaults to
+            10000).
+
+        The other arguments are the same as the arguments of
+        :func:`edit_distance_join`.
+
+    Returns:
+        A generator of output tables, one per chunk of the right table, each
+        containing tuple pairs that satisfy the join condition (DataFrame).
+    """
+    from py_stringsimjoin.utils.generic_helper import iter_join_output_chunks
+    from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
+    from py_stringsimjoin.utils.validation import validate_chunk_size, \
+        validate_input_table
+
+    # the right table is split into chunks, hence the dataframe of a prepared
+    # right table is used.
+    rtable, _ = unwrap_prepared_table(rtable)
+
+    # check if the right table is a dataframe and the chunk size is valid
+    validate_input_table(rtable, 'right table')
+    validate_chunk_size(chunk_size)
+
+    return iter_join_output_chunks(
+        lambda rtable_chunk: edit_distance_join(ltable, rtable_chunk,
+                                                l_key_attr, r_key_attr,
+                                                l_join_attr, r_join_attr,
+                                                threshold, comp_op, allow_missing,
+                                                l_out_attrs, r_out_attrs,
+                                                l_out_prefix, r_out_prefix,
+                                                out_sim_score, n_jobs, show_progress,
+                                                tokenizer, method),
+        rtable, chunk_size)
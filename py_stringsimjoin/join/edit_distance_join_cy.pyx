@@ -8,32 +8,43 @@ import pyprind
 from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     find_output_attribute_indices, get_attrs_to_project, \
     get_num_processes_to_launch, get_output_header_from_tables, \
-    get_output_row_from_tables, remove_non_ascii, remove_redundant_attrs
+    remove_non_ascii, remove_redundant_attrs
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
-from py_stringsimjoin.utils.token_ordering import \
-    gen_token_ordering_for_tables, order_using_token_ordering
+from py_stringsimjoin.utils.prepared_table import get_tokenized_columns, \
+    unwrap_prepared_table
 from py_stringsimjoin.utils.validation import validate_attr, \
-    validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
+    validate_attr_type, validate_comp_op_for_sim_measure, \
+    validate_edit_distance_join_method, validate_key_attr, \
     validate_input_table, validate_threshold, \
     validate_tokenizer_for_sim_measure, validate_output_attrs
 
 # Cython imports
-from cython.parallel import prange                                              
+from cython.operator cimport dereference as deref
+from cython.parallel import prange
 
+from libc.stdint cimport uint32_t, uint64_t
+from libcpp.unordered_map cimport unordered_map
 from libcpp.vector cimport vector                                               
 from libcpp.set cimport set as oset                                             
 from libcpp.string cimport string                                               
 from libcpp cimport bool                                                        
-from libcpp.map cimport map as omap                                             
 from libcpp.pair cimport pair     
 
-from py_stringsimjoin.similarity_measure.edit_distance cimport edit_distance
+from py_stringsimjoin.similarity_measure.edit_distance cimport \
+    bounded_edit_distance
 from py_stringsimjoin.index.inverted_index_cy cimport InvertedIndexCy             
 from py_stringsimjoin.utils.cython_utils cimport compfnptr,\
-    get_comparison_function, get_comp_type, int_min
+    generate_output_table, get_comparison_function, get_comp_type, \
+    get_probe_costs, get_probe_schedule, tokenize_lists
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreCy, \
+    TokenStoreView, get_num_tokens, get_tokens
 
 
+# largest distance up to which the edit distance of a pair is computed, which
+# keeps the bounds of the distance computation within the range of int.
+cdef int MAX_THRESHOLD = 1 << 30
+
 # Initialize a global variable to keep track of the progress bar
 _progress_bar = None
 
@@ -48,7 +59,8 @@ def edit_distance_join_cy(ltable, rtable,
                           out_sim_score=True, 
                           int n_jobs=1, 
                           bool show_progress=True,
-                          tokenizer=QgramTokenizer(qval=2)):
+                          tokenizer=QgramTokenizer(qval=2),
+                          method='qgram'):
     """Join two tables using edit distance measure.
 
     Finds tuple pairs from left table and right table such that the edit 
@@ -66,15 +78,31 @@ def edit_distance_join_cy(ltable, rtable,
         strings, to appear in the join output. For smaller strings, where all 
         qgrams of the strings differ, we cannot process them.
  
-        This method implements a simplified version of the algorithm proposed in
+        This method implements the algorithm proposed in
         `Ed-Join: An Efficient Algorithm for Similarity Joins With Edit Distance
         Constraints (Chuan Xiao, Wei Wang and Xuemin Lin), VLDB 08
-        <http://www.vldb.org/pvldb/1/1453957.pdf>`_. 
+        <http://www.vldb.org/pvldb/1/1453957.pdf>`_, using the prefix filter
+        with the location-based prefixes of the strings, the length filter
+        and the content filter on the character counts of the strings. 
+
+        The 'passjoin' method computes the exact join result instead, using
+        the algorithm proposed in `Pass-Join: A Partition-based Method for
+        Similarity Joins (Guoliang Li, Dong Deng, Jiannan Wang and Jianhua
+        Feng), VLDB 12 <http://www.vldb.org/pvldb/vol5/p253_guoliangli_vldb2012.pdf>`_.
+        Each string of the left table is split into threshold + 1 segments,
+        one of which appears unchanged in any string within the threshold, and
+        the strings of the right table are probed with their substrings
+        selected by the multi-match-aware method. The 'trie' method also
+        computes the exact join result, by traversing a trie over the strings
+        of the left table for each string of the right table, so that the
+        strings sharing a prefix share the computation of their edit distance
+        over the prefix. The tokenizer is not used by these methods, and the edit distance is computed over the characters of
+        the strings.
         
     Args:
-        ltable (DataFrame): left input table.
+        ltable (DataFrame or PreparedTable): left input table.
 
-        rtable (DataFrame): right input table.
+        rtable (DataFrame or PreparedTable): right input table.
 
         l_key_attr (string): key attribute in left table.
 
@@ -129,12 +157,23 @@ def edit_distance_join_cy(ltable, rtable,
             attributes during filtering, when edit distance measure is          
             transformed into an overlap measure. This must be a q-gram tokenizer
             (defaults to 2-gram tokenizer).
+
+        method (string): join algorithm to be used. Supported values are
+            'qgram', which filters the pairs by their q-grams, 'passjoin',
+            which computes the exact join result using segment partitioning,
+            and 'trie', which computes the exact join result using a trie
+            over the left table and suits short strings (defaults to
+            'qgram').
                                                                                 
     Returns:                                                                    
         An output table containing tuple pairs that satisfy the join            
         condition (DataFrame).  
     """
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
     # check if the input tables are dataframes
     validate_input_table(ltable, 'left table')
     validate_input_table(rtable, 'right table')
@@ -165,13 +204,18 @@ def edit_distance_join_cy(ltable, rtable,
     # check if the comparison operator is valid
     validate_comp_op_for_sim_measure(comp_op, 'EDIT_DISTANCE')
 
+    # check if the join method is valid
+    validate_edit_distance_join_method(method)
+
     # check if the output attributes exist
     validate_output_attrs(l_out_attrs, ltable.columns,
                           r_out_attrs, rtable.columns)
 
     # check if the key attributes are unique and do not contain missing values
-    validate_key_attr(l_key_attr, ltable, 'left table')
-    validate_key_attr(r_key_attr, rtable, 'right table')
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
 
     # convert threshold to integer (incase if it is float)
     threshold = int(floor(threshold))
@@ -209,95 +253,31 @@ def edit_distance_join_cy(ltable, rtable,
     r_join_attr_index = r_proj_attrs.index(r_join_attr)
     r_out_attrs_indices = find_output_attribute_indices(r_proj_attrs, r_out_attrs)
 
-    sim_measure_type = 'EDIT_DISTANCE'
-    # generate token ordering using tokens in l_join_attr
-    # and r_join_attr
-    token_ordering = gen_token_ordering_for_tables(
-                         [ltable_array, rtable_array],
-                         [l_join_attr_index, r_join_attr_index],
-                         tokenizer, sim_measure_type)
-
-    cdef vector[string] lstrings
-    cdef InvertedIndexCy prefix_index = InvertedIndexCy()                                           
-
-    str2bytes = lambda x: x if isinstance(x, bytes) else x.encode('utf-8')
-
-    tokenize_and_build_index(ltable_array, l_join_attr_index,             
-                             tokenizer, threshold, str2bytes, token_ordering,            
-                             lstrings, prefix_index)
-
-    cdef vector[vector[int]] rtokens
-    cdef vector[string] rstrings
-
-    for r_row in rtable_array:
-        rstring = r_row[r_join_attr_index]
-        rstrings.push_back(str2bytes(rstring))
-        # tokenize string and order the tokens using the token ordering
-        rstring_tokens = order_using_token_ordering(
-            tokenizer.tokenize(rstring), token_ordering)
-        rtokens.push_back(rstring_tokens)
-
     cdef int comp_op_type                                             
     comp_op_type = get_comp_type(comp_op) 
-    
+
     cdef vector[vector[pair[int, int]]] output_pairs
     cdef vector[vector[double]] output_sim_scores                               
-    cdef vector[pair[int, int]] partitions
-    cdef int ii, jj, rtable_size=len(rtable_array), partition_size, \
-            partition_start=0, partition_end            
-
-    partition_size = <int>(<float> rtable_size / <float> n_jobs)
-    for ii in range(n_jobs):
-        partition_end = partition_start + partition_size
-        if partition_end > rtable_size or ii == n_jobs - 1:
-            partition_end = rtable_size
-        partitions.push_back(pair[int, int](partition_start, partition_end))
-        partition_start = partition_end            
-        output_pairs.push_back(vector[pair[int, int]]())
-        output_sim_scores.push_back(vector[double]())                           
 
-    # If the show_progress flag is enabled, then create a new progress bar and 
-    # assign it to the global variable.
-    if show_progress:                                                           
-        global _progress_bar                                                    
-        _progress_bar = pyprind.ProgBar(partition_size)     
-
-    cdef int qval = tokenizer.qval
-
-    for ii in prange(n_jobs, nogil=True):    
-        _ed_join_part(partitions[ii], rtokens, qval, threshold, 
-                      comp_op_type, prefix_index.index, prefix_index.size_vector, 
-                      lstrings, rstrings, 
-                      output_pairs[ii], output_sim_scores[ii], ii, show_progress)
-
-    output_rows = []
-    has_output_attributes = (l_out_attrs is not None or
-                             r_out_attrs is not None)
-    
-    for ii in range(n_jobs):    
-        for jj in xrange(len(output_pairs[ii])):
-            cur_outpair = output_pairs[ii][jj]
-            l_row_inx = cur_outpair.first
-            l_row = ltable_array[l_row_inx]
-            r_row_inx = cur_outpair.second
-            r_row = rtable_array[r_row_inx]
-
-            if has_output_attributes:
-                output_row = get_output_row_from_tables(
-                                 l_row, r_row,
-                                 l_key_attr_index, r_key_attr_index,
-                                 l_out_attrs_indices,
-                                 r_out_attrs_indices)
-            else:
-                output_row = [l_row[l_key_attr_index],
-                              r_row[r_key_attr_index]]
-
-            # if out_sim_score flag is set, append the edit distance 
-            # score to the output record.
-            if out_sim_score:
-                output_row.append(output_sim_scores[ii][jj])
-
-            output_rows.append(output_row)
+    if method == 'passjoin':
+        _pass_join(ltable_array, rtable_array,
+                   l_join_attr_index, r_join_attr_index,
+                   threshold, comp_op_type, n_jobs, show_progress,
+                   output_pairs, output_sim_scores)
+    elif method == 'trie':
+        _trie_join(ltable_array, rtable_array,
+                   l_join_attr_index, r_join_attr_index,
+                   threshold, comp_op_type, n_jobs, show_progress,
+                   output_pairs, output_sim_scores)
+    else:
+        _qgram_ed_join(ltable_array, rtable_array,
+                       l_join_attr_index, r_join_attr_index,
+                       tokenizer, threshold, comp_op_type, n_jobs,
+                       show_progress,
+                       get_tokenized_columns(
+                           [l_prepared_table, r_prepared_table],
+                           [l_join_attr, r_join_attr], tokenizer),
+                       output_pairs, output_sim_scores)
 
     output_header = get_output_header_from_tables(
                         l_key_attr, r_key_attr,
@@ -306,8 +286,13 @@ def edit_distance_join_cy(ltable, rtable,
     if out_sim_score:
         output_header.append("_sim_score")
 
-    # generate a dataframe from the list of output rows
-    output_table = pd.DataFrame(output_rows, columns=output_header)
+    # generate output dataframe from the output pairs obtained after join
+    output_table = generate_output_table(ltable_array, rtable_array,
+                                         output_pairs, output_sim_scores,
+                                         l_key_attr_index, r_key_attr_index,
+                                         l_out_attrs_indices,
+                                         r_out_attrs_indices,
+                                         out_sim_score, output_header)
 
     # If allow_missing flag is set, then compute all pairs with missing value in
     # at least one of the join attributes and then add it to the output         
@@ -332,64 +317,623 @@ def edit_distance_join_cy(ltable, rtable,
     return output_table
 
 
-cdef void tokenize_and_build_index(ltable_array, l_join_attr_index,
-                                   tokenizer, threshold, str2bytes, 
-                                   token_ordering,
-                                   vector[string]& lstrings,
-                                   InvertedIndexCy index):
-    cdef vector[vector[int]] ltokens
-    for l_row in ltable_array:                                                  
-        lstring = l_row[l_join_attr_index]                                      
-        lstrings.push_back(str2bytes(lstring))                                  
-        # tokenize string and order the tokens using the token ordering         
-        lstring_tokens = order_using_token_ordering(                            
-            tokenizer.tokenize(lstring), token_ordering)                        
-        ltokens.push_back(lstring_tokens)
+cdef void _qgram_ed_join(ltable_array, rtable_array,
+                         int l_join_attr_index, int r_join_attr_index,
+                         tokenizer, double threshold, int comp_op_type,
+                         int n_jobs, bool show_progress, tokenized_columns,
+                         vector[vector[pair[int, int]]]& output_pairs,
+                         vector[vector[double]]& output_sim_scores):
+    # joins the tables using the q-gram prefix filter of Ed-Join.
+    # tokenize l_join_attr and r_join_attr, and order the tokens using the
+    # token ordering generated from the same pass. The tokens cached by the
+    # prepared tables, if any, are reused.
+    cdef TokenStoreCy ltokens = TokenStoreCy(), rtokens = TokenStoreCy()
+    l_positions, r_positions = tokenize_lists(
+        ltable_array, rtable_array,
+        l_join_attr_index, r_join_attr_index,
+        tokenizer, ltokens, rtokens, n_jobs,
+        tokenized_columns, True)
+
+    cdef vector[string] lstrings, rstrings
+    cdef InvertedIndexCy prefix_index = InvertedIndexCy()                                           
+
+    str2bytes = lambda x: x if isinstance(x, bytes) else x.encode('utf-8')
+
+    for l_row in ltable_array:
+        lstrings.push_back(str2bytes(l_row[l_join_attr_index]))
+    for r_row in rtable_array:
+        rstrings.push_back(str2bytes(r_row[r_join_attr_index]))
+
+    cdef int qval = tokenizer.qval
+    cdef vector[int] l_prefix_lengths, r_prefix_lengths
+    get_location_prefix_lengths(ltokens.view, l_positions, qval, threshold,
+                                l_prefix_lengths)
+    get_location_prefix_lengths(rtokens.view, r_positions, qval, threshold,
+                                r_prefix_lengths)
+
+    # Build prefix index on l_join_attr
+    prefix_index.build_index(ltokens.view, l_prefix_lengths)
+
+    cdef vector[pair[int, int]] chunks
+    cdef vector[int] probe_order
+    cdef vector[double] costs
+    cdef TokenStoreView rview = rtokens.view
+    cdef int c, num_chunks
+
+    # Split the probe rows into chunks based on the estimated cost of probing
+    # the index with each row, which depends on the prefix length of the row.
+    get_probe_costs(rview, r_prefix_lengths, prefix_index.offsets.data(),
+                    prefix_index.offsets.size() - 1, costs)
+    get_probe_schedule(costs, n_jobs, probe_order, chunks)
+
+    num_chunks = chunks.size()
+    for c in range(num_chunks):
+        output_pairs.push_back(vector[pair[int, int]]())
+        output_sim_scores.push_back(vector[double]())                           
+
+    # If the show_progress flag is enabled, then create a new progress bar and 
+    # assign it to the global variable.
+    if show_progress:                                                           
+        global _progress_bar                                                    
+        _progress_bar = pyprind.ProgBar(num_chunks)
+
+    # The chunks are handed out dynamically to the threads, starting with the
+    # most expensive ones.
+    for c in prange(num_chunks, nogil=True, num_threads=n_jobs,
+                    schedule='dynamic', chunksize=1):
+        _ed_join_part(chunks[c], probe_order, rview, r_prefix_lengths,
+                      threshold, comp_op_type,
+                      prefix_index.offsets, prefix_index.postings,
+                      prefix_index.size_vector, 
+                      lstrings, rstrings, 
+                      output_pairs[c], output_sim_scores[c])
+
+        # If the show_progress flag is enabled, we update the progress bar
+        # after each chunk. To do so, the thread acquires the GIL and updates
+        # the global variable that keeps track of the progress bar.
+        if show_progress:
+            with gil:
+                _progress_bar.update()
 
-    index.build_prefix_index(ltokens, tokenizer.qval, threshold)         
-       
 
 cdef void _ed_join_part(pair[int, int] partition, 
-                        vector[vector[int]]& rtokens, 
-                        int qval, double threshold, int comp_op_type, 
-                        omap[int, vector[int]]& index, 
+                        vector[int]& probe_order,
+                        TokenStoreView& rtokens, 
+                        vector[int]& r_prefix_lengths,
+                        double threshold, int comp_op_type, 
+                        vector[int]& offsets, vector[int]& postings,
                         vector[int]& size_vector,
                         vector[string]& lstrings, vector[string]& rstrings, 
                         vector[pair[int, int]]& output_pairs,
-                        vector[double]& output_sim_scores, 
-                        int thread_id, bool show_progress) nogil:    
+                        vector[double]& output_sim_scores) nogil:    
     cdef oset[int] candidates                                      
-    cdef vector[int] tokens
-    cdef int j=0, m, i, prefix_length, cand                    
+    cdef const int* tokens
+    cdef int j=0, k, m, i, ii, prefix_length, cand, token
+    cdef int num_indexed_tokens = offsets.size() - 1
     cdef double edit_dist               
     cdef compfnptr comp_fn                                                      
     comp_fn = get_comparison_function(comp_op_type)     
 
-    for i in range(partition.first, partition.second):
-        tokens = rtokens[i]                        
-        m = tokens.size()                                                      
-        prefix_length = int_min(<int>(qval * threshold + 1), m)                 
+    # counts of the characters (bytes) of the probe string.
+    cdef int char_counts[256]
+    cdef const unsigned char* rchars
+    cdef int rlen
+    for k in range(256):
+        char_counts[k] = 0
+
+    # the edit distance of a pair only needs to be computed up to the
+    # threshold, as a pair with a larger distance fails the condition.
+    cdef int max_dist = <int>threshold if threshold < MAX_THRESHOLD \
+                        else MAX_THRESHOLD
+
+    for ii in range(partition.first, partition.second):
+        i = probe_order[ii]
+        tokens = get_tokens(rtokens, i)
+        m = get_num_tokens(rtokens, i)
+        prefix_length = r_prefix_lengths[i]
+        rchars = <const unsigned char*>rstrings[i].c_str()
+        rlen = rstrings[i].length()
+        for k in range(rlen):
+            char_counts[rchars[k]] += 1
                                                                                 
         for j in range(prefix_length):                                          
-            if index.find(tokens[j]) == index.end():                
+            token = tokens[j]
+            if token >= num_indexed_tokens:
                 continue
-            for cand in index[tokens[j]]:                                             
-                candidates.insert(cand)               
+            for k in range(offsets[token], offsets[token + 1]):
+                candidates.insert(postings[k])               
 
         for cand in candidates:
             if m - threshold <= size_vector[cand] <= m + threshold:
-                edit_dist = edit_distance(lstrings[cand], rstrings[i])                                         
+                # content filter: each edit operation changes the counts of
+                # the characters by at most 2 in total.
+                if (get_char_count_distance(char_counts, lstrings[cand],
+                                            rlen) + 1) // 2 > max_dist:
+                    continue
+
+                edit_dist = bounded_edit_distance(
+                                <const unsigned char*>lstrings[cand].c_str(),
+                                lstrings[cand].length(),
+                                <const unsigned char*>rstrings[i].c_str(),
+                                rstrings[i].length(), max_dist)
                 if comp_fn(edit_dist, threshold):                                       
                     output_pairs.push_back(pair[int, int](cand, i))     
                     output_sim_scores.push_back(edit_dist)                          
 
         candidates.clear()
+        for k in range(rlen):
+            char_counts[rchars[k]] -= 1
+
+
+cdef int get_char_count_distance(int* char_counts, const string& str1,
+                                 int len2) nogil:
+    # Computes the L1 distance between the character counts of str1 and the
+    # counts in char_counts, which are the counts of a string of length len2.
+    # char_counts is restored before returning.
+    cdef const unsigned char* chars = <const unsigned char*>str1.c_str()
+    cdef int k, len1 = str1.length(), dist = len2
+    for k in range(len1):
+        if char_counts[chars[k]] > 0:
+            dist -= 1
+        else:
+            dist += 1
+        char_counts[chars[k]] -= 1
+    for k in range(len1):
+        char_counts[chars[k]] += 1
+    return dist
+
+
+cdef void get_location_prefix_lengths(TokenStoreView& token_store,
+                                      const int[:] positions, int qval,
+                                      double threshold,
+                                      vector[int]& prefix_lengths):
+    # The prefix of a string is the shortest prefix of its ordered q-grams
+    # that cannot be destroyed by threshold edit operations, which is the
+    # location-based mismatch filter of Ed-Join. An edit operation destroys
+    # the q-grams overlapping its location, and the number of edit
+    # operations needed to destroy a set of q-grams is found by placing each
+    # operation as far right as possible. The prefix has at most
+    # qval * threshold + 1 q-grams.
+    cdef vector[int] locations
+    cdef int ii, jj, kk, m, max_prefix_length, prefix_length, num_edits
+    cdef int last_destroyed, location
+    cdef const int* record_positions
+    for ii in range(token_store.num_records):
+        m = get_num_tokens(token_store, ii)
+        max_prefix_length = <int>(qval * threshold + 1) \
+                            if qval * threshold + 1 < m else m
+        record_positions = &positions[token_store.offsets[ii]] \
+                           if m > 0 else NULL
+        locations.clear()
+        prefix_length = max_prefix_length
+        for jj in range(max_prefix_length):
+            # insert the location of the next q-gram in sorted order.
+            location = record_positions[jj]
+            locations.push_back(location)
+            kk = locations.size() - 1
+            while kk > 0 and locations[kk - 1] > location:
+                locations[kk] = locations[kk - 1]
+                kk -= 1
+            locations[kk] = location
+
+            num_edits = 0
+            last_destroyed = -1
+            for kk in range(locations.size()):
+                if locations[kk] > last_destroyed:
+                    num_edits += 1
+                    last_destroyed = locations[kk] + qval - 1
+            if num_edits > threshold:
+                prefix_length = jj + 1
+                break
+        prefix_lengths.push_back(prefix_length)
+
+
+cdef void _pass_join(ltable_array, rtable_array,
+                     int l_join_attr_index, int r_join_attr_index,
+                     double threshold, int comp_op_type,
+                     int n_jobs, bool show_progress,
+                     vector[vector[pair[int, int]]]& output_pairs,
+                     vector[vector[double]]& output_sim_scores):
+    # joins the tables using the segment partitioning of Pass-Join. The
+    # strings are stored as code points, so that the edit distance is
+    # computed over the characters of the strings.
+    cdef vector[uint32_t] lchars, rchars
+    cdef vector[int] loffsets, roffsets
+    get_code_points(ltable_array, l_join_attr_index, lchars, loffsets)
+    get_code_points(rtable_array, r_join_attr_index, rchars, roffsets)
+
+    cdef int max_dist = <int>threshold if threshold < MAX_THRESHOLD \
+                        else MAX_THRESHOLD
+
+    # The segments of the strings of the left table are indexed by the hash
+    # of their length, position and characters. A hash collision only adds
+    # candidates, which are verified. The strings with at most max_dist
+    # characters cannot be split into max_dist + 1 non-empty segments, and
+    # are indexed by their length.
+    cdef unordered_map[uint64_t, vector[int]] segment_index
+    cdef unordered_map[int, vector[int]] short_index
+    cdef vector[int] length_counts
+    cdef int i, k, l_len, max_l_len = 0, num_l = loffsets.size() - 1
+    cdef int start, segment_length
+    for i in range(num_l):
+        l_len = loffsets[i + 1] - loffsets[i]
+        if l_len > max_l_len:
+            max_l_len = l_len
+        if l_len <= max_dist:
+            short_index[l_len].push_back(i)
+            continue
+        for k in range(max_dist + 1):
+            get_segment(l_len, max_dist, k, &start, &segment_length)
+            segment_index[hash_segment(lchars.data() + loffsets[i] + start,
+                                       segment_length, l_len, k)].push_back(i)
+
+    # The cost of probing the index with a string is estimated by the number
+    # of strings of the left table within the length filter.
+    for l_len in range(max_l_len + 2):
+        length_counts.push_back(0)
+    for i in range(num_l):
+        length_counts[loffsets[i + 1] - loffsets[i] + 1] += 1
+    for l_len in range(1, max_l_len + 2):
+        length_counts[l_len] += length_counts[l_len - 1]
+
+    cdef vector[double] costs
+    cdef vector[int] probe_order
+    cdef vector[pair[int, int]] chunks
+    cdef int r_len, min_len, max_len, c, num_chunks
+    for i in range(roffsets.size() - 1):
+        r_len = roffsets[i + 1] - roffsets[i]
+        min_len = r_len - max_dist if r_len > max_dist else 0
+        max_len = r_len + max_dist if r_len + max_dist < max_l_len \
+                  else max_l_len
+        costs.push_back(length_counts[max_len + 1] - length_counts[min_len]
+                        if min_len <= max_len else 0)
+    get_probe_schedule(costs, n_jobs, probe_order, chunks)
+
+    num_chunks = chunks.size()
+    for c in range(num_chunks):
+        output_pairs.push_back(vector[pair[int, int]]())
+        output_sim_scores.push_back(vector[double]())
+
+    # If the show_progress flag is enabled, then create a new progress bar and 
+    # assign it to the global variable.
+    if show_progress:
+        global _progress_bar
+        _progress_bar = pyprind.ProgBar(num_chunks)
+
+    for c in prange(num_chunks, nogil=True, num_threads=n_jobs,
+                    schedule='dynamic', chunksize=1):
+        _pass_join_part(chunks[c], probe_order, max_dist, max_l_len,
+                        threshold, comp_op_type, segment_index, short_index,
+                        lchars, loffsets, rchars, roffsets,
+                        output_pairs[c], output_sim_scores[c])
+
+        # If the show_progress flag is enabled, we update the progress bar
+        # after each chunk. To do so, the thread acquires the GIL and updates
+        # the global variable that keeps track of the progress bar.
+        if show_progress:
+            with gil:
+                _progress_bar.update()
+
+
+cdef void _pass_join_part(pair[int, int] partition,
+                          vector[int]& probe_order,
+                          int max_dist, int max_l_len,
+                          double threshold, int comp_op_type,
+                          unordered_map[uint64_t, vector[int]]& segment_index,
+                          unordered_map[int, vector[int]]& short_index,
+                          vector[uint32_t]& lchars, vector[int]& loffsets,
+                          vector[uint32_t]& rchars, vector[int]& roffsets,
+                          vector[pair[int, int]]& output_pairs,
+                          vector[double]& output_sim_scores) nogil:
+    cdef oset[int] candidates
+    cdef unordered_map[uint64_t, vector[int]].iterator segment_entry
+    cdef unordered_map[int, vector[int]].iterator short_entry
+    cdef const uint32_t* r_chars
+    cdef int ii, i, k, cand, r_len, l_len, min_len, max_len, length_diff
+    cdef int start, segment_length, lo, hi, pos
+    cdef double edit_dist
+    cdef compfnptr comp_fn
+    comp_fn = get_comparison_function(comp_op_type)
+
+    for ii in range(partition.first, partition.second):
+        i = probe_order[ii]
+        r_chars = rchars.data() + roffsets[i]
+        r_len = roffsets[i + 1] - roffsets[i]
+        min_len = r_len - max_dist if r_len > max_dist else 0
+        max_len = r_len + max_dist if r_len + max_dist < max_l_len \
+                  else max_l_len
+
+        for l_len in range(min_len, max_len + 1):
+            if l_len <= max_dist:
+                short_entry = short_index.find(l_len)
+                if short_entry != short_index.end():
+                    for cand in deref(short_entry).second:
+                        candidates.insert(cand)
+                continue
+
+            # A string within max_dist of the probe string has a segment that
+            # matches a substring of the probe string, such that the edits
+            # before the segment are at most the number of segments before it
+            # and the edits after the segment are at most the number of
+            # segments after it. This bounds the start of the substring
+            # (multi-match-aware substring selection).
+            length_diff = r_len - l_len
+            for k in range(max_dist + 1):
+                get_segment(l_len, max_dist, k, &start, &segment_length)
+                lo = int_max2(start - k,
+                              start + length_diff - (max_dist - k))
+                hi = int_min2(start + k,
+                              start + length_diff + (max_dist - k))
+                if lo < 0:
+                    lo = 0
+                if hi > r_len - segment_length:
+                    hi = r_len - segment_length
+                for pos in range(lo, hi + 1):
+                    segment_entry = segment_index.find(
+                        hash_segment(r_chars + pos, segment_length, l_len, k))
+                    if segment_entry != segment_index.end():
+                        for cand in deref(segment_entry).second:
+                            candidates.insert(cand)
+
+        for cand in candidates:
+            edit_dist = bounded_edit_distance(
+                            lchars.data() + loffsets[cand],
+                            loffsets[cand + 1] - loffsets[cand],
+                            r_chars, r_len, max_dist)
+            if comp_fn(edit_dist, threshold):
+                output_pairs.push_back(pair[int, int](cand, i))
+                output_sim_scores.push_back(edit_dist)
+
+        candidates.clear()
+
 
-        # If the show_progress flag is enabled, we update the progress bar.
-        # Note that only one of the threads will update the progress bar. To
-        # do so, it releases GIL and updates the global variable that keeps 
-        # track of the progress bar.
-        if thread_id == 0 and show_progress:
+cdef void get_code_points(table_array, int join_attr_index,
+                          vector[uint32_t]& chars, vector[int]& offsets):
+    # Stores the code points of the join attribute values of the table,
+    # concatenated, and the offset of each value.
+    cdef Py_UCS4 c
+    offsets.push_back(0)
+    for row in table_array:
+        for c in get_unicode(row[join_attr_index]):
+            chars.push_back(c)
+        offsets.push_back(chars.size())
+
+
+cdef get_unicode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+cdef inline void get_segment(int length, int max_dist, int k, int* start,
+                             int* segment_length) nogil:
+    # Finds the start and length of the k-th of the max_dist + 1 segments of
+    # a string of the given length. The last (length mod (max_dist + 1))
+    # segments are one character longer than the others.
+    cdef int num_segments = max_dist + 1
+    cdef int num_short = num_segments - length % num_segments
+    cdef int short_length = length // num_segments
+    if k < num_short:
+        start[0] = k * short_length
+        segment_length[0] = short_length
+    else:
+        start[0] = num_short * short_length + \
+                   (k - num_short) * (short_length + 1)
+        segment_length[0] = short_length + 1
+
+
+cdef inline uint64_t hash_segment(const uint32_t* chars, int length,
+                                  int string_length, int k) nogil:
+    # FNV-1a hash of the characters of a segment, seeded with the length of
+    # the string and the position of the segment in it.
+    cdef uint64_t h = 14695981039346656037ULL
+    cdef int j
+    h = (h ^ <uint64_t>string_length) * 1099511628211ULL
+    h = (h ^ <uint64_t>k) * 1099511628211ULL
+    for j in range(length):
+        h = (h ^ <uint64_t>chars[j]) * 1099511628211ULL
+    return h
+
+
+cdef inline int int_min2(int a, int b) nogil:
+    return a if a <= b else b
+
+
+cdef inline int int_max2(int a, int b) nogil:
+    return a if a >= b else b
+
+
+cdef void _trie_join(ltable_array, rtable_array,
+                     int l_join_attr_index, int r_join_attr_index,
+                     double threshold, int comp_op_type,
+                     int n_jobs, bool show_progress,
+                     vector[vector[pair[int, int]]]& output_pairs,
+                     vector[vector[double]]& output_sim_scores):
+    # joins the tables by traversing a trie over the strings of the left
+    # table for each string of the right table. The strings are stored as
+    # code points, so that the edit distance is computed over the characters
+    # of the strings.
+    cdef vector[uint32_t] lchars, rchars
+    cdef vector[int] loffsets, roffsets
+    get_code_points(ltable_array, l_join_attr_index, lchars, loffsets)
+    get_code_points(rtable_array, r_join_attr_index, rchars, roffsets)
+
+    cdef int max_dist = <int>threshold if threshold < MAX_THRESHOLD \
+                        else MAX_THRESHOLD
+
+    # The strings are sorted, so that the strings sharing a prefix are
+    # adjacent, and the trie is built in preorder from the longest common
+    # prefix of each string with the previous one. A node holds the last
+    # character of its prefix, its depth, the end of its subtree in preorder
+    # and the range of the sorted strings ending at it.
+    sorted_ids = sorted(range(loffsets.size() - 1),
+                        key=lambda i: get_unicode(
+                                          ltable_array[i][l_join_attr_index]))
+    cdef vector[int] string_order
+    cdef vector[uint32_t] node_chars
+    cdef vector[int] node_depths, subtree_ends, ids_begin, ids_end
+    cdef vector[int] path
+    cdef int i, j, prev = -1, lcp, node, l_len, prev_len, max_depth = 0
+    node_chars.push_back(0)
+    node_depths.push_back(0)
+    ids_begin.push_back(0)
+    ids_end.push_back(0)
+    path.push_back(0)
+    for i in sorted_ids:
+        l_len = loffsets[i + 1] - loffsets[i]
+        lcp = 0
+        if prev >= 0:
+            prev_len = loffsets[prev + 1] - loffsets[prev]
+            while (lcp < l_len and lcp < prev_len and
+                   lchars[loffsets[i] + lcp] == lchars[loffsets[prev] + lcp]):
+                lcp += 1
+        path.resize(lcp + 1)
+        for j in range(lcp, l_len):
+            path.push_back(node_chars.size())
+            node_chars.push_back(lchars[loffsets[i] + j])
+            node_depths.push_back(j + 1)
+            ids_begin.push_back(string_order.size())
+            ids_end.push_back(string_order.size())
+        node = path.back()
+        if ids_begin[node] == ids_end[node]:
+            ids_begin[node] = string_order.size()
+        string_order.push_back(i)
+        ids_end[node] = string_order.size()
+        if l_len > max_depth:
+            max_depth = l_len
+        prev = i
+
+    # the subtree of a node ends at the next node in preorder that is not
+    # deeper than it.
+    cdef int num_nodes = node_chars.size()
+    subtree_ends.resize(num_nodes, num_nodes)
+    path.clear()
+    for node in range(num_nodes):
+        while (not path.empty() and
+               node_depths[path.back()] >= node_depths[node]):
+            subtree_ends[path.back()] = node
+            path.pop_back()
+        path.push_back(node)
+
+    # The cost of probing the trie with a string is estimated by the length
+    # of the string, which is the number of cells computed per trie node.
+    cdef vector[double] costs
+    cdef vector[int] probe_order
+    cdef vector[pair[int, int]] chunks
+    cdef int c, num_chunks
+    for i in range(roffsets.size() - 1):
+        costs.push_back(roffsets[i + 1] - roffsets[i] + 1)
+    get_probe_schedule(costs, n_jobs, probe_order, chunks)
+
+    num_chunks = chunks.size()
+    for c in range(num_chunks):
+        output_pairs.push_back(vector[pair[int, int]]())
+        output_sim_scores.push_back(vector[double]())
+
+    # If the show_progress flag is enabled, then create a new progress bar and 
+    # assign it to the global variable.
+    if show_progress:
+        global _progress_bar
+        _progress_bar = pyprind.ProgBar(num_chunks)
+
+    for c in prange(num_chunks, nogil=True, num_threads=n_jobs,
+                    schedule='dynamic', chunksize=1):
+        _trie_join_part(chunks[c], probe_order, max_dist, max_depth,
+                        threshold, comp_op_type, node_chars, node_depths,
+                        subtree_ends, ids_begin, ids_end, string_order,
+                        rchars, roffsets,
+                        output_pairs[c], output_sim_scores[c])
+
+        # If the show_progress flag is enabled, we update the progress bar
+        # after each chunk. To do so, the thread acquires the GIL and updates
+        # the global variable that keeps track of the progress bar.
+        if show_progress:
             with gil:
-                global _progress_bar
                 _progress_bar.update()
+
+
+cdef void _trie_join_part(pair[int, int] partition,
+                          vector[int]& probe_order,
+                          int max_dist, int max_depth,
+                          double threshold, int comp_op_type,
+                          vector[uint32_t]& node_chars,
+                          vector[int]& node_depths,
+                          vector[int]& subtree_ends,
+                          vector[int]& ids_begin, vector[int]& ids_end,
+                          vector[int]& string_order,
+                          vector[uint32_t]& rchars, vector[int]& roffsets,
+                          vector[pair[int, int]]& output_pairs,
+                          vector[double]& output_sim_scores) nogil:
+    # The trie is traversed in preorder, computing a row of the edit
+    # distance matrix per node from the row of its parent, so that the
+    # strings sharing a prefix share the rows of the prefix. The row of a
+    # node at depth d is kept at position d, where it remains until the
+    # traversal leaves the subtree of the node. A subtree is skipped as soon
+    # as the minimum of the row exceeds max_dist, as the rows of the
+    # descendants have larger minimums. Only the cells within max_dist of
+    # the diagonal are computed, and the cells next to them are set to
+    # max_dist + 1, as the other cells exceed max_dist.
+    cdef vector[int] rows
+    cdef int* prev_row
+    cdef int* curr_row
+    cdef const uint32_t* r_chars
+    cdef uint32_t node_char
+    cdef int ii, i, j, k, r_len, depth, node, row_min, value, cost, lo, hi
+    cdef int num_nodes = node_chars.size(), exceeded = max_dist + 1
+    cdef compfnptr comp_fn
+    comp_fn = get_comparison_function(comp_op_type)
+
+    for ii in range(partition.first, partition.second):
+        i = probe_order[ii]
+        r_chars = rchars.data() + roffsets[i]
+        r_len = roffsets[i + 1] - roffsets[i]
+
+        # the rows deeper than r_len + max_dist + 1 are never computed, as
+        # their parents exceed max_dist.
+        depth = max_depth if max_depth < r_len + max_dist \
+                else r_len + max_dist
+        rows.resize((depth + 2) * (r_len + 1))
+        for j in range(r_len + 1):
+            rows[j] = j
+        if r_len <= max_dist:
+            for k in range(ids_begin[0], ids_end[0]):
+                if comp_fn(r_len, threshold):
+                    output_pairs.push_back(pair[int, int](string_order[k], i))
+                    output_sim_scores.push_back(r_len)
+
+        node = 1
+        while node < num_nodes:
+            depth = node_depths[node]
+            node_char = node_chars[node]
+            prev_row = rows.data() + (depth - 1) * (r_len + 1)
+            curr_row = prev_row + r_len + 1
+            curr_row[0] = depth
+            row_min = depth
+            lo = depth - max_dist if depth - max_dist > 1 else 1
+            hi = depth + max_dist if depth + max_dist < r_len else r_len
+            if lo > 1:
+                curr_row[lo - 1] = exceeded
+            for j in range(lo, hi + 1):
+                cost = 0 if r_chars[j - 1] == node_char else 1
+                value = prev_row[j - 1] + cost
+                if prev_row[j] + 1 < value:
+                    value = prev_row[j] + 1
+                if curr_row[j - 1] + 1 < value:
+                    value = curr_row[j - 1] + 1
+                if value > exceeded:
+                    value = exceeded
+                curr_row[j] = value
+                if value < row_min:
+                    row_min = value
+            if hi < r_len:
+                curr_row[hi + 1] = exceeded
+
+            if row_min > max_dist:
+                node = subtree_ends[node]
+                continue
+
+            if hi == r_len and curr_row[r_len] <= max_dist:
+                for k in range(ids_begin[node], ids_end[node]):
+                    if comp_fn(curr_row[r_len], threshold):
+                        output_pairs.push_back(
+                            pair[int, int](string_order[k], i))
+                        output_sim_scores.push_back(curr_row[r_len])
+            node += 1
@@ -1,4 +1,5 @@
 # edit distance join
+from collections import Counter
 from math import floor
 
 from joblib import delayed, Parallel
@@ -6,20 +7,25 @@ from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
 import pandas as pd
 import pyprind
 
+from py_stringsimjoin.filter.filter_utils import get_char_count_distance, \
+    get_location_prefix_length
 from py_stringsimjoin.filter.prefix_filter import PrefixFilter
 from py_stringsimjoin.index.prefix_index import PrefixIndex
+from py_stringsimjoin.index.segment_index import SegmentIndex, get_segments
+from py_stringsimjoin.index.trie_index import TrieIndex
 from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     find_output_attribute_indices, get_attrs_to_project, \
     get_num_processes_to_launch, get_output_header_from_tables, \
     get_output_row_from_tables, remove_non_ascii, remove_redundant_attrs, \
-    split_table, COMP_OP_MAP
+    split_table_by_cost, COMP_OP_MAP
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
 from py_stringsimjoin.utils.simfunctions import get_sim_function
-from py_stringsimjoin.utils.token_ordering import \
-    gen_token_ordering_for_tables, order_using_token_ordering
+from py_stringsimjoin.utils.token_ordering import tokenize_and_order_tables
 from py_stringsimjoin.utils.validation import validate_attr, \
-    validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
+    validate_attr_type, validate_comp_op_for_sim_measure, \
+    validate_edit_distance_join_method, validate_key_attr, \
     validate_input_table, validate_threshold, \
     validate_tokenizer_for_sim_measure, validate_output_attrs
 
@@ -32,7 +38,7 @@ def edit_distance_join_py(ltable, rtable,
                           l_out_attrs=None, r_out_attrs=None,
                           l_out_prefix='l_', r_out_prefix='r_',
                           out_sim_score=True, n_jobs=1, show_progress=True,
-                          tokenizer=QgramTokenizer(qval=2)):
+                          tokenizer=QgramTokenizer(qval=2), method='qgram'):
     """Join two tables using edit distance measure.
 
     Finds tuple pairs from left table and right table such that the edit 
@@ -50,15 +56,30 @@ def edit_distance_join_py(ltable, rtable,
         strings, to appear in the join output. For smaller strings, where all 
         qgrams of the strings differ, we cannot process them.
  
-        This method implements a simplified version of the algorithm proposed in
+        This method implements the algorithm proposed in
         `Ed-Join: An Efficient Algorithm for Similarity Joins With Edit Distance
         Constraints (Chuan Xiao, Wei Wang and Xuemin Lin), VLDB 08
-        <http://www.vldb.org/pvldb/1/1453957.pdf>`_. 
+        <http://www.vldb.org/pvldb/1/1453957.pdf>`_, using the prefix filter
+        with the location-based prefixes of the strings, the length filter
+        and the content filter on the character counts of the strings. 
+
+        The 'passjoin' method computes the exact join result instead, using
+        the algorithm proposed in `Pass-Join: A Partition-based Method for
+        Similarity Joins (Guoliang Li, Dong Deng, Jiannan Wang and Jianhua
+        Feng), VLDB 12 <http://www.vldb.org/pvldb/vol5/p253_guoliangli_vldb2012.pdf>`_.
+        Each string of the left table is split into threshold + 1 segments,
+        one of which appears unchanged in any string within the threshold, and
+        the strings of the right table are probed with their substrings
+        selected by the multi-match-aware method. The 'trie' method also
+        computes the exact join result, by traversing a trie over the strings
+        of the left table for each string of the right table, so that the
+        strings sharing a prefix share the computation of their edit distance
+        over the prefix. The tokenizer is not used by these methods.
         
     Args:
-        ltable (DataFrame): left input table.
+        ltable (DataFrame or PreparedTable): left input table.
 
-        rtable (DataFrame): right input table.
+        rtable (DataFrame or PreparedTable): right input table.
 
         l_key_attr (string): key attribute in left table.
 
@@ -113,12 +134,23 @@ def edit_distance_join_py(ltable, rtable,
             attributes during filtering, when edit distance measure is          
             transformed into an overlap measure. This must be a q-gram tokenizer
             (defaults to 2-gram tokenizer).
+
+        method (string): join algorithm to be used. Supported values are
+            'qgram', which filters the pairs by their q-grams, 'passjoin',
+            which computes the exact join result using segment partitioning,
+            and 'trie', which computes the exact join result using a trie
+            over the left table and suits short strings (defaults to
+            'qgram').
                                                                                 
     Returns:                                                                    
         An output table containing tuple pairs that satisfy the join            
         condition (DataFrame).  
     """
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
     # check if the input tables are dataframes
     validate_input_table(ltable, 'left table')
     validate_input_table(rtable, 'right table')
@@ -149,13 +181,18 @@ def edit_distance_join_py(ltable, rtable,
     # check if the comparison operator is valid
     validate_comp_op_for_sim_measure(comp_op, 'EDIT_DISTANCE')
 
+    # check if the join method is valid
+    validate_edit_distance_join_method(method)
+
     # check if the output attributes exist
     validate_output_attrs(l_out_attrs, ltable.columns,
                           r_out_attrs, rtable.columns)
 
     # check if the key attributes are unique and do not contain missing values
-    validate_key_attr(l_key_attr, ltable, 'left table')
-    validate_key_attr(r_key_attr, rtable, 'right table')
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
 
     # convert threshold to integer (incase if it is float)
     threshold = int(floor(threshold))
@@ -193,12 +230,14 @@ def edit_distance_join_py(ltable, rtable,
                                tokenizer, threshold, comp_op,
                                l_out_attrs, r_out_attrs,
                                l_out_prefix, r_out_prefix,
-                               out_sim_score, show_progress)
+                               out_sim_score, show_progress, method)
     else:
-        # if n_jobs is above 1, split the right table into n_jobs splits and    
-        # join each right table split with the whole of left table in a separate
-        # process.
-        r_splits = split_table(rtable_array, n_jobs)
+        # if n_jobs is above 1, split the right table into n_jobs splits of
+        # roughly equal cost and join each right table split with the whole of
+        # left table in a separate process.
+        r_join_attr_index = r_proj_attrs.index(r_join_attr)
+        r_splits, _ = split_table_by_cost(rtable_array, r_join_attr_index,
+                                          n_jobs)
         results = Parallel(n_jobs=n_jobs)(delayed(_edit_distance_join_split)(
                                     ltable_array, r_splits[job_index],
                                     l_proj_attrs, r_proj_attrs,
@@ -208,7 +247,8 @@ def edit_distance_join_py(ltable, rtable,
                                     l_out_attrs, r_out_attrs,
                                     l_out_prefix, r_out_prefix,
                                     out_sim_score,
-                                    (show_progress and (job_index==n_jobs-1)))
+                                    (show_progress and (job_index==n_jobs-1)),
+                                    method)
                                 for job_index in range(n_jobs))
         output_table = pd.concat(results)
 
@@ -242,7 +282,7 @@ def _edit_distance_join_split(ltable_list, rtable_list,
                               tokenizer, threshold, comp_op,
                               l_out_attrs, r_out_attrs,
                               l_out_prefix, r_out_prefix,
-                              out_sim_score, show_progress):
+                              out_sim_score, show_progress, method='qgram'):
     """Perform edit distance join for a split of ltable and rtable"""
     # find column indices of key attr, join attr and output attrs in ltable
     l_key_attr_index = l_columns.index(l_key_attr)
@@ -255,25 +295,43 @@ def _edit_distance_join_split(ltable_list, rtable_list,
     r_out_attrs_indices = find_output_attribute_indices(r_columns, r_out_attrs)
 
     sim_measure_type = 'EDIT_DISTANCE'
-    # generate token ordering using tokens in l_join_attr
-    # and r_join_attr
-    token_ordering = gen_token_ordering_for_tables(
-                         [ltable_list, rtable_list],
-                         [l_join_attr_index, r_join_attr_index],
-                         tokenizer, sim_measure_type)
-
-    # cache l_join_attr lengths
+
+    # cache l_join_attr lengths and character counts
     l_join_attr_list = []
+    l_char_counts_list = []
     for row in ltable_list:
         l_join_attr_list.append(len(row[l_join_attr_index]))
-
-    # Build prefix index on l_join_attr
-    prefix_index = PrefixIndex(ltable_list, l_join_attr_index,
-                               tokenizer, sim_measure_type, threshold,
-                               token_ordering)
-    prefix_index.build(False)
-
-    prefix_filter = PrefixFilter(tokenizer, sim_measure_type, threshold)
+        l_char_counts_list.append(Counter(row[l_join_attr_index]))
+
+    if method == 'passjoin':
+        # Build segment index on l_join_attr
+        segment_index = SegmentIndex(ltable_list, l_join_attr_index, threshold)
+        segment_index.build()
+    elif method == 'trie':
+        # Build trie index on l_join_attr
+        trie_index = TrieIndex(ltable_list, l_join_attr_index)
+        trie_index.build()
+    else:
+        # tokenize l_join_attr and r_join_attr, and order the tokens using the
+        # token ordering generated from the same pass. The locations of the
+        # q-grams are used to compute the prefix lengths.
+        token_lists, token_ordering, position_lists = \
+            tokenize_and_order_tables([ltable_list, rtable_list],
+                                      [l_join_attr_index, r_join_attr_index],
+                                      tokenizer, return_positions=True)
+        qval = tokenizer.qval
+        l_prefix_lengths = [get_location_prefix_length(positions, qval,
+                                                       threshold)
+                            for positions in position_lists[0]]
+
+        # Build prefix index on l_join_attr
+        prefix_index = PrefixIndex(ltable_list, l_join_attr_index,
+                                   tokenizer, sim_measure_type, threshold,
+                                   token_ordering)
+        prefix_index.build(False, token_lists=token_lists[0],
+                           prefix_lengths=l_prefix_lengths)
+
+        prefix_filter = PrefixFilter(tokenizer, sim_measure_type, threshold)
 
     comp_fn = COMP_OP_MAP[comp_op]
     sim_fn = get_sim_function(sim_measure_type)
@@ -285,19 +343,33 @@ def _edit_distance_join_split(ltable_list, rtable_list,
     if show_progress:
         prog_bar = pyprind.ProgBar(len(rtable_list))
 
-    for r_row in rtable_list:
+    for r_id, r_row in enumerate(rtable_list):
         r_string = r_row[r_join_attr_index]
         r_len = len(r_string)
-
-        r_ordered_tokens = order_using_token_ordering(
-                tokenizer.tokenize(r_string), token_ordering)
-
-        # obtain candidates by applying prefix filter. 
-        candidates = prefix_filter.find_candidates(r_ordered_tokens,
-                                                   prefix_index)
+        r_char_counts = Counter(r_string)
+
+        if method == 'passjoin':
+            # obtain candidates by probing the segment index.
+            candidates = _find_segment_candidates(r_string, segment_index,
+                                                  threshold)
+        elif method == 'trie':
+            # obtain candidates by traversing the trie index.
+            candidates = trie_index.probe(r_string, threshold)
+        else:
+            # obtain candidates by applying prefix filter. 
+            candidates = prefix_filter.find_candidates(
+                             token_lists[1][r_id], prefix_index,
+                             get_location_prefix_length(position_lists[1][r_id],
+                                                        qval, threshold))
 
         for cand in candidates:
             if r_len - threshold <= l_join_attr_list[cand] <= r_len + threshold:
+                # apply content filter: each edit operation changes the
+                # counts of the characters by at most 2 in total.
+                if get_char_count_distance(l_char_counts_list[cand],
+                                           r_char_counts) > 2 * threshold:
+                    continue
+
                 l_row = ltable_list[cand]
 
                 # compute the actual edit distance                           
@@ -334,3 +406,33 @@ def _edit_distance_join_split(ltable_list, rtable_list,
     # generate a dataframe from the list of output rows
     output_table = pd.DataFrame(output_rows, columns=output_header)
     return output_table
+
+
+def _find_segment_candidates(probe_string, segment_index, threshold):
+    """Find the strings in the segment index that have a segment matching a
+    substring of the probe string, using multi-match-aware substring
+    selection."""
+    candidates = set()
+    probe_length = len(probe_string)
+    for length in range(max(probe_length - threshold, 0),
+                        min(probe_length + threshold,
+                            segment_index.max_length) + 1):
+        if length <= threshold:
+            candidates.update(segment_index.probe_short_records(length))
+            continue
+
+        # A string within the threshold of the probe string has a segment
+        # that matches a substring of the probe string, such that the edits
+        # before the segment are at most the number of segments before it and
+        # the edits after the segment are at most the number of segments
+        # after it. This bounds the start of the substring.
+        length_diff = probe_length - length
+        for k, (start, segment_length) in enumerate(
+                get_segments(length, threshold)):
+            lo = max(start - k, start + length_diff - (threshold - k), 0)
+            hi = min(start + k, start + length_diff + (threshold - k),
+                     probe_length - segment_length)
+            for pos in range(lo, hi + 1):
+                candidates.update(segment_index.probe(
+                    length, k, probe_string[pos:pos + segment_length]))
+    return candidates
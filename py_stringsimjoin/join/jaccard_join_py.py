@@ -5,13 +5,15 @@ import pandas as pd
 from py_stringsimjoin.join.set_sim_join import set_sim_join
 from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     get_attrs_to_project, get_num_processes_to_launch, remove_redundant_attrs, \
-    split_table
+    split_table_by_cost
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
     validate_input_table, validate_threshold, validate_tokenizer, \
-    validate_output_attrs
+    validate_output_attrs, validate_self_join, \
+    validate_set_sim_join_index, validate_suffix_filter_max_depth
 
 
 def jaccard_join_py(ltable, rtable,
@@ -21,7 +23,9 @@ def jaccard_join_py(ltable, rtable,
                  allow_empty=True, allow_missing=False,
                  l_out_attrs=None, r_out_attrs=None,
                  l_out_prefix='l_', r_out_prefix='r_',
-                 out_sim_score=True, n_jobs=1, show_progress=True):
+                 out_sim_score=True, n_jobs=1, show_progress=True,
+                 self_join=False, suffix_filter_max_depth=0,
+                 index=None):
     """Join two tables using Jaccard similarity measure.
 
     For two sets X and Y, the Jaccard similarity score between them is given by:                      
@@ -39,9 +43,9 @@ def jaccard_join_py(ltable, rtable,
     specified in "threshold". 
 
     Args:
-        ltable (DataFrame): left input table.
+        ltable (DataFrame or PreparedTable): left input table.
 
-        rtable (DataFrame): right input table.
+        rtable (DataFrame or PreparedTable): right input table.
 
         l_key_attr (string): key attribute in left table.
 
@@ -99,11 +103,37 @@ def jaccard_join_py(ltable, rtable,
         show_progress (boolean): flag to indicate whether task progress should 
             be displayed to the user (defaults to True).
 
+        self_join (boolean): flag to indicate whether the join is a self join
+            (defaults to False). If True, ltable and rtable should be the same
+            table and l_join_attr and r_join_attr should be the same attribute.
+            The table is then tokenized and indexed only once, a tuple is not
+            paired with itself, and each matching pair is output only once
+            (with the left tuple occurring before the right tuple in the table).
+
+        suffix_filter_max_depth (int): maximum recursion depth of the suffix
+            filter applied to the candidate pairs before computing their
+            similarity scores (defaults to 0, which disables the suffix
+            filter). The suffix filter does not change the output. It pays off
+            when most candidates fail verification, for example on long strings
+            tokenized into q-grams. A depth of 2 is usually a good choice.
+
+        index (SetSimJoinIndex): prebuilt index on the join attribute of the
+            left table (defaults to None). The Python implementation only
+            checks that the index can be used for the join, and computes the
+            tokens and the position index of the left table itself. The index
+            should be built on ltable with the same tokenizer and similarity
+            measure, and with a threshold less than or equal to the threshold
+            of the join.
+
     Returns:
         An output table containing tuple pairs that satisfy the join 
         condition (DataFrame).
     """
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
     # check if the input tables are dataframes
     validate_input_table(ltable, 'left table')
     validate_input_table(rtable, 'right table')
@@ -138,8 +168,17 @@ def jaccard_join_py(ltable, rtable,
                           r_out_attrs, rtable.columns)
 
     # check if the key attributes are unique and do not contain missing values
-    validate_key_attr(l_key_attr, ltable, 'left table')
-    validate_key_attr(r_key_attr, rtable, 'right table')
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
+
+    # check if the self join flag is consistent with the input tables
+    if self_join:
+        validate_self_join(ltable, rtable, l_join_attr, r_join_attr)
+
+    # check if the maximum depth of the suffix filter is valid
+    validate_suffix_filter_max_depth(suffix_filter_max_depth)
 
     # set return_set flag of tokenizer to be True, in case it is set to False
     revert_tokenizer_return_set_flag = False
@@ -161,6 +200,14 @@ def jaccard_join_py(ltable, rtable,
     ltable_array = convert_dataframe_to_array(ltable, l_proj_attrs, l_join_attr)
     rtable_array = convert_dataframe_to_array(rtable, r_proj_attrs, r_join_attr)
 
+    # check if the prebuilt index can be used for the join. The index is only
+    # validated here, as the Python implementation builds its own index.
+    if index is not None:
+        validate_set_sim_join_index(index, 'JACCARD', threshold,
+                                    ltable_array,
+                                    l_proj_attrs.index(l_join_attr),
+                                    tokenizer)
+
     # computes the actual number of jobs to launch.
     n_jobs = min(get_num_processes_to_launch(n_jobs), len(rtable_array))
     
@@ -174,12 +221,18 @@ def jaccard_join_py(ltable, rtable,
                                     threshold, comp_op, allow_empty,
                                     l_out_attrs, r_out_attrs,
                                     l_out_prefix, r_out_prefix,
-                                    out_sim_score, show_progress)
+                                    out_sim_score, show_progress, self_join,
+                                    suffix_filter_max_depth=suffix_filter_max_depth)
     else:
-        # if n_jobs is above 1, split the right table into n_jobs splits and
-        # join each right table split with the whole of left table in a separate
-        # process.
-        r_splits = split_table(rtable_array, n_jobs)
+        # if n_jobs is above 1, split the right table into n_jobs splits of
+        # roughly equal cost and join each right table split with the whole of
+        # left table in a separate process.
+        r_join_attr_index = r_proj_attrs.index(r_join_attr)
+        r_splits, r_split_ids = split_table_by_cost(rtable_array,
+                                                    r_join_attr_index, n_jobs)
+        # In a self join, the ids of the records in each split are used to
+        # restrict the candidates of a record to the records that occur before
+        # it in the table.
         results = Parallel(n_jobs=n_jobs)(delayed(set_sim_join)(
                                           ltable_array, r_splits[job_index],
                                           l_proj_attrs, r_proj_attrs,
@@ -190,7 +243,9 @@ def jaccard_join_py(ltable, rtable,
                                           l_out_attrs, r_out_attrs,
                                           l_out_prefix, r_out_prefix,
                                           out_sim_score,
-                                      (show_progress and (job_index==n_jobs-1)))
+                                      (show_progress and (job_index==n_jobs-1)),
+                                          self_join, r_split_ids[job_index],
+                                          suffix_filter_max_depth)
                                           for job_index in range(n_jobs))
         output_table = pd.concat(results)
 
@@ -204,7 +259,8 @@ def jaccard_join_py(ltable, rtable,
                                         l_join_attr, r_join_attr,
                                         l_out_attrs, r_out_attrs,
                                         l_out_prefix, r_out_prefix,
-                                        out_sim_score, show_progress) 
+                                        out_sim_score, show_progress,
+                                        self_join) 
         output_table = pd.concat([output_table, missing_pairs])
 
     # add an id column named '_id' to the output table.
@@ -0,0 +1,125 @@
+# multi-measure join
+
+def multi_sim_join(ltable, rtable,
+                   l_key_attr, r_key_attr,
+                   l_join_attr, r_join_attr,
+                   tokenizer, conditions, combine_op='AND', comp_op='>=',
+                   allow_empty=True, allow_missing=False,
+                   l_out_attrs=None, r_out_attrs=None,
+                   l_out_prefix='l_', r_out_prefix='r_',
+                   out_sim_score=True, n_jobs=1, show_progress=True,
+                   self_join=False):
+    """Join two tables using several set similarity measures at once.
+
+    Finds tuple pairs from left table and right table such that the
+    conditions on the similarity between the join attributes, combined by
+    the operator in "combine_op", are satisfied. Each condition is a pair of
+    a similarity measure ('COSINE', 'DICE' or 'JACCARD') and a threshold. For
+    example, the conditions [('JACCARD', 0.5), ('COSINE', 0.7)] with
+    combine_op 'OR' find the tuple pairs whose Jaccard score is at least 0.5
+    or whose cosine score is at least 0.7.
+
+    The scores of all the measures are functions of the overlap between the
+    two sets of tokens and of their sizes. So, the tables are tokenized,
+    indexed and probed once, the overlap of each candidate pair is computed
+    once, and the scores of all the measures are derived from it. This is
+    faster than running a join per measure and merging their outputs.
+
+    Args:
+        ltable (DataFrame or PreparedTable): left input table.
+
+        rtable (DataFrame or PreparedTable): right input table.
+
+        l_key_attr (string): key attribute in left table.
+
+        r_key_attr (string): key attribute in right table.
+
+        l_join_attr (string): join attribute in left table.
+
+        r_join_attr (string): join attribute in right table.
+
+        tokenizer (Tokenizer): tokenizer to be used to tokenize join
+            attributes.
+
+        conditions (list): list of (similarity measure, threshold) pairs.
+
+        combine_op (string): operator combining the conditions. Supported
+            values are 'AND' and 'OR' (defaults to 'AND').
+
+        comp_op (string): comparison operator used by all the conditions.
+            Supported values are '>=', '>' and '=' (defaults to '>=').
+
+        allow_empty (boolean): flag to indicate whether tuple pairs with empty
+            set of tokens in both the join attributes should be included in the
+            output (defaults to True).
+
+        allow_missing (boolean): flag to indicate whether tuple pairs with
+            missing value in at least one of the join attributes should be
+            included in the output (defaults to False). If this flag is set to
+            True, a tuple in ltable with missing value in the join attribute
+            will be matched with every tuple in rtable and vice versa.
+
+        l_out_attrs (list): list of attribute names from the left table to be
+            included in the output table (defaults to None).
+
+        r_out_attrs (list): list of attribute names from the right table to be
+            included in the output table (defaults to None).
+
+        l_out_prefix (string): prefix to be used for the attribute names coming
+            from the left table, in the output table (defaults to 'l\_').
+
+        r_out_prefix (string): prefix to be used for the attribute names coming
+            from the right table, in the output table (defaults to 'r\_').
+
+        out_sim_score (boolean): flag to indicate whether the similarity
+            scores should be included in the output table (defaults to True).
+            Setting this flag to True will add a column per similarity measure
+            in the conditions, named after the measure ('_jaccard_sim_score',
+            '_cosine_sim_score' and '_dice_sim_score'), in the order in which
+            the measures first occur in the conditions.
+
+        n_jobs (int): number of parallel jobs to use for the computation
+            (defaults to 1). If -1 is given, all CPUs are used. If 1 is given,
+            no parallel computing code is used at all, which is useful for
+            debugging. For n_jobs below -1, (n_cpus + 1 + n_jobs) are used
+            (where n_cpus is the total number of CPUs in the machine). Thus for
+            n_jobs = -2, all CPUs but one are used. If (n_cpus + 1 + n_jobs)
+            becomes less than 1, then no parallel computing code will be used
+            (i.e., equivalent to the default).
+
+        show_progress (boolean): flag to indicate whether task progress should
+            be displayed to the user (defaults to True).
+
+        self_join (boolean): flag to indicate whether the join is a self join
+            (defaults to False). If True, ltable and rtable should be the same
+            table and l_join_attr and r_join_attr should be the same attribute.
+            A tuple is then not paired with itself, and each matching pair is
+            output only once.
+
+    Returns:
+        An output table containing tuple pairs that satisfy the join
+        condition (DataFrame).
+    """
+    from py_stringsimjoin import __use_cython__
+    if __use_cython__:
+        from py_stringsimjoin.join.multi_sim_join_cy import multi_sim_join_cy
+        return multi_sim_join_cy(ltable, rtable,
+                                 l_key_attr, r_key_attr,
+                                 l_join_attr, r_join_attr,
+                                 tokenizer, conditions, combine_op, comp_op,
+                                 allow_empty, allow_missing,
+                                 l_out_attrs, r_out_attrs,
+                                 l_out_prefix, r_out_prefix,
+                                 out_sim_score, n_jobs, show_progress,
+                                 self_join)
+    else:
+        from py_stringsimjoin.join.multi_sim_join_py import multi_sim_join_py
+        return multi_sim_join_py(ltable, rtable,
+                                 l_key_attr, r_key_attr,
+                                 l_join_attr, r_join_attr,
+                                 tokenizer, conditions, combine_op, comp_op,
+                                 allow_empty, allow_missing,
+                                 l_out_attrs, r_out_attrs,
+                                 l_out_prefix, r_out_prefix,
+                                 out_sim_score, n_jobs, show_progress,
+                                 self_join)
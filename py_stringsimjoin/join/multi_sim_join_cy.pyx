@@ -0,0 +1,192 @@
+# multi-measure join
+import pandas as pd
+
+from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
+    get_attrs_to_project, get_num_processes_to_launch, remove_redundant_attrs, \
+    find_output_attribute_indices, get_output_header_from_tables, \
+    get_sim_measure_types
+from py_stringsimjoin.utils.missing_value_handler import \
+    get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import get_tokenized_columns, \
+    unwrap_prepared_table
+from py_stringsimjoin.utils.validation import validate_attr, \
+    validate_attr_type, validate_combine_op, \
+    validate_comp_op_for_sim_measure, validate_key_attr, \
+    validate_input_table, validate_sim_conditions, validate_tokenizer, \
+    validate_output_attrs, validate_self_join
+
+from libcpp.vector cimport vector
+from libcpp.pair cimport pair
+
+from py_stringsimjoin.join.set_sim_join_cy cimport get_sim_type, \
+    multi_sim_join_cy as _multi_sim_join_cy
+from py_stringsimjoin.utils.cython_utils cimport generate_output_table
+
+
+def multi_sim_join_cy(ltable, rtable,
+                      l_key_attr, r_key_attr,
+                      l_join_attr, r_join_attr,
+                      tokenizer, conditions, combine_op='AND', comp_op='>=',
+                      allow_empty=True, allow_missing=False,
+                      l_out_attrs=None, r_out_attrs=None,
+                      l_out_prefix='l_', r_out_prefix='r_',
+                      out_sim_score=True, n_jobs=1, show_progress=True,
+                      self_join=False):
+    """Join two tables using several set similarity measures at once.
+
+    This is the Cython implementation of
+    :func:`py_stringsimjoin.join.multi_sim_join.multi_sim_join`, which
+    describes the arguments.
+
+    Returns:
+        An output table containing tuple pairs that satisfy the join
+        condition (DataFrame).
+    """
+
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
+    # check if the input tables are dataframes
+    validate_input_table(ltable, 'left table')
+    validate_input_table(rtable, 'right table')
+
+    # check if the key attributes and join attributes exist
+    validate_attr(l_key_attr, ltable.columns,
+                  'key attribute', 'left table')
+    validate_attr(r_key_attr, rtable.columns,
+                  'key attribute', 'right table')
+    validate_attr(l_join_attr, ltable.columns,
+                  'join attribute', 'left table')
+    validate_attr(r_join_attr, rtable.columns,
+                  'join attribute', 'right table')
+
+    # check if the join attributes are not of numeric type
+    validate_attr_type(l_join_attr, ltable[l_join_attr].dtype,
+                       'join attribute', 'left table')
+    validate_attr_type(r_join_attr, rtable[r_join_attr].dtype,
+                       'join attribute', 'right table')
+
+    # check if the input tokenizer is valid
+    validate_tokenizer(tokenizer)
+
+    # check if the conditions and the operator combining them are valid
+    validate_sim_conditions(conditions)
+    validate_combine_op(combine_op)
+
+    # check if the comparison operator is valid for all the measures
+    for sim_measure_type, _ in conditions:
+        validate_comp_op_for_sim_measure(comp_op, sim_measure_type)
+
+    # check if the output attributes exist
+    validate_output_attrs(l_out_attrs, ltable.columns,
+                          r_out_attrs, rtable.columns)
+
+    # check if the key attributes are unique and do not contain missing values
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
+
+    # check if the self join flag is consistent with the input tables
+    if self_join:
+        validate_self_join(ltable, rtable, l_join_attr, r_join_attr)
+
+    # set return_set flag of tokenizer to be True, in case it is set to False
+    revert_tokenizer_return_set_flag = False
+    if not tokenizer.get_return_set():
+        tokenizer.set_return_set(True)
+        revert_tokenizer_return_set_flag = True
+
+    # remove redundant attrs from output attrs.
+    l_out_attrs = remove_redundant_attrs(l_out_attrs, l_key_attr)
+    r_out_attrs = remove_redundant_attrs(r_out_attrs, r_key_attr)
+
+    # get attributes to project.
+    l_proj_attrs = get_attrs_to_project(l_out_attrs, l_key_attr, l_join_attr)
+    r_proj_attrs = get_attrs_to_project(r_out_attrs, r_key_attr, r_join_attr)
+
+    # Do a projection on the input dataframes to keep only the required
+    # attributes. Then, remove rows with missing value in join attribute from
+    # the input dataframes. Then, convert the resulting dataframes into ndarray.
+    ltable_array = convert_dataframe_to_array(ltable, l_proj_attrs, l_join_attr)
+    rtable_array = convert_dataframe_to_array(rtable, r_proj_attrs, r_join_attr)
+
+    # find column indices of key attr and output attrs in ltable
+    l_key_attr_index = l_proj_attrs.index(l_key_attr)
+    l_join_attr_index = l_proj_attrs.index(l_join_attr)
+    l_out_attrs_indices = find_output_attribute_indices(l_proj_attrs, l_out_attrs)
+
+    # find column indices of key attr and output attrs in rtable
+    r_key_attr_index = r_proj_attrs.index(r_key_attr)
+    r_join_attr_index = r_proj_attrs.index(r_join_attr)
+    r_out_attrs_indices = find_output_attribute_indices(r_proj_attrs, r_out_attrs)
+
+    # computes the actual number of jobs to launch.
+    n_jobs = min(get_num_processes_to_launch(n_jobs), len(rtable))
+
+    # the scores of the distinct measures of the conditions are output, one
+    # column per measure.
+    sim_measure_types, sim_score_attrs = get_sim_measure_types(conditions)
+
+    cdef vector[int] sim_types, out_sim_types
+    cdef vector[double] thresholds
+    for sim_measure_type, threshold in conditions:
+        sim_types.push_back(get_sim_type(sim_measure_type))
+        thresholds.push_back(threshold)
+    for sim_measure_type in sim_measure_types:
+        out_sim_types.push_back(get_sim_type(sim_measure_type))
+
+    cdef vector[vector[pair[int, int]]] output_pairs
+    cdef vector[vector[double]] output_sim_scores
+
+    # get the tokens cached by the prepared tables, if any.
+    tokenized_columns = get_tokenized_columns(
+                            [l_prepared_table, r_prepared_table],
+                            [l_join_attr, r_join_attr], tokenizer)
+
+    _multi_sim_join_cy(ltable_array, rtable_array,
+                       l_join_attr_index, r_join_attr_index,
+                       tokenizer, sim_types, thresholds, combine_op == 'AND',
+                       out_sim_types, comp_op,
+                       n_jobs, allow_empty, show_progress,
+                       output_pairs, output_sim_scores, self_join,
+                       0, None, tokenized_columns)
+
+    output_header = get_output_header_from_tables(
+                        l_key_attr, r_key_attr,
+                        l_out_attrs, r_out_attrs,
+                        l_out_prefix, r_out_prefix)
+    if out_sim_score:
+        output_header.extend(sim_score_attrs)
+
+    # generate output dataframe from the output pairs obtained after join
+    output_table = generate_output_table(ltable_array, rtable_array,
+                                         output_pairs, output_sim_scores,
+                                         l_key_attr_index, r_key_attr_index,
+                                         l_out_attrs_indices, r_out_attrs_indices,
+                                         out_sim_score, output_header,
+                                         out_sim_types.size())
+
+    # If allow_missing flag is set, then compute all pairs with missing value in
+    # at least one of the join attributes and then add it to the output
+    # obtained from the join. The scores of these pairs are missing.
+    if allow_missing:
+        missing_pairs = get_pairs_with_missing_value(
+                                        ltable, rtable,
+                                        l_key_attr, r_key_attr,
+                                        l_join_attr, r_join_attr,
+                                        l_out_attrs, r_out_attrs,
+                                        l_out_prefix, r_out_prefix,
+                                        False, show_progress,
+                                        self_join)
+        output_table = pd.concat([output_table, missing_pairs])
+
+    # add an id column named '_id' to the output table.
+    output_table.insert(0, '_id', range(0, len(output_table)))
+
+    # revert the return_set flag of tokenizer, in case it was modified.
+    if revert_tokenizer_return_set_flag:
+        tokenizer.set_return_set(False)
+
+    return output_table
@@ -0,0 +1,406 @@
+# multi-measure join
+from joblib import delayed, Parallel
+from six.moves import xrange
+import numpy as np
+import pandas as pd
+import pyprind
+
+from py_stringsimjoin.filter.filter_utils import get_overlap_threshold, \
+    get_prefix_length, get_size_lower_bound, get_size_upper_bound
+from py_stringsimjoin.index.position_index import PositionIndex
+from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
+    find_output_attribute_indices, get_attrs_to_project, \
+    get_num_processes_to_launch, get_output_header_from_tables, \
+    get_output_table_from_pairs, get_sim_measure_types, \
+    remove_redundant_attrs, split_table_by_cost, COMP_OP_MAP
+from py_stringsimjoin.utils.missing_value_handler import \
+    get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
+from py_stringsimjoin.utils.simfunctions import get_sim_score_from_overlap
+from py_stringsimjoin.utils.token_ordering import tokenize_and_order_tables
+from py_stringsimjoin.utils.validation import validate_attr, \
+    validate_attr_type, validate_combine_op, \
+    validate_comp_op_for_sim_measure, validate_key_attr, \
+    validate_input_table, validate_sim_conditions, validate_tokenizer, \
+    validate_output_attrs, validate_self_join
+
+
+def multi_sim_join_py(ltable, rtable,
+                      l_key_attr, r_key_attr,
+                      l_join_attr, r_join_attr,
+                      tokenizer, conditions, combine_op='AND', comp_op='>=',
+                      allow_empty=True, allow_missing=False,
+                      l_out_attrs=None, r_out_attrs=None,
+                      l_out_prefix='l_', r_out_prefix='r_',
+                      out_sim_score=True, n_jobs=1, show_progress=True,
+                      self_join=False):
+    """Join two tables using several set similarity measures at once.
+
+    This is the Python implementation of
+    :func:`py_stringsimjoin.join.multi_sim_join.multi_sim_join`, which
+    describes the arguments.
+
+    Returns:
+        An output table containing tuple pairs that satisfy the join
+        condition (DataFrame).
+    """
+
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
+    # check if the input tables are dataframes
+    validate_input_table(ltable, 'left table')
+    validate_input_table(rtable, 'right table')
+
+    # check if the key attributes and join attributes exist
+    validate_attr(l_key_attr, ltable.columns,
+                  'key attribute', 'left table')
+    validate_attr(r_key_attr, rtable.columns,
+                  'key attribute', 'right table')
+    validate_attr(l_join_attr, ltable.columns,
+                  'join attribute', 'left table')
+    validate_attr(r_join_attr, rtable.columns,
+                  'join attribute', 'right table')
+
+    # check if the join attributes are not of numeric type
+    validate_attr_type(l_join_attr, ltable[l_join_attr].dtype,
+                       'join attribute', 'left table')
+    validate_attr_type(r_join_attr, rtable[r_join_attr].dtype,
+                       'join attribute', 'right table')
+
+    # check if the input tokenizer is valid
+    validate_tokenizer(tokenizer)
+
+    # check if the conditions and the operator combining them are valid
+    validate_sim_conditions(conditions)
+    validate_combine_op(combine_op)
+
+    # check if the comparison operator is valid for all the measures
+    for sim_measure_type, _ in conditions:
+        validate_comp_op_for_sim_measure(comp_op, sim_measure_type)
+
+    # check if the output attributes exist
+    validate_output_attrs(l_out_attrs, ltable.columns,
+                          r_out_attrs, rtable.columns)
+
+    # check if the key attributes are unique and do not contain missing values
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
+
+    # check if the self join flag is consistent with the input tables
+    if self_join:
+        validate_self_join(ltable, rtable, l_join_attr, r_join_attr)
+
+    # set return_set flag of tokenizer to be True, in case it is set to False
+    revert_tokenizer_return_set_flag = False
+    if not tokenizer.get_return_set():
+        tokenizer.set_return_set(True)
+        revert_tokenizer_return_set_flag = True
+
+    # remove redundant attrs from output attrs.
+    l_out_attrs = remove_redundant_attrs(l_out_attrs, l_key_attr)
+    r_out_attrs = remove_redundant_attrs(r_out_attrs, r_key_attr)
+
+    # get attributes to project.
+    l_proj_attrs = get_attrs_to_project(l_out_attrs, l_key_attr, l_join_attr)
+    r_proj_attrs = get_attrs_to_project(r_out_attrs, r_key_attr, r_join_attr)
+
+    # Do a projection on the input dataframes to keep only the required
+    # attributes. Then, remove rows with missing value in join attribute from
+    # the input dataframes. Then, convert the resulting dataframes into ndarray.
+    ltable_array = convert_dataframe_to_array(ltable, l_proj_attrs, l_join_attr)
+    rtable_array = convert_dataframe_to_array(rtable, r_proj_attrs, r_join_attr)
+
+    # computes the actual number of jobs to launch.
+    n_jobs = min(get_num_processes_to_launch(n_jobs), len(rtable_array))
+
+    if n_jobs <= 1:
+        # if n_jobs is 1, do not use any parallel code.
+        output_table = _multi_sim_join_split(
+                           ltable_array, rtable_array,
+                           l_proj_attrs, r_proj_attrs,
+                           l_key_attr, r_key_attr,
+                           l_join_attr, r_join_attr,
+                           tokenizer, conditions, combine_op, comp_op,
+                           allow_empty,
+                           l_out_attrs, r_out_attrs,
+                           l_out_prefix, r_out_prefix,
+                           out_sim_score, show_progress, self_join)
+    else:
+        # if n_jobs is above 1, split the right table into n_jobs splits of
+        # roughly equal cost and join each right table split with the whole of
+        # left table in a separate process.
+        r_join_attr_index = r_proj_attrs.index(r_join_attr)
+        r_splits, r_split_ids = split_table_by_cost(rtable_array,
+                                                    r_join_attr_index, n_jobs)
+        results = Parallel(n_jobs=n_jobs)(delayed(_multi_sim_join_split)(
+                                          ltable_array, r_splits[job_index],
+                                          l_proj_attrs, r_proj_attrs,
+                                          l_key_attr, r_key_attr,
+                                          l_join_attr, r_join_attr,
+                                          tokenizer, conditions, combine_op,
+                                          comp_op, allow_empty,
+                                          l_out_attrs, r_out_attrs,
+                                          l_out_prefix, r_out_prefix,
+                                          out_sim_score,
+                                      (show_progress and (job_index==n_jobs-1)),
+                                          self_join, r_split_ids[job_index])
+                                          for job_index in range(n_jobs))
+        output_table = pd.concat(results)
+
+    # If allow_missing flag is set, then compute all pairs with missing value in
+    # at least one of the join attributes and then add it to the output
+    # obtained from the join. The scores of these pairs are missing.
+    if allow_missing:
+        missing_pairs = get_pairs_with_missing_value(
+                                        ltable, rtable,
+                                        l_key_attr, r_key_attr,
+                                        l_join_attr, r_join_attr,
+                                        l_out_attrs, r_out_attrs,
+                                        l_out_prefix, r_out_prefix,
+                                        False, show_progress,
+                                        self_join)
+        output_table = pd.concat([output_table, missing_pairs])
+
+    # add an id column named '_id' to the output table.
+    output_table.insert(0, '_id', range(0, len(output_table)))
+
+    # revert the return_set flag of tokenizer, in case it was modified.
+    if revert_tokenizer_return_set_flag:
+        tokenizer.set_return_set(False)
+
+    return output_table
+
+
+def _multi_sim_join_split(ltable, rtable,
+                          l_columns, r_columns,
+                          l_key_attr, r_key_attr,
+                          l_join_attr, r_join_attr,
+                          tokenizer, conditions, combine_op, comp_op,
+                          allow_empty,
+                          l_out_attrs, r_out_attrs,
+                          l_out_prefix, r_out_prefix,
+                          out_sim_score, show_progress,
+                          self_join=False, r_ids=None):
+    """Perform multi-measure join for a split of ltable and rtable.
+
+    In a self join, ltable is the whole table, rtable is a split of the same
+    table whose records are at the positions r_ids in the table (or the whole
+    table if r_ids is None), and a record is joined only with the records
+    occurring before it in the table.
+    """
+
+    # find column indices of key attr, join attr and output attrs in ltable
+    l_key_attr_index = l_columns.index(l_key_attr)
+    l_join_attr_index = l_columns.index(l_join_attr)
+    l_out_attrs_indices = find_output_attribute_indices(l_columns, l_out_attrs)
+
+    # find column indices of key attr, join attr and output attrs in rtable
+    r_key_attr_index = r_columns.index(r_key_attr)
+    r_join_attr_index = r_columns.index(r_join_attr)
+    r_out_attrs_indices = find_output_attribute_indices(r_columns, r_out_attrs)
+
+    # tokenize l_join_attr and r_join_attr, and order the tokens using the
+    # token ordering generated from the same pass. In a self join, rtable is a
+    # part of ltable and hence only ltable is tokenized.
+    if self_join:
+        token_lists, token_ordering = tokenize_and_order_tables(
+                                          [ltable], [l_join_attr_index],
+                                          tokenizer)
+    else:
+        token_lists, token_ordering = tokenize_and_order_tables(
+                                          [ltable, rtable],
+                                          [l_join_attr_index,
+                                           r_join_attr_index],
+                                          tokenizer)
+
+    conjunctive = combine_op == 'AND'
+    (prefix_sim_measure_type,
+     prefix_threshold) = _get_prefix_condition(conditions, conjunctive)
+
+    # Build position index on l_join_attr, using the prefixes of a single
+    # condition.
+    position_index = PositionIndex(ltable, l_join_attr_index,
+                                   tokenizer, prefix_sim_measure_type,
+                                   prefix_threshold, token_ordering)
+    cached_data = position_index.build(allow_empty, cache_tokens=True,
+                                       token_lists=token_lists[0])
+    l_empty_records = cached_data['empty_records']
+    cached_l_tokens = cached_data['cached_tokens']
+
+    sim_measure_types, sim_score_attrs = get_sim_measure_types(conditions)
+    comp_fn = COMP_OP_MAP[comp_op]
+
+    # positions of the output pairs in ltable and rtable, and their scores.
+    output_l_ids = []
+    output_r_ids = []
+    output_sim_scores = []
+
+    if show_progress:
+        prog_bar = pyprind.ProgBar(len(rtable))
+
+    for r_idx, r_row in enumerate(rtable):
+        # id of the current rtable record in ltable, in case of a self join.
+        r_id = r_ids[r_idx] if r_ids is not None else r_idx
+
+        if self_join:
+            r_ordered_tokens = cached_l_tokens[r_id]
+        else:
+            r_ordered_tokens = token_lists[1][r_idx]
+        r_num_tokens = len(r_ordered_tokens)
+
+        # pair a record with empty set of tokens with the ltable records with
+        # empty set of tokens, if allow_empty flag is set.
+        if allow_empty and r_num_tokens == 0:
+            for l_id in l_empty_records:
+                if self_join and l_id >= r_id:
+                    break
+
+                output_l_ids.append(l_id)
+                output_r_ids.append(r_idx)
+                output_sim_scores.append([1.0] * len(sim_measure_types))
+            continue
+
+        candidate_overlap = _find_candidates(
+                                r_ordered_tokens, position_index, conditions,
+                                conjunctive, prefix_sim_measure_type,
+                                prefix_threshold, tokenizer)
+
+        r_token_set = set(r_ordered_tokens)
+        for cand, overlap in candidate_overlap.items():
+            if self_join and cand >= r_id:
+                continue
+
+            if overlap > 0:
+                # compute the overlap of the pair once, and evaluate the
+                # conditions using the scores derived from it.
+                l_ordered_tokens = cached_l_tokens[cand]
+                l_num_tokens = len(l_ordered_tokens)
+                overlap = len(r_token_set.intersection(l_ordered_tokens))
+                sim_scores = {}
+                for sim_measure_type in sim_measure_types:
+                    sim_scores[sim_measure_type] = round(
+                        get_sim_score_from_overlap(overlap, l_num_tokens,
+                                                   r_num_tokens,
+                                                   sim_measure_type), 4)
+
+                satisfied = [comp_fn(sim_scores[sim_measure_type], threshold)
+                             for sim_measure_type, threshold in conditions]
+                if all(satisfied) if conjunctive else any(satisfied):
+                    output_l_ids.append(cand)
+                    output_r_ids.append(r_idx)
+                    output_sim_scores.append(
+                        [sim_scores[sim_measure_type]
+                         for sim_measure_type in sim_measure_types])
+
+        if show_progress:
+            prog_bar.update()
+
+    output_header = get_output_header_from_tables(
+                        l_key_attr, r_key_attr,
+                        l_out_attrs, r_out_attrs,
+                        l_out_prefix, r_out_prefix)
+    if out_sim_score:
+        output_header.extend(sim_score_attrs)
+
+    # generate a dataframe from the positions of the output pairs
+    output_table = get_output_table_from_pairs(
+                       ltable, rtable, output_l_ids, output_r_ids,
+                       l_key_attr_index, r_key_attr_index,
+                       l_out_attrs_indices, r_out_attrs_indices,
+                       output_header,
+                       np.array(output_sim_scores).reshape(
+                           len(output_l_ids), len(sim_measure_types))
+                       if out_sim_score else None)
+    return output_table
+
+
+def _get_prefix_condition(conditions, conjunctive):
+    # The prefix length of each measure is num_tokens - ceil(f * num_tokens)
+    # + 1, where f only depends on the threshold. A pair satisfying the
+    # conditions combined by OR satisfies at least one of them, hence the
+    # condition with the lowest f, which has the longest prefixes, is used. A
+    # pair satisfying the conditions combined by AND satisfies all of them,
+    # hence the condition with the highest f is used.
+    def get_prefix_fraction(condition):
+        sim_measure_type, threshold = condition
+        if sim_measure_type == 'COSINE':
+            return threshold * threshold
+        elif sim_measure_type == 'DICE':
+            return threshold / (2 - threshold)
+        elif sim_measure_type == 'JACCARD':
+            return threshold
+
+    if conjunctive:
+        return max(conditions, key=get_prefix_fraction)
+    return min(conditions, key=get_prefix_fraction)
+
+
+def _find_candidates(probe_tokens, position_index, conditions, conjunctive,
+                     prefix_sim_measure_type, prefix_threshold, tokenizer):
+    # probe position index to find candidates for the input probe tokens,
+    # applying the size and the position filters with the bounds of the
+    # combined conditions. The bounds of the conditions combined by AND are
+    # the tightest of their bounds, and the bounds of the conditions combined
+    # by OR are the loosest.
+    if not position_index.index:
+        return {}
+
+    combine_lower_bounds = max if conjunctive else min
+    combine_upper_bounds = min if conjunctive else max
+
+    probe_num_tokens = len(probe_tokens)
+    size_lower_bound = max(combine_lower_bounds(
+                               get_size_lower_bound(probe_num_tokens,
+                                                    sim_measure_type,
+                                                    threshold)
+                               for sim_measure_type, threshold in conditions),
+                           position_index.min_length)
+    size_upper_bound = min(combine_upper_bounds(
+                               get_size_upper_bound(probe_num_tokens,
+                                                    sim_measure_type,
+                                                    threshold)
+                               for sim_measure_type, threshold in conditions),
+                           position_index.max_length)
+
+    overlap_threshold_cache = {}
+    for size in xrange(size_lower_bound, size_upper_bound + 1):
+        overlap_threshold_cache[size] = combine_lower_bounds(
+            get_overlap_threshold(size, probe_num_tokens, sim_measure_type,
+                                  threshold, tokenizer)
+            for sim_measure_type, threshold in conditions)
+
+    probe_prefix_length = get_prefix_length(probe_num_tokens,
+                                            prefix_sim_measure_type,
+                                            prefix_threshold, tokenizer)
+
+    candidate_overlap = {}
+    probe_pos = 0
+    for token in probe_tokens[0:probe_prefix_length]:
+        for (cand, cand_pos) in position_index.probe(token):
+            current_overlap = candidate_overlap.get(cand, 0)
+
+            if current_overlap != -1:
+                cand_num_tokens = position_index.size_cache[cand]
+
+                # only consider candidates satisfying the size filter
+                # condition.
+                if size_lower_bound <= cand_num_tokens <= size_upper_bound:
+
+                    overlap_upper_bound = min(probe_num_tokens - probe_pos,
+                                              cand_num_tokens - cand_pos)
+
+                    # only consider candidates for which the overlap upper
+                    # bound is at least the required overlap.
+                    if (current_overlap + overlap_upper_bound >=
+                            overlap_threshold_cache[cand_num_tokens]):
+                        candidate_overlap[cand] = current_overlap + 1
+                    else:
+                        candidate_overlap[cand] = -1
+
+        probe_pos += 1
+
+    return candidate_overlap
@@ -27,10 +27,17 @@ def overlap_coefficient_join(ltable, rtable,
     the join attributes is greater than or equal to the input threshold, as     
     specified in "threshold". 
 
+    The overlap coefficient of a pair only depends on the size of its smaller
+    set, which needs an overlap of at least ceil(t * |X|). Hence, each set is
+    indexed on the prefix it has as the smaller set of a pair, and the pairs
+    are found in two passes, one per table of the smaller set. The candidates
+    are pruned by their size and by the positions of their common tokens, and
+    the overlap is only computed for the remaining candidates.
+
     Args:
-        ltable (DataFrame): left input table.
+        ltable (DataFrame or PreparedTable): left input table.
 
-        rtable (DataFrame): right input table.
+        rtable (DataFrame or PreparedTable): right input table.
 
         l_key_attr (string): key attribute in left table.
 
@@ -113,4 +120,59 @@ def overlap_coefficient_join(ltable, rtable,
                                            allow_empty, allow_missing,                      
                                            l_out_attrs, r_out_attrs,                        
                                            l_out_prefix, r_out_prefix,                      
-                                           out_sim_score, n_jobs, show_progress) 
+                                           out_sim_score, n_jobs, show_progress)
+
+
+def overlap_coefficient_join_iter(ltable, rtable,
+                                  l_key_attr, r_key_attr,
+                                  l_join_attr, r_join_attr,
+                                  tokenizer, threshold, comp_op='>=',
+                                  allow_empty=True, allow_missing=False,
+                                  l_out_attrs=None, r_out_attrs=None,
+                                  l_out_prefix='l_', r_out_prefix='r_',
+                                  out_sim_score=True, n_jobs=1, show_progress=True,
+                                  chunk_size=10000):
+    """Join two tables using overlap coefficient, yielding the output in chunks.
+
+    The right table is processed in chunks of chunk_size rows, and an output
+    table is yielded for each chunk, so that the memory used by the output is
+    bounded by the output of one chunk rather than by the total output. The
+    concatenation of the yielded tables contains the same tuple pairs as the
+    output of :func:`overlap_coefficient_join`, with unique values in the '_id' column. The
+    left table is tokenized again for each chunk, so chunk_size should be
+    large enough for this cost to be small compared to the join of a chunk.
+
+    Args:
+        chunk_size (int): number of right table rows per chunk (defaults to
+            10000).
+
+        The other arguments are the same as the arguments of
+        :func:`overlap_coefficient_join`.
+
+    Returns:
+        A generator of output tables, one per chunk of the right table, each
+        containing tuple pairs that satisfy the join condition (DataFrame).
+    """
+    from py_stringsimjoin.utils.generic_helper import iter_join_output_chunks
+    from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
+    from py_stringsimjoin.utils.validation import validate_chunk_size, \
+        validate_input_table
+
+    # the right table is split into chunks, hence the dataframe of a prepared
+    # right table is used.
+    rtable, _ = unwrap_prepared_table(rtable)
+
+    # check if the right table is a dataframe and the chunk size is valid
+    validate_input_table(rtable, 'right table')
+    validate_chunk_size(chunk_size)
+
+    return iter_join_output_chunks(
+        lambda rtable_chunk: overlap_coefficient_join(ltable, rtable_chunk,
+                                                      l_key_attr, r_key_attr,
+                                                      l_join_attr, r_join_attr,
+                                                      tokenizer, threshold, comp_op,
+                                                      allow_empty, allow_missing,
+                                                      l_out_attrs, r_out_attrs,
+                                                      l_out_prefix, r_out_prefix,
+                                                      out_sim_score, n_jobs, show_progress),
+        rtable, chunk_size)
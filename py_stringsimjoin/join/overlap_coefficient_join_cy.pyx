@@ -9,23 +9,29 @@ from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     get_output_row_from_tables, remove_redundant_attrs
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import get_tokenized_columns, \
+    unwrap_prepared_table
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
     validate_input_table, validate_threshold, validate_tokenizer, \
     validate_output_attrs
 
 # Cython imports                                                                
-from cython.parallel import prange                                              
+from cython.parallel import prange, threadid                                             
                                                                                 
+from libc.limits cimport INT_MAX
+from libc.math cimport ceil, round
 from libcpp.vector cimport vector                                               
 from libcpp cimport bool                                                        
-from libcpp.map cimport map as omap                                             
 from libcpp.pair cimport pair    
 
-from py_stringsimjoin.index.inverted_index_cy cimport InvertedIndexCy           
-from py_stringsimjoin.utils.cython_utils cimport build_inverted_index,\
-    compfnptr, generate_output_table, get_comparison_function, get_comp_type,\
-    int_min, tokenize_lists
+from py_stringsimjoin.index.position_index_cy cimport PositionIndexCy
+from py_stringsimjoin.join.set_sim_join_cy cimport get_overlap
+from py_stringsimjoin.utils.cython_utils cimport compfnptr, \
+    generate_output_table, get_comparison_function, get_comp_type, \
+    get_probe_costs, get_probe_schedule, int_max, int_min, tokenize_lists
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreCy, \
+    TokenStoreView, get_num_tokens, get_tokens
 
 
 # Initialize a global variable to keep track of the progress bar                
@@ -58,10 +64,17 @@ def overlap_coefficient_join_cy(ltable, rtable,
     the join attributes is greater than or equal to the input threshold, as     
     specified in "threshold". 
 
+    The overlap coefficient of a pair only depends on the size of its smaller
+    set, which needs an overlap of at least ceil(t * |X|). Hence, each set is
+    indexed on the prefix it has as the smaller set of a pair, and the pairs
+    are found in two passes, one per table of the smaller set. The candidates
+    are pruned by their size and by the positions of their common tokens, and
+    the overlap is only computed for the remaining candidates.
+
     Args:
-        ltable (DataFrame): left input table.
+        ltable (DataFrame or PreparedTable): left input table.
 
-        rtable (DataFrame): right input table.
+        rtable (DataFrame or PreparedTable): right input table.
 
         l_key_attr (string): key attribute in left table.
 
@@ -124,6 +137,10 @@ def overlap_coefficient_join_cy(ltable, rtable,
         condition (DataFrame).  
     """
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
     # check if the input tables are dataframes
     validate_input_table(ltable, 'left table')
     validate_input_table(rtable, 'right table')
@@ -158,8 +175,10 @@ def overlap_coefficient_join_cy(ltable, rtable,
                           r_out_attrs, rtable.columns)
 
     # check if the key attributes are unique and do not contain missing values
-    validate_key_attr(l_key_attr, ltable, 'left table')
-    validate_key_attr(r_key_attr, rtable, 'right table')
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
 
     # set return_set flag of tokenizer to be True, in case it is set to False
     revert_tokenizer_return_set_flag = False
@@ -191,8 +210,15 @@ def overlap_coefficient_join_cy(ltable, rtable,
     r_join_attr_index = r_proj_attrs.index(r_join_attr)                         
     r_out_attrs_indices = find_output_attribute_indices(r_proj_attrs, r_out_attrs)
 
-    # computes the actual number of jobs to launch.
-    n_jobs = min(get_num_processes_to_launch(n_jobs), len(rtable_array))
+    # computes the actual number of jobs to launch. Both the tables are
+    # probed, one in each pass.
+    n_jobs = min(get_num_processes_to_launch(n_jobs),
+                 max(len(ltable_array), len(rtable_array)))
+
+    # get the tokens cached by the prepared tables, if any.
+    tokenized_columns = get_tokenized_columns(
+                            [l_prepared_table, r_prepared_table],
+                            [l_join_attr, r_join_attr], tokenizer)
 
     cdef vector[vector[pair[int, int]]] output_pairs,                           
     cdef vector[vector[double]] output_sim_scores 
@@ -200,7 +226,8 @@ def overlap_coefficient_join_cy(ltable, rtable,
                                 l_join_attr_index, r_join_attr_index, 
                                 tokenizer, threshold, comp_op, 
                                 n_jobs, allow_empty, show_progress, 
-                                output_pairs, output_sim_scores)
+                                output_pairs, output_sim_scores,
+                                tokenized_columns)
 
     output_header = get_output_header_from_tables(                              
                         l_key_attr, r_key_attr,                                 
@@ -214,7 +241,7 @@ def overlap_coefficient_join_cy(ltable, rtable,
                                          output_pairs, output_sim_scores,       
                                          l_key_attr_index, r_key_attr_index,    
                                          l_out_attrs_indices, r_out_attrs_indices,
-                                         out_sim_score, output_header, n_jobs) 
+                                         out_sim_score, output_header) 
 
     # If allow_missing flag is set, then compute all pairs with missing value in
     # at least one of the join attributes and then add it to the output         
@@ -244,102 +271,274 @@ cdef void _perform_overlap_coeff_join(ltable_array, rtable_array,
               tokenizer, double threshold, comp_op, int n_jobs, 
               bool allow_empty, bool show_progress,                                     
               vector[vector[pair[int, int]]]& output_pairs, 
-              vector[vector[double]]& output_sim_scores):
-
-    cdef vector[vector[int]] ltokens, rtokens                                   
+              vector[vector[double]]& output_sim_scores,
+              tokenized_columns=None):
+    # The overlap coefficient of a pair only depends on the size of its
+    # smaller record, which needs an overlap of at least 
+    # ceil(threshold * size). Hence, a record only needs to be indexed on the
+    # prefix it has when it is the smaller record of a pair, and the pairs
+    # are found in two passes: the pairs whose ltable record is not larger 
+    # than the rtable record, by probing an index on ltable with rtable, and
+    # the pairs whose rtable record is smaller than the ltable record, by 
+    # probing an index on rtable with ltable.
+
+    cdef TokenStoreCy ltokens = TokenStoreCy(), rtokens = TokenStoreCy()
     tokenize_lists(ltable_array, rtable_array, 
                    l_join_attr_index, r_join_attr_index,        
-                   tokenizer, ltokens, rtokens) 
-
-    cdef vector[int] l_empty_ids
-    cdef vector[pair[int, int]] partitions                                      
-    cdef int i, n=rtokens.size(), partition_size, start=0, end                  
-    cdef InvertedIndexCy index = InvertedIndexCy()                                                 
+                   tokenizer, ltokens, rtokens, n_jobs, tokenized_columns)
+
+    cdef TokenStoreView lview = ltokens.view, rview = rtokens.view
+    cdef vector[int] required_overlaps, l_empty_ids, r_empty_ids
+    cdef vector[pair[int, int]] l_chunks, r_chunks
+    cdef vector[int] l_probe_order, r_probe_order
+    cdef vector[vector[int]] candidate_overlaps, touched_lists
+    cdef PositionIndexCy l_index, r_index
+    cdef int i, c, tid, size, max_len = 0, num_l_chunks, num_r_chunks
+    cdef int l_min_len, r_min_len
     cdef int comp_op_type                                             
                                                                                 
     comp_op_type = get_comp_type(comp_op)                                       
-                                                                                
-    build_inverted_index(ltokens, index)      
+
+    for i in range(lview.num_records):
+        max_len = int_max(max_len, get_num_tokens(lview, i))
+    for i in range(rview.num_records):
+        max_len = int_max(max_len, get_num_tokens(rview, i))
+
+    # required_overlaps is indexed by the size of the smaller record of a
+    # pair. The size is rounded to 4 decimal places before taking the
+    # ceiling, so that the floating point error does not prune pairs whose
+    # score is equal to the threshold. The pairs without a common token are
+    # never output.
+    for size in range(max_len + 1):
+        required_overlaps.push_back(int_max(<int>ceil(
+            round(threshold * size * 10000.0) / 10000.0), 1))
+
+    l_index = build_smaller_record_index(lview, required_overlaps)
+    r_index = build_smaller_record_index(rview, required_overlaps)
+    l_min_len = get_min_non_empty_size(lview)
+    r_min_len = get_min_non_empty_size(rview)
 
     if allow_empty:
-        for i in xrange(ltokens.size()):
-            if index.size_vector[i] == 0:
+        for i in range(lview.num_records):
+            if get_num_tokens(lview, i) == 0:
                 l_empty_ids.push_back(i)
-                                                                                
-    partition_size = <int>(<float> n / <float> n_jobs)                          
-    for i in xrange(n_jobs):                                                    
-        end = start + partition_size                                            
-        if end > n or i == n_jobs - 1:                                          
-            end = n                                                             
-        partitions.push_back(pair[int, int](start, end))                        
-        start = end                                                             
+
+    # Split the probe rows of each pass into chunks based on the estimated
+    # cost of probing the index with each row.
+    get_pass_schedule(rview, l_index, required_overlaps, l_min_len, n_jobs,
+                      r_probe_order, r_chunks)
+    get_pass_schedule(lview, r_index, required_overlaps, r_min_len, n_jobs,
+                      l_probe_order, l_chunks)
+
+    num_r_chunks = r_chunks.size()
+    num_l_chunks = l_chunks.size()
+    for c in range(num_r_chunks + num_l_chunks):
         output_pairs.push_back(vector[pair[int, int]]())                        
         output_sim_scores.push_back(vector[double]())                          
 
+    # Allocate the buffers used by each thread to accumulate the overlaps of
+    # the candidates. They are reused across the chunks processed by a thread,
+    # in both the passes.
+    for i in range(n_jobs):
+        candidate_overlaps.push_back(vector[int](
+            int_max(lview.num_records, rview.num_records), 0))
+        touched_lists.push_back(vector[int]())
+
     # If the show_progress flag is enabled, then create a new progress bar and  
     # assign it to the global variable.                                         
     if show_progress:                                                           
         global _progress_bar                                                    
-        _progress_bar = pyprind.ProgBar(partition_size)   
-
-    for i in prange(n_jobs, nogil=True):                                        
-        _overlap_coeff_join_part(partitions[i], ltokens, rtokens,       
-                                 comp_op_type, threshold, allow_empty, 
-                                 index.index, index.size_vector, l_empty_ids, 
-                                 output_pairs[i], output_sim_scores[i],
-                                 i, show_progress)  
-
-
-cdef void _overlap_coeff_join_part(pair[int, int] partition,                 
-                                   vector[vector[int]]& ltokens,                      
-                                   vector[vector[int]]& rtokens,
+        _progress_bar = pyprind.ProgBar(num_r_chunks + num_l_chunks)
+
+    # The chunks are handed out dynamically to the threads, starting with the
+    # most expensive ones.
+    for c in prange(num_r_chunks, nogil=True, num_threads=n_jobs,
+                    schedule='dynamic', chunksize=1):
+        tid = threadid()
+        _overlap_coeff_join_part(r_chunks[c], r_probe_order, lview, rview,
+                                 comp_op_type, threshold, allow_empty, False,
+                                 False, l_index.offsets_ptr,
+                                 l_index.num_indexed_tokens,
+                                 l_index.posting_ids_ptr,
+                                 l_index.posting_positions_ptr,
+                                 l_index.size_vector, required_overlaps,
+                                 l_min_len, l_empty_ids,
+                                 candidate_overlaps[tid], touched_lists[tid],
+                                 output_pairs[c], output_sim_scores[c])
+
+        # If the show_progress flag is enabled, we update the progress bar
+        # after each chunk. To do so, the thread acquires the GIL and updates
+        # the global variable that keeps track of the progress bar.
+        if show_progress:
+            with gil:
+                _progress_bar.update()
+
+    for c in prange(num_l_chunks, nogil=True, num_threads=n_jobs,
+                    schedule='dynamic', chunksize=1):
+        tid = threadid()
+        _overlap_coeff_join_part(l_chunks[c], l_probe_order, rview, lview,
+                                 comp_op_type, threshold, False, True, True,
+                                 r_index.offsets_ptr,
+                                 r_index.num_indexed_tokens,
+                                 r_index.posting_ids_ptr,
+                                 r_index.posting_positions_ptr,
+                                 r_index.size_vector, required_overlaps,
+                                 r_min_len, r_empty_ids,
+                                 candidate_overlaps[tid], touched_lists[tid],
+                                 output_pairs[num_r_chunks + c],
+                                 output_sim_scores[num_r_chunks + c])
+
+        if show_progress:
+            with gil:
+                _progress_bar.update()
+
+
+cdef PositionIndexCy build_smaller_record_index(TokenStoreView& token_store,
+                                                vector[int]& required_overlaps):
+    # indexes the prefix of each record as the smaller record of a pair, which
+    # shares a token with the other record if the pair has the required 
+    # overlap.
+    cdef PositionIndexCy pos_index = PositionIndexCy()
+    cdef vector[int] prefix_lengths, empty_ids
+    cdef int i, m, max_len = 0
+    for i in range(token_store.num_records):
+        m = get_num_tokens(token_store, i)
+        prefix_lengths.push_back(m - required_overlaps[m] + 1 if m > 0 else 0)
+        max_len = int_max(max_len, m)
+
+    pos_index.build_index(token_store, prefix_lengths)
+    pos_index.set_fields(empty_ids, get_min_non_empty_size(token_store),
+                         max_len, 0)
+    return pos_index
+
+
+cdef int get_min_non_empty_size(TokenStoreView& token_store) nogil:
+    # returns the size of the smallest non-empty record, or INT_MAX if all the
+    # records are empty.
+    cdef int i, m, min_len = INT_MAX
+    for i in range(token_store.num_records):
+        m = get_num_tokens(token_store, i)
+        if 0 < m < min_len:
+            min_len = m
+    return min_len
+
+
+cdef inline int get_probe_length(int num_tokens, int min_len,
+                                 vector[int]& required_overlaps) nogil:
+    # The first common token of a pair is at most at the position 
+    # num_tokens - required overlap in the probing record. The required 
+    # overlap grows with the size of the indexed record, so the smallest 
+    # indexed record gives the longest probe prefix.
+    if num_tokens == 0:
+        return 0
+    return num_tokens - required_overlaps[int_min(min_len, num_tokens)] + 1
+
+
+cdef void get_pass_schedule(TokenStoreView& probe_tokens,
+                            PositionIndexCy index,
+                            vector[int]& required_overlaps, int min_len,
+                            int n_jobs, vector[int]& probe_order,
+                            vector[pair[int, int]]& chunks):
+    cdef vector[int] num_probe_tokens
+    cdef vector[double] costs
+    cdef int i
+    for i in range(probe_tokens.num_records):
+        num_probe_tokens.push_back(get_probe_length(
+            get_num_tokens(probe_tokens, i), min_len, required_overlaps))
+    get_probe_costs(probe_tokens, num_probe_tokens, index.offsets_ptr,
+                    index.num_indexed_tokens, costs)
+    get_probe_schedule(costs, n_jobs, probe_order, chunks)
+
+
+cdef void _overlap_coeff_join_part(pair[int, int] partition,
+                                   vector[int]& probe_order,                 
+                                   TokenStoreView& index_tokens,                      
+                                   TokenStoreView& probe_tokens,
                                    int comp_op_type, double threshold, 
-                                   bool allow_empty,
-                                   omap[int, vector[int]]& index,
+                                   bool allow_empty, bool strictly_smaller,
+                                   bool swap_output,
+                                   const int* offsets, int num_indexed_tokens,
+                                   const int* posting_ids,
+                                   const int* posting_positions,
                                    vector[int]& size_vector,
-                                   vector[int]& l_empty_ids,            
+                                   vector[int]& required_overlaps,
+                                   int min_len, vector[int]& empty_ids,
+                                   vector[int]& candidate_overlap,
+                                   vector[int]& touched,
                                    vector[pair[int, int]]& output_pairs,              
-                                   vector[double]& output_sim_scores,
-                                   int thread_id, bool show_progress) nogil:          
-    cdef omap[int, int] candidate_overlap                                       
-    cdef vector[int] candidates                                                 
-    cdef vector[int] tokens                                                     
-    cdef pair[int, int] entry                                                   
-    cdef int j=0, m, i, cand                                                    
+                                   vector[double]& output_sim_scores) nogil:          
+    # Finds the pairs of a probing record and an indexed record that is
+    # smaller than it (or of the same size, unless strictly_smaller is set).
+    # The output pairs are (indexed id, probe id), or (probe id, indexed id)
+    # if swap_output is set.
+    cdef const int* tokens
+    cdef int j=0, k, m, i, ii, cand, cand_num_tokens, token, probe_length
+    cdef int current_overlap, overlap_upper_bound, overlap
     cdef double sim_score                                                       
     cdef compfnptr comp_fn                                                      
     comp_fn = get_comparison_function(comp_op_type)     
+
+    # candidate_overlap holds the overlap accumulated so far for each indexed
+    # record (-1 if the record has been pruned), and touched holds the 
+    # indexed records whose entry was modified while probing the current 
+    # record, so that only those entries need to be reset after the probe.
+    # These buffers belong to the calling thread.
                                                                                 
-    for i in range(partition.first, partition.second):                          
-        tokens = rtokens[i]                                                     
-        m = tokens.size()                                                       
+    for ii in range(partition.first, partition.second):                          
+        i = probe_order[ii]
+        tokens = get_tokens(probe_tokens, i)
+        m = get_num_tokens(probe_tokens, i)
 
         if allow_empty and m == 0:                                              
-            for j in l_empty_ids:                                         
+            for j in empty_ids:                                         
                 output_pairs.push_back(pair[int, int](j, i))                    
                 output_sim_scores.push_back(1.0)                                
             continue  
-                                                                                
-        for j in range(m):                                                      
-            if index.find(tokens[j]) == index.end():                
+
+        probe_length = get_probe_length(m, min_len, required_overlaps)
+        for j in range(probe_length):                                                      
+            token = tokens[j]
+            if token >= num_indexed_tokens:
                 continue                                                        
-            candidates = index[tokens[j]]                                 
-            for cand in candidates:                                             
-                candidate_overlap[cand] += 1                                    
-                                                                                
-        for entry in candidate_overlap:                                         
-            sim_score = <double>entry.second / <double>int_min(m, size_vector[entry.first])
-            if comp_fn(sim_score, threshold):                                           
-                output_pairs.push_back(pair[int, int](entry.first, i))          
-                output_sim_scores.push_back(sim_score)                          
+            for k in range(offsets[token], offsets[token + 1]):
+                cand = posting_ids[k]
+                cand_num_tokens = size_vector[cand]
+
+                # the pairs whose indexed record is larger are found by the
+                # other pass.
+                if cand_num_tokens > m or (strictly_smaller and 
+                                           cand_num_tokens == m):
+                    continue
+
+                current_overlap = candidate_overlap[cand]
+                if current_overlap != -1:
+                    if current_overlap == 0:
+                        touched.push_back(cand)
+
+                    # only consider candidates for which the overlap upper
+                    # bound is at least the required overlap.
+                    overlap_upper_bound = current_overlap + int_min(
+                        m - j, cand_num_tokens - posting_positions[k])
+                    if (overlap_upper_bound >= 
+                            required_overlaps[cand_num_tokens]):
+                        candidate_overlap[cand] = current_overlap + 1
+                    else:
+                        candidate_overlap[cand] = -1
                                                                                 
-        candidate_overlap.clear()
-
-        # If the show_progress flag is enabled, we update the progress bar.     
-        # Note that only one of the threads will update the progress bar. To    
-        # do so, it releases GIL and updates the global variable that keeps     
-        # track of the progress bar.                                            
-        if thread_id == 0 and show_progress:                                    
-            with gil:                                                           
-                global _progress_bar                                            
-                _progress_bar.update()    
+        for cand in touched:
+            if candidate_overlap[cand] > 0:
+                cand_num_tokens = size_vector[cand]
+                overlap = get_overlap(get_tokens(index_tokens, cand),
+                                      cand_num_tokens, tokens, m)
+                sim_score = <double>overlap / <double>cand_num_tokens
+                if comp_fn(sim_score, threshold):
+                    if swap_output:
+                        output_pairs.push_back(pair[int, int](i, cand))
+                    else:
+                        output_pairs.push_back(pair[int, int](cand, i))
+                    output_sim_scores.push_back(sim_score)
+
+            # reset the entry for the next probe.
+            candidate_overlap[cand] = 0
+
+        touched.clear()
@@ -1,17 +1,20 @@
 # overlap coefficient join
 from joblib import delayed, Parallel
-from six import iteritems
 import pandas as pd
 import pyprind
 
-from py_stringsimjoin.filter.overlap_filter import OverlapFilter
-from py_stringsimjoin.index.inverted_index import InvertedIndex
+from py_stringsimjoin.filter.filter_utils import get_overlap_threshold
+from py_stringsimjoin.index.position_index import PositionIndex
 from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     find_output_attribute_indices, get_attrs_to_project, \
     get_num_processes_to_launch, get_output_header_from_tables, \
-    get_output_row_from_tables, remove_redundant_attrs, split_table, COMP_OP_MAP
+    get_output_table_from_pairs, remove_redundant_attrs, \
+    split_table_by_cost, COMP_OP_MAP
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
+from py_stringsimjoin.utils.simfunctions import overlap
+from py_stringsimjoin.utils.token_ordering import tokenize_and_order_tables
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
     validate_input_table, validate_threshold, validate_tokenizer, \
@@ -44,10 +47,17 @@ def overlap_coefficient_join_py(ltable, rtable,
     the join attributes is greater than or equal to the input threshold, as     
     specified in "threshold". 
 
+    The overlap coefficient of a pair only depends on the size of its smaller
+    set, which needs an overlap of at least ceil(t * |X|). Hence, each set is
+    indexed on the prefix it has as the smaller set of a pair, and the pairs
+    are found in two passes, one per table of the smaller set. The candidates
+    are pruned by their size and by the positions of their common tokens, and
+    the overlap is only computed for the remaining candidates.
+
     Args:
-        ltable (DataFrame): left input table.
+        ltable (DataFrame or PreparedTable): left input table.
 
-        rtable (DataFrame): right input table.
+        rtable (DataFrame or PreparedTable): right input table.
 
         l_key_attr (string): key attribute in left table.
 
@@ -110,6 +120,10 @@ def overlap_coefficient_join_py(ltable, rtable,
         condition (DataFrame).  
     """
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
     # check if the input tables are dataframes
     validate_input_table(ltable, 'left table')
     validate_input_table(rtable, 'right table')
@@ -144,8 +158,10 @@ def overlap_coefficient_join_py(ltable, rtable,
                           r_out_attrs, rtable.columns)
 
     # check if the key attributes are unique and do not contain missing values
-    validate_key_attr(l_key_attr, ltable, 'left table')
-    validate_key_attr(r_key_attr, rtable, 'right table')
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
 
     # set return_set flag of tokenizer to be True, in case it is set to False
     revert_tokenizer_return_set_flag = False
@@ -183,10 +199,12 @@ def overlap_coefficient_join_py(ltable, rtable,
                                            l_out_prefix, r_out_prefix,
                                            out_sim_score, show_progress)
     else:
-        # if n_jobs is above 1, split the right table into n_jobs splits and    
-        # join each right table split with the whole of left table in a separate
-        # process.
-        r_splits = split_table(rtable_array, n_jobs)
+        # if n_jobs is above 1, split the right table into n_jobs splits of
+        # roughly equal cost and join each right table split with the whole of
+        # left table in a separate process.
+        r_join_attr_index = r_proj_attrs.index(r_join_attr)
+        r_splits, _ = split_table_by_cost(rtable_array, r_join_attr_index,
+                                          n_jobs)
         results = Parallel(n_jobs=n_jobs)(
                                 delayed(_overlap_coefficient_join_split)(
                                     ltable_array, r_splits[job_index],
@@ -234,7 +252,17 @@ def _overlap_coefficient_join_split(ltable_list, rtable_list,
                                     l_out_attrs, r_out_attrs,
                                     l_out_prefix, r_out_prefix,
                                     out_sim_score, show_progress):
-    """Perform overlap coefficient join for a split of ltable and rtable"""
+    """Perform overlap coefficient join for a split of ltable and rtable.
+
+    The overlap coefficient of a pair only depends on the size of its smaller
+    record, which needs an overlap of at least ceil(threshold * size). Hence,
+    each table is indexed on the prefixes its records have as the smaller
+    record of a pair, and the pairs are found in two passes: the pairs whose
+    ltable record is not larger than the rtable record, by probing the index
+    on ltable with rtable, and the pairs whose rtable record is smaller, by
+    probing the index on rtable with ltable.
+    """
+
     # find column indices of key attr, join attr and output attrs in ltable
     l_key_attr_index = l_columns.index(l_key_attr)
     l_join_attr_index = l_columns.index(l_join_attr)
@@ -245,79 +273,76 @@ def _overlap_coefficient_join_split(ltable_list, rtable_list,
     r_join_attr_index = r_columns.index(r_join_attr)
     r_out_attrs_indices = find_output_attribute_indices(r_columns, r_out_attrs)
 
-    # Build inverted index over ltable
-    inverted_index = InvertedIndex(ltable_list, l_join_attr_index,
-                                   tokenizer, cache_size_flag=True)
-    # While building the index, we cache the record ids with empty set of 
-    # tokens. This is needed to handle the allow_empty flag.
-    cached_data = inverted_index.build(allow_empty)
-    l_empty_records = cached_data['empty_records']
+    # tokenize l_join_attr and r_join_attr, and order the tokens using the
+    # token ordering generated from the same pass.
+    token_lists, token_ordering = tokenize_and_order_tables(
+                                      [ltable_list, rtable_list],
+                                      [l_join_attr_index, r_join_attr_index],
+                                      tokenizer)
+
+    # Build position indices on l_join_attr and r_join_attr. While building
+    # the index on ltable, we cache the record ids with empty set of tokens.
+    # This is needed to handle the allow_empty flag.
+    l_position_index = PositionIndex(ltable_list, l_join_attr_index,
+                                     tokenizer, 'OVERLAP_COEFFICIENT',
+                                     threshold, token_ordering)
+    l_empty_records = l_position_index.build(
+                          allow_empty, token_lists=token_lists[0])[
+                          'empty_records']
+    r_position_index = PositionIndex(rtable_list, r_join_attr_index,
+                                     tokenizer, 'OVERLAP_COEFFICIENT',
+                                     threshold, token_ordering)
+    r_position_index.build(False, token_lists=token_lists[1])
 
-    overlap_filter = OverlapFilter(tokenizer, 1)
     comp_fn = COMP_OP_MAP[comp_op]
 
-    output_rows = []
-    has_output_attributes = (l_out_attrs is not None or
-                             r_out_attrs is not None)
+    # positions of the output pairs in ltable and rtable, and their scores.
+    output_l_ids = []
+    output_r_ids = []
+    output_sim_scores = []
 
     if show_progress:
-        prog_bar = pyprind.ProgBar(len(rtable_list))
-
-    for r_row in rtable_list:
-        r_string = r_row[r_join_attr_index]
-
-        r_join_attr_tokens = tokenizer.tokenize(r_string)
-        r_num_tokens = len(r_join_attr_tokens)
+        prog_bar = pyprind.ProgBar(len(rtable_list) + len(ltable_list))
 
+    for r_id, r_ordered_tokens in enumerate(token_lists[1]):
         # If allow_empty flag is set and the current rtable record has empty set
         # of tokens in the join attribute, then generate output pairs joining   
         # the current rtable record with those records in ltable with empty set 
         # of tokens in the join attribute. These ltable record ids are cached in
-        # l_empty_records list which was constructed when building the inverted 
+        # l_empty_records list which was constructed when building the position
         # index.
-        if allow_empty and r_num_tokens == 0:
+        if allow_empty and len(r_ordered_tokens) == 0:
             for l_id in l_empty_records:
-                if has_output_attributes:
-                    output_row = get_output_row_from_tables(
-                                     ltable_list[l_id], r_row,
-                                     l_key_attr_index, r_key_attr_index,
-                                     l_out_attrs_indices,
-                                     r_out_attrs_indices)
-                else:
-                    output_row = [ltable_list[l_id][l_key_attr_index],
-                                  r_row[r_key_attr_index]]
-
-                if out_sim_score:
-                    output_row.append(1.0)
-                output_rows.append(output_row)
+                output_l_ids.append(l_id)
+                output_r_ids.append(r_id)
+                output_sim_scores.append(1.0)
             continue
 
-        # probe inverted index and find overlap of candidates 
-        candidate_overlap = overlap_filter.find_candidates(
-                                r_join_attr_tokens, inverted_index)
-
-        for cand, overlap in iteritems(candidate_overlap):
-            # compute the actual similarity score                           
-            sim_score = (float(overlap) /
-                         float(min(r_num_tokens,
-                                   inverted_index.size_cache[cand])))
-
+        # find the ltable records that are not larger than the rtable record.
+        for l_id in _find_candidates(r_ordered_tokens, l_position_index,
+                                     threshold, False):
+            l_ordered_tokens = token_lists[0][l_id]
+            sim_score = (float(overlap(l_ordered_tokens, r_ordered_tokens)) /
+                         float(len(l_ordered_tokens)))
             if comp_fn(sim_score, threshold):
-                if has_output_attributes:
-                    output_row = get_output_row_from_tables(
-                                     ltable_list[cand], r_row,
-                                     l_key_attr_index, r_key_attr_index,
-                                     l_out_attrs_indices, r_out_attrs_indices)
-                else:
-                    output_row = [ltable_list[cand][l_key_attr_index],
-                                  r_row[r_key_attr_index]]
+                output_l_ids.append(l_id)
+                output_r_ids.append(r_id)
+                output_sim_scores.append(sim_score)
 
-                # if out_sim_score flag is set, append the overlap coefficient 
-                # score to the output record.  
-                if out_sim_score:
-                    output_row.append(sim_score)
+        if show_progress:
+            prog_bar.update()
 
-                output_rows.append(output_row)
+    for l_id, l_ordered_tokens in enumerate(token_lists[0]):
+        # find the rtable records that are smaller than the ltable record.
+        for r_id in _find_candidates(l_ordered_tokens, r_position_index,
+                                     threshold, True):
+            r_ordered_tokens = token_lists[1][r_id]
+            sim_score = (float(overlap(l_ordered_tokens, r_ordered_tokens)) /
+                         float(len(r_ordered_tokens)))
+            if comp_fn(sim_score, threshold):
+                output_l_ids.append(l_id)
+                output_r_ids.append(r_id)
+                output_sim_scores.append(sim_score)
 
         if show_progress:
             prog_bar.update()
@@ -328,5 +353,56 @@ def _overlap_coefficient_join_split(ltable_list, rtable_list,
     if out_sim_score:
         output_header.append("_sim_score")
 
-    output_table = pd.DataFrame(output_rows, columns=output_header)
+    # generate a dataframe from the positions of the output pairs
+    output_table = get_output_table_from_pairs(
+                       ltable_list, rtable_list, output_l_ids, output_r_ids,
+                       l_key_attr_index, r_key_attr_index,
+                       l_out_attrs_indices, r_out_attrs_indices,
+                       output_header,
+                       output_sim_scores if out_sim_score else None)
     return output_table
+
+
+def _find_candidates(probe_tokens, position_index, threshold,
+                     strictly_smaller):
+    """Find the indexed records that may satisfy the threshold with the probe
+    record, among those that are smaller than it or of the same size (unless
+    strictly_smaller is set), using the prefix and position filters."""
+    probe_num_tokens = len(probe_tokens)
+    if probe_num_tokens == 0:
+        return []
+
+    # The first common token of a pair is at most at the position 
+    # probe_num_tokens - required overlap in the probe record. The required
+    # overlap grows with the size of the indexed record, so the smallest
+    # indexed record gives the longest probe prefix.
+    probe_prefix_length = probe_num_tokens - get_overlap_threshold(
+        max(position_index.min_length, 1), probe_num_tokens,
+        'OVERLAP_COEFFICIENT', threshold, None) + 1
+
+    candidate_overlap = {}
+    for probe_pos in range(probe_prefix_length):
+        for cand, cand_pos in position_index.probe(
+                probe_tokens[probe_pos]):
+            cand_num_tokens = position_index.size_cache[cand]
+            # the pairs whose indexed record is larger are found by the other
+            # pass.
+            if cand_num_tokens > probe_num_tokens or (
+                    strictly_smaller and cand_num_tokens == probe_num_tokens):
+                continue
+
+            current_overlap = candidate_overlap.get(cand, 0)
+            if current_overlap != -1:
+                # only consider candidates for which the overlap upper bound
+                # is at least the required overlap.
+                overlap_upper_bound = current_overlap + min(
+                    probe_num_tokens - probe_pos, cand_num_tokens - cand_pos)
+                if overlap_upper_bound >= get_overlap_threshold(
+                        cand_num_tokens, probe_num_tokens,
+                        'OVERLAP_COEFFICIENT', threshold, None):
+                    candidate_overlap[cand] = current_overlap + 1
+                else:
+                    candidate_overlap[cand] = -1
+
+    return [cand for cand, cand_overlap in candidate_overlap.items()
+            if cand_overlap > 0]
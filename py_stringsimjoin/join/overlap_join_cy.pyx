@@ -1,7 +1,6 @@
 # overlap coefficient join
 from six import iteritems
 import pandas as pd
-import pyprind                                                                  
 
 from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     find_output_attribute_indices, get_attrs_to_project, \
@@ -9,27 +8,19 @@ from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     get_output_row_from_tables, remove_redundant_attrs
 from py_stringsimjoin.utils.missing_value_handler import \
     get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import get_tokenized_columns, \
+    unwrap_prepared_table
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
     validate_input_table, validate_threshold, validate_tokenizer, \
     validate_output_attrs
 
 # Cython imports                                                                
-from cython.parallel import prange                                              
-                                                                                
 from libcpp.vector cimport vector                                               
-from libcpp cimport bool                                                        
-from libcpp.map cimport map as omap                                             
 from libcpp.pair cimport pair    
 
-from py_stringsimjoin.index.inverted_index_cy cimport InvertedIndexCy           
-from py_stringsimjoin.utils.cython_utils cimport build_inverted_index,\
-    compfnptr, generate_output_table, get_comparison_function, get_comp_type,\
-    tokenize_lists
-
-
-# Initialize a global variable to keep track of the progress bar                
-_progress_bar = None 
+from py_stringsimjoin.join.set_sim_join_cy cimport set_sim_join_cy
+from py_stringsimjoin.utils.cython_utils cimport generate_output_table
 
 
 def overlap_join_cy(ltable, rtable,                                             
@@ -51,11 +42,17 @@ def overlap_join_cy(ltable, rtable,
     example, if the comparison operator is '>=', finds tuple pairs whose        
     overlap between the strings that are the values of the join attributes is   
     greater than or equal to the input threshold, as specified in "threshold".  
+
+    A pair whose overlap is at least the threshold t shares a token within
+    the first |X| - t + 1 tokens of each of its sets, under a global ordering
+    of the tokens. Hence, only these prefixes are indexed and probed, the
+    candidates are pruned by their size and by the positions of their common
+    tokens, and the overlap is only computed for the remaining candidates.
                                                                                 
     Args:                                                                       
-        ltable (DataFrame): left input table.                                   
+        ltable (DataFrame or PreparedTable): left input table.                                   
                                                                                 
-        rtable (DataFrame): right input table.                                  
+        rtable (DataFrame or PreparedTable): right input table.                                  
                                                                                 
         l_key_attr (string): key attribute in left table.                       
                                                                                 
@@ -114,6 +111,10 @@ def overlap_join_cy(ltable, rtable,
         condition (DataFrame).                                                  
     """  
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
     # check if the input tables are dataframes                                  
     validate_input_table(ltable, 'left table')                                  
     validate_input_table(rtable, 'right table')                                 
@@ -148,8 +149,10 @@ def overlap_join_cy(ltable, rtable,
                           r_out_attrs, rtable.columns)                          
                                                                                 
     # check if the key attributes are unique and do not contain missing values  
-    validate_key_attr(l_key_attr, ltable, 'left table')                         
-    validate_key_attr(r_key_attr, rtable, 'right table')                        
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
                                                                                 
     # set return_set flag of tokenizer to be True, in case it is set to False   
     revert_tokenizer_return_set_flag = False                                    
@@ -184,12 +187,19 @@ def overlap_join_cy(ltable, rtable,
     # computes the actual number of jobs to launch.
     n_jobs = min(get_num_processes_to_launch(n_jobs), len(rtable_array))
 
+    # get the tokens cached by the prepared tables, if any.
+    tokenized_columns = get_tokenized_columns(
+                            [l_prepared_table, r_prepared_table],
+                            [l_join_attr, r_join_attr], tokenizer)
+
     cdef vector[vector[pair[int, int]]] output_pairs,                           
     cdef vector[vector[double]] output_sim_scores 
-    _perform_overlap_join(ltable_array, rtable_array, 
-                          l_join_attr_index, r_join_attr_index, 
-                          tokenizer, threshold, comp_op, n_jobs, show_progress, 
-                          output_pairs, output_sim_scores)
+    set_sim_join_cy(ltable_array, rtable_array,
+                    l_join_attr_index, r_join_attr_index,
+                    tokenizer, 'OVERLAP', threshold, comp_op,
+                    n_jobs, False, show_progress,
+                    output_pairs, output_sim_scores, False,
+                    0, None, tokenized_columns)
 
     output_header = get_output_header_from_tables(                              
                         l_key_attr, r_key_attr,                                 
@@ -203,7 +213,7 @@ def overlap_join_cy(ltable, rtable,
                                          output_pairs, output_sim_scores,       
                                          l_key_attr_index, r_key_attr_index,    
                                          l_out_attrs_indices, r_out_attrs_indices,
-                                         out_sim_score, output_header, n_jobs) 
+                                         out_sim_score, output_header) 
 
     # If allow_missing flag is set, then compute all pairs with missing value in
     # at least one of the join attributes and then add it to the output         
@@ -227,90 +237,3 @@ def overlap_join_cy(ltable, rtable,
 
     return output_table
 
-
-cdef void _perform_overlap_join(ltable_array, rtable_array,
-              l_join_attr_index, r_join_attr_index,  
-              tokenizer, double threshold, comp_op, int n_jobs, bool show_progress,
-              vector[vector[pair[int, int]]]& output_pairs, 
-              vector[vector[double]]& output_sim_scores):
-
-    cdef vector[vector[int]] ltokens, rtokens                                   
-    tokenize_lists(ltable_array, rtable_array, 
-                   l_join_attr_index, r_join_attr_index,        
-                   tokenizer, ltokens, rtokens) 
-
-    cdef vector[pair[int, int]] partitions                                      
-    cdef int i, n=rtokens.size(), partition_size, start=0, end                  
-    cdef InvertedIndexCy index = InvertedIndexCy()                                              
-    cdef int comp_op_type                                             
-                                                                                
-    comp_op_type = get_comp_type(comp_op)                                       
-                                                                                
-    build_inverted_index(ltokens, index)      
-
-    partition_size = <int>(<float> n / <float> n_jobs)                          
-    for i in xrange(n_jobs):                                                    
-        end = start + partition_size                                            
-        if end > n or i == n_jobs - 1:                                          
-            end = n                                                             
-        partitions.push_back(pair[int, int](start, end))                        
-        start = end                                                             
-        output_pairs.push_back(vector[pair[int, int]]())                        
-        output_sim_scores.push_back(vector[double]())                          
-
-    # If the show_progress flag is enabled, then create a new progress bar and  
-    # assign it to the global variable.                                         
-    if show_progress:                                                           
-        global _progress_bar                                                    
-        _progress_bar = pyprind.ProgBar(partition_size)   
-
-    for i in prange(n_jobs, nogil=True):                                        
-        _overlap_join_part(partitions[i], ltokens, rtokens,       
-                           comp_op_type, threshold, index.index, 
-                           output_pairs[i], output_sim_scores[i],
-                           i, show_progress)  
-
-
-cdef void _overlap_join_part(pair[int, int] partition,                 
-                             vector[vector[int]]& ltokens,                      
-                             vector[vector[int]]& rtokens,
-                             int comp_op_type, double threshold, 
-                             omap[int, vector[int]]& index,
-                             vector[pair[int, int]]& output_pairs,              
-                             vector[double]& output_sim_scores,
-                             int thread_id, bool show_progress) nogil:          
-    cdef omap[int, int] candidate_overlap                                       
-    cdef vector[int] candidates                                                 
-    cdef vector[int] tokens                                                     
-    cdef pair[int, int] entry                                                   
-    cdef int j=0, m, i, cand                                                    
-    cdef double sim_score                                                       
-    cdef compfnptr comp_fn                                                      
-    comp_fn = get_comparison_function(comp_op_type)     
-                                                                                
-    for i in range(partition.first, partition.second):                          
-        tokens = rtokens[i]                                                     
-        m = tokens.size()                                                       
-
-        for j in range(m):                                                      
-            if index.find(tokens[j]) == index.end():                
-                continue                                                        
-            candidates = index[tokens[j]]                                 
-            for cand in candidates:                                             
-                candidate_overlap[cand] += 1                                    
-                                                                                
-        for entry in candidate_overlap:                                         
-            if comp_fn(<double>entry.second, threshold):                                           
-                output_pairs.push_back(pair[int, int](entry.first, i))          
-                output_sim_scores.push_back(entry.second)                          
-                                                                                
-        candidate_overlap.clear()
-
-        # If the show_progress flag is enabled, we update the progress bar.     
-        # Note that only one of the threads will update the progress bar. To    
-        # do so, it releases GIL and updates the global variable that keeps     
-        # track of the progress bar.                                            
-        if thread_id == 0 and show_progress:                                    
-            with gil:                                                           
-                global _progress_bar                                            
-                _progress_bar.update()    
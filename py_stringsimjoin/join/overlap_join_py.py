@@ -1,5 +1,18 @@
-from py_stringsimjoin.filter.overlap_filter import OverlapFilter
-from py_stringsimjoin.utils.validation import validate_tokenizer
+# overlap join
+from joblib import delayed, Parallel
+import pandas as pd
+
+from py_stringsimjoin.join.set_sim_join import set_sim_join
+from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
+    get_attrs_to_project, get_num_processes_to_launch, remove_redundant_attrs, \
+    split_table_by_cost
+from py_stringsimjoin.utils.missing_value_handler import \
+    get_pairs_with_missing_value
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
+from py_stringsimjoin.utils.validation import validate_attr, \
+    validate_attr_type, validate_comp_op_for_sim_measure, validate_key_attr, \
+    validate_input_table, validate_threshold, validate_tokenizer, \
+    validate_output_attrs
 
 
 def overlap_join_py(ltable, rtable,
@@ -22,10 +35,16 @@ def overlap_join_py(ltable, rtable,
     overlap between the strings that are the values of the join attributes is 
     greater than or equal to the input threshold, as specified in "threshold".
 
+    A pair whose overlap is at least the threshold t shares a token within
+    the first |X| - t + 1 tokens of each of its sets, under a global ordering
+    of the tokens. Hence, only these prefixes are indexed and probed, the
+    candidates are pruned by their size and by the positions of their common
+    tokens, and the overlap is only computed for the remaining candidates.
+
     Args:
-        ltable (DataFrame): left input table.
+        ltable (DataFrame or PreparedTable): left input table.
 
-        rtable (DataFrame): right input table.
+        rtable (DataFrame or PreparedTable): right input table.
 
         l_key_attr (string): key attribute in left table.
 
@@ -84,24 +103,119 @@ def overlap_join_py(ltable, rtable,
         condition (DataFrame).  
     """
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
+    # check if the input tables are dataframes
+    validate_input_table(ltable, 'left table')
+    validate_input_table(rtable, 'right table')
+
+    # check if the key attributes and join attributes exist
+    validate_attr(l_key_attr, ltable.columns,
+                  'key attribute', 'left table')
+    validate_attr(r_key_attr, rtable.columns,
+                  'key attribute', 'right table')
+    validate_attr(l_join_attr, ltable.columns,
+                  'join attribute', 'left table')
+    validate_attr(r_join_attr, rtable.columns,
+                  'join attribute', 'right table')
+
+    # check if the join attributes are not of numeric type                      
+    validate_attr_type(l_join_attr, ltable[l_join_attr].dtype,
+                       'join attribute', 'left table')
+    validate_attr_type(r_join_attr, rtable[r_join_attr].dtype,
+                       'join attribute', 'right table')
+
     # check if the input tokenizer is valid
     validate_tokenizer(tokenizer)
 
+    # check if the input threshold is valid
+    validate_threshold(threshold, 'OVERLAP')
+
+    # check if the comparison operator is valid
+    validate_comp_op_for_sim_measure(comp_op, 'OVERLAP')
+
+    # check if the output attributes exist
+    validate_output_attrs(l_out_attrs, ltable.columns,
+                          r_out_attrs, rtable.columns)
+
+    # check if the key attributes are unique and do not contain missing values
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
+
     # set return_set flag of tokenizer to be True, in case it is set to False
     revert_tokenizer_return_set_flag = False
     if not tokenizer.get_return_set():
         tokenizer.set_return_set(True)
         revert_tokenizer_return_set_flag = True
 
-    # use overlap filter to perform the join.
-    overlap_filter = OverlapFilter(tokenizer, threshold, comp_op, allow_missing)
-    output_table =  overlap_filter.filter_tables(ltable, rtable,
-                                                 l_key_attr, r_key_attr,
-                                                 l_join_attr, r_join_attr,
-                                                 l_out_attrs, r_out_attrs,
-                                                 l_out_prefix, r_out_prefix,
-                                                 out_sim_score, n_jobs,
-                                                 show_progress)
+    # remove redundant attrs from output attrs.
+    l_out_attrs = remove_redundant_attrs(l_out_attrs, l_key_attr)
+    r_out_attrs = remove_redundant_attrs(r_out_attrs, r_key_attr)
+
+    # get attributes to project.  
+    l_proj_attrs = get_attrs_to_project(l_out_attrs, l_key_attr, l_join_attr)
+    r_proj_attrs = get_attrs_to_project(r_out_attrs, r_key_attr, r_join_attr)
+
+    # Do a projection on the input dataframes to keep only the required 
+    # attributes. Then, remove rows with missing value in join attribute from 
+    # the input dataframes. Then, convert the resulting dataframes into ndarray.
+    ltable_array = convert_dataframe_to_array(ltable, l_proj_attrs, l_join_attr)
+    rtable_array = convert_dataframe_to_array(rtable, r_proj_attrs, r_join_attr)
+
+    # computes the actual number of jobs to launch.
+    n_jobs = min(get_num_processes_to_launch(n_jobs), len(rtable_array))
+
+    if n_jobs <= 1:
+        # if n_jobs is 1, do not use any parallel code.
+        output_table = set_sim_join(ltable_array, rtable_array,
+                                    l_proj_attrs, r_proj_attrs,
+                                    l_key_attr, r_key_attr,
+                                    l_join_attr, r_join_attr,
+                                    tokenizer, 'OVERLAP',
+                                    threshold, comp_op, False,
+                                    l_out_attrs, r_out_attrs,
+                                    l_out_prefix, r_out_prefix,
+                                    out_sim_score, show_progress)
+    else:
+        # if n_jobs is above 1, split the right table into n_jobs splits of
+        # roughly equal cost and join each right table split with the whole of
+        # left table in a separate process.
+        r_join_attr_index = r_proj_attrs.index(r_join_attr)
+        r_splits, _ = split_table_by_cost(rtable_array, r_join_attr_index,
+                                          n_jobs)
+        results = Parallel(n_jobs=n_jobs)(delayed(set_sim_join)(
+                                          ltable_array, r_splits[job_index],
+                                          l_proj_attrs, r_proj_attrs,
+                                          l_key_attr, r_key_attr,
+                                          l_join_attr, r_join_attr,
+                                          tokenizer, 'OVERLAP',
+                                          threshold, comp_op, False,
+                                          l_out_attrs, r_out_attrs,
+                                          l_out_prefix, r_out_prefix,
+                                          out_sim_score,
+                                      (show_progress and (job_index==n_jobs-1)))
+                                          for job_index in range(n_jobs))
+        output_table = pd.concat(results)
+
+    # If allow_missing flag is set, then compute all pairs with missing value in
+    # at least one of the join attributes and then add it to the output 
+    # obtained from the join.
+    if allow_missing:
+        missing_pairs = get_pairs_with_missing_value(
+                                        ltable, rtable,
+                                        l_key_attr, r_key_attr,
+                                        l_join_attr, r_join_attr,
+                                        l_out_attrs, r_out_attrs,
+                                        l_out_prefix, r_out_prefix,
+                                        out_sim_score, show_progress)
+        output_table = pd.concat([output_table, missing_pairs])
+
+    # add an id column named '_id' to the output table.
+    output_table.insert(0, '_id', range(0, len(output_table)))
 
     # revert the return_set flag of tokenizer, in case it was modified.
     if revert_tokenizer_return_set_flag:
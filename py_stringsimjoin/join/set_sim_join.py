@@ -1,16 +1,16 @@
 # set similarity join
 from six import iteritems
-import pandas as pd
 import pyprind
 
+from py_stringsimjoin.filter.filter_utils import get_prefix_length
 from py_stringsimjoin.filter.position_filter import PositionFilter
+from py_stringsimjoin.filter.suffix_filter import SuffixFilter
 from py_stringsimjoin.index.position_index import PositionIndex
 from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
     find_output_attribute_indices, get_output_header_from_tables, \
-    get_output_row_from_tables, COMP_OP_MAP 
+    get_output_table_from_pairs, COMP_OP_MAP
 from py_stringsimjoin.utils.simfunctions import get_sim_function
-from py_stringsimjoin.utils.token_ordering import \
-    gen_token_ordering_for_tables, order_using_token_ordering
+from py_stringsimjoin.utils.token_ordering import tokenize_and_order_tables
 
 
 def set_sim_join(ltable, rtable,
@@ -21,8 +21,20 @@ def set_sim_join(ltable, rtable,
                  allow_empty,
                  l_out_attrs, r_out_attrs,
                  l_out_prefix, r_out_prefix,
-                 out_sim_score, show_progress):
-    """Perform set similarity join for a split of ltable and rtable"""
+                 out_sim_score, show_progress,
+                 self_join=False, r_ids=None,
+                 suffix_filter_max_depth=0):
+    """Perform set similarity join for a split of ltable and rtable.
+
+    In a self join, ltable is the whole table, rtable is a split of the same
+    table whose records are at the positions r_ids in the table (or the whole
+    table if r_ids is None), and a record is joined only with the records
+    occurring before it in the table.
+
+    If suffix_filter_max_depth is above 0, the candidates obtained from the
+    position filter are further pruned using the suffix filter, with the given
+    maximum recursion depth, before computing their similarity scores.
+    """
 
     # find column indices of key attr, join attr and output attrs in ltable
     l_key_attr_index = l_columns.index(l_key_attr)
@@ -34,43 +46,60 @@ def set_sim_join(ltable, rtable,
     r_join_attr_index = r_columns.index(r_join_attr)
     r_out_attrs_indices = find_output_attribute_indices(r_columns, r_out_attrs)
 
-    # generate token ordering using tokens in l_join_attr
-    # and r_join_attr
-    token_ordering = gen_token_ordering_for_tables(
-                         [ltable, rtable],
-                         [l_join_attr_index, r_join_attr_index],
-                         tokenizer, sim_measure_type)
+    # tokenize l_join_attr and r_join_attr, and order the tokens using the
+    # token ordering generated from the same pass. In a self join, rtable is a
+    # part of ltable and hence only ltable is tokenized.
+    if self_join:
+        token_lists, token_ordering = tokenize_and_order_tables(
+                                          [ltable], [l_join_attr_index],
+                                          tokenizer)
+    else:
+        token_lists, token_ordering = tokenize_and_order_tables(
+                                          [ltable, rtable],
+                                          [l_join_attr_index,
+                                           r_join_attr_index],
+                                          tokenizer)
 
     # Build position index on l_join_attr
     position_index = PositionIndex(ltable, l_join_attr_index,
                                    tokenizer, sim_measure_type,
                                    threshold, token_ordering)
     # While building the index, we cache the tokens and the empty records.
-    # We cache the tokens so that we need not tokenize each string in 
-    # l_join_attr multiple times when we need to compute the similarity measure.
-    # Further we cache the empty record ids to handle the allow_empty flag.
-    cached_data = position_index.build(allow_empty, cache_tokens=True)
+    # We cache the tokens so that we can look them up by record id when we
+    # need to compute the similarity measure. Further we cache the empty
+    # record ids to handle the allow_empty flag.
+    cached_data = position_index.build(allow_empty, cache_tokens=True,
+                                       token_lists=token_lists[0])
     l_empty_records = cached_data['empty_records']
     cached_l_tokens = cached_data['cached_tokens']
 
     pos_filter = PositionFilter(tokenizer, sim_measure_type, threshold)
 
+    if suffix_filter_max_depth > 0:
+        suffix_filter = SuffixFilter(tokenizer, sim_measure_type, threshold)
+        suffix_filter.max_depth = suffix_filter_max_depth
+
     sim_fn = get_sim_function(sim_measure_type)
     comp_fn = COMP_OP_MAP[comp_op]
 
-    output_rows = []
-    has_output_attributes = (l_out_attrs is not None or
-                             r_out_attrs is not None)
+    # positions of the output pairs in ltable and rtable, and their scores.
+    output_l_ids = []
+    output_r_ids = []
+    output_sim_scores = []
 
     if show_progress:
         prog_bar = pyprind.ProgBar(len(rtable))
 
-    for r_row in rtable:
-        r_string = r_row[r_join_attr_index]
+    for r_idx, r_row in enumerate(rtable):
+        # id of the current rtable record in ltable, in case of a self join.
+        r_id = r_ids[r_idx] if r_ids is not None else r_idx
 
-        # order the tokens using the token ordering.
-        r_ordered_tokens = order_using_token_ordering(
-                tokenizer.tokenize(r_string), token_ordering)
+        if self_join:
+            # the tokens of the record are already cached while building the
+            # position index.
+            r_ordered_tokens = cached_l_tokens[r_id]
+        else:
+            r_ordered_tokens = token_lists[1][r_idx]
 
         # If allow_empty flag is set and the current rtable record has empty set
         # of tokens in the join attribute, then generate output pairs joining 
@@ -80,49 +109,50 @@ def set_sim_join(ltable, rtable,
         # index.
         if allow_empty and len(r_ordered_tokens) == 0:
             for l_id in l_empty_records:
-                if has_output_attributes:
-                    output_row = get_output_row_from_tables(
-                                     ltable[l_id], r_row,
-                                     l_key_attr_index, r_key_attr_index,
-                                     l_out_attrs_indices,
-                                     r_out_attrs_indices)
-                else:
-                    output_row = [ltable[l_id][l_key_attr_index],
-                                  r_row[r_key_attr_index]]
-
-                if out_sim_score:
-                    output_row.append(1.0)
-                output_rows.append(output_row)
+                # l_empty_records is sorted by id. So, in a self join, we can
+                # stop once we reach the current record.
+                if self_join and l_id >= r_id:
+                    break
+
+                output_l_ids.append(l_id)
+                output_r_ids.append(r_idx)
+                output_sim_scores.append(1.0)
             continue
 
         # obtain candidates by applying position filter.            
         candidate_overlap = pos_filter.find_candidates(r_ordered_tokens,
                                                        position_index)
 
+        if suffix_filter_max_depth > 0:
+            r_prefix_length = get_prefix_length(len(r_ordered_tokens),
+                                                sim_measure_type, threshold,
+                                                tokenizer)
+
         for cand, overlap in iteritems(candidate_overlap):
+            if self_join and cand >= r_id:
+                continue
+
             if overlap > 0:
                 l_ordered_tokens = cached_l_tokens[cand]
 
+                # apply suffix filter on the tokens after the last common
+                # token of the prefixes of the two records.
+                if (suffix_filter_max_depth > 0 and
+                        suffix_filter._filter_suffix(
+                            l_ordered_tokens, r_ordered_tokens,
+                            get_prefix_length(len(l_ordered_tokens),
+                                              sim_measure_type, threshold,
+                                              tokenizer),
+                            r_prefix_length)):
+                    continue
+
                 # compute the actual similarity score
                 sim_score = round(sim_fn(l_ordered_tokens, r_ordered_tokens), 4)
 
                 if comp_fn(sim_score, threshold):
-                    if has_output_attributes:
-                        output_row = get_output_row_from_tables(
-                                         ltable[cand], r_row,
-                                         l_key_attr_index, r_key_attr_index,
-                                         l_out_attrs_indices,
-                                         r_out_attrs_indices)
-                    else:
-                        output_row = [ltable[cand][l_key_attr_index],
-                                      r_row[r_key_attr_index]]
-
-                    # if out_sim_score flag is set, append the similarity score    
-                    # to the output record.  
-                    if out_sim_score:
-                        output_row.append(sim_score)
-
-                    output_rows.append(output_row)
+                    output_l_ids.append(cand)
+                    output_r_ids.append(r_idx)
+                    output_sim_scores.append(sim_score)
 
         if show_progress:
             prog_bar.update()
@@ -134,6 +164,12 @@ def set_sim_join(ltable, rtable,
     if out_sim_score:
         output_header.append("_sim_score")
 
-    # generate a dataframe from the list of output rows
-    output_table = pd.DataFrame(output_rows, columns=output_header)
+    # generate a dataframe from the positions of the output pairs
+    output_table = get_output_table_from_pairs(
+                       ltable, rtable, output_l_ids, output_r_ids,
+                       l_key_attr_index, r_key_attr_index,
+                       l_out_attrs_indices, r_out_attrs_indices,
+                       output_header,
+                       output_sim_scores if out_sim_score else None)
     return output_table
+
@@ -8,4 +8,28 @@ cdef void set_sim_join_cy(ltable, rtable,
                           tokenizer, sim_measure, double threshold, comp_op,      
                           int n_jobs, bool allow_empty, bool show_progress,
                           vector[vector[pair[int, int]]]& output_pairs, 
-                          vector[vector[double]]& output_sim_scores)
+                          vector[vector[double]]& output_sim_scores,
+                          bool self_join=*, int suffix_filter_max_depth=*,
+                          prebuilt_index=*, tokenized_columns=*)
+
+cdef void multi_sim_join_cy(ltable, rtable,
+                            l_join_attr_index, r_join_attr_index,
+                            tokenizer, vector[int]& sim_types,
+                            vector[double]& thresholds, bool conjunctive,
+                            vector[int]& out_sim_types, comp_op,
+                            int n_jobs, bool allow_empty, bool show_progress,
+                            vector[vector[pair[int, int]]]& output_pairs,
+                            vector[vector[double]]& output_sim_scores,
+                            bool self_join=*, int suffix_filter_max_depth=*,
+                            prebuilt_index=*, tokenized_columns=*)
+
+ctypedef double (*fnptr)(const int*, int, const int*, int) nogil
+
+cdef fnptr get_sim_function(int& sim_type) nogil
+cdef int get_sim_type(sim_measure)
+cdef int get_overlap(const int* tokens1, int size1,
+                     const int* tokens2, int size2) nogil
+cdef int get_size_lower_bound(int& num_tokens, int& sim_type,
+                              double& threshold) nogil
+cdef int get_size_upper_bound(int& num_tokens, int& sim_type,
+                              double& threshold) nogil
@@ -2,14 +2,14 @@
 
 import pyprind                                                                  
 
-from cython.parallel import prange                                              
+from cython.parallel import prange, threadid                                             
                                                                                 
+from libc.limits cimport INT_MAX
 from libc.math cimport ceil, floor, round, sqrt, trunc                          
 from libcpp.vector cimport vector                                               
 from libcpp.set cimport set as oset                                             
 from libcpp.string cimport string                                               
 from libcpp cimport bool                                                        
-from libcpp.map cimport map as omap                                             
 from libcpp.pair cimport pair    
 
 from py_stringsimjoin.similarity_measure.cosine cimport cosine                
@@ -17,7 +17,11 @@ from py_stringsimjoin.similarity_measure.dice cimport dice
 from py_stringsimjoin.similarity_measure.jaccard cimport jaccard
 from py_stringsimjoin.index.position_index_cy cimport PositionIndexCy             
 from py_stringsimjoin.utils.cython_utils cimport compfnptr,\
-    get_comparison_function, get_comp_type, int_max, int_min, tokenize_lists                       
+    get_comparison_function, get_comp_type, get_probe_costs, \
+    get_probe_schedule, int_max, int_min, tokenize_list, \
+    tokenize_list_using_index, tokenize_lists
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreCy, \
+    TokenStoreView, get_num_tokens, get_tokens
 
 
 # Initialize a global variable to keep track of the progress bar                
@@ -29,151 +33,397 @@ cdef void set_sim_join_cy(ltable, rtable,
                            tokenizer, sim_measure, double threshold, comp_op,       
                            int n_jobs, bool allow_empty, bool show_progress,
                            vector[vector[pair[int, int]]]& output_pairs, 
-                           vector[vector[double]]& output_sim_scores):      
+                           vector[vector[double]]& output_sim_scores,
+                           bool self_join=False, int suffix_filter_max_depth=0,
+                           prebuilt_index=None, tokenized_columns=None):
+    cdef vector[int] sim_types
+    cdef vector[double] thresholds
+    sim_types.push_back(get_sim_type(sim_measure))
+    thresholds.push_back(threshold)
+    multi_sim_join_cy(ltable, rtable, l_join_attr_index, r_join_attr_index,
+                      tokenizer, sim_types, thresholds, True, sim_types,
+                      comp_op, n_jobs, allow_empty, show_progress,
+                      output_pairs, output_sim_scores, self_join,
+                      suffix_filter_max_depth, prebuilt_index,
+                      tokenized_columns)
+
+
+cdef void multi_sim_join_cy(ltable, rtable,
+                            l_join_attr_index, r_join_attr_index,
+                            tokenizer, vector[int]& sim_types,
+                            vector[double]& thresholds, bool conjunctive,
+                            vector[int]& out_sim_types, comp_op,
+                            int n_jobs, bool allow_empty, bool show_progress,
+                            vector[vector[pair[int, int]]]& output_pairs,
+                            vector[vector[double]]& output_sim_scores,
+                            bool self_join=False,
+                            int suffix_filter_max_depth=0,
+                            prebuilt_index=None, tokenized_columns=None):
+    # Joins the tables on a set of conditions, each given by a similarity
+    # measure and a threshold, that are combined by AND (conjunctive) or OR.
+    # The overlap of each candidate pair is computed once, and the scores of
+    # all the measures are derived from it. The scores of the measures in
+    # out_sim_types are output for each pair, one after the other in
+    # output_sim_scores.
                      
-    cdef vector[vector[int]] ltokens, rtokens
-    tokenize_lists(ltable, rtable, l_join_attr_index, r_join_attr_index, 
-                   tokenizer, ltokens, rtokens)
+    cdef TokenStoreCy ltokens = TokenStoreCy(), rtokens = TokenStoreCy()
+    cdef TokenStoreCy probe_tokens = rtokens
+    cdef PositionIndexCy index
+
+    # If a prebuilt index is given, the tokens of ltable are read from the 
+    # index, without copying them, and rtable is tokenized using the token 
+    # ordering of the index.
+    if prebuilt_index is not None:
+        ltokens.set_arrays(prebuilt_index.arrays['token_offsets'],
+                           prebuilt_index.arrays['tokens'])
+        if self_join:
+            probe_tokens = ltokens
+        else:
+            tokenize_list_using_index(rtable, r_join_attr_index, tokenizer,
+                                      prebuilt_index, rtokens)
+    # In a self join, both the sides refer to the same table. Hence, we 
+    # tokenize the table only once and probe the index with the same tokens.
+    elif self_join:
+        tokenize_list(ltable, l_join_attr_index, tokenizer, ltokens, n_jobs,
+                      None if tokenized_columns is None else
+                      tokenized_columns[0])
+        probe_tokens = ltokens
+    else:
+        tokenize_lists(ltable, rtable, l_join_attr_index, r_join_attr_index, 
+                       tokenizer, ltokens, rtokens, n_jobs, tokenized_columns)
   
-    cdef vector[pair[int, int]] partitions                                      
-    cdef int i, n=rtokens.size(), partition_size, start=0, end    
-    cdef int sim_type, comp_op_type                                             
+    cdef vector[pair[int, int]] chunks
+    cdef vector[int] probe_order, num_probe_tokens
+    cdef vector[double] costs
+    cdef vector[vector[int]] candidate_overlaps, touched_lists
+    cdef vector[vector[int]] overlap_threshold_caches
+    cdef vector[vector[pair[int, int]]] last_match_positions
+    cdef TokenStoreView lview = ltokens.view, probe_view = probe_tokens.view
+    cdef int i, c, tid, m, n=probe_view.num_records, num_chunks
+    cdef int prefix_sim_type, comp_op_type
+    cdef double prefix_threshold
 
-    sim_type = get_sim_type(sim_measure)                                        
     comp_op_type = get_comp_type(comp_op)     
 
-    index = build_position_index(ltokens, sim_type, threshold, allow_empty)                            
+    # The prefixes are computed using a single condition, so that the
+    # prefixes of the two records of a pair satisfying that condition share a
+    # token. A pair satisfying the conditions combined by OR satisfies at
+    # least one of them, hence the condition with the longest prefixes is
+    # used. A pair satisfying the conditions combined by AND satisfies all of
+    # them, hence the condition with the shortest prefixes is used.
+    i = get_prefix_condition(sim_types, thresholds, conjunctive)
+    prefix_sim_type = sim_types[i]
+    prefix_threshold = thresholds[i]
+
+    if prebuilt_index is not None:
+        index = load_position_index(prebuilt_index, lview, allow_empty)
+    else:
+        index = build_position_index(lview, prefix_sim_type,
+                                     prefix_threshold, allow_empty)
+
+    # Split the probe rows into chunks based on the estimated cost of probing
+    # the index with each row, which depends on the prefix length of the row.
+    for i in range(n):
+        m = get_num_tokens(probe_view, i)
+        num_probe_tokens.push_back(int_min(get_prefix_length(
+                                               m, prefix_sim_type,
+                                               prefix_threshold), m))
+    get_probe_costs(probe_view, num_probe_tokens, index.offsets_ptr,
+                    index.num_indexed_tokens, costs)
+    get_probe_schedule(costs, n_jobs, probe_order, chunks)
 
-    partition_size = <int>(<float> n / <float> n_jobs)                           
-    for i in xrange(n_jobs):                                                      
-        end = start + partition_size                                            
-        if end > n or i == n_jobs - 1:                                           
-            end = n                                                             
-        partitions.push_back(pair[int, int](start, end))                        
-        start = end                                                             
+    num_chunks = chunks.size()
+    for c in range(num_chunks):
         output_pairs.push_back(vector[pair[int, int]]())                        
         output_sim_scores.push_back(vector[double]())                           
 
+    # Allocate the buffers used by each thread to accumulate the overlaps of
+    # the candidates. They are reused across the chunks processed by a thread.
+    for i in range(n_jobs):
+        candidate_overlaps.push_back(vector[int](lview.num_records, 0))
+        touched_lists.push_back(vector[int]())
+        overlap_threshold_caches.push_back(vector[int](index.max_len + 1, 0))
+        last_match_positions.push_back(vector[pair[int, int]]())
+        if suffix_filter_max_depth > 0:
+            last_match_positions[i].resize(lview.num_records)
+
     # If the show_progress flag is enabled, then create a new progress bar and  
     # assign it to the global variable.                                         
     if show_progress:                                                           
         global _progress_bar                                                    
-        _progress_bar = pyprind.ProgBar(partition_size)   
+        _progress_bar = pyprind.ProgBar(num_chunks)
                                                                                 
-    for i in prange(n_jobs, nogil=True):                                         
-        set_sim_join_partition(partitions[i], ltokens, rtokens, sim_type, 
-                               comp_op_type, threshold, allow_empty,
-                               index.index, index.size_vector, index.l_empty_ids,
+    # The chunks are handed out dynamically to the threads, starting with the
+    # most expensive ones.
+    for c in prange(num_chunks, nogil=True, num_threads=n_jobs,
+                    schedule='dynamic', chunksize=1):
+        tid = threadid()
+        set_sim_join_partition(chunks[c], probe_order,
+                               lview, probe_view,
+                               sim_types, thresholds, conjunctive,
+                               prefix_sim_type, prefix_threshold,
+                               out_sim_types, comp_op_type, allow_empty,
+                               index.offsets_ptr, index.num_indexed_tokens,
+                               index.posting_ids_ptr,
+                               index.posting_positions_ptr, index.size_vector, index.l_empty_ids,
                                index.min_len, index.max_len, 
-                               output_pairs[i], output_sim_scores[i], 
-                               i, show_progress)                        
+                               candidate_overlaps[tid], touched_lists[tid],
+                               overlap_threshold_caches[tid],
+                               last_match_positions[tid],
+                               output_pairs[c], output_sim_scores[c], 
+                               self_join, suffix_filter_max_depth)
+
+        # If the show_progress flag is enabled, we update the progress bar
+        # after each chunk. To do so, the thread acquires the GIL and updates
+        # the global variable that keeps track of the progress bar.
+        if show_progress:
+            with gil:
+                _progress_bar.update()
 
 
 cdef void set_sim_join_partition(pair[int, int] partition,                  
-                                 vector[vector[int]]& ltokens,                       
-                                 vector[vector[int]]& rtokens,                       
-                                 int sim_type, int comp_op_type,                                      
-                                 double threshold, bool allow_empty, 
-                                 omap[int, vector[pair[int, int]]]& index,
+                                 vector[int]& probe_order,
+                                 TokenStoreView& ltokens,
+                                 TokenStoreView& rtokens,
+                                 vector[int]& sim_types,
+                                 vector[double]& thresholds,
+                                 bool conjunctive, int prefix_sim_type,
+                                 double prefix_threshold,
+                                 vector[int]& out_sim_types,
+                                 int comp_op_type, bool allow_empty, 
+                                 const int* offsets, int num_indexed_tokens,
+                                 const int* posting_ids,
+                                 const int* posting_positions,
                                  vector[int]& size_vector,
                                  vector[int]& l_empty_ids,
                                  int min_len, int max_len,            
+                                 vector[int]& candidate_overlap,
+                                 vector[int]& touched,
+                                 vector[int]& overlap_threshold_cache,
+                                 vector[pair[int, int]]& last_match_positions,
                                  vector[pair[int, int]]& output_pairs,               
                                  vector[double]& output_sim_scores,
-                                 int thread_id, bool show_progress) nogil:           
-    cdef omap[int, int] candidate_overlap, overlap_threshold_cache              
-    cdef vector[pair[int, int]] candidates                                      
-    cdef vector[int] tokens                                                     
-    cdef pair[int, int] cand, entry                                             
-    cdef int k=0, j=0, m, i, prefix_length, cand_num_tokens, current_overlap, overlap_upper_bound
+                                 bool self_join,
+                                 int suffix_filter_max_depth) nogil:           
+    cdef const int* tokens
+    cdef int k=0, j=0, m, i, ii, prefix_length, cand_num_tokens, current_overlap, overlap_upper_bound
+    cdef int l_id, hamming_dist_max, cand, cand_pos
+    cdef int token, s, overlap, l_num_tokens
     cdef int size, size_lower_bound, size_upper_bound                           
-    cdef double sim_score, overlap_score                                        
-    cdef fnptr sim_fn                                           
+    cdef int num_sim_types = out_sim_types.size()
+    cdef bool satisfied
+    cdef double sim_score
     cdef compfnptr comp_fn                
-    sim_fn = get_sim_function(sim_type)                                         
     comp_fn = get_comparison_function(comp_op_type)
+
+    # candidate_overlap holds the overlap accumulated so far for each ltable
+    # record (-1 if the record has been pruned), and touched holds the ltable
+    # records whose entry was modified while probing the current rtable 
+    # record, so that only those entries need to be reset after the probe.
+    # overlap_threshold_cache is indexed by the size of the ltable record.
+    # last_match_positions holds, for each ltable record, the positions of the
+    # last common token found so far in the rtable record and in the ltable 
+    # record, and is only used by the suffix filter. These buffers belong to 
+    # the calling thread.
                                                                             
-    for i in range(partition.first, partition.second):                          
-        tokens = rtokens[i]                                                     
-        m = tokens.size()                                                       
+    for ii in range(partition.first, partition.second):                          
+        i = probe_order[ii]
+        tokens = get_tokens(rtokens, i)
+        m = get_num_tokens(rtokens, i)
 
         if allow_empty and m == 0:
             for j in l_empty_ids:
+                # in a self join, pair the record only with the empty records
+                # that appear before it in the table.
+                if self_join and j >= i:
+                    break
                 output_pairs.push_back(pair[int, int](j, i))      
-                output_sim_scores.push_back(1.0)  
+                for s in range(num_sim_types):
+                    output_sim_scores.push_back(1.0)  
             continue
  
-        prefix_length = get_prefix_length(m, sim_type, threshold)               
-        size_lower_bound = int_max(get_size_lower_bound(m, sim_type, threshold),
+        # the prefix length of an empty set is 1, so it is capped by the
+        # number of tokens.
+        prefix_length = int_min(get_prefix_length(m, prefix_sim_type,
+                                                  prefix_threshold), m)
+        size_lower_bound = int_max(get_combined_size_lower_bound(
+                                       m, sim_types, thresholds, conjunctive),
                                    min_len)                               
-        size_upper_bound = int_min(get_size_upper_bound(m, sim_type, threshold),
+        size_upper_bound = int_min(get_combined_size_upper_bound(
+                                       m, sim_types, thresholds, conjunctive),
                                    max_len)                               
 
         for size in range(size_lower_bound, size_upper_bound + 1):              
-            overlap_threshold_cache[size] = get_overlap_threshold(size, m, sim_type, threshold)
+            overlap_threshold_cache[size] = get_combined_overlap_threshold(
+                                                size, m, sim_types,
+                                                thresholds, conjunctive)
 
         for j in range(prefix_length):                                          
-            if index.find(tokens[j]) == index.end():                
+            token = tokens[j]
+            if token >= num_indexed_tokens:
                 continue                                                        
-            candidates = index[tokens[j]]                                 
-            for cand in candidates:                                             
-                current_overlap = candidate_overlap[cand.first]                 
+            for k in range(offsets[token], offsets[token + 1]):
+                cand = posting_ids[k]
+                cand_pos = posting_positions[k]
+                # In a self join, we only need to consider the records that
+                # appear before the probing record. As the postings are sorted
+                # on the record id, we can stop scanning the list once we reach
+                # the probing record. This is equivalent to probing the index 
+                # before inserting the probing record into it, and makes sure 
+                # that each pair is output only once.
+                if self_join and cand >= i:
+                    break
+                current_overlap = candidate_overlap[cand]                 
                 if current_overlap != -1:                                       
-                    cand_num_tokens = size_vector[cand.first]             
+                    cand_num_tokens = size_vector[cand]             
                                                                                 
                     # only consider candidates satisfying the size filter       
                     # condition.                                                
                     if size_lower_bound <= cand_num_tokens <= size_upper_bound: 
                                                                                 
-                        if m - j <= cand_num_tokens - cand.second:              
+                        if m - j <= cand_num_tokens - cand_pos:              
                             overlap_upper_bound = m - j                         
                         else:                                                   
-                            overlap_upper_bound = cand_num_tokens - cand.second 
+                            overlap_upper_bound = cand_num_tokens - cand_pos 
 
                         # only consider candidates for which the overlap upper  
                         # bound is at least the required overlap.               
+                        if current_overlap == 0:
+                            touched.push_back(cand)
+
                         if (current_overlap + overlap_upper_bound >=            
                                 overlap_threshold_cache[cand_num_tokens]):      
-                            candidate_overlap[cand.first] = current_overlap + 1 
+                            candidate_overlap[cand] = current_overlap + 1 
+                            if suffix_filter_max_depth > 0:
+                                last_match_positions[cand] = \
+                                    pair[int, int](j, cand_pos)
                         else:                                                   
-                            candidate_overlap[cand.first] = -1                  
+                            candidate_overlap[cand] = -1                  
                                                                                 
-        for entry in candidate_overlap:                                         
-            if entry.second > 0:                                                
-                sim_score = sim_fn(ltokens[entry.first], tokens)                
+        for l_id in touched:
+            current_overlap = candidate_overlap[l_id]
+            if current_overlap > 0:
+                # apply suffix filter (PPJoin+) before verifying the pair. The
+                # overlap between the records up to their last common token in
+                # the prefixes is exactly current_overlap. So, the suffixes 
+                # after that token need an overlap of at least the remaining
+                # required overlap, which bounds their hamming distance.
+                if suffix_filter_max_depth > 0:
+                    cand_num_tokens = size_vector[l_id]
+                    j = last_match_positions[l_id].first + 1
+                    k = last_match_positions[l_id].second + 1
+                    hamming_dist_max = ((m - j) + (cand_num_tokens - k) - 
+                        2 * (overlap_threshold_cache[cand_num_tokens] - 
+                             current_overlap))
+                    if est_hamming_dist_lower_bound(
+                            tokens, j, m, get_tokens(ltokens, l_id), k,
+                            cand_num_tokens,
+                            hamming_dist_max, 1, 
+                            suffix_filter_max_depth) > hamming_dist_max:
+                        candidate_overlap[l_id] = 0
+                        continue
+
+                # compute the overlap of the pair once, and evaluate the
+                # conditions using the scores derived from it.
+                l_num_tokens = get_num_tokens(ltokens, l_id)
+                overlap = get_overlap(get_tokens(ltokens, l_id), l_num_tokens,
+                                      tokens, m)
+                satisfied = conjunctive
+                for s in range(sim_types.size()):
+                    sim_score = get_sim_score(overlap, l_num_tokens, m,
+                                              sim_types[s])
+                    if comp_fn(sim_score, thresholds[s]) != conjunctive:
+                        satisfied = not conjunctive
+                        break
+
+                if satisfied:
+                    output_pairs.push_back(pair[int, int](l_id, i))      
+                    for s in range(num_sim_types):
+                        output_sim_scores.push_back(get_sim_score(
+                            overlap, l_num_tokens, m, out_sim_types[s]))
+
+            # reset the entry for the next probe.
+            candidate_overlap[l_id] = 0
+
+        touched.clear()
+
+
+cdef int est_hamming_dist_lower_bound(const int* x, int x_start, int x_end,
+                                      const int* y, int y_start, int y_end,
+                                      int hamming_dist_max, int depth, 
+                                      int max_depth) nogil:
+    # estimates a lower bound on the hamming distance between the sorted 
+    # token ranges x[x_start:x_end] and y[y_start:y_end], by recursively 
+    # partitioning both the ranges using the middle token of y. The recursion
+    # stops as soon as the lower bound exceeds hamming_dist_max.
+    cdef int x_size = x_end - x_start, y_size = y_end - y_start
+    cdef int abs_diff = x_size - y_size if x_size > y_size else y_size - x_size
+    cdef int y_mid, x_pos, diff, left_diff, right_diff
+    cdef int hamming_dist, hamming_dist_l, hamming_dist_r
+    cdef int lo, hi, mid, x_pos_right
+
+    if depth > max_depth or x_size == 0 or y_size == 0:
+        return abs_diff
+
+    y_mid = y_start + y_size // 2
+
+    # find the position of the first token in x that is not smaller than the
+    # middle token of y.
+    lo = x_start
+    hi = x_end
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if x[mid] < y[y_mid]:
+            lo = mid + 1
+        else:
+            hi = mid
+    x_pos = lo
+
+    # if the middle token of y is present in x, it is excluded from the right
+    # partition of x. Else, it contributes 1 to the hamming distance.
+    if x_pos < x_end and x[x_pos] == y[y_mid]:
+        diff = 0
+        x_pos_right = x_pos + 1
+    else:
+        diff = 1
+        x_pos_right = x_pos
 
-                if comp_fn(sim_score, threshold):                                       
-                    output_pairs.push_back(pair[int, int](entry.first, i))      
-                    output_sim_scores.push_back(sim_score)                      
+    left_diff = (x_pos - x_start) - (y_mid - y_start)
+    if left_diff < 0:
+        left_diff = -left_diff
+    right_diff = (x_end - x_pos_right) - (y_end - y_mid - 1)
+    if right_diff < 0:
+        right_diff = -right_diff
 
-        candidate_overlap.clear()                                               
-        overlap_threshold_cache.clear()          
+    hamming_dist = left_diff + right_diff + diff
+    if hamming_dist > hamming_dist_max:
+        return hamming_dist
 
-        # If the show_progress flag is enabled, we update the progress bar.     
-        # Note that only one of the threads will update the progress bar. To    
-        # do so, it releases GIL and updates the global variable that keeps     
-        # track of the progress bar.                                            
-        if thread_id == 0 and show_progress:                                    
-            with gil:                                                           
-                global _progress_bar                                            
-                _progress_bar.update()   
+    hamming_dist_l = est_hamming_dist_lower_bound(
+                         x, x_start, x_pos, y, y_start, y_mid,
+                         hamming_dist_max - right_diff - diff, 
+                         depth + 1, max_depth)
+    hamming_dist = hamming_dist_l + right_diff + diff
+    if hamming_dist > hamming_dist_max:
+        return hamming_dist
 
+    hamming_dist_r = est_hamming_dist_lower_bound(
+                         x, x_pos_right, x_end, y, y_mid + 1, y_end,
+                         hamming_dist_max - hamming_dist_l - diff,
+                         depth + 1, max_depth)
+    return hamming_dist_l + hamming_dist_r + diff
 
-cdef PositionIndexCy build_position_index(vector[vector[int]]& token_vectors, 
+
+cdef PositionIndexCy build_position_index(TokenStoreView& token_store, 
                                int& sim_type, double& threshold, 
                                bool allow_empty):
     cdef PositionIndexCy pos_index = PositionIndexCy()
-    cdef vector[int] tokens, size_vector                                        
-    cdef int prefix_length, token, i, j, m, n=token_vectors.size(), min_len=100000, max_len=0
-    cdef omap[int, vector[pair[int, int]]] index
-    cdef vector[int] empty_l_ids                                
+    cdef int i, m, n=token_store.num_records, min_len=100000, max_len=0
+    cdef vector[int] empty_l_ids, prefix_lengths
     for i in range(n):                                                          
-        tokens = token_vectors[i]                                               
-        m = tokens.size()                                                       
-        size_vector.push_back(m)                                                
-        prefix_length = get_prefix_length(m, sim_type, threshold)               
-        for j in range(prefix_length):                                          
-            index[tokens[j]].push_back(pair[int, int](i, j))                    
+        m = get_num_tokens(token_store, i)
+        prefix_lengths.push_back(int_min(get_prefix_length(m, sim_type, 
+                                                           threshold), m))
         if m > max_len:                                                         
             max_len = m                                                         
         if m < min_len:                                                         
@@ -181,11 +431,35 @@ cdef PositionIndexCy build_position_index(vector[vector[int]]& token_vectors,
         if allow_empty and m == 0:
             empty_l_ids.push_back(i)
 
-    pos_index.set_fields(index, size_vector, empty_l_ids, 
-                         min_len, max_len, threshold)
+    pos_index.build_index(token_store, prefix_lengths)
+    pos_index.set_fields(empty_l_ids, min_len, max_len, threshold)
     return pos_index      
 
 
+cdef PositionIndexCy load_position_index(prebuilt_index,
+                                         TokenStoreView& token_store,
+                                         bool allow_empty):
+    cdef PositionIndexCy pos_index = PositionIndexCy()
+    cdef int i, m, n=token_store.num_records, min_len=100000, max_len=0
+    cdef vector[int] empty_l_ids
+    for i in range(n):
+        m = get_num_tokens(token_store, i)
+        if m > max_len:
+            max_len = m
+        if m < min_len:
+            min_len = m
+        if allow_empty and m == 0:
+            empty_l_ids.push_back(i)
+
+    pos_index.set_arrays(prebuilt_index.arrays['offsets'],
+                         prebuilt_index.arrays['posting_ids'],
+                         prebuilt_index.arrays['posting_positions'],
+                         token_store)
+    pos_index.set_fields(empty_l_ids, min_len, max_len,
+                         prebuilt_index.threshold)
+    return pos_index
+
+
 cdef int get_prefix_length(int& num_tokens, int& sim_type, double& threshold) nogil:
     if sim_type == 0: # COSINE                                                  
         return <int>(num_tokens - ceil(threshold * threshold * num_tokens) + 1.0)
@@ -193,32 +467,144 @@ cdef int get_prefix_length(int& num_tokens, int& sim_type, double& threshold) no
         return <int>(num_tokens - ceil((threshold / (2 - threshold)) * num_tokens) + 1.0)
     elif sim_type == 2: # JACCARD:                                              
         return <int>(num_tokens - ceil(threshold * num_tokens) + 1.0)           
+    elif sim_type == 3: # OVERLAP:
+        return num_tokens - get_required_overlap(threshold) + 1
                                                                                 
 cdef int get_size_lower_bound(int& num_tokens, int& sim_type, double& threshold) nogil:
     if sim_type == 0: # COSINE                                                  
-        return <int>ceil(threshold * threshold * num_tokens)                    
+        return <int>ceil(round_to_4_places(threshold * threshold * num_tokens))                    
     elif sim_type == 1: # DICE                                                  
-        return <int>ceil((threshold / (2 - threshold)) * num_tokens)            
+        return <int>ceil(round_to_4_places((threshold / (2 - threshold)) * num_tokens))            
     elif sim_type == 2: # JACCARD:                                              
-        return <int>ceil(threshold * num_tokens)                                
+        return <int>ceil(round_to_4_places(threshold * num_tokens))                                
+    elif sim_type == 3: # OVERLAP:
+        return get_required_overlap(threshold)
                                                                                 
 cdef int get_size_upper_bound(int& num_tokens, int& sim_type, double& threshold) nogil:
     if sim_type == 0: # COSINE                                                  
-        return <int>floor(num_tokens / (threshold * threshold))                 
+        return <int>floor(round_to_4_places(num_tokens / (threshold * threshold)))                 
     elif sim_type == 1: # DICE                                                  
-        return <int>floor(((2 - threshold) / threshold) * num_tokens)           
+        return <int>floor(round_to_4_places(((2 - threshold) / threshold) * num_tokens))           
     elif sim_type == 2: # JACCARD:                                              
-        return <int>floor(num_tokens / threshold)                              
+        return <int>floor(round_to_4_places(num_tokens / threshold))                              
+    elif sim_type == 3: # OVERLAP:
+        return INT_MAX
                                                                                 
 cdef int get_overlap_threshold(int& l_num_tokens, int& r_num_tokens, int& sim_type, double& threshold) nogil:
+    # the overlap is rounded to 4 decimal places before taking the ceiling, as 
+    # done by filter_utils.get_overlap_threshold (and by the size bounds 
+    # above), so that the floating point error does not prune pairs whose 
+    # score is equal to the threshold.
     if sim_type == 0: # COSINE                                                  
-        return <int>ceil(threshold * sqrt(<double>(l_num_tokens * r_num_tokens)))
+        return <int>ceil(round_to_4_places(threshold * sqrt(<double>(l_num_tokens * r_num_tokens))))
     elif sim_type == 1: # DICE                                                  
-        return <int>ceil((threshold / 2) * (l_num_tokens + r_num_tokens))       
+        return <int>ceil(round_to_4_places((threshold / 2) * (l_num_tokens + r_num_tokens)))
     elif sim_type == 2: # JACCARD:                                              
-        return <int>ceil((threshold / (1 + threshold)) * (l_num_tokens + r_num_tokens))
-                                                                                
-ctypedef double (*fnptr)(const vector[int]&, const vector[int]&) nogil          
+        return <int>ceil(round_to_4_places((threshold / (1 + threshold)) * (l_num_tokens + r_num_tokens)))
+    elif sim_type == 3: # OVERLAP:
+        return get_required_overlap(threshold)
+
+cdef inline int get_required_overlap(double threshold) nogil:
+    # the overlap of a pair is an integer, hence a pair satisfying the
+    # threshold with any of the comparison operators has an overlap of at
+    # least the ceiling of the threshold. The pairs without a common token
+    # are never output.
+    cdef int required_overlap = <int>ceil(round_to_4_places(threshold))
+    return required_overlap if required_overlap > 1 else 1
+
+cdef int get_prefix_condition(vector[int]& sim_types,
+                              vector[double]& thresholds,
+                              bool conjunctive) nogil:
+    # The prefix length of each measure is num_tokens - ceil(f * num_tokens)
+    # + 1, where f only depends on the threshold. Hence, the condition with
+    # the lowest f has the longest prefixes for all the record sizes, and the
+    # condition with the highest f has the shortest ones.
+    cdef int i, best = 0
+    cdef double f, best_f = get_prefix_fraction(sim_types[0], thresholds[0])
+    for i in range(1, sim_types.size()):
+        f = get_prefix_fraction(sim_types[i], thresholds[i])
+        if (f > best_f) if conjunctive else (f < best_f):
+            best = i
+            best_f = f
+    return best
+
+cdef inline double get_prefix_fraction(int sim_type, double threshold) nogil:
+    if sim_type == 0: # COSINE
+        return threshold * threshold
+    elif sim_type == 1: # DICE
+        return threshold / (2 - threshold)
+    elif sim_type == 2: # JACCARD:
+        return threshold
+
+# The bounds of the conditions combined by AND are the tightest of their
+# bounds, and the bounds of the conditions combined by OR are the loosest.
+cdef int get_combined_size_lower_bound(int& num_tokens, vector[int]& sim_types,
+                                       vector[double]& thresholds,
+                                       bool conjunctive) nogil:
+    cdef int i, bound
+    cdef int combined = get_size_lower_bound(num_tokens, sim_types[0],
+                                             thresholds[0])
+    for i in range(1, sim_types.size()):
+        bound = get_size_lower_bound(num_tokens, sim_types[i], thresholds[i])
+        combined = int_max(combined, bound) if conjunctive else \
+                   int_min(combined, bound)
+    return combined
+
+cdef int get_combined_size_upper_bound(int& num_tokens, vector[int]& sim_types,
+                                       vector[double]& thresholds,
+                                       bool conjunctive) nogil:
+    cdef int i, bound
+    cdef int combined = get_size_upper_bound(num_tokens, sim_types[0],
+                                             thresholds[0])
+    for i in range(1, sim_types.size()):
+        bound = get_size_upper_bound(num_tokens, sim_types[i], thresholds[i])
+        combined = int_min(combined, bound) if conjunctive else \
+                   int_max(combined, bound)
+    return combined
+
+cdef int get_combined_overlap_threshold(int& l_num_tokens, int& r_num_tokens,
+                                        vector[int]& sim_types,
+                                        vector[double]& thresholds,
+                                        bool conjunctive) nogil:
+    cdef int i, bound
+    cdef int combined = get_overlap_threshold(l_num_tokens, r_num_tokens,
+                                              sim_types[0], thresholds[0])
+    for i in range(1, sim_types.size()):
+        bound = get_overlap_threshold(l_num_tokens, r_num_tokens,
+                                      sim_types[i], thresholds[i])
+        combined = int_max(combined, bound) if conjunctive else \
+                   int_min(combined, bound)
+    return combined
+
+cdef int get_overlap(const int* tokens1, int size1,
+                     const int* tokens2, int size2) nogil:
+    cdef int i=0, j=0, overlap=0
+    while i < size1 and j < size2:
+        if tokens1[i] == tokens2[j]:
+            overlap += 1
+            i += 1
+            j += 1
+        elif tokens1[i] < tokens2[j]:
+            i += 1
+        else:
+            j += 1
+    return overlap
+
+cdef inline double get_sim_score(int overlap, int size1, int size2,
+                                 int sim_type) nogil:
+    # computes the score of a pair of non-empty sets from their overlap, the
+    # same way as the similarity functions do.
+    if sim_type == 0: # COSINE
+        return <double>overlap / sqrt(<double>(size1*size2))
+    elif sim_type == 1: # DICE
+        return (overlap * 2.0) / <double>(size1 + size2)
+    elif sim_type == 2: # JACCARD:
+        return (overlap * 1.0) / <double>(size1 + size2 - overlap)
+    elif sim_type == 3: # OVERLAP:
+        return <double>overlap
+
+cdef inline double round_to_4_places(double value) nogil:
+    return round(value * 10000.0) / 10000.0
                                                                                 
 cdef fnptr get_sim_function(int& sim_type) nogil:                               
     if sim_type == 0: # COSINE                                                  
@@ -234,5 +620,7 @@ cdef int get_sim_type(sim_measure):
     elif sim_measure == 'DICE': # DICE                                                  
         return 1                                                                
     elif sim_measure == 'JACCARD': # JACCARD:                                              
-        return 2                                                                
+        return 2
+    elif sim_measure == 'OVERLAP': # OVERLAP:
+        return 3                                                                
 
@@ -0,0 +1,130 @@
+# top-k dice join
+from py_stringsimjoin.join.topk_set_sim_join import topk_set_sim_join
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
+from py_stringsimjoin.utils.validation import validate_attr, \
+    validate_attr_type, validate_key_attr, validate_input_table, validate_k, \
+    validate_tokenizer, validate_output_attrs
+
+
+def topk_dice_join(ltable, rtable,
+                   l_key_attr, r_key_attr,
+                   l_join_attr, r_join_attr,
+                   tokenizer, k,
+                   l_out_attrs=None, r_out_attrs=None,
+                   l_out_prefix='l_', r_out_prefix='r_',
+                   out_sim_score=True):
+    """Find the top-k tuple pairs using Dice similarity measure.
+
+    For two sets X and Y, the Dice similarity score between them is given by:
+
+        :math:`dice(X, Y) = \\frac{2 * |X \\cap Y|}{|X| + |Y|}`
+
+    Finds the k tuple pairs from left table and right table with the highest
+    Dice similarity between the join attributes, without requiring a
+    similarity threshold. The pairs are found using prefix filtering, where
+    the threshold is raised dynamically to the k-th best score found so far,
+    so that the join stops as soon as no unseen pair can make it into the
+    top k. Tuples with missing value or with empty set of tokens in the join
+    attribute are not considered. If several pairs have the same score as the
+    k-th pair, an arbitrary subset of them is output.
+
+    Args:
+        ltable (DataFrame or PreparedTable): left input table.
+
+        rtable (DataFrame or PreparedTable): right input table.
+
+        l_key_attr (string): key attribute in left table.
+
+        r_key_attr (string): key attribute in right table.
+
+        l_join_attr (string): join attribute in left table.
+
+        r_join_attr (string): join attribute in right table.
+
+        tokenizer (Tokenizer): tokenizer to be used to tokenize join
+            attributes.
+
+        k (int): number of tuple pairs to be output.
+
+        l_out_attrs (list): list of attribute names from the left table to be
+            included in the output table (defaults to None).
+
+        r_out_attrs (list): list of attribute names from the right table to be
+            included in the output table (defaults to None).
+
+        l_out_prefix (string): prefix to be used for the attribute names coming
+            from the left table, in the output table (defaults to 'l\_').
+
+        r_out_prefix (string): prefix to be used for the attribute names coming
+            from the right table, in the output table (defaults to 'r\_').
+
+        out_sim_score (boolean): flag to indicate whether similarity score
+            should be included in the output table (defaults to True). Setting
+            this flag to True will add a column named '_sim_score' in the
+            output table. This column will contain the similarity scores for the
+            tuple pairs in the output.
+
+    Returns:
+        An output table containing the top-k tuple pairs, in decreasing order
+        of their similarity scores (DataFrame).
+    """
+
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
+    # check if the input tables are dataframes
+    validate_input_table(ltable, 'left table')
+    validate_input_table(rtable, 'right table')
+
+    # check if the key attributes and join attributes exist
+    validate_attr(l_key_attr, ltable.columns,
+                  'key attribute', 'left table')
+    validate_attr(r_key_attr, rtable.columns,
+                  'key attribute', 'right table')
+    validate_attr(l_join_attr, ltable.columns,
+                  'join attribute', 'left table')
+    validate_attr(r_join_attr, rtable.columns,
+                  'join attribute', 'right table')
+
+    # check if the join attributes are not of numeric type
+    validate_attr_type(l_join_attr, ltable[l_join_attr].dtype,
+                       'join attribute', 'left table')
+    validate_attr_type(r_join_attr, rtable[r_join_attr].dtype,
+                       'join attribute', 'right table')
+
+    # check if the input tokenizer is valid
+    validate_tokenizer(tokenizer)
+
+    # check if the input k is valid
+    validate_k(k)
+
+    # check if the output attributes exist
+    validate_output_attrs(l_out_attrs, ltable.columns,
+                          r_out_attrs, rtable.columns)
+
+    # check if the key attributes are unique and do not contain missing values
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
+
+    # set return_set flag of tokenizer to be True, in case it is set to False
+    revert_tokenizer_return_set_flag = False
+    if not tokenizer.get_return_set():
+        tokenizer.set_return_set(True)
+        revert_tokenizer_return_set_flag = True
+
+    output_table = topk_set_sim_join(ltable, rtable,
+                                     l_key_attr, r_key_attr,
+                                     l_join_attr, r_join_attr,
+                                     tokenizer, 'DICE', k,
+                                     l_out_attrs, r_out_attrs,
+                                     l_out_prefix, r_out_prefix,
+                                     out_sim_score)
+
+    # revert the return_set flag of tokenizer, in case it was modified.
+    if revert_tokenizer_return_set_flag:
+        tokenizer.set_return_set(False)
+
+    return output_table
@@ -0,0 +1,232 @@
+# top-k set similarity join
+import heapq
+from math import sqrt
+
+import pandas as pd
+
+from py_stringsimjoin.filter.filter_utils import get_size_lower_bound, \
+    get_size_upper_bound
+from py_stringsimjoin.utils.generic_helper import convert_dataframe_to_array, \
+    find_output_attribute_indices, get_attrs_to_project, \
+    get_output_header_from_tables, get_output_row_from_tables, \
+    remove_redundant_attrs
+from py_stringsimjoin.utils.simfunctions import get_sim_function
+from py_stringsimjoin.utils.token_ordering import tokenize_and_order_tables
+
+
+def topk_set_sim_join(ltable, rtable,
+                      l_key_attr, r_key_attr,
+                      l_join_attr, r_join_attr,
+                      tokenizer, sim_measure_type, k,
+                      l_out_attrs, r_out_attrs,
+                      l_out_prefix, r_out_prefix,
+                      out_sim_score):
+    """Find the k tuple pairs with the highest similarity between the join
+    attributes, and return them as an output table."""
+
+    # remove redundant attrs from output attrs.
+    l_out_attrs = remove_redundant_attrs(l_out_attrs, l_key_attr)
+    r_out_attrs = remove_redundant_attrs(r_out_attrs, r_key_attr)
+
+    # get attributes to project.
+    l_proj_attrs = get_attrs_to_project(l_out_attrs, l_key_attr, l_join_attr)
+    r_proj_attrs = get_attrs_to_project(r_out_attrs, r_key_attr, r_join_attr)
+
+    # Do a projection on the input dataframes to keep only the required
+    # attributes. Then, remove rows with missing value in join attribute from
+    # the input dataframes. Then, convert the resulting dataframes into ndarray.
+    ltable_array = convert_dataframe_to_array(ltable, l_proj_attrs, l_join_attr)
+    rtable_array = convert_dataframe_to_array(rtable, r_proj_attrs, r_join_attr)
+
+    # find column indices of key attr, join attr and output attrs in ltable
+    l_key_attr_index = l_proj_attrs.index(l_key_attr)
+    l_join_attr_index = l_proj_attrs.index(l_join_attr)
+    l_out_attrs_indices = find_output_attribute_indices(l_proj_attrs,
+                                                        l_out_attrs)
+
+    # find column indices of key attr, join attr and output attrs in rtable
+    r_key_attr_index = r_proj_attrs.index(r_key_attr)
+    r_join_attr_index = r_proj_attrs.index(r_join_attr)
+    r_out_attrs_indices = find_output_attribute_indices(r_proj_attrs,
+                                                        r_out_attrs)
+
+    from py_stringsimjoin import __use_cython__
+    if __use_cython__:
+        from py_stringsimjoin.join.topk_set_sim_join_cy import \
+            topk_set_sim_join_cy
+        output_pairs, output_sim_scores = topk_set_sim_join_cy(
+                                              ltable_array, rtable_array,
+                                              l_join_attr_index,
+                                              r_join_attr_index,
+                                              tokenizer, sim_measure_type, k)
+    else:
+        output_pairs, output_sim_scores = topk_set_sim_join_py(
+                                              ltable_array, rtable_array,
+                                              l_join_attr_index,
+                                              r_join_attr_index,
+                                              tokenizer, sim_measure_type, k)
+
+    output_rows = []
+    has_output_attributes = (l_out_attrs is not None or
+                             r_out_attrs is not None)
+
+    for ((l_id, r_id), sim_score) in zip(output_pairs, output_sim_scores):
+        if has_output_attributes:
+            output_row = get_output_row_from_tables(
+                             ltable_array[l_id], rtable_array[r_id],
+                             l_key_attr_index, r_key_attr_index,
+                             l_out_attrs_indices, r_out_attrs_indices)
+        else:
+            output_row = [ltable_array[l_id][l_key_attr_index],
+                          rtable_array[r_id][r_key_attr_index]]
+
+        # if out_sim_score flag is set, append the similarity score
+        # to the output record.
+        if out_sim_score:
+            output_row.append(sim_score)
+
+        output_rows.append(output_row)
+
+    output_header = get_output_header_from_tables(
+                        l_key_attr, r_key_attr,
+                        l_out_attrs, r_out_attrs,
+                        l_out_prefix, r_out_prefix)
+    if out_sim_score:
+        output_header.append("_sim_score")
+
+    # generate a dataframe from the list of output rows
+    output_table = pd.DataFrame(output_rows, columns=output_header)
+
+    # add an id column named '_id' to the output table.
+    output_table.insert(0, '_id', range(0, len(output_table)))
+
+    return output_table
+
+
+def topk_set_sim_join_py(ltable, rtable,
+                         l_join_attr_index, r_join_attr_index,
+                         tokenizer, sim_measure_type, k):
+    """Find the k pairs of ltable and rtable records with the highest
+    similarity. Returns the list of (ltable index, rtable index) pairs and the
+    list of their similarity scores, in decreasing order of score.
+
+    Each record x yields one event per token in x. The event for the token at
+    position p carries an upper bound on the similarity of any pair whose
+    first common token is at position p in x. Events are processed in
+    decreasing order of this bound: the token is probed against the index of
+    the other table and then inserted into the index of the table of x. So, a
+    pair is verified once the events of its first common token have been
+    processed on both sides, and the join stops as soon as the bound of the
+    next event is not larger than the k-th best score found so far.
+    """
+
+    # tokenize l_join_attr and r_join_attr, and order the tokens using the
+    # token ordering generated from the same pass.
+    tokens, _ = tokenize_and_order_tables(
+                    [ltable, rtable],
+                    [l_join_attr_index, r_join_attr_index],
+                    tokenizer)
+
+    sim_fn = get_sim_function(sim_measure_type)
+
+    # an event is represented as (-upper bound, table index, record id,
+    # position), where table index is 0 for ltable and 1 for rtable.
+    # Records with empty set of tokens are not considered.
+    events = [(-1.0, table_index, rec_id, 0)
+              for table_index in range(2)
+              for rec_id in range(len(tokens[table_index]))
+              if len(tokens[table_index][rec_id]) > 0]
+    heapq.heapify(events)
+
+    # topk_pairs is a min-heap (on the score) of the best pairs found so far.
+    topk_pairs = []
+    verified_pairs = set()
+    indexes = [{}, {}]
+
+    while len(events) > 0:
+        (neg_bound, table_index, x, pos) = heapq.heappop(events)
+
+        if len(topk_pairs) == k and -neg_bound <= topk_pairs[0][0]:
+            break
+
+        x_tokens = tokens[table_index][x]
+        token = x_tokens[pos]
+
+        # the k-th best score is a lower bound on the similarity of the pairs
+        # that can still enter the top-k, so the size filter of the threshold
+        # join is applied using it. As the k-th best score only increases, a
+        # pair pruned by the size filter stays pruned, and it is not added to
+        # verified_pairs.
+        apply_size_filter = len(topk_pairs) == k
+        if apply_size_filter:
+            size_lower_bound = get_size_lower_bound(
+                len(x_tokens), sim_measure_type, topk_pairs[0][0])
+            size_upper_bound = get_size_upper_bound(
+                len(x_tokens), sim_measure_type, topk_pairs[0][0])
+
+        for (y, y_pos) in indexes[1 - table_index].get(token, []):
+            y_tokens = tokens[1 - table_index][y]
+            if apply_size_filter and (len(y_tokens) < size_lower_bound or
+                                      len(y_tokens) > size_upper_bound):
+                continue
+
+            pair_ids = (x, y) if table_index == 0 else (y, x)
+
+            # a pair is verified at most once. If the pair has not been
+            # verified yet, then the current token is its first common token.
+            if pair_ids in verified_pairs:
+                continue
+            verified_pairs.add(pair_ids)
+
+            if len(topk_pairs) == k:
+                # only verify the pair if the upper bound on its similarity,
+                # obtained from the overlap of the unseen suffixes, exceeds
+                # the k-th best score.
+                overlap_upper_bound = min(len(x_tokens) - pos,
+                                          len(y_tokens) - y_pos)
+                if (get_overlap_upper_bound_score(overlap_upper_bound,
+                        len(x_tokens), len(y_tokens), sim_measure_type) <=
+                        topk_pairs[0][0]):
+                    continue
+
+            sim_score = sim_fn(x_tokens, y_tokens)
+
+            if len(topk_pairs) < k:
+                heapq.heappush(topk_pairs, (sim_score, pair_ids))
+            elif sim_score > topk_pairs[0][0]:
+                heapq.heapreplace(topk_pairs, (sim_score, pair_ids))
+
+        indexes[table_index].setdefault(token, []).append((x, pos))
+
+        if pos + 1 < len(x_tokens):
+            heapq.heappush(events, (-get_prefix_upper_bound(
+                                        len(x_tokens), pos + 1,
+                                        sim_measure_type),
+                                    table_index, x, pos + 1))
+
+    # output the pairs in decreasing order of their scores.
+    topk_pairs.sort(key=lambda entry: -entry[0])
+    return ([pair_ids for (sim_score, pair_ids) in topk_pairs],
+            [sim_score for (sim_score, pair_ids) in topk_pairs])
+
+
+def get_prefix_upper_bound(num_tokens, pos, sim_measure_type):
+    # upper bound on the similarity of a pair whose first common token is at
+    # position pos in a record containing num_tokens tokens.
+    if sim_measure_type == 'COSINE':
+        return sqrt(float(num_tokens - pos) / num_tokens)
+    elif sim_measure_type == 'DICE':
+        return (2.0 * (num_tokens - pos)) / (2 * num_tokens - pos)
+    elif sim_measure_type == 'JACCARD':
+        return float(num_tokens - pos) / num_tokens
+
+
+def get_overlap_upper_bound_score(overlap, l_num_tokens, r_num_tokens,
+                                  sim_measure_type):
+    # similarity of a pair of records with the given sizes and overlap.
+    if sim_measure_type == 'COSINE':
+        return overlap / sqrt(float(l_num_tokens * r_num_tokens))
+    elif sim_measure_type == 'DICE':
+        return (2.0 * overlap) / (l_num_tokens + r_num_tokens)
+    elif sim_measure_type == 'JACCARD':
+        return float(overlap) / (l_num_tokens + r_num_tokens - overlap)
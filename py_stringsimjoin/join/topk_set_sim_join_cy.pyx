@@ -0,0 +1,212 @@
+# top-k set similarity join
+
+from libc.math cimport sqrt
+from libcpp.vector cimport vector
+from libcpp.set cimport set as oset
+from libcpp cimport bool
+from libcpp.pair cimport pair
+from libcpp.queue cimport priority_queue
+
+from py_stringsimjoin.join.set_sim_join_cy cimport fnptr, get_sim_function, \
+    get_sim_type, get_size_lower_bound, get_size_upper_bound
+from py_stringsimjoin.utils.cython_utils cimport int_min, tokenize_lists
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreCy, \
+    TokenStoreView, get_num_tokens, get_tokens
+
+
+def topk_set_sim_join_cy(ltable, rtable,
+                         l_join_attr_index, r_join_attr_index,
+                         tokenizer, sim_measure, int k):
+    """Find the k pairs of ltable and rtable records with the highest
+    similarity. Returns the list of (ltable index, rtable index) pairs and the
+    list of their similarity scores, in decreasing order of score.
+    """
+    cdef TokenStoreCy ltokens = TokenStoreCy(), rtokens = TokenStoreCy()
+    tokenize_lists(ltable, rtable, l_join_attr_index, r_join_attr_index,
+                   tokenizer, ltokens, rtokens)
+
+    cdef vector[pair[int, int]] output_pairs
+    cdef vector[double] output_sim_scores
+    cdef int sim_type = get_sim_type(sim_measure)
+    cdef TokenStoreView lview = ltokens.view, rview = rtokens.view
+
+    with nogil:
+        topk_set_sim_join(lview, rview, sim_type, k,
+                          output_pairs, output_sim_scores)
+
+    return output_pairs, output_sim_scores
+
+
+cdef void topk_set_sim_join(TokenStoreView& ltokens,
+                            TokenStoreView& rtokens,
+                            int sim_type, int k,
+                            vector[pair[int, int]]& output_pairs,
+                            vector[double]& output_sim_scores) nogil:
+    # Each record x yields one event per token in x. The event for the token at
+    # position p carries an upper bound on the similarity of any pair whose
+    # first common token is at position p in x. Events are processed in
+    # decreasing order of this bound: the token is probed against the index of
+    # the other table and then inserted into the index of the table of x. So, a
+    # pair is verified once the events of its first common token have been
+    # processed on both sides, and the join stops as soon as the bound of the
+    # next event is not larger than the k-th best score found so far.
+    cdef int i, nl = ltokens.num_records, nr = rtokens.num_records
+    cdef int rec_id, pos, num_tokens, max_token = 0
+    cdef pair[double, pair[int, int]] event
+    cdef priority_queue[pair[double, pair[int, int]]] events
+    # topk_pairs is a min-heap (on the score) of the best pairs found so far,
+    # obtained by storing the negated scores in a max-heap.
+    cdef priority_queue[pair[double, pair[int, int]]] topk_pairs
+    cdef oset[pair[int, int]] verified_pairs
+    cdef vector[vector[pair[int, int]]] lindex, rindex
+    cdef fnptr sim_fn = get_sim_function(sim_type)
+
+    if k <= 0:
+        return
+
+    # the tokens of each record are sorted, hence the last token is the
+    # largest one.
+    for i in range(nl):
+        num_tokens = get_num_tokens(ltokens, i)
+        if num_tokens > 0 and get_tokens(ltokens, i)[num_tokens - 1] > max_token:
+            max_token = get_tokens(ltokens, i)[num_tokens - 1]
+    for i in range(nr):
+        num_tokens = get_num_tokens(rtokens, i)
+        if num_tokens > 0 and get_tokens(rtokens, i)[num_tokens - 1] > max_token:
+            max_token = get_tokens(rtokens, i)[num_tokens - 1]
+    lindex.resize(max_token + 1)
+    rindex.resize(max_token + 1)
+
+    # records of rtable are identified by nl + (index in rtable) in the events.
+    # records with empty set of tokens are not considered.
+    for i in range(nl):
+        if get_num_tokens(ltokens, i) > 0:
+            events.push(pair[double, pair[int, int]](1.0, pair[int, int](i, 0)))
+    for i in range(nr):
+        if get_num_tokens(rtokens, i) > 0:
+            events.push(pair[double, pair[int, int]](1.0,
+                                                     pair[int, int](nl + i, 0)))
+
+    while not events.empty():
+        event = events.top()
+        events.pop()
+
+        if (<int>topk_pairs.size() == k and
+                event.first <= -topk_pairs.top().first):
+            break
+
+        pos = event.second.second
+        if event.second.first < nl:
+            rec_id = event.second.first
+            num_tokens = get_num_tokens(ltokens, rec_id)
+            probe_event(rec_id, pos, ltokens, rtokens, lindex, rindex, True,
+                        sim_type, sim_fn, k, verified_pairs, topk_pairs)
+        else:
+            rec_id = event.second.first - nl
+            num_tokens = get_num_tokens(rtokens, rec_id)
+            probe_event(rec_id, pos, rtokens, ltokens, rindex, lindex, False,
+                        sim_type, sim_fn, k, verified_pairs, topk_pairs)
+
+        if pos + 1 < num_tokens:
+            events.push(pair[double, pair[int, int]](
+                            get_prefix_upper_bound(num_tokens, pos + 1,
+                                                   sim_type),
+                            pair[int, int](event.second.first, pos + 1)))
+
+    # output the pairs in decreasing order of their scores. The heap pops the
+    # pairs in increasing order of score, so the output is filled from the end.
+    i = topk_pairs.size()
+    output_pairs.resize(i)
+    output_sim_scores.resize(i)
+    while not topk_pairs.empty():
+        i -= 1
+        output_pairs[i] = topk_pairs.top().second
+        output_sim_scores[i] = -topk_pairs.top().first
+        topk_pairs.pop()
+
+
+cdef void probe_event(int x, int pos,
+                      TokenStoreView& xtokens,
+                      TokenStoreView& ytokens,
+                      vector[vector[pair[int, int]]]& xindex,
+                      vector[vector[pair[int, int]]]& yindex,
+                      bool x_is_left, int sim_type, fnptr sim_fn, int k,
+                      oset[pair[int, int]]& verified_pairs,
+                      priority_queue[pair[double, pair[int, int]]]& topk_pairs) nogil:
+    cdef int j, y, token = get_tokens(xtokens, x)[pos], ny
+    cdef int nx = get_num_tokens(xtokens, x)
+    cdef pair[int, int] entry, pair_ids
+    cdef int size_lower_bound = 0, size_upper_bound = 0
+    cdef double sim_score, kth_score = 0.0
+    cdef bool apply_size_filter = <int>topk_pairs.size() == k
+
+    # the k-th best score is a lower bound on the similarity of the pairs that
+    # can still enter the top-k, so the size filter of the threshold join is
+    # applied using it. As the k-th best score only increases, a pair pruned by
+    # the size filter stays pruned, and it is not added to verified_pairs.
+    if apply_size_filter:
+        kth_score = -topk_pairs.top().first
+        size_lower_bound = get_size_lower_bound(nx, sim_type, kth_score)
+        size_upper_bound = get_size_upper_bound(nx, sim_type, kth_score)
+
+    for j in range(yindex[token].size()):
+        entry = yindex[token][j]
+        y = entry.first
+        ny = get_num_tokens(ytokens, y)
+        if apply_size_filter and (ny < size_lower_bound or
+                                  ny > size_upper_bound):
+            continue
+
+        if x_is_left:
+            pair_ids = pair[int, int](x, y)
+        else:
+            pair_ids = pair[int, int](y, x)
+
+        # a pair is verified at most once. If the pair has not been verified
+        # yet, then the current token is its first common token.
+        if verified_pairs.find(pair_ids) != verified_pairs.end():
+            continue
+        verified_pairs.insert(pair_ids)
+
+        if <int>topk_pairs.size() == k:
+            kth_score = -topk_pairs.top().first
+            # only verify the pair if the upper bound on its similarity,
+            # obtained from the overlap of the unseen suffixes, exceeds the
+            # k-th best score.
+            if get_overlap_upper_bound_score(
+                   int_min(nx - pos, ny - entry.second), nx, ny,
+                   sim_type) <= kth_score:
+                continue
+
+        sim_score = sim_fn(get_tokens(xtokens, x), nx,
+                           get_tokens(ytokens, y), ny)
+
+        if <int>topk_pairs.size() < k:
+            topk_pairs.push(pair[double, pair[int, int]](-sim_score, pair_ids))
+        elif sim_score > -topk_pairs.top().first:
+            topk_pairs.pop()
+            topk_pairs.push(pair[double, pair[int, int]](-sim_score, pair_ids))
+
+    xindex[token].push_back(pair[int, int](x, pos))
+
+
+cdef double get_prefix_upper_bound(int num_tokens, int pos, int sim_type) nogil:
+    # upper bound on the similarity of a pair whose first common token is at
+    # position pos in a record containing num_tokens tokens.
+    if sim_type == 0: # COSINE
+        return sqrt(<double>(num_tokens - pos) / <double>num_tokens)
+    elif sim_type == 1: # DICE
+        return (2.0 * (num_tokens - pos)) / <double>(2 * num_tokens - pos)
+    elif sim_type == 2: # JACCARD
+        return <double>(num_tokens - pos) / <double>num_tokens
+
+
+cdef double get_overlap_upper_bound_score(int overlap, int l_num_tokens,
+                                          int r_num_tokens, int sim_type) nogil:
+    # similarity of a pair of records with the given sizes and overlap.
+    if sim_type == 0: # COSINE
+        return overlap / sqrt(<double>l_num_tokens * r_num_tokens)
+    elif sim_type == 1: # DICE
+        return (2.0 * overlap) / <double>(l_num_tokens + r_num_tokens)
+    elif sim_type == 2: # JACCARD
+        return <double>overlap / <double>(l_num_tokens + r_num_tokens - overlap)
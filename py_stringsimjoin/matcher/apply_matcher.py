@@ -1,8 +1,11 @@
 
+from math import floor
 import operator
 import types
 
 from joblib import delayed, Parallel
+from py_stringmatching.similarity_measure.levenshtein import Levenshtein
+from six import text_type
 from six.moves import copyreg
 import pandas as pd
 import pyprind
@@ -13,6 +16,7 @@ from py_stringsimjoin.utils.generic_helper import build_dict_from_table, \
     get_output_row_from_tables, remove_redundant_attrs, split_table, COMP_OP_MAP
 from py_stringsimjoin.utils.pickle import pickle_instance_method, \
                                           unpickle_instance_method
+from py_stringsimjoin.utils.prepared_table import unwrap_prepared_table
 from py_stringsimjoin.utils.validation import validate_attr, \
     validate_comp_op, validate_key_attr, validate_input_table, \
     validate_tokenizer, validate_output_attrs
@@ -28,6 +32,11 @@ copyreg.pickle(types.MethodType,
                unpickle_instance_method)
 
 
+# largest threshold for which a Levenshtein matcher is replaced by the
+# threshold-bounded edit distance kernel.
+MAX_EDIT_DISTANCE_THRESHOLD = 1 << 30
+
+
 def apply_matcher(candset,
                   candset_l_key_attr, candset_r_key_attr,
                   ltable, rtable,
@@ -56,9 +65,9 @@ def apply_matcher(candset,
         candset_r_key_attr (string): attribute in candidate set which is a key 
             in right table.
 
-        ltable (DataFrame): left input table.
+        ltable (DataFrame or PreparedTable): left input table.
 
-        rtable (DataFrame): right input table.
+        rtable (DataFrame or PreparedTable): right input table.
 
         l_key_attr (string): key attribute in left table.
 
@@ -129,6 +138,10 @@ def apply_matcher(candset,
     validate_attr(candset_r_key_attr, candset.columns,
                   'right key attribute', 'candset')
 
+    # use the dataframes of the prepared tables, if any
+    ltable, l_prepared_table = unwrap_prepared_table(ltable)
+    rtable, r_prepared_table = unwrap_prepared_table(rtable)
+
     # check if the input tables are dataframes
     validate_input_table(ltable, 'left table')
     validate_input_table(rtable, 'right table')
@@ -155,8 +168,10 @@ def apply_matcher(candset,
     validate_comp_op(comp_op)
 
     # check if the key attributes are unique and do not contain missing values
-    validate_key_attr(l_key_attr, ltable, 'left table')
-    validate_key_attr(r_key_attr, rtable, 'right table')
+    validate_key_attr(l_key_attr, ltable, 'left table',
+                      l_prepared_table)
+    validate_key_attr(r_key_attr, rtable, 'right table',
+                      r_prepared_table)
 
     # check for empty candset
     if candset.empty:
@@ -178,6 +193,12 @@ def apply_matcher(candset,
     # computes the actual number of jobs to launch.
     n_jobs = min(get_num_processes_to_launch(n_jobs), len(candset))
 
+    # A Levenshtein matcher only needs the distances up to the threshold, so
+    # it is replaced by the threshold-bounded edit distance kernel, if the
+    # Cython extensions are used.
+    sim_function = _get_bounded_edit_distance(sim_function, tokenizer,
+                                              threshold, comp_op)
+
     # If a tokenizer is provided, we can optimize by tokenizing each value 
     # only once by caching the tokens of l_match_attr and r_match_attr. But, 
     # this can be a bad strategy in case the candset has very few records 
@@ -346,6 +367,42 @@ def _apply_matcher_split(candset,
     return output_table
 
 
+class _BoundedEditDistance(object):
+    """Levenshtein matcher computing the distances only up to max_dist.
+
+    A pair whose distance exceeds max_dist gets a score of max_dist + 1, which
+    fails the condition of the matcher as well. The values that are not
+    unicode strings are passed to the original matcher.
+    """
+
+    def __init__(self, sim_function, max_dist):
+        self.sim_function = sim_function
+        self.max_dist = max_dist
+
+    def __call__(self, string1, string2):
+        if isinstance(string1, text_type) and isinstance(string2, text_type):
+            from py_stringsimjoin.similarity_measure.edit_distance import \
+                bounded_levenshtein
+            edit_dist = bounded_levenshtein(string1, string2, self.max_dist)
+            # Levenshtein returns a float score for an exact match.
+            return edit_dist if edit_dist > 0 else 0.0
+        return self.sim_function(string1, string2)
+
+
+def _get_bounded_edit_distance(sim_function, tokenizer, threshold, comp_op):
+    # use the bounded kernel only for the comparison operators that reject
+    # the pairs whose distance exceeds the threshold.
+    from py_stringsimjoin import __use_cython__
+    if (not __use_cython__ or tokenizer is not None or
+            comp_op not in ['<=', '<', '='] or
+            not isinstance(getattr(sim_function, '__self__', None),
+                           Levenshtein) or
+            sim_function.__name__ != 'get_raw_score' or
+            not 0 <= threshold < MAX_EDIT_DISTANCE_THRESHOLD):
+        return sim_function
+    return _BoundedEditDistance(sim_function, int(floor(threshold)))
+
+
 def generate_tokens(table, key_attr, join_attr, tokenizer):
     table_nonnull = table[pd.notnull(table[join_attr])]
     return dict(zip(table_nonnull[key_attr],
@@ -1,5 +1,3 @@
-
-from libcpp.vector cimport vector                                               
-
-cdef double dice(const vector[int]& tokens1, const vector[int]& tokens2) nogil
+cdef double dice(const int* tokens1, int size1,
+                 const int* tokens2, int size2) nogil
 
@@ -1,4 +1,12 @@
 
+from libc.stdint cimport uint32_t
 from libcpp.string cimport string
 
+ctypedef fused char_t:
+    unsigned char
+    uint32_t
+
 cdef double edit_distance(const string& str1, const string& str2) nogil
+cdef int bounded_edit_distance(const char_t* str1, int len1,
+                               const char_t* str2, int len2,
+                               int max_dist) nogil
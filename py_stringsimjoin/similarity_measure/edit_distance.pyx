@@ -1,5 +1,7 @@
 
+from libc.stdint cimport uint32_t, uint64_t
 from libcpp.string cimport string                                               
+from libcpp.vector cimport vector
 from libc.stdlib cimport malloc, free
 
 cdef inline int int_min3(int a, int b, int c) nogil:
@@ -45,3 +47,169 @@ cdef double edit_distance(const string& str1, const string& str2) nogil:
     edit_dist = d_mat[len_str1*(len_str2 + 1) + len_str2]
     free(d_mat)
     return <double>edit_dist
+
+
+# maximum length of the shorter string for which the bit-parallel algorithm
+# is used, as the columns of the matrix are encoded in 64 bit words.
+cdef int MAX_BIT_PARALLEL_LENGTH = 64
+
+
+cdef int bounded_edit_distance(const char_t* str1, int len1,
+                               const char_t* str2, int len2,
+                               int max_dist) nogil:
+    # Computes the edit distance between the two strings if it is at most
+    # max_dist, and returns max_dist + 1 otherwise, which is enough to check a
+    # pair against a threshold. The distance is computed with the
+    # bit-parallel algorithm of Myers (in the formulation of Hyyro) when the
+    # shorter string has at most 64 characters, and with a dynamic program
+    # restricted to the diagonal band of width 2 * max_dist + 1 (Ukkonen)
+    # otherwise. Both stop as soon as the distance is known to exceed
+    # max_dist.
+    if len1 > len2:
+        return bounded_edit_distance(str2, len2, str1, len1, max_dist)
+
+    # the distance is at most the length of the longer string.
+    if max_dist > len2:
+        max_dist = len2
+
+    # the distance is at least the difference between the lengths.
+    if len2 - len1 > max_dist:
+        return max_dist + 1
+
+    if len1 == 0:
+        return len2
+
+    if len1 <= MAX_BIT_PARALLEL_LENGTH:
+        return bit_parallel_edit_distance(str1, len1, str2, len2, max_dist)
+    return banded_edit_distance(str1, len1, str2, len2, max_dist)
+
+
+cdef int bit_parallel_edit_distance(const char_t* pattern, int m,
+                                    const char_t* text, int n,
+                                    int max_dist) nogil:
+    # The vertical deltas of a column of the matrix, between the rows of the
+    # pattern, are encoded in the bit vectors pv (+1) and mv (-1), and each
+    # character of the text advances the column in a constant number of word
+    # operations. The score tracks the last row of the column, which is the
+    # distance between the pattern and the prefix of the text read so far.
+    cdef uint64_t peq[256]
+    cdef vector[uint32_t] wide_chars
+    cdef vector[uint64_t] wide_masks
+    cdef uint64_t pv, mv, ph, mh, xv, xh, eq, last_bit
+    cdef uint32_t c
+    cdef int i, j, k, score = m
+
+    # peq holds, for each character, the bit vector of its positions in the
+    # pattern. The characters outside the byte range are kept in a list,
+    # which is short as the pattern has at most 64 characters.
+    for i in range(256):
+        peq[i] = 0
+    for i in range(m):
+        c = pattern[i]
+        if c < 256:
+            peq[c] |= (<uint64_t>1) << i
+        else:
+            for k in range(wide_chars.size() + 1):
+                if k == wide_chars.size():
+                    wide_chars.push_back(c)
+                    wide_masks.push_back((<uint64_t>1) << i)
+                    break
+                if wide_chars[k] == c:
+                    wide_masks[k] |= (<uint64_t>1) << i
+                    break
+
+    last_bit = (<uint64_t>1) << (m - 1)
+    pv = ~(<uint64_t>0)
+    mv = 0
+    for j in range(n):
+        c = text[j]
+        eq = 0
+        if c < 256:
+            eq = peq[c]
+        else:
+            for k in range(wide_chars.size()):
+                if wide_chars[k] == c:
+                    eq = wide_masks[k]
+                    break
+
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last_bit:
+            score += 1
+        elif mh & last_bit:
+            score -= 1
+
+        # the first row of the matrix increases by 1 in each column.
+        ph = (ph << 1) | 1
+        mh = mh << 1
+        pv = mh | ~(xv | ph)
+        mv = ph & xv
+
+        # the score decreases by at most 1 per remaining column.
+        if score - (n - j - 1) > max_dist:
+            return max_dist + 1
+
+    return score if score <= max_dist else max_dist + 1
+
+
+cdef int banded_edit_distance(const char_t* str1, int len1,
+                              const char_t* str2, int len2,
+                              int max_dist) nogil:
+    # Only the cells within max_dist of the main diagonal can hold a distance
+    # of at most max_dist, so the other cells are treated as exceeding it.
+    cdef int exceeded = max_dist + 1
+    cdef vector[int] prev_row = vector[int](len2 + 1, exceeded)
+    cdef vector[int] curr_row = vector[int](len2 + 1, exceeded)
+    cdef int i, j, lo, hi, cost, value, row_min
+
+    for j in range(int_min2(len2, max_dist) + 1):
+        prev_row[j] = j
+
+    for i in range(1, len1 + 1):
+        lo = i - max_dist if i - max_dist > 1 else 1
+        hi = i + max_dist if i + max_dist < len2 else len2
+        curr_row[lo - 1] = i if lo == 1 else exceeded
+        row_min = curr_row[lo - 1]
+        for j in range(lo, hi + 1):
+            cost = 0 if str1[i - 1] == str2[j - 1] else 1
+            value = int_min3(prev_row[j - 1] + cost, prev_row[j] + 1,
+                             curr_row[j - 1] + 1)
+            if value > exceeded:
+                value = exceeded
+            curr_row[j] = value
+            if value < row_min:
+                row_min = value
+        if hi < len2:
+            curr_row[hi + 1] = exceeded
+
+        # the distance is at least the minimum of any row.
+        if row_min > max_dist:
+            return exceeded
+        prev_row.swap(curr_row)
+
+    return prev_row[len2]
+
+
+cdef inline int int_min2(int a, int b) nogil:
+    return a if a <= b else b
+
+
+def bounded_levenshtein(str1, str2, int max_dist):
+    """Computes the Levenshtein distance between two unicode strings if it is
+    at most max_dist, using the threshold-bounded kernel of the edit distance
+    join.
+
+    Returns:
+        The Levenshtein distance if it is at most max_dist, and max_dist + 1
+        otherwise (int).
+    """
+    cdef vector[uint32_t] chars1, chars2
+    cdef Py_UCS4 c
+    for c in str1:
+        chars1.push_back(c)
+    for c in str2:
+        chars2.push_back(c)
+    return bounded_edit_distance(chars1.data(), chars1.size(),
+                                 chars2.data(), chars2.size(), max_dist)
@@ -1,8 +1,7 @@
 
-from libcpp.vector cimport vector 
-
-cdef double jaccard(const vector[int]& tokens1, const vector[int]& tokens2) nogil:
-    cdef int i=0, j=0, size1 = tokens1.size(), size2 = tokens2.size()           
+cdef double jaccard(const int* tokens1, int size1,
+                    const int* tokens2, int size2) nogil:
+    cdef int i=0, j=0
     cdef int sum_of_size = size1 + size2                                        
     if sum_of_size == 0:                                                        
         return 1.0                                                              
@@ -4,6 +4,7 @@ import unittest
 from nose.tools import assert_equal, assert_list_equal, raises
 from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
 from py_stringmatching.similarity_measure.jaccard import Jaccard
+from py_stringmatching.similarity_measure.levenshtein import Levenshtein
 import pandas as pd
 
 from py_stringsimjoin.matcher.apply_matcher import apply_matcher
@@ -176,6 +177,40 @@ class ApplyMatcherTestCases(unittest.TestCase):
         common_pairs = actual_pairs.intersection(expected_pairs)
         assert_equal(len(common_pairs), len(expected_pairs))
 
+    def test_apply_matcher_with_levenshtein(self):
+        sim_func = Levenshtein().get_raw_score
+        candset = self.cartprod.rename(columns={
+                      self.l_key_attr: DEFAULT_L_OUT_PREFIX + self.l_key_attr,
+                      self.r_key_attr: DEFAULT_R_OUT_PREFIX + self.r_key_attr})
+
+        for threshold, comp_op, n_jobs in [(9, '<=', 1), (4.5, '<', 2),
+                                           (3, '=', 1), (9, '>', 1)]:
+            comp_fn = COMP_OP_MAP[comp_op]
+            # compute expected output pairs and their scores
+            expected_pairs = set()
+            for idx, row in self.cartprod.iterrows():
+                edit_dist = sim_func(str(row[self.l_join_attr]),
+                                     str(row[self.r_join_attr]))
+                if comp_fn(edit_dist, threshold):
+                    expected_pairs.add((row[self.l_key_attr],
+                                        row[self.r_key_attr], edit_dist))
+
+            # apply a levenshtein matcher to the candset
+            output_candset = apply_matcher(candset,
+                DEFAULT_L_OUT_PREFIX+self.l_key_attr,
+                DEFAULT_R_OUT_PREFIX+self.r_key_attr,
+                self.ltable, self.rtable, self.l_key_attr, self.r_key_attr,
+                self.l_join_attr, self.r_join_attr, None, sim_func, threshold,
+                comp_op, n_jobs=n_jobs, show_progress=False)
+
+            actual_pairs = set(zip(
+                output_candset[DEFAULT_L_OUT_PREFIX + self.l_key_attr],
+                output_candset[DEFAULT_R_OUT_PREFIX + self.r_key_attr],
+                output_candset['_sim_score']))
+
+            # verify whether the actual pairs and the expected pairs match.
+            assert_equal(actual_pairs, expected_pairs)
+
     def test_apply_matcher_with_allow_missing(self):
         tok = QgramTokenizer(qval=2, return_set=True)
         sim_func = get_sim_function('JACCARD')
@@ -1,14 +1,18 @@
 from functools import partial
 import os
+import random
 import unittest
 
 from nose.tools import assert_equal, assert_list_equal, nottest, raises
+from py_stringmatching.similarity_measure.levenshtein import Levenshtein
 from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
 from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
 from six import iteritems
 import pandas as pd
 
 from py_stringsimjoin.join.edit_distance_join import edit_distance_join
+from py_stringsimjoin.similarity_measure.edit_distance import \
+    bounded_levenshtein
 from py_stringsimjoin.utils.converter import dataframe_column_to_str            
 from py_stringsimjoin.utils.generic_helper import COMP_OP_MAP, \
                                                   remove_redundant_attrs
@@ -164,7 +168,8 @@ def test_edit_distance_join():
 
     # tokenizers to be tested.
     tokenizers = {'2_GRAM': QgramTokenizer(qval=2),
-                  '3_GRAM': QgramTokenizer(qval=3)}
+                  '3_GRAM': QgramTokenizer(qval=3),
+                  '4_GRAM': QgramTokenizer(qval=4)}
 
     # comparison operators to be tested.
     comp_ops = ['<=', '<', '=']
@@ -273,6 +278,151 @@ def test_edit_distance_join():
     yield test_function,
 
 
+class BoundedEditDistanceTestCases(unittest.TestCase):
+    def setUp(self):
+        self.levenshtein = Levenshtein()
+        self.random = random.Random(0)
+
+    def _get_random_string(self, alphabet, length):
+        return u''.join(self.random.choice(alphabet) for _ in range(length))
+
+    def _get_edited_string(self, string, alphabet, num_edits):
+        chars = list(string)
+        for _ in range(num_edits):
+            pos = self.random.randint(0, len(chars))
+            if self.random.random() < 0.5 or pos == len(chars):
+                chars.insert(pos, self.random.choice(alphabet))
+            elif self.random.random() < 0.5:
+                del chars[pos]
+            else:
+                chars[pos] = self.random.choice(alphabet)
+        return u''.join(chars)
+
+    def test_bounded_levenshtein(self):
+        # the strings cover both the bit-parallel kernel (up to 64
+        # characters) and the banded kernel, with characters outside the byte
+        # range.
+        for alphabet in [u'ab', u'abcd', u'ab\xe9\u20ac\U0001F600']:
+            for length in [0, 1, 5, 63, 64, 65, 100]:
+                for _ in range(20):
+                    string1 = self._get_random_string(alphabet, length)
+                    if self.random.random() < 0.5:
+                        string2 = self._get_edited_string(
+                                      string1, alphabet,
+                                      self.random.randint(0, 10))
+                    else:
+                        string2 = self._get_random_string(
+                                      alphabet,
+                                      max(0, length + self.random.randint(-5,
+                                                                          5)))
+                    edit_dist = self.levenshtein.get_raw_score(string1,
+                                                               string2)
+                    for max_dist in [0, 1, 3, 8, 200]:
+                        assert_equal(bounded_levenshtein(string1, string2,
+                                                         max_dist),
+                                     min(edit_dist, max_dist + 1))
+
+    def test_edit_distance_join_long_strings(self):
+        # the join attributes are longer than 64 characters.
+        A = pd.DataFrame({'A.id': range(20),
+                          'A.attr': [self._get_random_string(u'abc', 80)
+                                     for _ in range(20)]})
+        B = pd.DataFrame({'B.id': range(20),
+                          'B.attr': [self._get_edited_string(
+                                         A['A.attr'][i], u'abc', i % 8)
+                                     for i in range(20)]})
+        output = edit_distance_join(A, B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                                    4, show_progress=False)
+        expected_pairs = set()
+        for l_id, l_string in zip(A['A.id'], A['A.attr']):
+            for r_id, r_string in zip(B['B.id'], B['B.attr']):
+                edit_dist = self.levenshtein.get_raw_score(l_string, r_string)
+                if edit_dist <= 4:
+                    expected_pairs.add((l_id, r_id, edit_dist))
+        assert_equal(set(zip(output['l_A.id'], output['r_B.id'],
+                             output['_sim_score'])),
+                     expected_pairs)
+
+
+class ExactEditDistanceJoinTestCases(unittest.TestCase):
+    def setUp(self):
+        self.levenshtein = Levenshtein()
+        self.random = random.Random(0)
+
+    def _get_random_string(self, alphabet):
+        length = self.random.choice([0, 1, 2, 3, 5, 8, 13, 70])
+        return u''.join(self.random.choice(alphabet) for _ in range(length))
+
+    def test_exact_output(self):
+        # the output contains all the pairs satisfying the condition,
+        # including the short strings without a common q-gram.
+        for threshold in [0, 1, 2, 4, 30]:
+            for comp_op in ['<=', '<', '=']:
+                A = pd.DataFrame({'A.id': range(30),
+                                  'A.attr': [self._get_random_string(
+                                                 u'ab\xe9\u20ac')
+                                             for _ in range(30)]})
+                B = pd.DataFrame({'B.id': range(30),
+                                  'B.attr': [self._get_random_string(
+                                                 u'ab\xe9\u20ac')
+                                             for _ in range(30)]})
+                expected_pairs = set()
+                for l_id, l_string in zip(A['A.id'], A['A.attr']):
+                    for r_id, r_string in zip(B['B.id'], B['B.attr']):
+                        edit_dist = self.levenshtein.get_raw_score(l_string,
+                                                                   r_string)
+                        if COMP_OP_MAP[comp_op](edit_dist, threshold):
+                            expected_pairs.add((l_id, r_id, edit_dist))
+                for method, n_jobs in [('passjoin', 1), ('passjoin', 2),
+                                       ('trie', 1), ('trie', 2)]:
+                    output = edit_distance_join(A, B, 'A.id', 'B.id',
+                                                'A.attr', 'B.attr',
+                                                threshold, comp_op,
+                                                n_jobs=n_jobs,
+                                                show_progress=False,
+                                                method=method)
+                    assert_equal(set(zip(output['l_A.id'], output['r_B.id'],
+                                         output['_sim_score'])),
+                                 expected_pairs)
+
+    def test_exact_output_without_common_qgram(self):
+        A = pd.DataFrame([{'A.id': 1, 'A.attr': 'ab'},
+                          {'A.id': 2, 'A.attr': 'abcdef'}])
+        B = pd.DataFrame([{'B.id': 1, 'B.attr': 'ba'},
+                          {'B.id': 2, 'B.attr': 'badcfe'}])
+        output = edit_distance_join(A, B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                                    2, show_progress=False)
+        assert_equal(len(output), 0)
+        for method in ['passjoin', 'trie']:
+            output = edit_distance_join(A, B, 'A.id', 'B.id',
+                                        'A.attr', 'B.attr', 2,
+                                        show_progress=False, method=method)
+            assert_list_equal(list(zip(output['l_A.id'], output['r_B.id'],
+                                       output['_sim_score'])),
+                              [(1, 1, 2)])
+
+
+    def test_trie_strings_sharing_prefixes(self):
+        # the strings share prefixes, and some are prefixes of others or
+        # duplicates.
+        strings = [u'', u'a', u'ab', u'abc', u'abcd', u'abd', u'abd', u'b',
+                   u'ba', u'bac', u'\xe9', u'\xe9a']
+        A = pd.DataFrame({'A.id': range(len(strings)), 'A.attr': strings})
+        B = pd.DataFrame({'B.id': range(len(strings)),
+                          'B.attr': list(reversed(strings))})
+        expected_pairs = set()
+        for l_id, l_string in zip(A['A.id'], A['A.attr']):
+            for r_id, r_string in zip(B['B.id'], B['B.attr']):
+                edit_dist = self.levenshtein.get_raw_score(l_string, r_string)
+                if edit_dist <= 1:
+                    expected_pairs.add((l_id, r_id, edit_dist))
+        output = edit_distance_join(A, B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                                    1, show_progress=False, method='trie')
+        assert_equal(set(zip(output['l_A.id'], output['r_B.id'],
+                             output['_sim_score'])),
+                     expected_pairs)
+
+
 class EditDistJoinInvalidTestCases(unittest.TestCase):
     def setUp(self):
         self.A = pd.DataFrame([{'A.id':1, 'A.attr':'hello', 'A.int_attr':5}])   
@@ -351,3 +501,8 @@ class EditDistJoinInvalidTestCases(unittest.TestCase):
         edit_distance_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
                            self.threshold, self.comp_op, False,
                            ['A.attr'], ['B.invalid_attr'])
+
+    @raises(AssertionError)
+    def test_edit_distance_join_invalid_method(self):
+        edit_distance_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                           self.threshold, method='bktree')
@@ -1,10 +1,27 @@
 import multiprocessing
 import unittest
+from zlib import crc32
 
-from nose.tools import assert_equal, assert_list_equal, raises
+from nose.tools import assert_dict_equal, assert_equal, assert_list_equal, \
+    raises
+from py_stringmatching.tokenizer.alphanumeric_tokenizer import \
+    AlphanumericTokenizer
+from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
+from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
 import pandas as pd
 
-from py_stringsimjoin.utils.generic_helper import get_num_processes_to_launch
+from py_stringsimjoin.filter.filter_utils import divide_skip, \
+    get_char_count_distance, get_location_prefix_length, get_num_long_lists, \
+    merge_skip
+from py_stringsimjoin.index.inverted_index import InvertedIndex
+from py_stringsimjoin.utils.generic_helper import \
+    get_num_processes_to_launch, split_table_by_cost
+from py_stringsimjoin.utils.native_tokenizer_cy import \
+    tokenize_and_order_tables_natively
+from py_stringsimjoin.utils.token_ordering import \
+    gen_sampled_token_ordering, gen_token_ordering_for_tables, \
+    order_using_token_ordering, tokenize_and_order_tables, \
+    tokenize_and_order_tables_in_parallel
 
 
 class GetNumProcessesToLaunchTestCases(unittest.TestCase):
@@ -37,3 +54,271 @@ class GetNumProcessesToLaunchTestCases(unittest.TestCase):
 
     def test_n_jobs_0(self):
         assert_equal(get_num_processes_to_launch(0), 1)
+
+
+class SplitTableByCostTestCases(unittest.TestCase):
+    def setUp(self):
+        self.table = pd.DataFrame([[1, 'aaaaaaaa'], [2, 'a'], [3, 'aaaa'],
+                                   [4, 'aaa'], [5, 'a']]).values
+
+    def test_split_table_by_cost(self):
+        splits, split_ids = split_table_by_cost(self.table, 1, 2)
+        assert_list_equal(split_ids, [[0, 4], [1, 2, 3]])
+        assert_list_equal(list(splits[1][:, 0]), [2, 3, 4])
+
+    def test_split_table_by_cost_more_splits_than_rows(self):
+        splits, split_ids = split_table_by_cost(self.table[:2], 1, 3)
+        assert_list_equal(split_ids, [[0], [1], []])
+        assert_equal(len(splits[2]), 0)
+
+
+class TokenizeAndOrderTablesTestCases(unittest.TestCase):
+    def setUp(self):
+        self.ltable = [['a b c'], ['b c'], ['']]
+        self.rtable = [['c d'], ['e a b'], ['d']]
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+
+    def test_tokenize_and_order_tables(self):
+        token_lists, token_ordering = tokenize_and_order_tables(
+            [self.ltable, self.rtable], [0, 0], self.tokenizer)
+        expected_ordering = gen_token_ordering_for_tables(
+            [self.ltable, self.rtable], [0, 0], self.tokenizer)
+        assert_dict_equal(token_ordering, expected_ordering)
+        assert_list_equal(token_lists, [
+            [order_using_token_ordering(self.tokenizer.tokenize(row[0]),
+                                        expected_ordering) for row in table]
+            for table in [self.ltable, self.rtable]])
+        assert_list_equal(token_lists[0], [[2, 4, 5], [4, 5], []])
+
+    def test_tokenize_and_order_tables_empty(self):
+        assert_equal(tokenize_and_order_tables([[]], [0], self.tokenizer),
+                     ([[]], {}))
+
+    def test_tokenize_and_order_tables_in_parallel(self):
+        token_lists, token_ordering = tokenize_and_order_tables(
+            [self.ltable, self.rtable], [0, 0], self.tokenizer)
+        # with a single row per job, each row is tokenized by a separate job.
+        for n_jobs in [1, 2]:
+            token_arrays, parallel_token_ordering = \
+                tokenize_and_order_tables_in_parallel(
+                    [self.ltable, self.rtable], [0, 0], self.tokenizer,
+                    n_jobs, min_rows_per_job=1)
+            assert_dict_equal(parallel_token_ordering, token_ordering)
+            for (offsets, tokens), table_token_lists in zip(token_arrays,
+                                                            token_lists):
+                assert_list_equal([list(tokens[offsets[i]:offsets[i + 1]])
+                                   for i in range(len(offsets) - 1)],
+                                  table_token_lists)
+
+    def test_tokenize_and_order_tables_with_positions(self):
+        tokenizer = DelimiterTokenizer(delim_set=[' '])
+        ltable = [['c a c b'], ['']]
+        rtable = [['b a']]
+        token_lists, token_ordering, position_lists = \
+            tokenize_and_order_tables([ltable, rtable], [0, 0], tokenizer,
+                                      return_positions=True)
+        assert_list_equal(token_lists, [[[1, 2, 3, 3], []], [[1, 2]]])
+        # the tokens with the same rank are ordered by their positions.
+        assert_list_equal(position_lists, [[[1, 3, 0, 2], []], [[1, 0]]])
+        for n_jobs in [1, 2]:
+            token_arrays, _ = tokenize_and_order_tables_in_parallel(
+                [ltable, rtable], [0, 0], tokenizer, n_jobs,
+                min_rows_per_job=1, return_positions=True)
+            for (offsets, tokens, positions), table_position_lists in zip(
+                    token_arrays, position_lists):
+                assert_list_equal([list(positions[offsets[i]:offsets[i + 1]])
+                                   for i in range(len(offsets) - 1)],
+                                  table_position_lists)
+
+    def test_tokenize_and_order_tables_in_parallel_empty(self):
+        token_arrays, token_ordering = tokenize_and_order_tables_in_parallel(
+            [[]], [0], self.tokenizer, 2, min_rows_per_job=1)
+        assert_list_equal(list(token_arrays[0][0]), [0])
+        assert_equal(len(token_arrays[0][1]), 0)
+        assert_dict_equal(token_ordering, {})
+
+
+class SampledTokenOrderingTestCases(unittest.TestCase):
+    def setUp(self):
+        self.ltable = [['a b c'], ['b c'], ['']]
+        self.rtable = [['c d'], ['e a b'], ['d']]
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+
+    def test_sample_of_all_records(self):
+        # if all the records are sampled, the ordering is the exact ordering.
+        token_ordering = gen_sampled_token_ordering(
+            [self.ltable, self.rtable], [0, 0], self.tokenizer, 3)
+        assert_equal(len(token_ordering), 5)
+        assert_equal(tokenize_and_order_tables(
+                         [self.ltable, self.rtable], [0, 0], self.tokenizer,
+                         token_ordering),
+                     tokenize_and_order_tables(
+                         [self.ltable, self.rtable], [0, 0], self.tokenizer))
+
+    def test_unseen_tokens(self):
+        token_ordering = gen_sampled_token_ordering([self.ltable], [0],
+                                                    self.tokenizer, 3)
+        # the unseen tokens are ordered before the sampled tokens, by their
+        # hash.
+        assert_list_equal(sorted(['a', 'b', 'c', 'd', 'e'],
+                                 key=token_ordering.get),
+                          sorted(['d', 'e'],
+                                 key=lambda token: crc32(token.encode())) +
+                          ['a', 'b', 'c'])
+        assert_equal(token_ordering.get('e'), token_ordering.get('e'))
+        assert_equal(gen_sampled_token_ordering(
+                         [self.rtable], [0], self.tokenizer, 3).get('x'),
+                     token_ordering.get('x'))
+
+        token_lists, ordering = tokenize_and_order_tables(
+            [self.ltable, self.rtable], [0, 0], self.tokenizer,
+            token_ordering)
+        assert_equal(sorted(ordering.values()), [1, 2, 3, 4, 5])
+        assert_list_equal([ordering[token] for token in 'abc'], [3, 4, 5])
+        assert_list_equal(token_lists[1],
+                          [sorted([ordering['c'], ordering['d']]),
+                           sorted([ordering['e'], 3, 4]), [ordering['d']]])
+
+    def test_sample_is_deterministic(self):
+        table = [[str(i)] for i in range(100)]
+        token_orderings = [gen_sampled_token_ordering([table], [0],
+                                                      self.tokenizer, 10)
+                           for _ in range(2)]
+        assert_equal(len(token_orderings[0].sampled_token_ordering), 10)
+        assert_dict_equal(token_orderings[0].sampled_token_ordering,
+                          token_orderings[1].sampled_token_ordering)
+
+
+class TokenizeAndOrderTablesNativelyTestCases(unittest.TestCase):
+    def setUp(self):
+        self.ltable = [['data science'], ['  data,,integration '], [''],
+                       ['caf\xe9 na\xefve'], ['\u6570\u636e \U0001f600x'],
+                       ['aaaa']]
+        self.rtable = [['science, data'], ['a'], ['b b b'], ['caf\xe9']]
+
+    def assert_same_tokens(self, tokenizer):
+        token_arrays = tokenize_and_order_tables_natively(
+            [self.ltable, self.rtable], [0, 0], tokenizer)
+        expected_token_arrays, _ = tokenize_and_order_tables_in_parallel(
+            [self.ltable, self.rtable], [0, 0], tokenizer, 1)
+        for (offsets, tokens), (expected_offsets, expected_tokens) in zip(
+                token_arrays, expected_token_arrays):
+            assert_list_equal(list(offsets), list(expected_offsets))
+            assert_list_equal(list(tokens), list(expected_tokens))
+
+    def test_delimiter_tokenizers(self):
+        for delim_set in [[' '], [' ', ','], ['\xe9']]:
+            for return_set in [True, False]:
+                self.assert_same_tokens(DelimiterTokenizer(
+                    delim_set=delim_set, return_set=return_set))
+
+    def test_qgram_tokenizers(self):
+        for qval in [1, 2, 3]:
+            for padding in [True, False]:
+                for return_set in [True, False]:
+                    self.assert_same_tokens(QgramTokenizer(
+                        qval=qval, padding=padding, prefix_pad='^',
+                        suffix_pad='\U0001f600', return_set=return_set))
+
+    def test_qgram_tokenizers_with_positions(self):
+        for qval in [1, 2, 3]:
+            tokenizer = QgramTokenizer(qval=qval, return_set=False)
+            token_arrays = tokenize_and_order_tables_natively(
+                [self.ltable, self.rtable], [0, 0], tokenizer, True)
+            expected_token_arrays, _ = tokenize_and_order_tables_in_parallel(
+                [self.ltable, self.rtable], [0, 0], tokenizer, 1,
+                return_positions=True)
+            for token_array, expected_token_array in zip(
+                    token_arrays, expected_token_arrays):
+                for array, expected_array in zip(token_array,
+                                                 expected_token_array):
+                    assert_list_equal(list(array), list(expected_array))
+
+        # positions are not supported for tokenizers returning sets.
+        assert_equal(tokenize_and_order_tables_natively(
+            [self.ltable], [0], QgramTokenizer(return_set=True), True), None)
+
+    def test_unsupported_tokenizers(self):
+        for tokenizer in [QgramTokenizer(qval=4),
+                          DelimiterTokenizer(delim_set=['ab']),
+                          AlphanumericTokenizer()]:
+            assert_equal(tokenize_and_order_tables_natively(
+                [self.ltable], [0], tokenizer), None)
+
+    def test_unsupported_values(self):
+        assert_equal(tokenize_and_order_tables_natively(
+            [[['a'], [b'b']]], [0], QgramTokenizer()), None)
+
+
+class EditDistanceFilterTestCases(unittest.TestCase):
+    def test_location_prefix_length(self):
+        # the 3-grams at the locations 0 to 2 are destroyed by an edit
+        # operation at location 2, and the 3-gram at location 6 needs another
+        # one.
+        assert_equal(get_location_prefix_length([0, 2, 1, 6, 4], 3, 1), 4)
+        assert_equal(get_location_prefix_length([0, 1, 2, 3, 4], 2, 1), 3)
+        # the prefix has at most qval * threshold + 1 q-grams.
+        assert_equal(get_location_prefix_length(list(range(10)), 3, 2), 7)
+        assert_equal(get_location_prefix_length([0, 8], 3, 0), 1)
+        # the q-grams of a string that can be destroyed by threshold edit
+        # operations are all in the prefix.
+        assert_equal(get_location_prefix_length([0, 1, 2], 3, 1), 3)
+        assert_equal(get_location_prefix_length([], 3, 1), 0)
+
+    def test_char_count_distance(self):
+        assert_equal(get_char_count_distance({'a': 2, 'b': 1},
+                                             {'a': 1, 'c': 2}), 4)
+        assert_equal(get_char_count_distance({}, {'a': 1}), 1)
+        assert_equal(get_char_count_distance({'a': 1}, {'a': 1}), 0)
+
+
+class ListMergingTestCases(unittest.TestCase):
+    def setUp(self):
+        self.lists = [[1, 3, 5, 7, 9], [3, 4, 5, 9], [0, 5, 9], [2, 9], [5]]
+        # the number of lists containing each id.
+        self.occurrences = {0: 1, 1: 1, 2: 1, 3: 2, 4: 1, 5: 4, 7: 1, 9: 4}
+
+    def expected_output(self, threshold):
+        return dict((cand, count) for cand, count in
+                    self.occurrences.items() if count >= threshold)
+
+    def test_merge_skip(self):
+        for threshold in range(1, 7):
+            assert_dict_equal(merge_skip(self.lists, threshold),
+                              self.expected_output(threshold))
+
+    def test_merge_skip_empty_lists(self):
+        assert_dict_equal(merge_skip([[], [1, 2], []], 1), {1: 1, 2: 1})
+        assert_dict_equal(merge_skip([], 2), {})
+
+    def test_divide_skip(self):
+        for threshold in range(2, 7):
+            for num_long_lists in range(threshold):
+                assert_dict_equal(divide_skip(self.lists, threshold,
+                                              num_long_lists),
+                                  self.expected_output(threshold))
+
+    def test_num_long_lists(self):
+        # the lists that are much longer than the others are long.
+        assert_equal(get_num_long_lists([9000, 9000, 6, 6], 3), 2)
+        assert_equal(get_num_long_lists([9000, 6, 6, 6], 2), 1)
+        # the short lists are scanned, so a long list is only worth skipping
+        # if the short lists are much shorter.
+        assert_equal(get_num_long_lists([9000, 9000, 9000, 6], 3), 0)
+        # lists of similar lengths are all scanned.
+        assert_equal(get_num_long_lists([10, 9, 8, 8], 3), 0)
+        assert_equal(get_num_long_lists([9000, 9000, 6, 6], 1), 0)
+        assert_equal(get_num_long_lists([], 3), 0)
+
+    def test_inverted_index_long_lists(self):
+        table = [(0, 'a b'), (1, 'a c'), (2, 'a'), (3, 'a b')]
+        table.extend([(i, 'a') for i in range(4, 100)])
+        index = InvertedIndex(table, 1,
+                              DelimiterTokenizer(delim_set=[' '],
+                                                 return_set=True))
+        index.build()
+        assert_list_equal(index.get_long_lists(2), [('a', 100)])
+        assert_list_equal(index.get_long_lists(2, ['b', 'c', 'a', 'd']),
+                          [('a', 100)])
+        assert_list_equal(index.get_long_lists(2, ['b', 'c']), [])
+        assert_list_equal(index.get_long_lists(1), [])
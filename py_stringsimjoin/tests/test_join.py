@@ -9,9 +9,14 @@ from six import iteritems
 import pandas as pd
 
 from py_stringsimjoin.join.cosine_join import cosine_join
+from py_stringsimjoin.join.cosine_join_py import cosine_join_py
 from py_stringsimjoin.join.dice_join import dice_join
+from py_stringsimjoin.join.dice_join_py import dice_join_py
 from py_stringsimjoin.join.jaccard_join import jaccard_join
+from py_stringsimjoin.join.jaccard_join_py import jaccard_join_py
 from py_stringsimjoin.join.overlap_coefficient_join import overlap_coefficient_join
+from py_stringsimjoin.join.overlap_coefficient_join_py import \
+    overlap_coefficient_join_py
 from py_stringsimjoin.join.overlap_join import overlap_join
 from py_stringsimjoin.utils.converter import dataframe_column_to_str
 from py_stringsimjoin.utils.generic_helper import COMP_OP_MAP, \
@@ -24,15 +29,22 @@ JOIN_FN_MAP = {'COSINE': cosine_join,
                'JACCARD': jaccard_join, 
                'OVERLAP_COEFFICIENT': overlap_coefficient_join}
 
+# join functions of the Python implementation, used to test the Python
+# implementation irrespective of whether the Cython implementation is enabled.
+PY_JOIN_FN_MAP = {'COSINE': cosine_join_py,
+                  'DICE': dice_join_py,
+                  'JACCARD': jaccard_join_py}
+
 DEFAULT_COMP_OP = '>='
 DEFAULT_L_OUT_PREFIX = 'l_'
 DEFAULT_R_OUT_PREFIX = 'r_'
 
 @nottest
-def test_valid_join(scenario, sim_measure_type, args, convert_to_str=False):
+def test_valid_join(scenario, sim_measure_type, args, convert_to_str=False,
+                    join_fn_map=JOIN_FN_MAP):
     (ltable_path, l_key_attr, l_join_attr) = scenario[0]
     (rtable_path, r_key_attr, r_join_attr) = scenario[1]
-    join_fn = JOIN_FN_MAP[sim_measure_type]
+    join_fn = join_fn_map[sim_measure_type]
 
     # load input tables for the tests.
     ltable = pd.read_csv(os.path.join(os.path.dirname(__file__),
@@ -159,6 +171,65 @@ def test_valid_join(scenario, sim_measure_type, args, convert_to_str=False):
     common_pairs = actual_pairs.intersection(expected_pairs)
     assert_equal(len(common_pairs), len(expected_pairs))
 
+@nottest
+def test_valid_self_join(scenario, sim_measure_type, args):
+    (table_path, key_attr, join_attr) = scenario
+    join_fn = JOIN_FN_MAP[sim_measure_type]
+
+    # load input table for the tests.
+    table = pd.read_csv(os.path.join(os.path.dirname(__file__), table_path))
+
+    sim_func = get_sim_function(sim_measure_type)
+
+    comp_fn = COMP_OP_MAP[DEFAULT_COMP_OP]
+    # Check for comp_op in args.
+    if len(args) > 2:
+        comp_fn = COMP_OP_MAP[args[2]]
+
+    allow_empty = True
+    # Check for allow_empty in args.
+    if len(args) > 3:
+        allow_empty = args[3]
+
+    allow_missing = len(args) > 4 and args[4]
+
+    # compute the expected pairs. In a self join, a pair (a, b) is expected
+    # only if a occurs before b in the table.
+    expected_pairs = set()
+    rows = [row for idx, row in table.iterrows()]
+    for r_pos in range(len(rows)):
+        for l_pos in range(r_pos):
+            l_row, r_row = rows[l_pos], rows[r_pos]
+            pair = ','.join((str(l_row[key_attr]), str(r_row[key_attr])))
+            if (pd.isnull(l_row[join_attr]) or pd.isnull(r_row[join_attr])):
+                if allow_missing:
+                    expected_pairs.add(pair)
+                continue
+
+            l_tokens = args[0].tokenize(str(l_row[join_attr]))
+            r_tokens = args[0].tokenize(str(r_row[join_attr]))
+            if not allow_empty and (len(l_tokens) == 0 or len(r_tokens) == 0):
+                continue
+
+            if comp_fn(round(sim_func(l_tokens, r_tokens), 4), args[1]):
+                expected_pairs.add(pair)
+
+    # use join function to obtain actual output pairs.
+    actual_candset = join_fn(table, table,
+                             key_attr, key_attr,
+                             join_attr, join_attr,
+                             *args, self_join=True)
+
+    actual_pairs = []
+    for idx, row in actual_candset.iterrows():
+        actual_pairs.append(','.join((str(row[DEFAULT_L_OUT_PREFIX + key_attr]),
+                                      str(row[DEFAULT_R_OUT_PREFIX + key_attr]))))
+
+    # verify that each pair is output only once and that the actual pairs
+    # and the expected pairs match.
+    assert_equal(len(actual_pairs), len(set(actual_pairs)))
+    assert_equal(set(actual_pairs), expected_pairs)
+
 def test_set_sim_join():
     # data to be tested.
     test_scenario_1 = [(os.sep.join(['data', 'table_A.csv']), 'A.ID', 'A.name'),
@@ -267,6 +338,55 @@ def test_set_sim_join():
                                     ' with n_jobs above 1.'
         yield test_function,
 
+    # Test each similarity measure, except overlap coefficient, with the
+    # suffix filter enabled.
+    for sim_measure_type in ['COSINE', 'DICE', 'JACCARD']:
+        for threshold in [0.3, 0.7]:
+            for max_depth in [1, 2, 4]:
+                test_function = partial(test_valid_join, test_scenario_1,
+                                        sim_measure_type,
+                                        (tokenizers['3_GRAM'], threshold,
+                                         '>=', True, False, None, None,
+                                         'l_', 'r_', True, 1, False, False,
+                                         max_depth))
+                test_function.description = 'Test ' + sim_measure_type + \
+                    ' with ' + str(threshold) + ' threshold and suffix ' + \
+                    'filter of max depth ' + str(max_depth) + '.'
+                yield test_function,
+
+    # Test the Python implementation of each similarity measure, except
+    # overlap coefficient, with the suffix filter enabled.
+    for sim_measure_type in ['COSINE', 'DICE', 'JACCARD']:
+        for threshold in [0.4, 0.5, 0.8]:
+            for tok_type in ['2_GRAM', '3_GRAM']:
+                test_function = partial(test_valid_join, test_scenario_1,
+                                        sim_measure_type,
+                                        (tokenizers[tok_type], threshold,
+                                         '>=', True, False, None, None,
+                                         'l_', 'r_', True, 1, False, False,
+                                         2),
+                                        join_fn_map=PY_JOIN_FN_MAP)
+                test_function.description = 'Test Python implementation ' + \
+                    'of ' + sim_measure_type + ' with ' + str(threshold) + \
+                    ' threshold, ' + tok_type + ' tokenizer and suffix filter.'
+                yield test_function,
+
+    # Test the Python implementation of overlap coefficient.
+    for threshold in [0.3, 0.7, 1]:
+        for tok_type in ['SPACE_DELIMITER', '2_GRAM']:
+            for comp_op in ['>=', '>', '=']:
+                test_function = partial(test_valid_join, test_scenario_1,
+                                        'OVERLAP_COEFFICIENT',
+                                        (tokenizers[tok_type], threshold,
+                                         comp_op, False),
+                                        join_fn_map={'OVERLAP_COEFFICIENT':
+                                            overlap_coefficient_join_py})
+                test_function.description = 'Test Python implementation ' + \
+                    'of OVERLAP_COEFFICIENT with ' + str(threshold) + \
+                    ' threshold, ' + tok_type + ' tokenizer and comp_op ' + \
+                    comp_op + '.'
+                yield test_function,
+
     # scenario where join attributes are of type int
     test_scenario_2 = [(os.sep.join(['data', 'table_A.csv']), 'A.ID', 'A.zipcode'),
                        (os.sep.join(['data', 'table_B.csv']), 'B.ID', 'B.zipcode')]
@@ -326,6 +446,80 @@ def test_set_sim_join():
         yield test_function,
 
 
+def test_set_sim_self_join():
+    test_scenario = (os.sep.join(['data', 'table_A.csv']), 'A.ID', 'A.name')
+
+    # similarity measures to be tested.
+    sim_measure_types = ['COSINE', 'DICE', 'JACCARD']
+
+    # tokenizers to be tested.
+    tokenizers = {'SPACE_DELIMITER': DelimiterTokenizer(delim_set=[' '],
+                                                        return_set=True),
+                  '2_GRAM': QgramTokenizer(qval=2, return_set=True)}
+
+    # Test each combination of similarity measure, threshold and tokenizer.
+    for sim_measure_type in sim_measure_types:
+        for threshold in [0.3, 0.5, 0.7, 1]:
+            for tok_type, tok in iteritems(tokenizers):
+                test_function = partial(test_valid_self_join, test_scenario,
+                                        sim_measure_type, (tok, threshold))
+                test_function.description = 'Test ' + sim_measure_type + \
+                    ' self join with ' + str(threshold) + ' threshold and ' + \
+                    tok_type + ' tokenizer.'
+                yield test_function,
+
+    # Test each similarity measure with allow_missing set to True and with
+    # n_jobs above 1.
+    for sim_measure_type in sim_measure_types:
+        for n_jobs in [1, 2]:
+            test_function = partial(test_valid_self_join, test_scenario,
+                                    sim_measure_type,
+                                    (tokenizers['SPACE_DELIMITER'],
+                                     0.3, '>=', True, True, None, None,
+                                     'l_', 'r_', True, n_jobs))
+            test_function.description = 'Test ' + sim_measure_type + \
+                ' self join with allow_missing set to True and n_jobs ' + \
+                str(n_jobs) + '.'
+            yield test_function,
+
+class SuffixFilterJoinTestCases(unittest.TestCase):
+    def setUp(self):
+        # the Jaccard score between the join attributes is exactly 0.4.
+        self.A = pd.DataFrame([{'A.id':1, 'A.attr':'a b c'}])
+        self.B = pd.DataFrame([{'B.id':1, 'B.attr':'a b d e'}])
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+
+    def test_jaccard_join_suffix_filter_score_equal_to_threshold(self):
+        for join_fn in [jaccard_join, jaccard_join_py]:
+            output = join_fn(self.A, self.B, 'A.id', 'B.id', 'A.attr',
+                             'B.attr', self.tokenizer, 0.4,
+                             suffix_filter_max_depth=2)
+            assert_equal(len(output), 1)
+
+
+class OverlapCoefficientJoinTestCases(unittest.TestCase):
+    def setUp(self):
+        # the smaller record of each matching pair is on either side, or both
+        # the records have the same size.
+        self.A = pd.DataFrame([{'A.id':1, 'A.attr':'a b'},
+                               {'A.id':2, 'A.attr':'a b c d e f'},
+                               {'A.id':3, 'A.attr':'c d e'}])
+        self.B = pd.DataFrame([{'B.id':1, 'B.attr':'a b c d'},
+                               {'B.id':2, 'B.attr':'c d'},
+                               {'B.id':3, 'B.attr':'c d f'}])
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+
+    def test_overlap_coefficient_join_smaller_record_on_either_side(self):
+        for join_fn in [overlap_coefficient_join, overlap_coefficient_join_py]:
+            output = join_fn(self.A, self.B, 'A.id', 'B.id', 'A.attr',
+                             'B.attr', self.tokenizer, 2.0 / 3)
+            assert_list_equal(sorted(zip(output['l_A.id'], output['r_B.id'],
+                                         output['_sim_score'].round(4))),
+                              [(1, 1, 1.0), (2, 1, 1.0), (2, 2, 1.0),
+                               (2, 3, 1.0), (3, 1, 0.6667), (3, 2, 1.0),
+                               (3, 3, 0.6667)])
+
+
 class JaccardJoinInvalidTestCases(unittest.TestCase):
     def setUp(self):
         self.A = pd.DataFrame([{'A.id':1, 'A.attr':'hello', 'A.int_attr':5}])
@@ -415,6 +609,17 @@ class JaccardJoinInvalidTestCases(unittest.TestCase):
                      self.tokenizer, self.threshold, '>=', True, False,
                      ['A.attr'], ['B.invalid_attr'])
 
+    @raises(AssertionError)
+    def test_jaccard_join_invalid_self_join(self):
+        jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                     self.tokenizer, self.threshold, self_join=True)
+
+    @raises(TypeError)
+    def test_jaccard_join_invalid_suffix_filter_max_depth_type(self):
+        jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                     self.tokenizer, self.threshold,
+                     suffix_filter_max_depth='2')
+
 
 class CosineJoinInvalidTestCases(unittest.TestCase):
     def setUp(self):
@@ -505,6 +710,16 @@ class CosineJoinInvalidTestCases(unittest.TestCase):
                     self.tokenizer, self.threshold, '>=', True, False,
                     ['A.attr'], ['B.invalid_attr'])
 
+    @raises(AssertionError)
+    def test_cosine_join_invalid_self_join(self):
+        cosine_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                    self.tokenizer, self.threshold, self_join=True)
+
+    @raises(AssertionError)
+    def test_cosine_join_invalid_suffix_filter_max_depth(self):
+        cosine_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                    self.tokenizer, self.threshold, suffix_filter_max_depth=-1)
+
 
 class DiceJoinInvalidTestCases(unittest.TestCase):
     def setUp(self):
@@ -595,6 +810,16 @@ class DiceJoinInvalidTestCases(unittest.TestCase):
                   self.tokenizer, self.threshold, '>=', True, False,
                   ['A.attr'], ['B.invalid_attr'])
 
+    @raises(AssertionError)
+    def test_dice_join_invalid_self_join(self):
+        dice_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                  self.tokenizer, self.threshold, self_join=True)
+
+    @raises(TypeError)
+    def test_dice_join_invalid_suffix_filter_max_depth_type(self):
+        dice_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                  self.tokenizer, self.threshold, suffix_filter_max_depth=1.5)
+
 
 class OverlapCoefficientJoinInvalidTestCases(unittest.TestCase):
     def setUp(self):
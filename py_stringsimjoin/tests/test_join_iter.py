@@ -0,0 +1,125 @@
+from functools import partial
+import os
+import unittest
+
+from nose.tools import assert_equal, assert_list_equal, nottest, raises
+from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
+from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
+import pandas as pd
+
+from py_stringsimjoin.join.cosine_join import cosine_join, cosine_join_iter
+from py_stringsimjoin.join.dice_join import dice_join, dice_join_iter
+from py_stringsimjoin.join.edit_distance_join import edit_distance_join, \
+    edit_distance_join_iter
+from py_stringsimjoin.join.jaccard_join import jaccard_join, \
+    jaccard_join_iter
+from py_stringsimjoin.join.overlap_coefficient_join import \
+    overlap_coefficient_join, overlap_coefficient_join_iter
+from py_stringsimjoin.join.overlap_join import overlap_join, \
+    overlap_join_iter
+
+
+JOIN_FN_MAP = {'COSINE': (cosine_join, cosine_join_iter),
+               'DICE': (dice_join, dice_join_iter),
+               'EDIT_DISTANCE': (edit_distance_join, edit_distance_join_iter),
+               'JACCARD': (jaccard_join, jaccard_join_iter),
+               'OVERLAP': (overlap_join, overlap_join_iter),
+               'OVERLAP_COEFFICIENT': (overlap_coefficient_join,
+                                       overlap_coefficient_join_iter)}
+
+
+def get_output_pairs(output_table):
+    # the pairs with a missing value have a NaN score, which is replaced so
+    # that the pairs can be compared.
+    return sorted(zip(output_table['l_A.ID'].astype(str),
+                      output_table['r_B.ID'].astype(str),
+                      output_table['_sim_score'].fillna(-1).round(4)))
+
+
+@nottest
+def test_valid_join_iter(sim_measure_type, args, chunk_size, kwargs={}):
+    (join_fn, join_iter_fn) = JOIN_FN_MAP[sim_measure_type]
+
+    # load input tables for the tests.
+    ltable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      'data', 'table_A.csv'))
+    rtable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      'data', 'table_B.csv'))
+
+    expected_output = join_fn(ltable, rtable, 'A.ID', 'B.ID',
+                              'A.name', 'B.name', *args, **kwargs)
+
+    chunks = list(join_iter_fn(ltable, rtable, 'A.ID', 'B.ID',
+                               'A.name', 'B.name', *args,
+                               chunk_size=chunk_size, **kwargs))
+
+    # the right table is split into chunks of chunk_size rows.
+    assert_equal(len(chunks), max(1, -(-len(rtable) // chunk_size)))
+    for chunk in chunks:
+        assert_list_equal(list(chunk.columns.values),
+                          list(expected_output.columns.values))
+
+    # the concatenation of the chunks is the output of the join, with unique
+    # ids.
+    actual_output = pd.concat(chunks)
+    assert_list_equal(list(actual_output['_id']),
+                      list(range(len(expected_output))))
+    assert_list_equal(get_output_pairs(actual_output),
+                      get_output_pairs(expected_output))
+
+
+def test_join_iter():
+    delim_tok = DelimiterTokenizer(delim_set=[' '], return_set=True)
+    qgram_tok = QgramTokenizer(qval=2, return_set=True)
+    test_cases = [('JACCARD', (delim_tok, 0.3), {}),
+                  ('JACCARD', (qgram_tok, 0.5),
+                   {'allow_missing': True, 'l_out_attrs': ['A.name'],
+                    'r_out_attrs': ['B.name']}),
+                  ('COSINE', (qgram_tok, 0.5), {'n_jobs': 2}),
+                  ('DICE', (qgram_tok, 0.6), {'allow_empty': False}),
+                  ('EDIT_DISTANCE', (4, ), {}),
+                  ('OVERLAP', (delim_tok, 1), {}),
+                  ('OVERLAP_COEFFICIENT', (delim_tok, 0.5), {})]
+
+    for (sim_measure_type, args, kwargs) in test_cases:
+        for chunk_size in [1, 7, 100000]:
+            test_function = partial(test_valid_join_iter, sim_measure_type,
+                                    args, chunk_size, kwargs)
+            test_function.description = 'Test ' + sim_measure_type + \
+                ' join iter with chunk_size = ' + str(chunk_size) + \
+                ' and ' + str(kwargs) + '.'
+            yield test_function,
+
+
+class JoinIterTestCases(unittest.TestCase):
+    def setUp(self):
+        self.A = pd.DataFrame([{'A.id':1, 'A.attr':'hello world'},
+                               {'A.id':2, 'A.attr':'hello'}])
+        self.B = pd.DataFrame([{'B.id':1, 'B.attr':'hello world'},
+                               {'B.id':2, 'B.attr':'world'}])
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+
+    def test_join_iter_empty_rtable(self):
+        # an empty right table yields a single empty output table.
+        chunks = list(jaccard_join_iter(self.A, self.B[:0], 'A.id', 'B.id',
+                                        'A.attr', 'B.attr', self.tokenizer,
+                                        0.3, chunk_size=1))
+        assert_equal(len(chunks), 1)
+        assert_equal(len(chunks[0]), 0)
+        assert_list_equal(list(chunks[0].columns.values),
+                          ['_id', 'l_A.id', 'r_B.id', '_sim_score'])
+
+    @raises(TypeError)
+    def test_join_iter_invalid_chunk_size_type(self):
+        jaccard_join_iter(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                          self.tokenizer, 0.3, chunk_size='1')
+
+    @raises(AssertionError)
+    def test_join_iter_invalid_chunk_size_zero(self):
+        overlap_join_iter(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                          self.tokenizer, 1, chunk_size=0)
+
+    @raises(TypeError)
+    def test_join_iter_invalid_rtable(self):
+        edit_distance_join_iter(self.A, [], 'A.id', 'B.id', 'A.attr',
+                                'B.attr', 2)
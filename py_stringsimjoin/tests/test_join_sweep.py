@@ -0,0 +1,133 @@
+from functools import partial
+import os
+import unittest
+
+from nose.tools import assert_equal, assert_list_equal, nottest, raises
+from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
+from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
+import pandas as pd
+
+from py_stringsimjoin.index.set_sim_join_index import SetSimJoinIndex
+from py_stringsimjoin.join.cosine_join import cosine_join, cosine_join_sweep
+from py_stringsimjoin.join.dice_join import dice_join, dice_join_sweep
+from py_stringsimjoin.join.jaccard_join import jaccard_join, \
+    jaccard_join_sweep
+
+
+JOIN_FN_MAP = {'COSINE': (cosine_join, cosine_join_sweep),
+               'DICE': (dice_join, dice_join_sweep),
+               'JACCARD': (jaccard_join, jaccard_join_sweep)}
+
+
+def get_output_pairs(output_table, l_key_attr, r_key_attr):
+    # the pairs with a missing value have a NaN score, which is replaced so
+    # that the pairs can be compared.
+    return sorted(zip(output_table[l_key_attr].astype(str),
+                      output_table[r_key_attr].astype(str),
+                      output_table['_sim_score'].fillna(-1).round(4)))
+
+
+@nottest
+def test_valid_join_sweep(sim_measure_type, args, thresholds, kwargs={}):
+    (join_fn, join_sweep_fn) = JOIN_FN_MAP[sim_measure_type]
+
+    # load input tables for the tests.
+    ltable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      'data', 'table_A.csv'))
+    rtable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      'data', 'table_B.csv'))
+    if kwargs.get('self_join'):
+        rtable = ltable
+        join_args = ('A.ID', 'A.ID', 'A.name', 'A.name')
+        r_key_attr = 'r_A.ID'
+    else:
+        join_args = ('A.ID', 'B.ID', 'A.name', 'B.name')
+        r_key_attr = 'r_B.ID'
+
+    output = join_sweep_fn(ltable, rtable, *(join_args + args + (thresholds,)),
+                           **kwargs)
+    assert_list_equal(list(output.columns.values)[-2:],
+                      ['_sim_score', '_threshold'])
+
+    # the pairs tagged with a threshold greater than or equal to a threshold
+    # of the sweep are the output of the join at that threshold.
+    for threshold in thresholds:
+        expected_output = join_fn(ltable, rtable,
+                                  *(join_args + args + (threshold, )),
+                                  **kwargs)
+        assert_list_equal(
+            get_output_pairs(output[output['_threshold'] >= threshold],
+                             'l_A.ID', r_key_attr),
+            get_output_pairs(expected_output, 'l_A.ID', r_key_attr))
+
+    # each pair is tagged with one of the thresholds.
+    assert_equal(set(output['_threshold']) - set(thresholds), set())
+
+
+def test_join_sweep():
+    delim_tok = DelimiterTokenizer(delim_set=[' '], return_set=True)
+    qgram_tok = QgramTokenizer(qval=2, return_set=True)
+    test_cases = [('JACCARD', (delim_tok, ), [0.3, 0.5, 0.7, 0.9], {}),
+                  ('JACCARD', (qgram_tok, ), [0.8, 0.4, 0.6],
+                   {'allow_missing': True, 'l_out_attrs': ['A.name'],
+                    'r_out_attrs': ['B.name']}),
+                  ('JACCARD', (qgram_tok, ), [0.4, 0.6], {'self_join': True}),
+                  ('COSINE', (qgram_tok, ), [0.5, 0.7, 1.0], {'n_jobs': 2}),
+                  ('DICE', (qgram_tok, ), [0.6, 0.75],
+                   {'allow_empty': False, 'suffix_filter_max_depth': 2}),
+                  ('DICE', (delim_tok, ), [0.5], {})]
+
+    for (sim_measure_type, args, thresholds, kwargs) in test_cases:
+        test_function = partial(test_valid_join_sweep, sim_measure_type,
+                                args, thresholds, kwargs)
+        test_function.description = 'Test ' + sim_measure_type + \
+            ' join sweep with thresholds = ' + str(thresholds) + \
+            ' and ' + str(kwargs) + '.'
+        yield test_function,
+
+
+class JoinSweepTestCases(unittest.TestCase):
+    def setUp(self):
+        self.A = pd.DataFrame([{'A.id':1, 'A.attr':'hello world'},
+                               {'A.id':2, 'A.attr':'hello'},
+                               {'A.id':3, 'A.attr':None}])
+        self.B = pd.DataFrame([{'B.id':1, 'B.attr':'hello world'},
+                               {'B.id':2, 'B.attr':'world'}])
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+
+    def test_join_sweep_thresholds(self):
+        output = jaccard_join_sweep(self.A, self.B, 'A.id', 'B.id', 'A.attr',
+                                    'B.attr', self.tokenizer, [0.9, 0.5, 0.3],
+                                    out_sim_score=False, allow_missing=True)
+        assert_list_equal(list(output.columns.values),
+                          ['_id', 'l_A.id', 'r_B.id', '_threshold'])
+        # a pair with a missing value is tagged with the highest threshold.
+        assert_list_equal(sorted(zip(output['l_A.id'], output['r_B.id'],
+                                     output['_threshold'])),
+                          [(1, 1, 0.9), (1, 2, 0.5), (2, 1, 0.5),
+                           (3, 1, 0.9), (3, 2, 0.9)])
+
+    def test_join_sweep_with_index(self):
+        index = SetSimJoinIndex(self.tokenizer, 'JACCARD', 0.5).build(
+                    self.A, 'A.attr')
+        output = jaccard_join_sweep(self.A, self.B, 'A.id', 'B.id', 'A.attr',
+                                    'B.attr', self.tokenizer, [0.5, 1.0],
+                                    index=index)
+        assert_list_equal(sorted(zip(output['l_A.id'], output['r_B.id'],
+                                     output['_threshold'])),
+                          [(1, 1, 1.0), (1, 2, 0.5), (2, 1, 0.5)])
+
+    @raises(TypeError)
+    def test_join_sweep_invalid_thresholds_type(self):
+        jaccard_join_sweep(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                           self.tokenizer, 0.5)
+
+    @raises(AssertionError)
+    def test_join_sweep_empty_thresholds(self):
+        cosine_join_sweep(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                          self.tokenizer, [])
+
+    @raises(AssertionError)
+    def test_join_sweep_invalid_threshold(self):
+        dice_join_sweep(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                        self.tokenizer, [0.5, 1.5])
@@ -0,0 +1,191 @@
+from functools import partial
+import os
+import unittest
+
+from nose.tools import assert_equal, assert_list_equal, nottest, raises
+from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
+from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
+import pandas as pd
+
+from py_stringsimjoin.join.cosine_join import cosine_join
+from py_stringsimjoin.join.dice_join import dice_join
+from py_stringsimjoin.join.jaccard_join import jaccard_join
+from py_stringsimjoin.join.multi_sim_join import multi_sim_join
+from py_stringsimjoin.utils.prepared_table import PreparedTable
+
+
+JOIN_FN_MAP = {'COSINE': cosine_join,
+               'DICE': dice_join,
+               'JACCARD': jaccard_join}
+
+
+@nottest
+def test_valid_multi_sim_join(conditions, combine_op, tokenizer, kwargs={}):
+    # load input tables for the tests.
+    ltable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      'data', 'table_A.csv'))
+    rtable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      'data', 'table_B.csv'))
+    if kwargs.get('self_join'):
+        rtable = ltable
+        join_args = ('A.ID', 'A.ID', 'A.name', 'A.name')
+        r_key_attr = 'r_A.ID'
+    else:
+        join_args = ('A.ID', 'B.ID', 'A.name', 'B.name')
+        r_key_attr = 'r_B.ID'
+    comp_op = kwargs.get('comp_op', '>=')
+
+    output = multi_sim_join(ltable, rtable,
+                            *(join_args + (tokenizer, conditions,
+                                           combine_op)), **kwargs)
+
+    # the expected output is obtained by combining the outputs of the joins
+    # on each condition, and the score of each measure is taken from the
+    # join on that measure.
+    join_kwargs = dict((key, value) for key, value in kwargs.items()
+                       if key not in ['comp_op', 'allow_missing'])
+    pair_sets = []
+    expected_scores = {}
+    for sim_measure_type, threshold in conditions:
+        join_output = JOIN_FN_MAP[sim_measure_type](
+                          ltable, rtable,
+                          *(join_args + (tokenizer, threshold, comp_op)),
+                          **join_kwargs)
+        pairs = list(zip(join_output['l_A.ID'], join_output[r_key_attr]))
+        pair_sets.append(set(pairs))
+        expected_scores[sim_measure_type] = dict(
+            zip(pairs, join_output['_sim_score'].round(4)))
+    if combine_op == 'AND':
+        expected_pairs = set.intersection(*pair_sets)
+    else:
+        expected_pairs = set.union(*pair_sets)
+
+    output_pairs = list(zip(output['l_A.ID'], output[r_key_attr]))
+    if kwargs.get('allow_missing'):
+        # the pairs with a missing value have missing scores.
+        missing_flags = output['_' + conditions[0][0].lower() +
+                               '_sim_score'].isnull().values
+        output_pairs = [pair for pair, missing_flag in
+                        zip(output_pairs, missing_flags) if not missing_flag]
+        assert_equal(sum(missing_flags),
+                     len(ltable) * rtable['B.name'].isnull().sum() +
+                     len(rtable) * ltable['A.name'].isnull().sum() -
+                     ltable['A.name'].isnull().sum() *
+                     rtable['B.name'].isnull().sum())
+    assert_equal(len(output_pairs), len(set(output_pairs)))
+    assert_equal(set(output_pairs), expected_pairs)
+    assert_list_equal(list(output['_id']), list(range(len(output))))
+
+    # the scores of a measure are output if the pair is output by the join on
+    # that measure.
+    for sim_measure_type in expected_scores:
+        sim_scores = output['_' + sim_measure_type.lower() + '_sim_score']
+        for pair, sim_score in zip(output_pairs, sim_scores.round(4)):
+            if pair in expected_scores[sim_measure_type]:
+                assert_equal(sim_score,
+                             expected_scores[sim_measure_type][pair])
+
+
+def test_multi_sim_join():
+    delim_tok = DelimiterTokenizer(delim_set=[' '], return_set=True)
+    qgram_tok = QgramTokenizer(qval=2, return_set=True)
+    test_cases = [([('JACCARD', 0.5), ('COSINE', 0.7)], delim_tok, {}),
+                  ([('COSINE', 0.7), ('JACCARD', 0.5)], qgram_tok, {}),
+                  ([('DICE', 0.6), ('JACCARD', 0.3), ('COSINE', 0.8)],
+                   qgram_tok, {'n_jobs': 2}),
+                  ([('JACCARD', 0.4)], qgram_tok, {'comp_op': '>'}),
+                  ([('COSINE', 0.6), ('DICE', 0.7)], qgram_tok,
+                   {'self_join': True}),
+                  ([('JACCARD', 0.3), ('JACCARD', 0.6)], delim_tok,
+                   {'allow_missing': True}),
+                  ([('DICE', 0.5), ('COSINE', 0.5)], qgram_tok,
+                   {'allow_empty': False})]
+
+    for (conditions, tokenizer, kwargs) in test_cases:
+        for combine_op in ['AND', 'OR']:
+            test_function = partial(test_valid_multi_sim_join, conditions,
+                                    combine_op, tokenizer, kwargs)
+            test_function.description = 'Test multi-measure join with ' + \
+                str(conditions) + ' combined by ' + combine_op + \
+                ' and ' + str(kwargs) + '.'
+            yield test_function,
+
+
+class MultiSimJoinTestCases(unittest.TestCase):
+    def setUp(self):
+        self.A = pd.DataFrame([{'A.id':1, 'A.attr':'hello world'},
+                               {'A.id':2, 'A.attr':'hello'},
+                               {'A.id':3, 'A.attr':''}])
+        self.B = pd.DataFrame([{'B.id':1, 'B.attr':'hello world'},
+                               {'B.id':2, 'B.attr':'world'},
+                               {'B.id':3, 'B.attr':''}])
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+
+    def test_output_columns(self):
+        output = multi_sim_join(self.A, self.B, 'A.id', 'B.id', 'A.attr',
+                                'B.attr', self.tokenizer,
+                                [('DICE', 0.6), ('JACCARD', 0.5),
+                                 ('DICE', 0.9)], 'OR',
+                                l_out_attrs=['A.attr'])
+        assert_list_equal(list(output.columns.values),
+                          ['_id', 'l_A.id', 'r_B.id', 'l_A.attr',
+                           '_dice_sim_score', '_jaccard_sim_score'])
+        # the pairs with empty sets of tokens have a score of 1.
+        assert_list_equal(sorted(zip(output['l_A.id'], output['r_B.id'],
+                                     output['_dice_sim_score'].round(4),
+                                     output['_jaccard_sim_score'].round(4))),
+                          [(1, 1, 1.0, 1.0), (1, 2, 0.6667, 0.5),
+                           (2, 1, 0.6667, 0.5), (3, 3, 1.0, 1.0)])
+
+    def test_out_sim_score_false(self):
+        output = multi_sim_join(self.A, self.B, 'A.id', 'B.id', 'A.attr',
+                                'B.attr', self.tokenizer,
+                                [('COSINE', 0.7), ('JACCARD', 0.5)], 'AND',
+                                out_sim_score=False)
+        assert_list_equal(list(output.columns.values),
+                          ['_id', 'l_A.id', 'r_B.id'])
+        assert_list_equal(sorted(zip(output['l_A.id'], output['r_B.id'])),
+                          [(1, 1), (1, 2), (2, 1), (3, 3)])
+
+    def test_prepared_tables(self):
+        conditions = [('COSINE', 0.8), ('JACCARD', 0.5)]
+        expected_output = multi_sim_join(self.A, self.B, 'A.id', 'B.id',
+                                         'A.attr', 'B.attr', self.tokenizer,
+                                         conditions, 'OR')
+        output = multi_sim_join(PreparedTable(self.A, 'A.id'),
+                                PreparedTable(self.B, 'B.id'), 'A.id', 'B.id',
+                                'A.attr', 'B.attr', self.tokenizer,
+                                conditions, 'OR')
+        assert_list_equal(sorted(zip(output['l_A.id'], output['r_B.id'])),
+                          sorted(zip(expected_output['l_A.id'],
+                                     expected_output['r_B.id'])))
+
+    @raises(TypeError)
+    def test_invalid_conditions(self):
+        multi_sim_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                       self.tokenizer, ('JACCARD', 0.5))
+
+    @raises(AssertionError)
+    def test_empty_conditions(self):
+        multi_sim_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                       self.tokenizer, [])
+
+    @raises(AssertionError)
+    def test_invalid_sim_measure(self):
+        multi_sim_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                       self.tokenizer, [('OVERLAP', 1)])
+
+    @raises(AssertionError)
+    def test_invalid_threshold(self):
+        multi_sim_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                       self.tokenizer, [('JACCARD', 0.5), ('COSINE', 1.5)])
+
+    @raises(AssertionError)
+    def test_invalid_combine_op(self):
+        multi_sim_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                       self.tokenizer, [('JACCARD', 0.5)], 'XOR')
+
+    @raises(AssertionError)
+    def test_invalid_comp_op(self):
+        multi_sim_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                       self.tokenizer, [('JACCARD', 0.5)], 'AND', '<=')
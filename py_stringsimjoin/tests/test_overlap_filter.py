@@ -145,6 +145,23 @@ class FilterTablesTestCases(unittest.TestCase):
                                 'ltable.', 'rtable.'),
                                 expected_pairs)
 
+    # test with tokens occurring in most of the records, whose lists are
+    # handled with binary search.
+    def test_overlap_dlm_3_with_frequent_tokens(self):
+        A = pd.DataFrame([{'id': i + 1, 'attr': 'aa bb t' + str(i)}
+                          for i in range(40)] +
+                         [{'id': 41, 'attr': 'aa t1 t2'}])
+        B = pd.DataFrame([{'id': 1, 'attr': 'aa bb t3'},
+                          {'id': 2, 'attr': 'aa t1 t2'},
+                          {'id': 3, 'attr': 'cc t5'}])
+        expected_pairs = set(['4,1', '41,2'])
+        self.test_filter_tables(self.dlm, 3, '>=', False,
+                                (A, B, 'id', 'id', 'attr', 'attr'),
+                                expected_pairs)
+        self.test_filter_tables(self.dlm, 2, '>', False,
+                                (A, B, 'id', 'id', 'attr', 'attr'),
+                                expected_pairs)
+
     # tests for empty table input
     def test_empty_ltable(self):
         expected_pairs = set()
@@ -1,14 +1,69 @@
 
+from functools import partial
 import os
 import unittest
 
-from nose.tools import assert_equal, raises
+from nose.tools import assert_equal, nottest, raises
 from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
 from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
 from six import iteritems
 import pandas as pd
 
 from py_stringsimjoin.join.overlap_join import overlap_join
+from py_stringsimjoin.utils.generic_helper import COMP_OP_MAP
+
+
+@nottest
+def test_valid_join(tokenizer, threshold, comp_op, n_jobs):
+    # load input tables for the tests.
+    ltable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      'data', 'table_A.csv'))
+    rtable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      'data', 'table_B.csv'))
+
+    # the expected pairs share at least one token and their overlap
+    # satisfies the threshold.
+    comp_fn = COMP_OP_MAP[comp_op]
+    expected_pairs = {}
+    for l_id, l_string in zip(ltable['A.ID'], ltable['A.name']):
+        if pd.isnull(l_string):
+            continue
+        l_tokens = set(tokenizer.tokenize(l_string))
+        for r_id, r_string in zip(rtable['B.ID'], rtable['B.name']):
+            if pd.isnull(r_string):
+                continue
+            overlap = len(l_tokens.intersection(tokenizer.tokenize(r_string)))
+            if overlap > 0 and comp_fn(overlap, threshold):
+                expected_pairs[(l_id, r_id)] = overlap
+
+    output = overlap_join(ltable, rtable, 'A.ID', 'B.ID', 'A.name', 'B.name',
+                          tokenizer, threshold, comp_op, n_jobs=n_jobs,
+                          show_progress=False)
+    assert_equal(dict(zip(zip(output['l_A.ID'], output['r_B.ID']),
+                          output['_sim_score'])),
+                 expected_pairs)
+    assert_equal(len(output), len(expected_pairs))
+
+
+def test_overlap_join():
+    tokenizers = {'SPACE_DELIMITER': DelimiterTokenizer(delim_set=[' '],
+                                                        return_set=True),
+                  '2_GRAM': QgramTokenizer(qval=2, return_set=True)}
+    # the prefix of a set depends on the threshold, which is rounded up when
+    # it is fractional.
+    for tok_type, tokenizer in iteritems(tokenizers):
+        for threshold in [1, 2, 2.5, 3, 5]:
+            for comp_op in ['>=', '>', '=']:
+                test_function = partial(test_valid_join, tokenizer,
+                                        threshold, comp_op, 1)
+                test_function.description = 'Test overlap join with ' + \
+                    str(threshold) + ' threshold, comp_op ' + comp_op + \
+                    ' and ' + tok_type + ' tokenizer.'
+                yield test_function,
+
+    test_function = partial(test_valid_join, tokenizers['2_GRAM'], 3, '>=', 2)
+    test_function.description = 'Test overlap join with n_jobs above 1.'
+    yield test_function,
 
 
 class OverlapJoinValidTestCases(unittest.TestCase):
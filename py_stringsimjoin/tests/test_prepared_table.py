@@ -0,0 +1,189 @@
+import os
+import unittest
+
+from nose.tools import assert_equal, assert_list_equal, assert_not_equal, \
+    raises
+from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
+from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
+from py_stringmatching.tokenizer.whitespace_tokenizer import \
+    WhitespaceTokenizer
+import pandas as pd
+
+from py_stringsimjoin.filter.overlap_filter import OverlapFilter
+from py_stringsimjoin.filter.size_filter import SizeFilter
+from py_stringsimjoin.join.cosine_join import cosine_join
+from py_stringsimjoin.join.dice_join import dice_join
+from py_stringsimjoin.join.edit_distance_join import edit_distance_join
+from py_stringsimjoin.join.jaccard_join import jaccard_join
+from py_stringsimjoin.join.overlap_coefficient_join import \
+    overlap_coefficient_join
+from py_stringsimjoin.join.overlap_join import overlap_join
+from py_stringsimjoin.join.topk_jaccard_join import topk_jaccard_join
+from py_stringsimjoin.matcher.apply_matcher import apply_matcher
+from py_stringsimjoin.utils.prepared_table import PreparedTable
+from py_stringsimjoin.utils.simfunctions import get_sim_function
+from py_stringsimjoin.utils.token_ordering import \
+    tokenize_and_order_tables_in_parallel
+
+
+def get_output_pairs(output_table):
+    return sorted(zip(output_table['l_A.ID'], output_table['r_B.ID'],
+                      output_table['_sim_score'].round(4)))
+
+
+class PreparedTableTestCases(unittest.TestCase):
+    def setUp(self):
+        # load input tables for the tests.
+        self.A = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                          os.sep.join(['data',
+                                                       'table_A.csv'])))
+        self.B = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                          os.sep.join(['data',
+                                                       'table_B.csv'])))
+        self.prepared_A = PreparedTable(self.A, 'A.ID')
+        self.prepared_B = PreparedTable(self.B, 'B.ID')
+        self.join_args = ('A.ID', 'B.ID', 'A.name', 'B.name')
+
+    def test_joins_with_prepared_tables(self):
+        tokenizers = [DelimiterTokenizer(delim_set=[' '], return_set=True),
+                      QgramTokenizer(qval=2, return_set=True),
+                      WhitespaceTokenizer(return_set=True)]
+        for tok in tokenizers:
+            for join_fn, threshold in [(jaccard_join, 0.3),
+                                       (cosine_join, 0.5),
+                                       (dice_join, 0.5),
+                                       (overlap_join, 1),
+                                       (overlap_coefficient_join, 0.5)]:
+                expected_pairs = get_output_pairs(
+                    join_fn(self.A, self.B, *(self.join_args + (tok,
+                                                                threshold))))
+                # the tokens cached by the first join are reused by the
+                # second join.
+                for _ in range(2):
+                    assert_list_equal(get_output_pairs(
+                        join_fn(self.prepared_A, self.prepared_B,
+                                *(self.join_args + (tok, threshold)))),
+                        expected_pairs)
+                # only one of the tables may be prepared.
+                assert_list_equal(get_output_pairs(
+                    join_fn(self.A, self.prepared_B,
+                            *(self.join_args + (tok, threshold)))),
+                    expected_pairs)
+
+    def test_edit_distance_join_with_prepared_tables(self):
+        expected_pairs = get_output_pairs(
+            edit_distance_join(self.A, self.B, *(self.join_args + (5,))))
+        assert_list_equal(get_output_pairs(
+            edit_distance_join(self.prepared_A, self.prepared_B,
+                               *(self.join_args + (5,)))),
+            expected_pairs)
+
+    def test_self_join_with_prepared_table(self):
+        tok = QgramTokenizer(qval=2, return_set=True)
+        expected_output = jaccard_join(self.A, self.A, 'A.ID', 'A.ID',
+                                       'A.name', 'A.name', tok, 0.3,
+                                       self_join=True)
+        output = jaccard_join(self.prepared_A, self.prepared_A, 'A.ID',
+                              'A.ID', 'A.name', 'A.name', tok, 0.3,
+                              self_join=True)
+        assert_list_equal(sorted(zip(output['l_A.ID'], output['r_A.ID'])),
+                          sorted(zip(expected_output['l_A.ID'],
+                                     expected_output['r_A.ID'])))
+
+    def test_topk_join_with_prepared_tables(self):
+        tok = DelimiterTokenizer(delim_set=[' '], return_set=True)
+        expected_pairs = get_output_pairs(
+            topk_jaccard_join(self.A, self.B, *(self.join_args + (tok, 5))))
+        assert_list_equal(get_output_pairs(
+            topk_jaccard_join(self.prepared_A, self.prepared_B,
+                              *(self.join_args + (tok, 5)))),
+            expected_pairs)
+
+    def test_filter_and_matcher_with_prepared_tables(self):
+        tok = DelimiterTokenizer(delim_set=[' '], return_set=True)
+        size_filter = SizeFilter(tok, 'JACCARD', 0.3)
+        expected_candset = size_filter.filter_tables(self.A, self.B,
+                                                     *self.join_args)
+        candset = size_filter.filter_tables(self.prepared_A, self.prepared_B,
+                                            *self.join_args)
+        assert_list_equal(sorted(zip(candset['l_A.ID'], candset['r_B.ID'])),
+                          sorted(zip(expected_candset['l_A.ID'],
+                                     expected_candset['r_B.ID'])))
+
+        overlap_filter = OverlapFilter(tok, 1)
+        candset = overlap_filter.filter_candset(candset, 'l_A.ID', 'r_B.ID',
+                                                self.prepared_A,
+                                                self.prepared_B,
+                                                *self.join_args)
+        expected_candset = overlap_filter.filter_candset(
+                               expected_candset, 'l_A.ID', 'r_B.ID',
+                               self.A, self.B, *self.join_args)
+        assert_list_equal(sorted(zip(candset['l_A.ID'], candset['r_B.ID'])),
+                          sorted(zip(expected_candset['l_A.ID'],
+                                     expected_candset['r_B.ID'])))
+
+        sim_fn = get_sim_function('JACCARD')
+        output = apply_matcher(candset, 'l_A.ID', 'r_B.ID',
+                               self.prepared_A, self.prepared_B,
+                               *(self.join_args + (tok, sim_fn, 0.3)))
+        expected_output = apply_matcher(expected_candset, 'l_A.ID', 'r_B.ID',
+                                        self.A, self.B,
+                                        *(self.join_args + (tok, sim_fn,
+                                                            0.3)))
+        assert_list_equal(get_output_pairs(output),
+                          get_output_pairs(expected_output))
+
+    def test_tokenize_is_cached(self):
+        tok = DelimiterTokenizer(delim_set=[' '], return_set=True)
+        tokenized_column = self.prepared_A.tokenize('A.name', tok)
+        # an equal tokenizer reuses the cached tokens.
+        assert_equal(self.prepared_A.tokenize(
+                         'A.name', DelimiterTokenizer(delim_set=[' '],
+                                                      return_set=True)),
+                     tokenized_column)
+        # the tokens of a bag tokenizer are cached separately.
+        assert_not_equal(self.prepared_A.tokenize(
+                             'A.name', DelimiterTokenizer(delim_set=[' '])),
+                         tokenized_column)
+
+    def test_tokenized_column(self):
+        table = pd.DataFrame([{'id': 1, 'attr': 'a b a'},
+                              {'id': 2, 'attr': None},
+                              {'id': 3, 'attr': 'b c'}])
+        tokenized_column = PreparedTable(table, 'id').tokenize(
+                               'attr', DelimiterTokenizer(delim_set=[' ']))
+        # the records with a missing value are skipped.
+        assert_equal(tokenized_column.num_records, 2)
+        assert_list_equal(tokenized_column.tokens, ['a', 'b', 'c'])
+        assert_list_equal(tokenized_column.token_freqs.tolist(), [2, 2, 1])
+        assert_list_equal(tokenized_column.sizes.tolist(), [3, 2])
+        assert_list_equal(tokenized_column.token_ids.tolist(),
+                          [0, 1, 0, 1, 2])
+
+    @raises(AssertionError)
+    def test_invalid_key_attr(self):
+        PreparedTable(self.A, 'A.name')
+
+    @raises(TypeError)
+    def test_invalid_table(self):
+        PreparedTable([], 'A.ID')
+
+    @raises(AssertionError)
+    def test_join_key_attr_validated(self):
+        # a key attribute other than the one of the prepared table is
+        # validated by the join.
+        jaccard_join(self.prepared_A, self.prepared_B, 'A.name', 'B.ID',
+                     'A.name', 'B.name',
+                     DelimiterTokenizer(delim_set=[' '], return_set=True),
+                     0.3)
+
+    @raises(AssertionError)
+    def test_table_modified_after_tokenize(self):
+        tok = DelimiterTokenizer(delim_set=[' '], return_set=True)
+        tokenized_column = self.prepared_A.tokenize('A.name', tok)
+        self.A.loc[len(self.A)] = ['a_new', 'Kevin', 1990, 30.0,
+                                   'Madison', 53703]
+        table_array = self.A[['A.name']].values
+        tokenize_and_order_tables_in_parallel([table_array], [0], tok, 1,
+                                              tokenized_columns=[
+                                                  tokenized_column])
@@ -0,0 +1,252 @@
+from functools import partial
+import os
+import shutil
+import tempfile
+import unittest
+
+from nose.tools import assert_equal, assert_list_equal, nottest, raises
+from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
+from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
+from six import iteritems
+import pandas as pd
+
+from py_stringsimjoin.index.set_sim_join_index import SetSimJoinIndex
+from py_stringsimjoin.join.cosine_join import cosine_join
+from py_stringsimjoin.join.dice_join import dice_join
+from py_stringsimjoin.join.jaccard_join import jaccard_join
+
+
+JOIN_FN_MAP = {'COSINE': cosine_join,
+               'DICE': dice_join,
+               'JACCARD': jaccard_join}
+
+
+def get_output_pairs(output_table, l_key_attr, r_key_attr):
+    return sorted(zip(output_table['l_' + l_key_attr].astype(str),
+                      output_table['r_' + r_key_attr].astype(str),
+                      output_table['_sim_score'].round(4)))
+
+
+@nottest
+def test_valid_join_with_index(scenario, sim_measure_type, tokenizer,
+                               index_threshold, thresholds, kwargs={}):
+    (ltable_path, l_key_attr, l_join_attr) = scenario[0]
+    (rtable_path, r_key_attr, r_join_attr) = scenario[1]
+    join_fn = JOIN_FN_MAP[sim_measure_type]
+
+    # load input tables for the tests.
+    ltable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      ltable_path))
+    # a self join requires the same dataframe on both the sides.
+    if rtable_path == ltable_path:
+        rtable = ltable
+    else:
+        rtable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                          rtable_path))
+
+    index = SetSimJoinIndex(tokenizer, sim_measure_type,
+                            index_threshold).build(ltable, l_join_attr)
+
+    # save the index to a file and load it back, so that the joins are run
+    # both with the built index and with the memory-mapped index.
+    temp_dir = tempfile.mkdtemp()
+    try:
+        index_path = os.path.join(temp_dir, 'index.bin')
+        index.save(index_path)
+        loaded_index = SetSimJoinIndex.load(index_path, tokenizer)
+        assert_equal(loaded_index.num_records, index.num_records)
+        assert_equal(loaded_index.token_ordering, index.token_ordering)
+
+        for threshold in thresholds:
+            # the output of the join without an index is the expected output.
+            expected_pairs = get_output_pairs(
+                join_fn(ltable, rtable, l_key_attr, r_key_attr,
+                        l_join_attr, r_join_attr, tokenizer, threshold,
+                        **kwargs), l_key_attr, r_key_attr)
+
+            for join_index in [index, loaded_index]:
+                actual_pairs = get_output_pairs(
+                    join_fn(ltable, rtable, l_key_attr, r_key_attr,
+                            l_join_attr, r_join_attr, tokenizer, threshold,
+                            index=join_index, **kwargs),
+                    l_key_attr, r_key_attr)
+                assert_list_equal(actual_pairs, expected_pairs)
+        del loaded_index
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_set_sim_join_with_index():
+    # data to be tested.
+    test_scenario_1 = [(os.sep.join(['data', 'table_A.csv']), 'A.ID', 'A.name'),
+                       (os.sep.join(['data', 'table_B.csv']), 'B.ID', 'B.name')]
+    data = {'TEST_SCENARIO_1' : test_scenario_1}
+
+    # similarity measures to be tested.
+    sim_measure_types = ['COSINE', 'DICE', 'JACCARD']
+
+    # tokenizers to be tested.
+    tokenizers = {'SPACE_DELIMITER': DelimiterTokenizer(delim_set=[' '],
+                                                        return_set=True),
+                  '2_GRAM': QgramTokenizer(qval=2, return_set=True)}
+
+    # Test each combination of similarity measure and tokenizer, with join
+    # thresholds equal to and above the threshold of the index.
+    for label, scenario in iteritems(data):
+        for sim_measure_type in sim_measure_types:
+            for tok_type, tok in iteritems(tokenizers):
+                test_function = partial(test_valid_join_with_index, scenario,
+                                        sim_measure_type, tok, 0.5,
+                                        [0.5, 0.65, 0.85])
+                test_function.description = 'Test ' + sim_measure_type + \
+                    ' with index and ' + tok_type + ' tokenizer for ' + \
+                    label + '.'
+                yield test_function,
+
+    # Test with allow_empty set to False, n_jobs set to 2 and a self join.
+    tok = QgramTokenizer(qval=2, return_set=True)
+    for kwargs in [{'allow_empty': False}, {'n_jobs': 2}]:
+        test_function = partial(test_valid_join_with_index, test_scenario_1,
+                                'JACCARD', tok, 0.3, [0.7], kwargs)
+        test_function.description = 'Test JACCARD with index and ' + \
+                                    str(kwargs) + '.'
+        yield test_function,
+
+    self_join_scenario = [test_scenario_1[0], test_scenario_1[0]]
+    test_function = partial(test_valid_join_with_index, self_join_scenario,
+                            'JACCARD', tok, 0.3, [0.7], {'self_join': True})
+    test_function.description = 'Test JACCARD self join with index.'
+    yield test_function,
+
+
+class SetSimJoinIndexTestCases(unittest.TestCase):
+    def setUp(self):
+        self.A = pd.DataFrame([{'A.id':1, 'A.attr':'hello world'},
+                               {'A.id':2, 'A.attr':'hello'},
+                               {'A.id':3, 'A.attr':''}])
+        self.B = pd.DataFrame([{'B.id':1, 'B.attr':'hello world unseen'},
+                               {'B.id':2, 'B.attr':'world'},
+                               {'B.id':3, 'B.attr':''}])
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+        self.index = SetSimJoinIndex(self.tokenizer, 'JACCARD',
+                                     0.3).build(self.A, 'A.attr')
+
+    def test_join_with_unseen_tokens(self):
+        # the tokens of rtable that are not in the index count towards the
+        # size of the rtable record.
+        output = jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr',
+                              'B.attr', self.tokenizer, 0.5, index=self.index)
+        assert_equal(sorted(zip(output['l_A.id'], output['r_B.id'],
+                                output['_sim_score'].round(4))),
+                     [(1, 1, 0.6667), (1, 2, 0.5), (3, 3, 1.0)])
+
+    def test_join_with_sampled_token_ordering(self):
+        # an index whose token ordering is derived from a sample gives the
+        # same output as the join without an index.
+        ltable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                          os.sep.join(['data',
+                                                       'table_A.csv'])))
+        rtable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                          os.sep.join(['data',
+                                                       'table_B.csv'])))
+        tokenizer = QgramTokenizer(qval=2, return_set=True)
+        expected_pairs = get_output_pairs(
+            jaccard_join(ltable, rtable, 'A.ID', 'B.ID', 'A.name', 'B.name',
+                         tokenizer, 0.3), 'A.ID', 'B.ID')
+        for sample_size in [1, 5, 1000]:
+            index = SetSimJoinIndex(tokenizer, 'JACCARD', 0.3).build(
+                        ltable, 'A.name', sample_size=sample_size)
+            assert_list_equal(get_output_pairs(
+                jaccard_join(ltable, rtable, 'A.ID', 'B.ID', 'A.name',
+                             'B.name', tokenizer, 0.3, index=index),
+                'A.ID', 'B.ID'), expected_pairs)
+
+    @raises(AssertionError)
+    def test_invalid_sample_size(self):
+        SetSimJoinIndex(self.tokenizer, 'JACCARD', 0.3).build(self.A,
+                                                              'A.attr',
+                                                              sample_size=0)
+
+    def test_order_tokens(self):
+        assert_list_equal(self.index.order_tokens(['world', 'unseen', 'hello']),
+                          [1, 2, 3])
+
+    @raises(TypeError)
+    def test_invalid_tokenizer(self):
+        SetSimJoinIndex([], 'JACCARD', 0.3)
+
+    @raises(AssertionError)
+    def test_unsupported_sim_measure_type(self):
+        SetSimJoinIndex(self.tokenizer, 'OVERLAP', 1)
+
+    @raises(AssertionError)
+    def test_invalid_threshold(self):
+        SetSimJoinIndex(self.tokenizer, 'JACCARD', 1.5)
+
+    @raises(AssertionError)
+    def test_invalid_join_attr(self):
+        SetSimJoinIndex(self.tokenizer, 'JACCARD', 0.3).build(self.A,
+                                                              'A.invalid_attr')
+
+    @raises(AssertionError)
+    def test_save_index_not_built(self):
+        SetSimJoinIndex(self.tokenizer, 'JACCARD', 0.3).save('index.bin')
+
+    @raises(TypeError)
+    def test_join_invalid_index(self):
+        jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                     self.tokenizer, 0.5, index={})
+
+    @raises(AssertionError)
+    def test_join_index_not_built(self):
+        jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                     self.tokenizer, 0.5,
+                     index=SetSimJoinIndex(self.tokenizer, 'JACCARD', 0.3))
+
+    @raises(AssertionError)
+    def test_join_index_sim_measure_mismatch(self):
+        cosine_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                    self.tokenizer, 0.5, index=self.index)
+
+    @raises(AssertionError)
+    def test_join_threshold_below_index_threshold(self):
+        jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                     self.tokenizer, 0.2, index=self.index)
+
+    @raises(AssertionError)
+    def test_join_num_records_mismatch(self):
+        jaccard_join(self.A[:2], self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                     self.tokenizer, 0.5, index=self.index)
+
+    @raises(AssertionError)
+    def test_join_table_values_mismatch(self):
+        # a table with the same number of records but different values in the
+        # join attribute cannot be joined using the index.
+        C = pd.DataFrame([{'C.id':1, 'C.attr':'hello world'},
+                          {'C.id':2, 'C.attr':'world'},
+                          {'C.id':3, 'C.attr':''}])
+        jaccard_join(C, self.B, 'C.id', 'B.id', 'C.attr', 'B.attr',
+                     self.tokenizer, 0.5, index=self.index)
+
+    @raises(AssertionError)
+    def test_join_tokenizer_mismatch(self):
+        jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                     DelimiterTokenizer(delim_set=[','], return_set=True),
+                     0.5, index=self.index)
+
+    @raises(AssertionError)
+    def test_join_tokenizer_type_mismatch(self):
+        jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                     QgramTokenizer(qval=2, return_set=True), 0.5,
+                     index=self.index)
+
+    @raises(AssertionError)
+    def test_load_tokenizer_mismatch(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            index_path = os.path.join(temp_dir, 'index.bin')
+            self.index.save(index_path)
+            SetSimJoinIndex.load(index_path,
+                                 QgramTokenizer(qval=3, return_set=True))
+        finally:
+            shutil.rmtree(temp_dir)
@@ -24,9 +24,17 @@ class FilterPairTestCases(unittest.TestCase):
                               self.dlm, 'JACCARD', 0.8, False, False, True)
 
     def test_jac_dlm_08_pass(self):
-        self.test_filter_pair('aa bb cc dd ee', 'xx aa cc dd ee',
+        self.test_filter_pair('aa bb cc dd ee', 'xx aa bb cc dd ee',
                               self.dlm, 'JACCARD', 0.8, False, False, False)
 
+    def test_jac_dlm_08_pass_suffix_token_in_prefix(self):
+        # the token 4 in the suffix of the first list matches a token in the
+        # prefix of the second list, and the Jaccard score is exactly 0.8.
+        suffix_filter = SuffixFilter(self.dlm, 'JACCARD', 0.8)
+        assert_equal(suffix_filter._filter_suffix([0, 1, 2, 4],
+                                                  [0, 1, 2, 3, 4], 1, 2),
+                     False)
+
     # tests for COSINE measure 
     def test_cos_dlm_08_prune(self):
         self.test_filter_pair('aa bb cc dd ee', 'xx yy cc zz ww',
@@ -51,7 +59,7 @@ class FilterPairTestCases(unittest.TestCase):
                               self.dlm, 'OVERLAP', 2, False, False, True)
 
     def test_overlap_dlm_2_pass(self):
-        self.test_filter_pair('dd zz', 'yy zz',
+        self.test_filter_pair('dd zz', 'dd yy zz',
                               self.dlm, 'OVERLAP', 2, False, False, False)
 
     def test_overlap_dlm_empty(self):
@@ -383,7 +391,7 @@ class FilterCandsetTestCases(unittest.TestCase):
 
     # tests for JACCARD measure
     def test_jac_dlm_075(self):
-        expected_pairs = set(['1,5', '3,4', '5,1', '5,3'])
+        expected_pairs = set(['5,1'])
         self.test_filter_candset(self.dlm, 'JACCARD', 0.75, False, False,
                                 (self.C, 'l_id', 'r_id',
                                  self.A, self.B,
@@ -392,7 +400,7 @@ class FilterCandsetTestCases(unittest.TestCase):
 
     # tests for COSINE measure
     def test_cos_dlm_08(self):
-        expected_pairs = set(['1,5', '3,4', '4,2', '5,1', '5,3'])
+        expected_pairs = set(['1,5', '4,2', '5,1'])
         self.test_filter_candset(self.dlm, 'COSINE', 0.8, False, False,
                                 (self.C, 'l_id', 'r_id',
                                  self.A, self.B,
@@ -401,7 +409,7 @@ class FilterCandsetTestCases(unittest.TestCase):
 
     # tests for DICE measure
     def test_dice_dlm_08(self):
-        expected_pairs = set(['1,5', '3,4', '4,2', '5,1', '5,3'])
+        expected_pairs = set(['1,5', '4,2', '5,1'])
         self.test_filter_candset(self.dlm, 'DICE', 0.8, False, False,
                                 (self.C, 'l_id', 'r_id',
                                  self.A, self.B,
@@ -410,7 +418,7 @@ class FilterCandsetTestCases(unittest.TestCase):
 
     # test allow_missing flag
     def test_jac_dlm_075_allow_missing(self):
-        expected_pairs = set(['1,5', '3,4', '5,1', '5,3',
+        expected_pairs = set(['5,1',
                               '6,1', '6,2', '6,3', '6,4', '6,5',
                               '6,6', '1,6', '2,6', '3,6', '4,6', '5,6'])
         self.test_filter_candset(self.dlm, 'JACCARD', 0.75, False, True,
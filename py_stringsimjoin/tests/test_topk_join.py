@@ -0,0 +1,184 @@
+from functools import partial
+import os
+import unittest
+
+from nose.tools import assert_equal, assert_list_equal, nottest, raises
+from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
+from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
+from six import iteritems
+import pandas as pd
+
+from py_stringsimjoin.join.topk_cosine_join import topk_cosine_join
+from py_stringsimjoin.join.topk_dice_join import topk_dice_join
+from py_stringsimjoin.join.topk_jaccard_join import topk_jaccard_join
+from py_stringsimjoin.utils.simfunctions import get_sim_function
+
+
+JOIN_FN_MAP = {'COSINE': topk_cosine_join,
+               'DICE': topk_dice_join,
+               'JACCARD': topk_jaccard_join}
+
+
+@nottest
+def test_valid_topk_join(scenario, sim_measure_type, args):
+    (ltable_path, l_key_attr, l_join_attr) = scenario[0]
+    (rtable_path, r_key_attr, r_join_attr) = scenario[1]
+    join_fn = JOIN_FN_MAP[sim_measure_type]
+    tokenizer, k = args[0], args[1]
+
+    # load input tables for the tests.
+    ltable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      ltable_path))
+    rtable = pd.read_csv(os.path.join(os.path.dirname(__file__),
+                                      rtable_path))
+
+    sim_func = get_sim_function(sim_measure_type)
+
+    # compute the similarity scores of all the pairs of tuples with non-empty
+    # set of tokens in the join attribute.
+    scores = {}
+    for l_idx, l_row in ltable.iterrows():
+        if pd.isnull(l_row[l_join_attr]):
+            continue
+        l_tokens = tokenizer.tokenize(str(l_row[l_join_attr]))
+        for r_idx, r_row in rtable.iterrows():
+            if pd.isnull(r_row[r_join_attr]):
+                continue
+            r_tokens = tokenizer.tokenize(str(r_row[r_join_attr]))
+            if len(l_tokens) == 0 or len(r_tokens) == 0:
+                continue
+            scores[(str(l_row[l_key_attr]), str(r_row[r_key_attr]))] = \
+                round(sim_func(l_tokens, r_tokens), 4)
+
+    # the expected top-k scores. As ties can be broken arbitrarily, the output
+    # is verified using the scores and not the pairs.
+    expected_scores = sorted([score for score in scores.values() if score > 0],
+                             reverse=True)[:k]
+
+    orig_return_set_flag = tokenizer.get_return_set()
+
+    # use join function to obtain the actual output pairs.
+    actual_candset = join_fn(ltable, rtable,
+                             l_key_attr, r_key_attr,
+                             l_join_attr, r_join_attr,
+                             *args)
+
+    assert_equal(tokenizer.get_return_set(), orig_return_set_flag)
+
+    assert_list_equal(list(actual_candset.columns.values),
+                      ['_id', 'l_' + l_key_attr, 'r_' + r_key_attr,
+                       '_sim_score'])
+
+    actual_scores = []
+    for idx, row in actual_candset.iterrows():
+        pair = (str(row['l_' + l_key_attr]), str(row['r_' + r_key_attr]))
+        # verify that the output score is the similarity score of the pair.
+        assert_equal(round(row['_sim_score'], 4), scores[pair])
+        actual_scores.append(scores[pair])
+
+    # verify that the pairs are output in decreasing order of their scores
+    # and that the output scores are the top-k scores.
+    assert_list_equal(actual_scores, expected_scores)
+
+
+def test_topk_set_sim_join():
+    # data to be tested.
+    test_scenario_1 = [(os.sep.join(['data', 'table_A.csv']), 'A.ID', 'A.name'),
+                       (os.sep.join(['data', 'table_B.csv']), 'B.ID', 'B.name')]
+    data = {'TEST_SCENARIO_1' : test_scenario_1}
+
+    # similarity measures to be tested.
+    sim_measure_types = ['COSINE', 'DICE', 'JACCARD']
+
+    # values of k to be tested.
+    k_values = [1, 3, 10, 100]
+
+    # tokenizers to be tested.
+    tokenizers = {'SPACE_DELIMITER': DelimiterTokenizer(delim_set=[' '],
+                                                        return_set=True),
+                  '2_GRAM': QgramTokenizer(qval=2, return_set=True),
+                  '3_GRAM': QgramTokenizer(qval=3, return_set=True)}
+
+    # Test each combination of similarity measure, k and tokenizer
+    # for different test scenarios.
+    for label, scenario in iteritems(data):
+        for sim_measure_type in sim_measure_types:
+            for k in k_values:
+                for tok_type, tok in iteritems(tokenizers):
+                    test_function = partial(test_valid_topk_join, scenario,
+                                            sim_measure_type, (tok, k))
+                    test_function.description = 'Test top-k ' + \
+                        sim_measure_type + ' with k = ' + str(k) + ' and ' + \
+                        tok_type + ' tokenizer for ' + label + '.'
+                    yield test_function,
+
+    # Test each similarity measure with a tokenizer with return_set flag set
+    # to False.
+    for sim_measure_type in sim_measure_types:
+        tok = QgramTokenizer(2)
+        test_function = partial(test_valid_topk_join, test_scenario_1,
+                                sim_measure_type, (tok, 5))
+        test_function.description = 'Test top-k ' + sim_measure_type + \
+                    ' with a tokenizer with return_set flag set to False.'
+        yield test_function,
+
+
+class TopkJoinTestCases(unittest.TestCase):
+    def setUp(self):
+        self.A = pd.DataFrame([{'A.id':1, 'A.attr':'hello world'},
+                               {'A.id':2, 'A.attr':'hello'}])
+        self.B = pd.DataFrame([{'B.id':1, 'B.attr':'hello world'},
+                               {'B.id':2, 'B.attr':'world'}])
+        self.tokenizer = DelimiterTokenizer(delim_set=[' '], return_set=True)
+
+    def test_topk_jaccard_join_with_output_attrs(self):
+        output = topk_jaccard_join(self.A, self.B, 'A.id', 'B.id',
+                                   'A.attr', 'B.attr', self.tokenizer, 2,
+                                   ['A.attr'], ['B.attr'], 'ltable.', 'rtable.')
+        assert_list_equal(list(output.columns.values),
+                          ['_id', 'ltable.A.id', 'rtable.B.id',
+                           'ltable.A.attr', 'rtable.B.attr', '_sim_score'])
+        assert_equal(len(output), 2)
+        assert_equal((output['ltable.A.id'][0], output['rtable.B.id'][0]),
+                     (1, 1))
+        assert_equal(output['_sim_score'][0], 1.0)
+        assert_equal(output['_sim_score'][1], 0.5)
+
+    def test_topk_jaccard_join_k_above_num_pairs(self):
+        output = topk_jaccard_join(self.A, self.B, 'A.id', 'B.id',
+                                   'A.attr', 'B.attr', self.tokenizer, 10,
+                                   out_sim_score=False)
+        assert_list_equal(list(output.columns.values),
+                          ['_id', 'l_A.id', 'r_B.id'])
+        # only the pairs with a common token can be output.
+        assert_equal(len(output), 3)
+
+    @raises(TypeError)
+    def test_topk_jaccard_join_invalid_ltable(self):
+        topk_jaccard_join([], self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                          self.tokenizer, 1)
+
+    @raises(TypeError)
+    def test_topk_jaccard_join_invalid_tokenizer(self):
+        topk_jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                          [], 1)
+
+    @raises(TypeError)
+    def test_topk_cosine_join_invalid_k_type(self):
+        topk_cosine_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                         self.tokenizer, 0.5)
+
+    @raises(AssertionError)
+    def test_topk_dice_join_invalid_k_zero(self):
+        topk_dice_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                       self.tokenizer, 0)
+
+    @raises(AssertionError)
+    def test_topk_jaccard_join_invalid_l_join_attr(self):
+        topk_jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.invalid_attr',
+                          'B.attr', self.tokenizer, 1)
+
+    @raises(AssertionError)
+    def test_topk_jaccard_join_invalid_r_out_attr(self):
+        topk_jaccard_join(self.A, self.B, 'A.id', 'B.id', 'A.attr', 'B.attr',
+                          self.tokenizer, 1, ['A.attr'], ['B.invalid_attr'])
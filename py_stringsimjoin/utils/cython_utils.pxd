@@ -4,24 +4,43 @@ from libcpp.vector cimport vector
 from libcpp.pair cimport pair  
 
 from py_stringsimjoin.index.inverted_index_cy cimport InvertedIndexCy           
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreCy, TokenStoreView
 
 
 ctypedef bool (*compfnptr)(double, double) nogil                                
 
-cdef void tokenize_lists(ltable, rtable,                                        
-                         l_join_attr_index, r_join_attr_index,                  
-                         tokenizer,                                             
-                         vector[vector[int]]& ltokens,                          
-                         vector[vector[int]]& rtokens)
+cdef tokenize_lists(ltable, rtable,                                        
+                    l_join_attr_index, r_join_attr_index,                  
+                    tokenizer,                                             
+                    TokenStoreCy ltokens, TokenStoreCy rtokens,
+                    int n_jobs=*, tokenized_columns=*,
+                    bool return_positions=*)
+
+cdef void tokenize_list(table, join_attr_index, tokenizer,
+                        TokenStoreCy tokens, int n_jobs=*,
+                        tokenized_column=*)
+
+cdef void tokenize_list_using_index(table, join_attr_index, tokenizer, index,
+                                    TokenStoreCy tokens)
 
 cdef generate_output_table(ltable_array, rtable_array,                     
                            vector[vector[pair[int, int]]]& output_pairs,   
                            vector[vector[double]]& output_sim_scores,      
                            l_key_attr_index, r_key_attr_index,             
                            l_out_attrs_indices, r_out_attrs_indices,       
-                           out_sim_score, output_header, n_jobs)
+                           out_sim_score, output_header,
+                           int num_sim_scores=*)
+
+cdef void get_probe_costs(TokenStoreView& probe_tokens,
+                          vector[int]& num_probe_tokens,
+                          const int* offsets, int num_indexed_tokens,
+                          vector[double]& costs) nogil
+
+cdef void get_probe_schedule(vector[double]& costs, int n_jobs,
+                             vector[int]& probe_order,
+                             vector[pair[int, int]]& chunks) nogil
 
-cdef void build_inverted_index(vector[vector[int]]& token_vectors,              
+cdef void build_inverted_index(TokenStoreView& token_store,
                                InvertedIndexCy inv_index)
 
 cdef int get_comp_type(comp_op)
@@ -1,40 +1,81 @@
 
-import pandas as pd
+import numpy as np
 
-from py_stringsimjoin.utils.generic_helper import get_output_row_from_tables
-from py_stringsimjoin.utils.token_ordering import gen_token_ordering_for_tables,\
-    order_using_token_ordering
+from py_stringsimjoin.utils.generic_helper import get_output_table_from_pairs
+from py_stringsimjoin.utils.native_tokenizer_cy import \
+    tokenize_and_order_tables_natively
+from py_stringsimjoin.utils.token_ordering import \
+    tokenize_and_order_tables_in_parallel
 
 from libcpp cimport bool                                                        
+from libcpp.algorithm cimport sort
 from libcpp.vector cimport vector                                               
 from libcpp.pair cimport pair  
-from libcpp.map cimport map as omap
 
 from py_stringsimjoin.index.inverted_index_cy cimport InvertedIndexCy           
-
-
-cdef void tokenize_lists(ltable, rtable, 
-                         l_join_attr_index, r_join_attr_index, 
-                         tokenizer,      
-                         vector[vector[int]]& ltokens, 
-                         vector[vector[int]]& rtokens): 
-
-    token_ordering = gen_token_ordering_for_tables(                             
-                         [ltable, rtable],                                      
-                         [l_join_attr_index, r_join_attr_index],                          
-                         tokenizer)                                             
-                                                                                
-    for lrow in ltable:                                                         
-        lstr = lrow[l_join_attr_index]                                               
-        py_tokens = order_using_token_ordering(                                 
-                        tokenizer.tokenize(lstr), token_ordering)               
-        ltokens.push_back(py_tokens)                                            
-                                                                                
-    for rrow in rtable:                                                         
-        rstr = rrow[r_join_attr_index]                                               
-        py_tokens = order_using_token_ordering(                                 
-                        tokenizer.tokenize(rstr), token_ordering)               
-        rtokens.push_back(py_tokens)                                            
+from py_stringsimjoin.utils.token_store_cy cimport TokenStoreCy, \
+    TokenStoreView, get_num_tokens, get_tokens
+
+
+cdef tokenize_lists(ltable, rtable, 
+                    l_join_attr_index, r_join_attr_index, 
+                    tokenizer,      
+                    TokenStoreCy ltokens, TokenStoreCy rtokens,
+                    int n_jobs=1, tokenized_columns=None,
+                    bool return_positions=False): 
+    # each string is tokenized only once, and the token ordering is obtained
+    # from the same pass. The tokens cached by prepared tables are reused.
+    # Otherwise, the standard delimiter and qgram tokenizers are run natively,
+    # and large tables are tokenized by n_jobs processes. If return_positions
+    # is True, the positions of the ordered tokens of the two tables in the
+    # lists returned by the tokenizer are returned, in the layout of the
+    # token stores.
+    token_arrays = None
+    if tokenized_columns is None:
+        token_arrays = tokenize_and_order_tables_natively(
+                           [ltable, rtable],
+                           [l_join_attr_index, r_join_attr_index], tokenizer,
+                           return_positions)
+    if token_arrays is None:
+        token_arrays, _ = tokenize_and_order_tables_in_parallel(
+                              [ltable, rtable],
+                              [l_join_attr_index, r_join_attr_index],
+                              tokenizer, n_jobs,
+                              tokenized_columns=tokenized_columns,
+                              return_positions=return_positions)
+
+    ltokens.set_arrays(token_arrays[0][0], token_arrays[0][1])
+    rtokens.set_arrays(token_arrays[1][0], token_arrays[1][1])
+
+    if return_positions:
+        return token_arrays[0][2], token_arrays[1][2]
+    return None
+
+
+cdef void tokenize_list(table, join_attr_index, tokenizer, 
+                        TokenStoreCy tokens, int n_jobs=1,
+                        tokenized_column=None):
+    # tokenizes a single table. This is used by the self joins, where both
+    # the sides of the join refer to the same table.
+    token_arrays = None
+    if tokenized_column is None:
+        token_arrays = tokenize_and_order_tables_natively(
+                           [table], [join_attr_index], tokenizer)
+    if token_arrays is None:
+        token_arrays, _ = tokenize_and_order_tables_in_parallel(
+                              [table], [join_attr_index], tokenizer, n_jobs,
+                              tokenized_columns=[tokenized_column])
+
+    tokens.set_arrays(token_arrays[0][0], token_arrays[0][1])
+
+
+cdef void tokenize_list_using_index(table, join_attr_index, tokenizer, index,
+                                    TokenStoreCy tokens):
+    # tokenizes a table to probe a prebuilt SetSimJoinIndex, using the token
+    # ordering stored in the index.
+    for row in table:
+        tokens.append(index.order_tokens(
+                          tokenizer.tokenize(row[join_attr_index])))
 
 
 cdef generate_output_table(ltable_array, rtable_array, 
@@ -42,51 +83,111 @@ cdef generate_output_table(ltable_array, rtable_array,
                            vector[vector[double]]& output_sim_scores, 
                            l_key_attr_index, r_key_attr_index, 
                            l_out_attrs_indices, r_out_attrs_indices, 
-                           out_sim_score, output_header, n_jobs):
-
-    output_rows = []                                                            
-    has_output_attributes = (len(l_out_attrs_indices) > 0 or                         
-                             len(r_out_attrs_indices) > 0)       
-
-    cdef int i, j                                                               
-    cdef pair[int, int] pair_entry                                              
-    for i in xrange(n_jobs):                                                    
-        for j in xrange(output_pairs[i].size()):                                
-            pair_entry = output_pairs[i][j]                                     
-            if has_output_attributes:                                           
-                output_row = get_output_row_from_tables(                        
-                    ltable_array[pair_entry.first], rtable_array[pair_entry.second],
-                    l_key_attr_index, r_key_attr_index,                         
-                    l_out_attrs_indices, r_out_attrs_indices)                   
-            else:                                                               
-                output_row = [ltable_array[pair_entry.first][l_key_attr_index], 
-                              rtable_array[pair_entry.second][r_key_attr_index]]
-                                                                                
-            # if out_sim_score flag is set, append the similarity score         
-            # to the output record.                                             
-            if out_sim_score:                                                   
-                output_row.append(output_sim_scores[i][j])                      
-                                                                                
-            output_rows.append(output_row)  
-
-    # generate a dataframe from the list of output rows                         
-    output_table = pd.DataFrame(output_rows, columns=output_header)   
-
-    return output_table
-
-
-cdef void build_inverted_index(vector[vector[int]]& token_vectors, 
+                           out_sim_score, output_header,
+                           int num_sim_scores=1):
+    # the output pairs of all the threads are gathered into arrays of row
+    # positions and scores in a single pass, and the output columns are then
+    # taken from the input arrays using these positions. Each pair has
+    # num_sim_scores consecutive scores in output_sim_scores, which are
+    # output as separate columns.
+    cdef int i, j, s, k = 0, num_pairs = 0
+    for i in range(output_pairs.size()):
+        num_pairs += output_pairs[i].size()
+
+    l_ids = np.empty(num_pairs, dtype=np.intc)
+    r_ids = np.empty(num_pairs, dtype=np.intc)
+    sim_scores = np.empty((num_pairs, num_sim_scores), dtype=np.float64)
+    cdef int[:] l_ids_view = l_ids, r_ids_view = r_ids
+    cdef double[:, :] sim_scores_view = sim_scores
+
+    with nogil:
+        for i in range(output_pairs.size()):
+            for j in range(output_pairs[i].size()):
+                l_ids_view[k] = output_pairs[i][j].first
+                r_ids_view[k] = output_pairs[i][j].second
+                for s in range(num_sim_scores):
+                    sim_scores_view[k, s] = \
+                        output_sim_scores[i][j * num_sim_scores + s]
+                k += 1
+
+    if num_sim_scores == 1:
+        sim_scores = sim_scores[:, 0]
+
+    return get_output_table_from_pairs(ltable_array, rtable_array,
+                                       l_ids, r_ids,
+                                       l_key_attr_index, r_key_attr_index,
+                                       l_out_attrs_indices, r_out_attrs_indices,
+                                       output_header,
+                                       sim_scores if out_sim_score else None)
+
+
+# number of chunks per job that the probe rows are split into, so that the
+# chunks can be handed out dynamically to the threads.
+cdef int CHUNKS_PER_JOB = 16
+
+
+cdef void get_probe_costs(TokenStoreView& probe_tokens,
+                          vector[int]& num_probe_tokens,
+                          const int* offsets, int num_indexed_tokens,
+                          vector[double]& costs) nogil:
+    # estimates the cost of probing the index with each row, as the number of
+    # tokens in the row plus the total length of the posting lists scanned for
+    # the first num_probe_tokens[i] tokens of the row.
+    cdef int i, j, token, n = probe_tokens.num_records
+    cdef const int* tokens
+    cdef double cost
+    costs.clear()
+    for i in range(n):
+        tokens = get_tokens(probe_tokens, i)
+        cost = 1.0 + get_num_tokens(probe_tokens, i)
+        for j in range(num_probe_tokens[i]):
+            token = tokens[j]
+            if token < num_indexed_tokens:
+                cost += offsets[token + 1] - offsets[token]
+        costs.push_back(cost)
+
+
+cdef void get_probe_schedule(vector[double]& costs, int n_jobs,
+                             vector[int]& probe_order,
+                             vector[pair[int, int]]& chunks) nogil:
+    # orders the rows in decreasing order of cost and splits them into chunks
+    # of roughly equal cost, given as (start, end) ranges of probe_order. The
+    # most expensive rows come first, so that when the chunks are handed out
+    # dynamically, the threads finish at about the same time.
+    cdef int i, start = 0, n = costs.size()
+    cdef double total_cost = 0, chunk_cost = 0, target_chunk_cost
+    cdef vector[pair[double, int]] cost_ids
+
+    for i in range(n):
+        cost_ids.push_back(pair[double, int](-costs[i], i))
+        total_cost += costs[i]
+    sort(cost_ids.begin(), cost_ids.end())
+
+    probe_order.clear()
+    for i in range(n):
+        probe_order.push_back(cost_ids[i].second)
+
+    chunks.clear()
+    if n == 0:
+        return
+
+    target_chunk_cost = total_cost / (n_jobs * CHUNKS_PER_JOB)
+    for i in range(n):
+        chunk_cost += costs[probe_order[i]]
+        if chunk_cost >= target_chunk_cost or i == n - 1:
+            chunks.push_back(pair[int, int](start, i + 1))
+            start = i + 1
+            chunk_cost = 0
+
+
+cdef void build_inverted_index(TokenStoreView& token_store, 
                                InvertedIndexCy inv_index):
-    cdef vector[int] tokens, size_vector                                        
-    cdef int i, j, m, n=token_vectors.size()                                    
-    cdef omap[int, vector[int]] index                                           
+    cdef int i, n=token_store.num_records
+    cdef vector[int] prefix_lengths
+    # all the tokens of each record are indexed.
     for i in xrange(n):                                                          
-        tokens = token_vectors[i]                                               
-        m = tokens.size()                                                       
-        size_vector.push_back(m)                                                
-        for j in range(m):                                                      
-            index[tokens[j]].push_back(i)                                       
-    inv_index.set_fields(index, size_vector) 
+        prefix_lengths.push_back(get_num_tokens(token_store, i))
+    inv_index.build_index(token_store, prefix_lengths)
 
 
 cdef int get_comp_type(comp_op):                                                
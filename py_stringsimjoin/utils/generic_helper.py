@@ -1,9 +1,11 @@
 
+import heapq
 import multiprocessing
 import operator
 import os
 
 from six.moves import xrange
+import numpy as np
 import pandas as pd
 
 
@@ -60,6 +62,45 @@ def get_output_header_from_tables(l_key_attr, r_key_attr,
     return output_header
 
 
+def get_output_table_from_pairs(ltable_array, rtable_array, l_ids, r_ids,
+                                l_key_attr_index, r_key_attr_index,
+                                l_out_attrs_indices, r_out_attrs_indices,
+                                output_header, sim_scores=None):
+    """Builds the output table of a join from the positions l_ids and r_ids
+    of the output pairs in ltable_array and rtable_array.
+
+    Each output column is gathered with a single vectorized take on the
+    corresponding column of the input arrays, instead of building a list per
+    output pair. The types of the columns are then inferred as done when the
+    output table is built from a list of rows. If sim_scores is a 2D array,
+    each of its columns is output as a separate score column.
+    """
+    l_ids = np.asarray(l_ids, dtype=np.intp)
+    r_ids = np.asarray(r_ids, dtype=np.intp)
+
+    columns = [ltable_array[l_ids, l_key_attr_index],
+               rtable_array[r_ids, r_key_attr_index]]
+    if l_out_attrs_indices:
+        columns.extend(ltable_array[l_ids, l_attr_index]
+                       for l_attr_index in l_out_attrs_indices)
+    if r_out_attrs_indices:
+        columns.extend(rtable_array[r_ids, r_attr_index]
+                       for r_attr_index in r_out_attrs_indices)
+    if sim_scores is not None:
+        sim_scores = np.asarray(sim_scores, dtype=np.float64)
+        if sim_scores.ndim == 1:
+            columns.append(sim_scores)
+        else:
+            columns.extend(sim_scores.T)
+
+    # the columns are keyed by their position, as the output header may
+    # contain the same name twice.
+    output_table = pd.DataFrame(dict(zip(xrange(len(columns)), columns)),
+                                columns=list(xrange(len(columns))))
+    output_table.columns = output_header
+    return output_table.infer_objects()
+
+
 def convert_dataframe_to_list(table, join_attr_index,
                               remove_null=True):
     table_list = []
@@ -108,6 +149,88 @@ def split_table(table, num_splits):
     return splits
 
 
+def split_table_by_cost(table, attr_index, num_splits):
+    """Split the rows of table into num_splits splits of roughly equal cost.
+
+    The cost of a row is estimated by the length of the string in the column
+    attr_index. Rows are assigned in decreasing order of cost to the split with
+    the least total cost so far. Returns the list of splits and, for each
+    split, the list of indices of its rows in table, in increasing order.
+    """
+    costs = [len(str(row[attr_index])) for row in table]
+    heap = [(0, split_index) for split_index in xrange(num_splits)]
+    split_ids = [[] for split_index in xrange(num_splits)]
+    for row_index in sorted(xrange(len(costs)), key=lambda i: -costs[i]):
+        (split_cost, split_index) = heapq.heappop(heap)
+        split_ids[split_index].append(row_index)
+        heapq.heappush(heap, (split_cost + costs[row_index], split_index))
+
+    splits = []
+    for ids in split_ids:
+        ids.sort()
+        splits.append(table[ids])
+    return splits, split_ids
+
+
+def split_table_into_chunks(table, chunk_size):
+    """Yields consecutive chunks of at most chunk_size rows of the dataframe.
+    An empty dataframe yields a single empty chunk, so that the output of a join
+    on an empty table still has a header.
+    """
+    for start in xrange(0, max(len(table), 1), chunk_size):
+        yield table.iloc[start:start + chunk_size]
+
+
+def iter_join_output_chunks(join_fn, rtable, chunk_size):
+    """Runs join_fn on consecutive chunks of rtable and yields the output table
+    of each chunk. The values of the '_id' column continue across the chunks,
+    so the concatenation of the chunks has unique ids.
+    """
+    num_output_rows = 0
+    for rtable_chunk in split_table_into_chunks(rtable, chunk_size):
+        output_table = join_fn(rtable_chunk)
+        output_table['_id'] = range(num_output_rows,
+                                    num_output_rows + len(output_table))
+        num_output_rows += len(output_table)
+        yield output_table
+
+
+def sweep_join_thresholds(join_fn, thresholds, out_sim_score):
+    """Runs join_fn once at the lowest of the thresholds, and tags each output
+    pair with the highest threshold it satisfies in a '_threshold' column.
+
+    join_fn is called with the lowest threshold and should return an output
+    table with a '_sim_score' column, computed with the comparison operator
+    '>='. The pairs tagged with a threshold greater than or equal to t are the
+    pairs that the join outputs at threshold t. The pairs with a missing
+    value, which are output at every threshold, are tagged with the highest
+    threshold.
+    """
+    sorted_thresholds = np.unique(thresholds)
+    output_table = join_fn(sorted_thresholds[0])
+    sim_scores = output_table['_sim_score'].values.astype(np.float64)
+    threshold_pos = np.searchsorted(sorted_thresholds, sim_scores,
+                                    side='right') - 1
+    threshold_pos[np.isnan(sim_scores)] = len(sorted_thresholds) - 1
+    output_table['_threshold'] = sorted_thresholds[threshold_pos]
+    if not out_sim_score:
+        output_table.drop('_sim_score', axis=1, inplace=True)
+    return output_table
+
+
+def get_sim_measure_types(conditions):
+    """Returns the distinct similarity measures of the conditions of a
+    multi-measure join, in the order in which they first occur, and the names
+    of their score columns in the output table."""
+    sim_measure_types = []
+    for sim_measure_type, _ in conditions:
+        if sim_measure_type not in sim_measure_types:
+            sim_measure_types.append(sim_measure_type)
+    return (sim_measure_types,
+            ['_' + sim_measure_type.lower() + '_sim_score'
+             for sim_measure_type in sim_measure_types])
+
+
 def remove_non_ascii(s):
     return ''.join(i for i in s if ord(i) < 128)
 
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import pyprind
 
@@ -11,7 +12,8 @@ def get_pairs_with_missing_value(ltable, rtable,
                                  l_join_attr, r_join_attr,
                                  l_out_attrs=None, r_out_attrs=None,
                                  l_out_prefix='l_', r_out_prefix='r_',
-                                 out_sim_score=False, show_progress=True):
+                                 out_sim_score=False, show_progress=True,
+                                 self_join=False):
     # find column indices of key attr, join attr and output attrs in ltable
     l_columns = list(ltable.columns.values)
     l_key_attr_index = l_columns.index(l_key_attr)
@@ -25,13 +27,18 @@ def get_pairs_with_missing_value(ltable, rtable,
     r_out_attrs_indices = find_output_attribute_indices(r_columns, r_out_attrs)
    
     # find ltable records with missing value in l_join_attr
-    ltable_missing = ltable[pd.isnull(ltable[l_join_attr])]
+    l_missing_flags = pd.isnull(ltable[l_join_attr]).values
+    ltable_missing = ltable[l_missing_flags]
+    l_missing_pos = np.flatnonzero(l_missing_flags)
 
     # find ltable records which do not contain missing value in l_join_attr
-    ltable_not_missing = ltable[pd.notnull(ltable[l_join_attr])]
+    ltable_not_missing = ltable[~l_missing_flags]
+    l_not_missing_pos = np.flatnonzero(~l_missing_flags)
 
     # find rtable records with missing value in r_join_attr
-    rtable_missing = rtable[pd.isnull(rtable[r_join_attr])]
+    r_missing_flags = pd.isnull(rtable[r_join_attr]).values
+    rtable_missing = rtable[r_missing_flags]
+    r_missing_pos = np.flatnonzero(r_missing_flags)
 
     output_rows = []
     has_output_attributes = (l_out_attrs is not None or
@@ -41,10 +48,19 @@ def get_pairs_with_missing_value(ltable, rtable,
         print('Finding pairs with missing value...')
         prog_bar = pyprind.ProgBar(len(ltable_missing) + len(rtable_missing))
 
+    # In a self join, ltable and rtable are the same table. So, a pair is
+    # output only if the left record occurs before the right record in the
+    # table, so that each pair is output once and no record is paired with
+    # itself.
+
     # For each ltable record with missing value in l_join_attr,
     # output a pair corresponding to every record in rtable.
-    for l_row in ltable_missing.itertuples(index=False):
-        for r_row in rtable.itertuples(index=False):
+    for l_pos, l_row in zip(l_missing_pos,
+                            ltable_missing.itertuples(index=False)):
+        for r_pos, r_row in enumerate(rtable.itertuples(index=False)):
+            if self_join and r_pos <= l_pos:
+                continue
+
             if has_output_attributes:
                 output_row = get_output_row_from_tables(
                                  l_row, r_row,
@@ -52,6 +68,10 @@ def get_pairs_with_missing_value(ltable, rtable,
                                  l_out_attrs_indices, r_out_attrs_indices)
             else:
                 output_row = [l_row[l_key_attr_index], r_row[r_key_attr_index]]
+
+            if out_sim_score:
+                output_row.append(np.nan)
+
             output_rows.append(output_row)
 
         if show_progress:
@@ -60,8 +80,13 @@ def get_pairs_with_missing_value(ltable, rtable,
     # For each rtable record with missing value in r_join_attr,
     # output a pair corresponding to every record in ltable which 
     # doesn't have a missing value in l_join_attr.
-    for r_row in rtable_missing.itertuples(index=False):
-        for l_row in ltable_not_missing.itertuples(index=False):
+    for r_pos, r_row in zip(r_missing_pos,
+                            rtable_missing.itertuples(index=False)):
+        for l_pos, l_row in zip(l_not_missing_pos,
+                                ltable_not_missing.itertuples(index=False)):
+            if self_join and l_pos >= r_pos:
+                break
+
             if has_output_attributes:
                 output_row = get_output_row_from_tables(
                                  l_row, r_row,
@@ -71,7 +96,7 @@ def get_pairs_with_missing_value(ltable, rtable,
                 output_row = [l_row[l_key_attr_index], r_row[r_key_attr_index]]
 
             if out_sim_score:
-                output_row.append(pd.np.NaN)
+                output_row.append(np.nan)
 
             output_rows.append(output_row)
 
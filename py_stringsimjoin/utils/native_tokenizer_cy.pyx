@@ -0,0 +1,310 @@
+# native tokenization of delimiter and qgram tokenizers
+
+from py_stringmatching.tokenizer.delimiter_tokenizer import DelimiterTokenizer
+from py_stringmatching.tokenizer.qgram_tokenizer import QgramTokenizer
+import numpy as np
+
+from cython.operator cimport dereference as deref
+from libc.stdint cimport uint32_t, uint64_t
+from libcpp cimport bool
+from libcpp.algorithm cimport sort, unique
+from libcpp.pair cimport pair
+from libcpp.string cimport string
+from libcpp.unordered_map cimport unordered_map
+from libcpp.vector cimport vector
+
+
+cdef extern from "Python.h":
+    int unicode_kind "PyUnicode_KIND"(object o)
+    void* unicode_data "PyUnicode_DATA"(object o)
+    Py_ssize_t unicode_length "PyUnicode_GET_LENGTH"(object o)
+    uint32_t unicode_read "PyUnicode_READ"(int kind, void* data,
+                                           Py_ssize_t index) nogil
+
+
+# Each code point is stored in 21 bits of a q-gram code, so q-grams of up to 3
+# characters fit in 64 bits. The code points are packed with the first
+# character in the most significant bits, so that the q-gram codes compare in
+# the same order as the q-grams themselves.
+cdef int CODE_POINT_BITS = 21
+cdef int MAX_NATIVE_QVAL = 3
+
+
+def tokenize_and_order_tables_natively(table_list, attr_list, tokenizer,
+                                       return_positions=False):
+    """Tokenize the tables and order the tokens without creating a Python
+    object per token.
+
+    This is supported for DelimiterTokenizer with single character delimiters
+    and for QgramTokenizer with qval of at most 3, when all the values of the
+    attributes are strings. The q-grams are encoded as integers by packing
+    their code points, and the tokens of a DelimiterTokenizer are interned
+    using their code points, in a loop that runs without the GIL. The token
+    ordering is the same as the one generated by
+    gen_token_ordering_for_tables.
+
+    If return_positions is True, the position of each token in the list
+    returned by the tokenizer is returned along with the ordered tokens. This
+    is not supported for tokenizers returning sets.
+
+    Returns:
+        A list holding, for each table, a pair of int32 arrays
+        (offsets, tokens) with the ordered tokens of the j-th record in
+        tokens[offsets[j] : offsets[j + 1]], as returned by
+        tokenize_and_order_tables_in_parallel. If return_positions is True,
+        each pair is extended with an int32 array holding the positions of
+        the tokens. None is returned if the tokenizer or the values are not
+        supported.
+    """
+    cdef bool is_qgram, padding = False, return_set
+    cdef int qval = 0
+    cdef uint32_t prefix_pad = 0, suffix_pad = 0
+    cdef vector[uint32_t] delims
+
+    if type(tokenizer) is QgramTokenizer:
+        if tokenizer.qval > MAX_NATIVE_QVAL:
+            return None
+        is_qgram = True
+        qval = tokenizer.qval
+        padding = tokenizer.padding
+        prefix_pad = ord(tokenizer.prefix_pad)
+        suffix_pad = ord(tokenizer.suffix_pad)
+    elif type(tokenizer) is DelimiterTokenizer:
+        is_qgram = False
+        for delim in tokenizer.get_delim_set():
+            if not isinstance(delim, unicode) or len(delim) != 1:
+                return None
+            delims.push_back(ord(delim))
+    else:
+        return None
+    return_set = tokenizer.get_return_set()
+    if return_set and return_positions:
+        return None
+    cdef bool with_positions = return_positions
+
+    # collect the buffers of the strings. The strings are kept alive by the
+    # tables while they are tokenized.
+    cdef vector[int] kinds, num_records
+    cdef vector[void*] datas
+    cdef vector[Py_ssize_t] lengths
+    for table, attr in zip(table_list, attr_list):
+        for row in table:
+            value = row[attr]
+            if not isinstance(value, unicode):
+                return None
+            kinds.push_back(unicode_kind(value))
+            datas.push_back(unicode_data(value))
+            lengths.push_back(unicode_length(value))
+        num_records.push_back(len(table))
+
+    cdef vector[int] offsets, token_ids, token_freqs, ranks, positions
+    cdef int i
+
+    with nogil:
+        if is_qgram:
+            tokenize_qgrams(kinds, datas, lengths, qval, padding,
+                            prefix_pad, suffix_pad, return_set,
+                            offsets, token_ids, token_freqs, ranks)
+        else:
+            tokenize_delimited(kinds, datas, lengths, delims, return_set,
+                               offsets, token_ids, token_freqs, ranks)
+
+        # relabel the tokens using their ranks, and sort the tokens of each
+        # record.
+        for i in range(token_ids.size()):
+            token_ids[i] = ranks[token_ids[i]]
+        if with_positions:
+            sort_tokens_with_positions(offsets, token_ids, positions)
+        else:
+            for i in range(offsets.size() - 1):
+                sort(token_ids.begin() + offsets[i],
+                     token_ids.begin() + offsets[i + 1])
+
+    token_arrays = split_token_arrays(offsets, token_ids, num_records)
+    if return_positions:
+        position_arrays = split_token_arrays(offsets, positions, num_records)
+        token_arrays = [token_array + position_array[1:]
+                        for token_array, position_array in
+                        zip(token_arrays, position_arrays)]
+    return token_arrays
+
+
+cdef void sort_tokens_with_positions(vector[int]& offsets,
+                                     vector[int]& token_ids,
+                                     vector[int]& positions) nogil:
+    # sorts the tokens of each record, and stores the position of each token
+    # in the record before sorting. The tokens with the same rank are sorted
+    # by their positions.
+    cdef vector[pair[int, int]] record_tokens
+    cdef int i, j
+    positions.resize(token_ids.size())
+    for i in range(offsets.size() - 1):
+        record_tokens.clear()
+        for j in range(offsets[i], offsets[i + 1]):
+            record_tokens.push_back(pair[int, int](token_ids[j],
+                                                   j - offsets[i]))
+        sort(record_tokens.begin(), record_tokens.end())
+        for j in range(offsets[i], offsets[i + 1]):
+            token_ids[j] = record_tokens[j - offsets[i]].first
+            positions[j] = record_tokens[j - offsets[i]].second
+
+
+cdef void tokenize_qgrams(vector[int]& kinds, vector[void*]& datas,
+                          vector[Py_ssize_t]& lengths, int qval, bool padding,
+                          uint32_t prefix_pad, uint32_t suffix_pad,
+                          bool return_set, vector[int]& offsets,
+                          vector[int]& token_ids, vector[int]& token_freqs,
+                          vector[int]& ranks) nogil:
+    cdef unordered_map[uint64_t, int] code_ids
+    cdef unordered_map[uint64_t, int].iterator it
+    cdef vector[uint64_t] codes
+    cdef vector[int] record_ids
+    cdef vector[pair[pair[int, uint64_t], int]] freq_codes
+    cdef int r, i, j, token_id, num_pads = qval - 1 if padding else 0
+    cdef Py_ssize_t length, num_chars, pos
+    cdef uint64_t code
+    cdef uint32_t c
+
+    offsets.push_back(0)
+    for r in range(kinds.size()):
+        length = lengths[r]
+        num_chars = length + 2 * num_pads
+        record_ids.clear()
+        for i in range(num_chars - qval + 1):
+            code = 0
+            for j in range(qval):
+                pos = i + j
+                if pos < num_pads:
+                    c = prefix_pad
+                elif pos >= num_pads + length:
+                    c = suffix_pad
+                else:
+                    c = unicode_read(kinds[r], datas[r], pos - num_pads)
+                code = (code << CODE_POINT_BITS) | c
+            it = code_ids.find(code)
+            if it == code_ids.end():
+                token_id = codes.size()
+                code_ids[code] = token_id
+                codes.push_back(code)
+                token_freqs.push_back(0)
+            else:
+                token_id = deref(it).second
+            record_ids.push_back(token_id)
+        add_record(record_ids, return_set, offsets, token_ids, token_freqs)
+
+    # the tokens are ranked in increasing order of frequency, breaking ties
+    # using the tokens themselves.
+    for i in range(codes.size()):
+        freq_codes.push_back(pair[pair[int, uint64_t], int](
+                                 pair[int, uint64_t](token_freqs[i], codes[i]),
+                                 i))
+    sort(freq_codes.begin(), freq_codes.end())
+    ranks.resize(codes.size())
+    for i in range(freq_codes.size()):
+        ranks[freq_codes[i].second] = i + 1
+
+
+cdef void tokenize_delimited(vector[int]& kinds, vector[void*]& datas,
+                             vector[Py_ssize_t]& lengths,
+                             vector[uint32_t]& delims, bool return_set,
+                             vector[int]& offsets, vector[int]& token_ids,
+                             vector[int]& token_freqs,
+                             vector[int]& ranks) nogil:
+    # the tokens are interned using their code points, stored as 4 big endian
+    # bytes each, so that the keys compare in the same order as the tokens.
+    cdef unordered_map[string, int] key_ids
+    cdef unordered_map[string, int].iterator it
+    cdef vector[string] keys
+    cdef vector[int] record_ids
+    cdef vector[pair[pair[int, string], int]] freq_keys
+    cdef int r, i, token_id
+    cdef Py_ssize_t length, pos, start
+    cdef string key
+    cdef uint32_t c
+
+    offsets.push_back(0)
+    for r in range(kinds.size()):
+        length = lengths[r]
+        record_ids.clear()
+        start = 0
+        for pos in range(length + 1):
+            if pos < length:
+                c = unicode_read(kinds[r], datas[r], pos)
+                if not is_delim(c, delims):
+                    continue
+            # the characters from start to pos form a token, unless they are
+            # empty.
+            if pos > start:
+                key.clear()
+                for i in range(start, pos):
+                    c = unicode_read(kinds[r], datas[r], i)
+                    key.push_back(<char>((c >> 24) & 0xFF))
+                    key.push_back(<char>((c >> 16) & 0xFF))
+                    key.push_back(<char>((c >> 8) & 0xFF))
+                    key.push_back(<char>(c & 0xFF))
+                it = key_ids.find(key)
+                if it == key_ids.end():
+                    token_id = keys.size()
+                    key_ids[key] = token_id
+                    keys.push_back(key)
+                    token_freqs.push_back(0)
+                else:
+                    token_id = deref(it).second
+                record_ids.push_back(token_id)
+            start = pos + 1
+        add_record(record_ids, return_set, offsets, token_ids, token_freqs)
+
+    for i in range(keys.size()):
+        freq_keys.push_back(pair[pair[int, string], int](
+                                pair[int, string](token_freqs[i], keys[i]), i))
+    sort(freq_keys.begin(), freq_keys.end())
+    ranks.resize(keys.size())
+    for i in range(freq_keys.size()):
+        ranks[freq_keys[i].second] = i + 1
+
+
+cdef inline bool is_delim(uint32_t c, vector[uint32_t]& delims) nogil:
+    cdef int i
+    for i in range(delims.size()):
+        if delims[i] == c:
+            return True
+    return False
+
+
+cdef void add_record(vector[int]& record_ids, bool return_set,
+                     vector[int]& offsets, vector[int]& token_ids,
+                     vector[int]& token_freqs) nogil:
+    # appends the tokens of a record, removing the duplicate tokens if the
+    # tokenizer returns a set, and counts their frequencies.
+    cdef int i
+    if return_set:
+        sort(record_ids.begin(), record_ids.end())
+        record_ids.erase(unique(record_ids.begin(), record_ids.end()),
+                         record_ids.end())
+    for i in range(record_ids.size()):
+        token_freqs[record_ids[i]] += 1
+        token_ids.push_back(record_ids[i])
+    offsets.push_back(token_ids.size())
+
+
+cdef split_token_arrays(vector[int]& offsets, vector[int]& token_ids,
+                        vector[int]& num_records):
+    # splits the offsets and the tokens of all the records into the arrays of
+    # each table.
+    cdef int t, i, first = 0, n
+    cdef int[:] table_offsets_view, table_tokens_view
+    token_arrays = []
+    for t in range(num_records.size()):
+        n = num_records[t]
+        table_offsets = np.empty(n + 1, dtype=np.int32)
+        table_tokens = np.empty(offsets[first + n] - offsets[first],
+                                dtype=np.int32)
+        table_offsets_view = table_offsets
+        table_tokens_view = table_tokens
+        for i in range(n + 1):
+            table_offsets_view[i] = offsets[first + i] - offsets[first]
+        for i in range(offsets[first], offsets[first + n]):
+            table_tokens_view[i - offsets[first]] = token_ids[i]
+        token_arrays.append((table_offsets, table_tokens))
+        first += n
+    return token_arrays
@@ -0,0 +1,135 @@
+"""Tables prepared once and shared by multiple joins"""
+import json
+
+from py_stringsimjoin.utils.token_ordering import _tokenize_shard
+from py_stringsimjoin.utils.validation import validate_attr, \
+    validate_input_table, validate_key_attr, validate_tokenizer
+
+
+class PreparedTable(object):
+    """A table prepared once to be used by multiple joins, filters and
+    matchers.
+
+    Much of the time of a join on large tables is spent before the join
+    itself, validating the key attribute and tokenizing the join attribute.
+    A PreparedTable validates the key attribute when it is created, and caches
+    the tokens of the attributes it is tokenized on, so that a workflow
+    running several joins on the same table does this work only once. It can
+    be passed in place of the dataframe as the left or the right table of the
+    joins, the filters and apply_matcher. The tokens are reused by the joins
+    that are run using the Cython implementation.
+
+    The table should not be modified after it is prepared.
+
+    Args:
+        table (DataFrame): input table.
+
+        key_attr (string): key attribute in the table.
+
+    Attributes:
+        table (DataFrame): An attribute to store the input table.
+        key_attr (string): An attribute to store the key attribute.
+    """
+
+    def __init__(self, table, key_attr):
+        # check if the input table is a dataframe
+        validate_input_table(table, 'input table')
+
+        # check if the key attribute exists, is unique and does not contain
+        # missing values
+        validate_attr(key_attr, table.columns, 'key attribute', 'input table')
+        validate_key_attr(key_attr, table, 'input table')
+
+        self.table = table
+        self.key_attr = key_attr
+        self._tokenized_columns = {}
+
+    def tokenize(self, attr, tokenizer):
+        """Tokenize an attribute of the table, caching the tokens.
+
+        Args:
+            attr (string): attribute to be tokenized.
+
+            tokenizer (Tokenizer): tokenizer to be used. The tokens are cached
+                for the type, the parameters and the return_set flag of the
+                tokenizer.
+
+        Returns:
+            The tokens of the attribute (TokenizedColumn).
+        """
+        validate_attr(attr, self.table.columns, 'attribute', 'input table')
+        validate_tokenizer(tokenizer)
+
+        from py_stringsimjoin.index.set_sim_join_index import \
+            get_tokenizer_config
+        cache_key = (attr, json.dumps(get_tokenizer_config(tokenizer),
+                                      sort_keys=True),
+                     tokenizer.get_return_set())
+        tokenized_column = self._tokenized_columns.get(cache_key)
+        if tokenized_column is None:
+            tokenized_column = TokenizedColumn(self.table, attr, tokenizer)
+            self._tokenized_columns[cache_key] = tokenized_column
+        return tokenized_column
+
+
+class TokenizedColumn(object):
+    """Tokens of an attribute of a table.
+
+    The records with a missing value in the attribute are skipped, as in the
+    joins. The tokens are interned into integer ids, in the order in which
+    they are seen, and the ids of the tokens of each record are stored in CSR
+    layout.
+
+    Args:
+        table (DataFrame): input table.
+
+        attr (string): attribute to be tokenized.
+
+        tokenizer (Tokenizer): tokenizer to be used.
+
+    Attributes:
+        attr (string): An attribute to store the tokenized attribute.
+        tokens (list): An attribute to store the distinct tokens, indexed by
+            their id.
+        token_freqs (ndarray): An attribute to store the number of
+            occurrences of each token.
+        offsets (ndarray), token_ids (ndarray): Attributes to store the ids
+            of the tokens of the j-th record in
+            token_ids[offsets[j] : offsets[j + 1]].
+        sizes (ndarray): An attribute to store the number of tokens of each
+            record.
+        num_records (int): An attribute to store the number of records.
+    """
+
+    def __init__(self, table, attr, tokenizer):
+        self.attr = attr
+        (self.tokens, self.token_freqs,
+         self.offsets, self.token_ids) = _tokenize_shard(
+                                             table[attr].dropna().tolist(),
+                                             tokenizer)
+        self.sizes = self.offsets[1:] - self.offsets[:-1]
+        self.num_records = len(self.sizes)
+
+    def get_shard(self):
+        """Returns the tokens in the layout of a tokenized shard, as used by
+        tokenize_and_order_tables_in_parallel."""
+        return (self.tokens, self.token_freqs, self.offsets, self.token_ids)
+
+
+def unwrap_prepared_table(table):
+    """Returns the dataframe of a table which may be a PreparedTable, and the
+    PreparedTable (None if the table is not prepared)."""
+    if isinstance(table, PreparedTable):
+        return table.table, table
+    return table, None
+
+
+def get_tokenized_columns(prepared_tables, attrs, tokenizer):
+    """Returns the cached tokens of the attributes of the prepared tables,
+    with None for the tables that are not prepared. None is returned if none
+    of the tables is prepared."""
+    if all(prepared_table is None for prepared_table in prepared_tables):
+        return None
+    return [None if prepared_table is None else
+            prepared_table.tokenize(attr, tokenizer)
+            for prepared_table, attr in zip(prepared_tables, attrs)]
@@ -1,5 +1,7 @@
 """Similarity measure utilities"""
 
+from math import sqrt
+
 from py_stringmatching.similarity_measure.cosine import Cosine
 from py_stringmatching.similarity_measure.dice import Dice
 from py_stringmatching.similarity_measure.jaccard import Jaccard
@@ -38,3 +40,15 @@ def overlap(set1, set2):
     if not isinstance(set2, set):
         set2 = set(set2)
     return len(set1.intersection(set2))
+
+
+def get_sim_score_from_overlap(overlap, size1, size2, sim_measure_type):
+    """Computes the cosine, Dice or Jaccard score of two non-empty sets from
+    their overlap and their sizes, the same way as the similarity functions
+    do."""
+    if sim_measure_type == 'COSINE':
+        return float(overlap) / (sqrt(float(size1)) * sqrt(float(size2)))
+    elif sim_measure_type == 'DICE':
+        return 2.0 * float(overlap) / float(size1 + size2)
+    elif sim_measure_type == 'JACCARD':
+        return float(overlap) / float(size1 + size2 - overlap)
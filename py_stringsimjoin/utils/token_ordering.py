@@ -1,24 +1,30 @@
 """Token ordering utilities"""
-from operator import itemgetter 
+from zlib import crc32
 
+from joblib import delayed, Parallel
+import numpy as np
 import pandas as pd
 
 
+# minimum number of rows tokenized by a job in
+# tokenize_and_order_tables_in_parallel. Smaller tables are tokenized in the
+# calling process, as shipping them to the workers costs more than it saves.
+MIN_ROWS_PER_TOKENIZATION_JOB = 5000
+
+# number of bits used to number the unseen tokens with the same hash in the
+# orders of a SampledTokenOrdering. The orders of the unseen tokens are below
+# 2 ** (32 + UNSEEN_TOKEN_INDEX_BITS), and the orders of the sampled tokens
+# start from there.
+UNSEEN_TOKEN_INDEX_BITS = 16
+
+
 def gen_token_ordering_for_lists(token_lists):
     token_freq_dict = {}
     for token_list in token_lists:
         for token in token_list:
             token_freq_dict[token] = token_freq_dict.get(token, 0) + 1
-            order_idx = 1
-
-    ordered_tokens = sorted(list(token_freq_dict.items()), key=itemgetter(0))
 
-    token_ordering = {}
-    for token_freq_tuple in sorted(ordered_tokens, key=itemgetter(1)):
-        token_ordering[token_freq_tuple[0]] = order_idx
-        order_idx += 1
-
-    return token_ordering
+    return _get_token_ordering(token_freq_dict)
 
 
 def gen_token_ordering_for_tables(table_list, attr_list, tokenizer,
@@ -31,15 +37,350 @@ def gen_token_ordering_for_tables(table_list, attr_list, tokenizer,
                 token_freq_dict[token] = token_freq_dict.get(token, 0) + 1
         table_index += 1
 
-    ordered_tokens = sorted(list(token_freq_dict.items()), key=itemgetter(0))
+    return _get_token_ordering(token_freq_dict)
+
+
+class SampledTokenOrdering(object):
+    """Approximate token ordering derived from a sample of the records.
+
+    Prefix filtering is correct for any total order of the tokens, and the
+    ordering only affects how much is pruned. A SampledTokenOrdering orders
+    the tokens of the sample as gen_token_ordering_for_tables does, using
+    their frequencies in the sample. The tokens that do not occur in the
+    sample are assumed to be rare and are ordered before them, by the CRC32
+    checksum of their UTF-8 encoding, so that their order does not depend on
+    the records they occur in. The unseen tokens with the same checksum are
+    ordered in the order they are first seen.
+
+    The orders are positive integers which are not consecutive. Like a token
+    ordering dict, the ordering is accessed using get.
+
+    Args:
+        token_freq_dict (dict): frequencies of the tokens in the sample.
+    """
+
+    def __init__(self, token_freq_dict):
+        tokens = list(token_freq_dict)
+        ranks = _get_token_ranks(tokens, list(token_freq_dict.values()))
+        sampled_token_offset = 1 << (32 + UNSEEN_TOKEN_INDEX_BITS)
+        self.sampled_token_ordering = dict(zip(
+            tokens, (ranks.astype(np.int64) + sampled_token_offset).tolist()))
+        self.unseen_token_ordering = {}
+        self._num_unseen_tokens_per_hash = {}
+
+    def get(self, token, default=None):
+        """Returns the order of a token. The default is never returned, as
+        every token has an order."""
+        order = self.sampled_token_ordering.get(token)
+        if order is None:
+            order = self.unseen_token_ordering.get(token)
+        if order is None:
+            token_bytes = token if isinstance(token, bytes) else \
+                token.encode('utf-8')
+            token_hash = crc32(token_bytes) & 0xffffffff
+            index = self._num_unseen_tokens_per_hash.get(token_hash, 0)
+            if index >= (1 << UNSEEN_TOKEN_INDEX_BITS) - 1:
+                raise AssertionError('too many unseen tokens with the ' + \
+                                     'same hash')
+            self._num_unseen_tokens_per_hash[token_hash] = index + 1
+            order = (token_hash << UNSEEN_TOKEN_INDEX_BITS) + index + 1
+            self.unseen_token_ordering[token] = order
+        return order
+
+    def __len__(self):
+        return (len(self.sampled_token_ordering) +
+                len(self.unseen_token_ordering))
+
+
+def gen_sampled_token_ordering(table_list, attr_list, tokenizer, sample_size,
+                               random_state=0):
+    """Generate an approximate token ordering from a sample of the tables.
+
+    Up to sample_size records, chosen at random using the seed random_state,
+    are tokenized from each table. Hence, the ordering is available after
+    a pass over the sample, instead of a pass over the whole tables.
+
+    Returns:
+        The token ordering (SampledTokenOrdering).
+    """
+    rng = np.random.RandomState(random_state)
+    token_freq_dict = {}
+    for table, attr in zip(table_list, attr_list):
+        num_rows = len(table)
+        if num_rows > sample_size:
+            row_ids = np.sort(rng.choice(num_rows, sample_size,
+                                         replace=False))
+        else:
+            row_ids = range(num_rows)
+        for row_id in row_ids:
+            for token in tokenizer.tokenize(table[row_id][attr]):
+                token_freq_dict[token] = token_freq_dict.get(token, 0) + 1
+
+    return SampledTokenOrdering(token_freq_dict)
+
+
+def tokenize_and_order_tables(table_list, attr_list, tokenizer,
+                              token_ordering=None, return_positions=False):
+    """Tokenize the tables and order the tokens of each record in one pass.
+
+    Each string is tokenized only once. The tokens are interned into integer
+    ids in the order they are seen, while counting their frequencies, and the
+    token ordering is then obtained by relabeling the ids. The ordering is the
+    same as the one generated by gen_token_ordering_for_tables.
+
+    If token_ordering is given, such as a SampledTokenOrdering, the tokens are
+    ordered using it instead of using their frequencies. The ids are then
+    relabeled to consecutive ranks starting from 1, which preserve the order.
+
+    If return_positions is True, the positions of the tokens in the lists
+    returned by the tokenizer are returned as well. The tokens with the same
+    rank are ordered by their positions.
+
+    Returns:
+        A pair (token_lists, token_ordering), where token_lists[i][j] is the
+        list of ordered tokens of the j-th record of the i-th table. If
+        return_positions is True, a triple (token_lists, token_ordering,
+        position_lists) is returned, where position_lists[i][j][k] is the
+        position of token_lists[i][j][k].
+    """
+    token_ids = {}
+    token_freqs = []
+    sizes = []
+    flat_token_ids = []
+    for table, attr in zip(table_list, attr_list):
+        table_sizes = []
+        for row in table:
+            num_tokens = 0
+            for token in tokenizer.tokenize(row[attr]):
+                token_id = token_ids.get(token)
+                if token_id is None:
+                    token_id = len(token_freqs)
+                    token_ids[token] = token_id
+                    token_freqs.append(0)
+                token_freqs[token_id] += 1
+                flat_token_ids.append(token_id)
+                num_tokens += 1
+            table_sizes.append(num_tokens)
+        sizes.append(table_sizes)
+
+    tokens = list(token_ids)
+    if token_ordering is None:
+        ranks = _get_token_ranks(tokens, token_freqs)
+    else:
+        orders = np.array([token_ordering.get(token) for token in tokens],
+                          dtype=np.int64)
+        ranks = np.empty(len(tokens), dtype=np.int32)
+        ranks[np.argsort(orders)] = np.arange(1, len(tokens) + 1,
+                                              dtype=np.int32)
+
+    # relabel the ids of all the records in bulk, and sort the tokens of each
+    # record by sorting the flat array on (record, rank).
+    ordered_tokens = ranks[np.array(flat_token_ids, dtype=np.int64)]
+    record_sizes = np.array([num_tokens for table_sizes in sizes
+                             for num_tokens in table_sizes], dtype=np.int64)
+    record_ids = np.repeat(np.arange(len(record_sizes)), record_sizes)
+    order = np.lexsort((ordered_tokens, record_ids))
+    ordered_tokens = ordered_tokens[order].tolist()
+
+    token_lists = _split_records(ordered_tokens, sizes)
+    token_ordering = dict(zip(tokens, ranks.tolist()))
+
+    if return_positions:
+        # lexsort is stable, hence the tokens with the same rank keep the
+        # order of their positions.
+        record_starts = np.repeat(np.cumsum(record_sizes) - record_sizes,
+                                  record_sizes)
+        positions = (order - record_starts).tolist()
+        return token_lists, token_ordering, _split_records(positions, sizes)
+
+    return token_lists, token_ordering
+
+
+def _split_records(values, sizes):
+    # splits a flat list of values into a list of records per table, where
+    # sizes[i][j] is the number of values of the j-th record of the i-th
+    # table.
+    lists = []
+    start = 0
+    for table_sizes in sizes:
+        table_lists = []
+        for num_values in table_sizes:
+            table_lists.append(values[start:start + num_values])
+            start += num_values
+        lists.append(table_lists)
+    return lists
+
+
+def tokenize_and_order_tables_in_parallel(table_list, attr_list, tokenizer,
+        n_jobs, min_rows_per_job=MIN_ROWS_PER_TOKENIZATION_JOB,
+        tokenized_columns=None, return_positions=False):
+    """Tokenize the tables using multiple processes and order the tokens.
+
+    The tables are split into shards of at least min_rows_per_job rows, which
+    are tokenized by up to n_jobs processes. Each process interns the tokens
+    of its shard into ids local to the shard and counts their frequencies.
+    The counts are then merged into the global token ordering, which is the
+    same as the one generated by gen_token_ordering_for_tables, and the local
+    ids are relabeled using the ordering.
+
+    If tokenized_columns is given, the tables whose entry is a TokenizedColumn
+    are not tokenized again. The tokens of the column are used as a single
+    shard, which should have one record per row of the table.
+
+    If return_positions is True, the positions of the tokens in the lists
+    returned by the tokenizer are returned as well, as in
+    tokenize_and_order_tables.
+
+    Returns:
+        A pair (token_arrays, token_ordering), where token_arrays[i] is a pair
+        of int32 arrays (offsets, tokens) holding the ordered tokens of the
+        j-th record of the i-th table in tokens[offsets[j] : offsets[j + 1]].
+        If return_positions is True, token_arrays[i] is extended with an
+        int32 array holding the positions of the tokens.
+    """
+    if tokenized_columns is None:
+        tokenized_columns = [None] * len(table_list)
+
+    shard_table_indices = []
+    shards = []
+    tokenized_shards = {}
+    for table_index in range(len(table_list)):
+        table = table_list[table_index]
+        attr = attr_list[table_index]
+        num_rows = len(table)
+        tokenized_column = tokenized_columns[table_index]
+        if tokenized_column is not None:
+            if tokenized_column.num_records != num_rows:
+                raise AssertionError('prepared table has ' + \
+                                     str(tokenized_column.num_records) + \
+                                     ' tokenized records, but the table ' + \
+                                     'has ' + str(num_rows) + ' records. ' + \
+                                     'The table should not be modified ' + \
+                                     'after it is prepared')
+            tokenized_shards[len(shards)] = tokenized_column.get_shard()
+            shard_table_indices.append(table_index)
+            shards.append(None)
+            continue
+        num_shards = max(1, min(n_jobs, num_rows // min_rows_per_job))
+        for shard_index in range(num_shards):
+            start = (num_rows * shard_index) // num_shards
+            end = (num_rows * (shard_index + 1)) // num_shards
+            shard_table_indices.append(table_index)
+            shards.append([row[attr] for row in table[start:end]])
+
+    shards_to_tokenize = [shard for shard in shards if shard is not None]
+    if n_jobs > 1 and len(shards_to_tokenize) > len(table_list):
+        new_results = Parallel(n_jobs=n_jobs)(delayed(_tokenize_shard)(
+                                                  shard, tokenizer)
+                                              for shard in shards_to_tokenize)
+    else:
+        new_results = [_tokenize_shard(shard, tokenizer)
+                       for shard in shards_to_tokenize]
+    new_results = iter(new_results)
+    results = [tokenized_shards[i] if shards[i] is None else next(new_results)
+               for i in range(len(shards))]
+
+    # merge the tokens of the shards, mapping the local ids of each shard to
+    # global ids.
+    token_ids = {}
+    tokens = []
+    local_to_global_ids = []
+    for (shard_tokens, _, _, _) in results:
+        local_to_global = np.empty(len(shard_tokens), dtype=np.int32)
+        for local_id in range(len(shard_tokens)):
+            token = shard_tokens[local_id]
+            token_id = token_ids.get(token)
+            if token_id is None:
+                token_id = len(tokens)
+                token_ids[token] = token_id
+                tokens.append(token)
+            local_to_global[local_id] = token_id
+        local_to_global_ids.append(local_to_global)
+
+    token_freqs = np.zeros(len(tokens), dtype=np.int64)
+    for local_to_global, (_, shard_freqs, _, _) in zip(local_to_global_ids,
+                                                       results):
+        token_freqs[local_to_global] += shard_freqs
+    ranks = _get_token_ranks(tokens, token_freqs)
+
+    token_arrays = []
+    for table_index in range(len(table_list)):
+        sizes = []
+        table_tokens = []
+        for i in range(len(shards)):
+            if shard_table_indices[i] == table_index:
+                (_, _, shard_offsets, shard_ids) = results[i]
+                sizes.append(np.diff(shard_offsets))
+                table_tokens.append(ranks[local_to_global_ids[i][shard_ids]])
+        sizes = np.concatenate(sizes)
+        table_tokens = np.concatenate(table_tokens)
+
+        offsets = np.zeros(len(sizes) + 1, dtype=np.int32)
+        np.cumsum(sizes, dtype=np.int32, out=offsets[1:])
+
+        # sort the tokens of each record.
+        record_ids = np.repeat(np.arange(len(sizes)), sizes)
+        order = np.lexsort((table_tokens, record_ids))
+        table_tokens = table_tokens[order]
+        if return_positions:
+            positions = order - offsets[record_ids]
+            token_arrays.append((offsets, table_tokens.astype(np.int32),
+                                 positions.astype(np.int32)))
+        else:
+            token_arrays.append((offsets, table_tokens.astype(np.int32)))
+
+    token_ordering = dict(zip(tokens, ranks.tolist()))
+
+    return token_arrays, token_ordering
+
+
+def _tokenize_shard(strings, tokenizer):
+    # tokenizes a shard of strings, interning the tokens into ids local to the
+    # shard. Returns the tokens (indexed by their local id), their frequencies
+    # and the local ids of the tokens of each string, in CSR layout.
+    token_ids = {}
+    token_freqs = []
+    offsets = [0]
+    ids = []
+    for string in strings:
+        for token in tokenizer.tokenize(string):
+            token_id = token_ids.get(token)
+            if token_id is None:
+                token_id = len(token_freqs)
+                token_ids[token] = token_id
+                token_freqs.append(0)
+            token_freqs[token_id] += 1
+            ids.append(token_id)
+        offsets.append(len(ids))
+
+    return (list(token_ids), np.array(token_freqs, dtype=np.int64),
+            np.array(offsets, dtype=np.int32), np.array(ids, dtype=np.int32))
+
+
+def _get_token_ranks(tokens, token_freqs):
+    # ranks the tokens in increasing order of frequency, breaking ties using
+    # the tokens themselves. The ranks start from 1, and are returned as an
+    # int32 array indexed by the position of the token in tokens.
+    ranks = np.empty(len(tokens), dtype=np.int32)
+    token_array = np.array(tokens)
+    token_freqs = np.asarray(token_freqs, dtype=np.int64)
+    if len(tokens) > 0 and token_array.dtype.kind in 'SU':
+        order = np.lexsort((token_array, token_freqs))
+    else:
+        # the tokens cannot be compared by NumPy, so they are sorted in
+        # Python.
+        order = np.array(sorted(range(len(tokens)),
+                                key=lambda i: (token_freqs[i], tokens[i])),
+                         dtype=np.int64)
+    ranks[order] = np.arange(1, len(tokens) + 1, dtype=np.int32)
+    return ranks
 
-    token_ordering = {}
-    order_idx = 1
-    for token_freq_tuple in sorted(ordered_tokens, key=itemgetter(1)):
-        token_ordering[token_freq_tuple[0]] = order_idx
-        order_idx += 1
 
-    return token_ordering
+def _get_token_ordering(token_freq_dict):
+    # builds the token ordering from the frequencies of the tokens.
+    tokens = list(token_freq_dict)
+    ranks = _get_token_ranks(tokens, list(token_freq_dict.values()))
+    return dict(zip(tokens, ranks.tolist()))
 
 
 def order_using_token_ordering(tokens, token_ordering):
@@ -0,0 +1,30 @@
+
+from libcpp.vector cimport vector
+
+
+# A view of the tokens of a list of records stored in a compressed sparse row
+# (CSR) layout, where the tokens of record i are 
+# tokens[offsets[i] : offsets[i + 1]]. The view does not own the arrays, and
+# is passed by the join kernels to the functions running without the GIL.
+ctypedef struct TokenStoreView:
+    const int* offsets
+    const int* tokens
+    int num_records
+
+
+cdef class TokenStoreCy:
+    cdef void append(self, list tokens)
+    cdef void set_arrays(self, const int[:], const int[:])
+    cdef void _update_view(self)
+    cdef vector[int] offsets, tokens
+    # the arrays passed to set_arrays, which are kept alive by array_refs.
+    cdef object array_refs
+    cdef TokenStoreView view
+
+
+cdef inline const int* get_tokens(TokenStoreView& store, int i) nogil:
+    return store.tokens + store.offsets[i]
+
+
+cdef inline int get_num_tokens(TokenStoreView& store, int i) nogil:
+    return store.offsets[i + 1] - store.offsets[i]
@@ -0,0 +1,39 @@
+
+from libcpp.vector cimport vector
+
+# The tokens of all the records are stored contiguously in a single array, 
+# instead of one vector per record, which avoids one allocation per record and
+# keeps the tokens of consecutive records close in memory. The join kernels
+# access the tokens through the view, which points either to the vectors of
+# the store, or to the arrays passed to set_arrays.
+
+cdef class TokenStoreCy:
+    def __cinit__(self):
+        self.offsets.push_back(0)
+        self.array_refs = None
+        self._update_view()
+
+    cdef void append(self, list tokens):
+        # appends a record with the given (ordered) tokens.
+        cdef int token
+        for token in tokens:
+            self.tokens.push_back(token)
+        self.offsets.push_back(self.tokens.size())
+        # the vectors may have been reallocated.
+        self._update_view()
+
+    cdef void set_arrays(self, const int[:] offsets, const int[:] tokens):
+        # sets the store to arrays in the same CSR layout, as stored in an 
+        # index file by SetSimJoinIndex. The arrays are not copied, so that a
+        # memory-mapped index is only read where it is accessed.
+        self.offsets.clear()
+        self.tokens.clear()
+        self.array_refs = (offsets, tokens)
+        self.view.offsets = &offsets[0]
+        self.view.tokens = &tokens[0] if tokens.shape[0] > 0 else NULL
+        self.view.num_records = offsets.shape[0] - 1
+
+    cdef void _update_view(self):
+        self.view.offsets = self.offsets.data()
+        self.view.tokens = self.tokens.data()
+        self.view.num_records = self.offsets.size() - 1
@@ -1,5 +1,7 @@
 """Validation utilities"""
 
+from numbers import Integral
+
 import pandas as pd
 
 from py_stringmatching.tokenizer.tokenizer import Tokenizer
@@ -31,8 +33,11 @@ def validate_attr_type(attr, attr_type, attr_label, table_label):
     return True
 
 
-def validate_key_attr(key_attr, table, table_label):
-    """Check if the attribute is a valid key attribute."""
+def validate_key_attr(key_attr, table, table_label, prepared_table=None):
+    """Check if the attribute is a valid key attribute. The check is skipped
+    if the attribute was validated when the table was prepared."""
+    if prepared_table is not None and prepared_table.key_attr == key_attr:
+        return True
     unique_flag = len(table[key_attr].unique()) == len(table)
     nan_flag = sum(table[key_attr].isnull()) == 0 
     if not (unique_flag and nan_flag):
@@ -41,6 +46,17 @@ def validate_key_attr(key_attr, table, table_label):
     return True
 
 
+def validate_self_join(ltable, rtable, l_join_attr, r_join_attr):
+    """Check if the input tables and join attributes form a self join."""
+    if ltable is not rtable:
+        raise AssertionError('left table and right table should be the ' + \
+                             'same table in a self join')
+    if l_join_attr != r_join_attr:
+        raise AssertionError('left join attribute and right join attribute ' + \
+                             'should be the same in a self join')
+    return True
+
+
 def validate_output_attrs(l_out_attrs, l_columns, r_out_attrs, r_columns):
     """Check if the output attributes exist in the original tables."""
     if l_out_attrs:
@@ -74,6 +90,125 @@ def validate_threshold(threshold, sim_measure_type):
     return True
 
 
+def validate_thresholds(thresholds, sim_measure_type):
+    """Check if the list of thresholds of a threshold sweep is valid for the
+    sim_measure_type."""
+    if not isinstance(thresholds, (list, tuple)):
+        raise TypeError('thresholds should be a list')
+    if len(thresholds) == 0:
+        raise AssertionError('thresholds should not be empty')
+    for threshold in thresholds:
+        validate_threshold(threshold, sim_measure_type)
+    return True
+
+
+def validate_sim_conditions(conditions):
+    """Check if the conditions of a multi-measure join are valid."""
+    if not isinstance(conditions, (list, tuple)):
+        raise TypeError('conditions should be a list')
+    if len(conditions) == 0:
+        raise AssertionError('conditions should not be empty')
+    for condition in conditions:
+        if not isinstance(condition, (list, tuple)) or len(condition) != 2:
+            raise TypeError('each condition should be a pair of a ' + \
+                            'similarity measure and a threshold')
+        if condition[0] not in ['COSINE', 'DICE', 'JACCARD']:
+            raise AssertionError('similarity measure \'' + \
+                                 str(condition[0]) + '\' not supported. ' + \
+                                 'Supported measures are COSINE, DICE ' + \
+                                 'and JACCARD.')
+        validate_threshold(condition[1], condition[0])
+    return True
+
+
+def validate_combine_op(combine_op):
+    """Check if the operator combining the conditions of a join is valid."""
+    if combine_op not in ['AND', 'OR']:
+        raise AssertionError('combine_op not supported. Supported ' + \
+                             'operators are AND and OR.')
+    return True
+
+
+def validate_edit_distance_join_method(method):
+    """Check if the method of an edit distance join is valid."""
+    if method not in ['qgram', 'passjoin', 'trie']:
+        raise AssertionError('method not supported. Supported ' + \
+                             'methods are qgram, passjoin and trie.')
+    return True
+
+
+def validate_k(k):
+    """Check if k, the number of output pairs in a top-k join, is valid."""
+    if isinstance(k, bool) or not isinstance(k, Integral):
+        raise TypeError('k should be an integer')
+    if k <= 0:
+        raise AssertionError('k should be greater than 0')
+    return True
+
+
+def validate_set_sim_join_index(index, sim_measure_type, threshold,
+                                table_array, join_attr_index, tokenizer):
+    """Check if the index can be used by a join with the given similarity
+    measure, threshold and tokenizer, on the left table table_array whose join
+    attribute is at join_attr_index."""
+    from py_stringsimjoin.index.set_sim_join_index import SetSimJoinIndex, \
+        get_join_attr_fingerprint, get_tokenizer_config
+    if not isinstance(index, SetSimJoinIndex):
+        raise TypeError('index should be a SetSimJoinIndex')
+    if index.arrays is None:
+        raise AssertionError('index has not been built')
+    if index.sim_measure_type != sim_measure_type:
+        raise AssertionError('index is built for ' + \
+                             index.sim_measure_type + ' and cannot be ' + \
+                             'used for ' + sim_measure_type)
+    if threshold < index.threshold:
+        raise AssertionError('threshold should be greater than or equal ' + \
+                             'to the threshold of the index, ' + \
+                             str(index.threshold))
+    if len(table_array) != index.num_records:
+        raise AssertionError('index is built on a table with ' + \
+                             str(index.num_records) + ' records, but the ' + \
+                             'left table has ' + str(len(table_array)) + \
+                             ' records with a non-missing join attribute')
+    if get_tokenizer_config(tokenizer) != index.tokenizer_config:
+        raise AssertionError('tokenizer does not match the tokenizer ' + \
+                             'used to build the index')
+    if get_join_attr_fingerprint(table_array,
+                                 join_attr_index) != index.fingerprint:
+        raise AssertionError('values of the join attribute of the left ' + \
+                             'table do not match the values of the ' + \
+                             'indexed table')
+    return True
+
+
+def validate_chunk_size(chunk_size):
+    """Check if the number of right table rows per chunk is valid."""
+    if isinstance(chunk_size, bool) or not isinstance(chunk_size, Integral):
+        raise TypeError('chunk_size should be an integer')
+    if chunk_size <= 0:
+        raise AssertionError('chunk_size should be greater than 0')
+    return True
+
+
+def validate_sample_size(sample_size):
+    """Check if the number of records sampled to order the tokens is valid."""
+    if isinstance(sample_size, bool) or not isinstance(sample_size, Integral):
+        raise TypeError('sample_size should be an integer')
+    if sample_size <= 0:
+        raise AssertionError('sample_size should be greater than 0')
+    return True
+
+
+def validate_suffix_filter_max_depth(max_depth):
+    """Check if the maximum recursion depth of the suffix filter is valid."""
+    if isinstance(max_depth, bool) or not isinstance(max_depth, Integral):
+        raise TypeError('suffix_filter_max_depth should be an integer')
+    if max_depth < 0:
+        raise AssertionError('suffix_filter_max_depth should be greater ' + \
+                             'than or equal to 0')
+    return True
+
+
 def validate_tokenizer(tokenizer):
     """Check if the input tokenizer is a valid tokenizer."""
     if not isinstance(tokenizer, Tokenizer):
@@ -133,15 +133,34 @@ MODULES = {
                                                         'comargs':["-I./py_stringsimjoin/index/"]
                                                         },       
 
+        "py_stringsimjoin.join.multi_sim_join_cy": {'sources':["py_stringsimjoin/join/multi_sim_join_cy.pyx"],
+                                                        'comargs':["-I./py_stringsimjoin/index/"]
+                                                        },
+
         "py_stringsimjoin.join.set_sim_join_cy": {'sources':["py_stringsimjoin/join/set_sim_join_cy.pyx",
                                                              ],
                                                         'comargs':["-I./py_stringsimjoin/index/"]
                                                         },   
 
-        "py_stringsimjoin.utils.cython_utils": {'sources': ["py_stringsimjoin/utils/cython_utils.pyx", 
+        "py_stringsimjoin.join.topk_set_sim_join_cy": {'sources':["py_stringsimjoin/join/topk_set_sim_join_cy.pyx",
+                                                             ],
+                                                        'comargs':["-I./py_stringsimjoin/index/"]
+                                                        },
+
+        "py_stringsimjoin.utils.cython_utils": {'sources': ["py_stringsimjoin/utils/cython_utils.pyx",
                                                             ],
                                                'comargs': ["-I./py_stringsimjoin/index/"]
-                                               }
+                                               },
+
+        "py_stringsimjoin.utils.token_store_cy": {'sources': ["py_stringsimjoin/utils/token_store_cy.pyx",
+                                                              ],
+                                                 'comargs': []
+                                                 },
+
+        "py_stringsimjoin.utils.native_tokenizer_cy": {'sources': ["py_stringsimjoin/utils/native_tokenizer_cy.pyx",
+                                                                   ],
+                                                      'comargs': []
+                                                      }
 }
 
 
@@ -250,6 +269,7 @@ def setup_package():
             cmdclass=cmdclass,
             install_requires=[
                 'joblib',
+                'numpy',
                 'pandas >= 0.16.0',
                 'PyPrind >= 2.9.3',
                 'py_stringmatching >= 0.2.1',